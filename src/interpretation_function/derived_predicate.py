@@ -0,0 +1,362 @@
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .nary_tuple import NaryTuple
+from interpretation_function.predicate import Predicate
+from modal_logic.interpretation import Interpretation
+
+from syntax.tokenizer import Token, tokenize
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+RULE_ARROWS = (":-", "←", "<-")
+
+
+class Atom:
+    """
+    An atom in the body or head of a rule, e.g. R(x, z). The terms of a rule atom are
+    always variables.
+    """
+
+    def __init__(self, name: str, variables: Tuple[str, ...]):
+        self.name = name
+        self.variables = tuple(variables)
+        self.arity = len(self.variables)
+
+    def __str__(self):
+        return f"{self.name}({', '.join(self.variables)})"
+
+
+class Rule:
+    """
+    A Datalog rule (Horn clause) of the form H(x, y) :- B1(x, z), B2(z, y). The head
+    holds of a tuple of objects whenever some assignment of the body variables makes
+    every atom in the body true.
+
+    Rules must be range-restricted: every variable in the head has to occur somewhere
+    in the body, otherwise the head would hold for arbitrary objects of the domain.
+    """
+
+    def __init__(self, head: Atom, body: List[Atom]):
+        if not body:
+            raise ValueError(f"Rule for {head} must have a non-empty body.")
+        body_variables = {var for atom in body for var in atom.variables}
+        unsafe = [var for var in head.variables if var not in body_variables]
+        if unsafe:
+            msg = f"Rule {head} :- ... is not range-restricted, {', '.join(unsafe)} does not occur in the body."
+            raise ValueError(msg)
+
+        self.head = head
+        self.body = body
+
+    def __str__(self):
+        return f"{self.head} :- {', '.join(map(str, self.body))}"
+
+    @staticmethod
+    def parse(rule: str) -> "Rule":
+        """
+        Parse a rule written as "T(x, y) :- R(x, z), T(z, y)". The arrow can be written
+        as ":-", "<-" or "←".
+        """
+        for arrow in RULE_ARROWS:
+            if arrow in rule:
+                head_str, body_str = rule.split(arrow, 1)
+                break
+        else:
+            raise ValueError(f"Expected one of {RULE_ARROWS} in rule {rule}")
+
+        head = _parse_atoms(tokenize(head_str))
+        if len(head) != 1:
+            raise ValueError(f"Expected a single atom in the head of rule {rule}")
+        return Rule(head[0], _parse_atoms(tokenize(body_str)))
+
+
+def _parse_atoms(tokens: List[Token]) -> List[Atom]:
+    atoms = []
+    pos = 0
+
+    def consume(token_type):
+        nonlocal pos
+        if pos < len(tokens) and tokens[pos].type == token_type:
+            pos += 1
+            return tokens[pos - 1]
+        found = tokens[pos] if pos < len(tokens) else None
+        raise ValueError(f"Expected token {token_type} but got {found}")
+
+    while pos < len(tokens):
+        name = consume("PREDICATE").value
+        consume("LPAREN")
+        variables = [consume("VARIABLE").value]
+        while pos < len(tokens) and tokens[pos].type == "COMMA":
+            consume("COMMA")
+            variables.append(consume("VARIABLE").value)
+        consume("RPAREN")
+        atoms.append(Atom(name, tuple(variables)))
+        if pos < len(tokens):
+            consume("COMMA")
+    return atoms
+
+
+class IndexedRelation:
+    """
+    A set of tuples together with hash indexes keyed on the values at a subset of the
+    argument positions. Indexes are built the first time a particular set of bound
+    positions is looked up and are kept up to date as tuples are added.
+    """
+
+    def __init__(self, arity: int):
+        self.arity = arity
+        self.tuples: Set[tuple] = set()
+        self.indexes: Dict[Tuple[int, ...], Dict[tuple, List[tuple]]] = {}
+
+    def __len__(self):
+        return len(self.tuples)
+
+    def __contains__(self, row: tuple):
+        return row in self.tuples
+
+    def __iter__(self):
+        return iter(self.tuples)
+
+    def add(self, row: tuple) -> bool:
+        if row in self.tuples:
+            return False
+        self.tuples.add(row)
+        for positions, index in self.indexes.items():
+            index[tuple(row[i] for i in positions)].append(row)
+        return True
+
+    def lookup(self, positions: Tuple[int, ...], key: tuple):
+        if not positions:
+            return self.tuples
+        if positions not in self.indexes:
+            index = defaultdict(list)
+            for row in self.tuples:
+                index[tuple(row[i] for i in positions)].append(row)
+            self.indexes[positions] = index
+        return self.indexes[positions].get(key, ())
+
+
+class RuleSet:
+    """
+    A set of Datalog rules whose head predicates are derived by semi-naive bottom-up
+    fixpoint evaluation over the extensions of the base predicates in an
+    interpretation.
+
+    Each iteration only joins rules against the tuples derived in the previous
+    iteration (the delta), which is indexed on the positions bound by the join. When
+    base predicates are extended after the fixpoint was computed, only the new base
+    tuples are fed in as the next delta so the derived extensions are maintained
+    incrementally.
+    """
+
+    def __init__(self, rules: Optional[List[Union[Rule, str]]] = None):
+        self.rules: List[Rule] = []
+        self.relations: Dict[str, IndexedRelation] = {}
+        self.derived: Dict[str, "DerivedPredicate"] = {}
+        self.interpretation: Optional[Interpretation] = None
+        # Base predicate name -> (id of the predicate object, its version, number of tuples seen)
+        self._seen: Dict[str, Tuple[int, Tuple[int, int], int]] = {}
+        self._stale = True
+        for rule in rules or []:
+            self.add_rule(rule)
+
+    def __str__(self):
+        return "\n".join(map(str, self.rules))
+
+    def add_rule(self, rule: Union[Rule, str]):
+        if isinstance(rule, str):
+            rule = Rule.parse(rule)
+
+        head = rule.head
+        if head.name in self.derived and self.derived[head.name].arity != head.arity:
+            msg = f"Rule {rule} defines {head.name} with arity {head.arity} but it was previously defined with arity {self.derived[head.name].arity}."
+            raise ValueError(msg)
+        if head.name not in self.derived:
+            self.derived[head.name] = DerivedPredicate(head.name, head.arity, self)
+
+        self.rules.append(rule)
+        self._stale = True  # New rules require a full recomputation
+        return self
+
+    def attach(self, interpretation: Interpretation):
+        """Register every derived predicate on the interpretation."""
+        self.interpretation = interpretation
+        for name, predicate in self.derived.items():
+            interpretation.add_predicate(predicate)
+        self._stale = True
+        return self
+
+    def base_names(self) -> Set[str]:
+        return {
+            atom.name
+            for rule in self.rules
+            for atom in rule.body
+            if atom.name not in self.derived
+        }
+
+    def update(self):
+        """
+        Bring the derived extensions up to date with the base predicates. New base
+        tuples are propagated incrementally; if a base extension was replaced or
+        edited other than by appending to it, the fixpoint is recomputed from scratch.
+        """
+        if self.interpretation is None:
+            raise ValueError("RuleSet must be attached to an interpretation first.")
+
+        base_predicates = {}
+        for name in self.base_names():
+            if name not in self.interpretation.predicates:
+                raise ValueError(f"Rules reference unknown base predicate {name}.")
+            base_predicates[name] = self.interpretation.predicates[name]
+
+        recompute = self._stale or any(
+            name not in self._seen
+            or self._seen[name][0] != id(predicate)
+            or self._seen[name][1] != predicate.version
+            or self._seen[name][2] > len(predicate.true_for)
+            for name, predicate in base_predicates.items()
+        )
+        if recompute:
+            self._reset(base_predicates)
+            self._stale = False
+            delta = {name: self.relations[name] for name in base_predicates}
+        else:
+            delta = {}
+            for name, predicate in base_predicates.items():
+                seen = self._seen[name][2]
+                if seen == len(predicate.true_for):
+                    continue
+                new = IndexedRelation(predicate.arity)
+                for nary_tuple in predicate.true_for[seen:]:
+                    row = tuple(nary_tuple.terms)
+                    if self.relations[name].add(row):
+                        new.add(row)
+                self._seen[name] = (id(predicate), predicate.version, len(predicate.true_for))
+                if new:
+                    delta[name] = new
+
+        if delta:
+            self._fixpoint(delta)
+
+    def _reset(self, base_predicates: Dict[str, Predicate]):
+        logger.debug(f"Recomputing derived predicates {', '.join(self.derived)}")
+        self.relations = {}
+        self._seen = {}
+        for name, predicate in base_predicates.items():
+            relation = IndexedRelation(predicate.arity)
+            for nary_tuple in predicate.true_for:
+                relation.add(tuple(nary_tuple.terms))
+            self.relations[name] = relation
+            self._seen[name] = (id(predicate), predicate.version, len(predicate.true_for))
+        for name, predicate in self.derived.items():
+            self.relations[name] = IndexedRelation(predicate.arity)
+            predicate.true_for = []
+
+    def _fixpoint(self, delta: Dict[str, IndexedRelation]):
+        iteration = 0
+        while delta:
+            iteration += 1
+            new: Dict[str, IndexedRelation] = {}
+            for rule in self.rules:
+                head = rule.head
+                for i, atom in enumerate(rule.body):
+                    if atom.name not in delta:
+                        continue
+                    for binding in self._join(rule.body, i, delta[atom.name]):
+                        row = tuple(binding[var] for var in head.variables)
+                        if row in self.relations[head.name]:
+                            continue
+                        if head.name not in new:
+                            new[head.name] = IndexedRelation(head.arity)
+                        new[head.name].add(row)
+
+            for name, relation in new.items():
+                derived = self.derived[name]
+                for row in relation:
+                    self.relations[name].add(row)
+                    derived.true_for.append(NaryTuple(row))
+
+            logger.debug(
+                f"Semi-naive iteration {iteration}: derived {sum(map(len, new.values()))} new tuples"
+            )
+            delta = new
+
+    def _join(
+        self, body: List[Atom], delta_position: int, delta: IndexedRelation
+    ) -> Iterator[Dict[str, object]]:
+        """
+        Enumerate the variable bindings satisfying the body of a rule where the atom
+        at delta_position ranges over the delta and every other atom over the full
+        relation. The delta atom is joined first, and the remaining atoms are ordered
+        so that each one shares as many bound variables as possible.
+        """
+        order = [delta_position]
+        bound = set(body[delta_position].variables)
+        remaining = [i for i in range(len(body)) if i != delta_position]
+        while remaining:
+            best = max(
+                remaining,
+                key=lambda i: sum(var in bound for var in body[i].variables),
+            )
+            remaining.remove(best)
+            order.append(best)
+            bound.update(body[best].variables)
+
+        def extend(step: int, binding: Dict[str, object]):
+            if step == len(order):
+                yield binding
+                return
+            atom = body[order[step]]
+            relation = delta if order[step] == delta_position else self.relations[atom.name]
+            positions = tuple(
+                i for i, var in enumerate(atom.variables) if var in binding
+            )
+            key = tuple(binding[atom.variables[i]] for i in positions)
+            for row in relation.lookup(positions, key):
+                extended = dict(binding)
+                consistent = True
+                for var, obj in zip(atom.variables, row):
+                    if extended.setdefault(var, obj) != obj:
+                        consistent = False
+                        break
+                if consistent:
+                    yield from extend(step + 1, extended)
+
+        yield from extend(0, {})
+
+
+class DerivedPredicate(Predicate):
+    """
+    A predicate whose extension is not listed explicitly but derived from the rules
+    of a RuleSet, e.g. the transitive closure T of a relation R. Once the rule set is
+    added to an interpretation, a derived predicate can be used in formulas like any
+    other predicate.
+    """
+
+    def __init__(self, name: str, arity: int, rule_set: RuleSet):
+        super().__init__(name, arity)
+        self.rule_set = rule_set
+
+    def __call__(self, objects: NaryTuple, interpretation: Interpretation):
+        self.rule_set.update()
+        resolved = objects.get_resolved_terms(interpretation)
+        return tuple(resolved.terms) in self.rule_set.relations[self.name]
+
+    @property
+    def extension(self) -> set:
+        self.rule_set.update()
+        return self.rule_set.relations[self.name].tuples
+
+    def extend(self, objects):
+        msg = f"Predicate {self.name} is derived by rules and cannot be extended directly, extend the base predicates of its rules instead."
+        raise ValueError(msg)
+
+    def represent_extension(self):
+        self.rule_set.update()
+        return super().represent_extension()
@@ -1,26 +1,81 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+
 class Function:
     """
     A function is a mapping from a set of input values (arguments) to an output value. In FOL, functions are used to represent relationships between objects in the domain that produce a new object as a result of applying the function to the input objects. Functions can have multiple arguments and return a single object as the result of the function application.
 
+    The mapping is a hash table from tuples of argument objects to the result. A
+    callable can be given instead of, or in addition to, the table; it computes the
+    result for arguments that are not in the table.
     """
 
-    def __init__(self, name: str, arity: int):
+    def __init__(
+        self,
+        name: str,
+        arity: int,
+        mapping: Optional[Dict[Tuple[Any, ...], Any]] = None,
+        compute: Optional[Callable[..., Any]] = None,
+    ):
         self.name = name
         self.arity = arity
-        self.mapping = {}
+        self.mapping: Dict[Tuple[Any, ...], Any] = {}
+        self.compute = compute
+        # Incremented on every change so that memoized term values can be invalidated
+        self.version = 0
+        if mapping:
+            for objects, result in mapping.items():
+                self[objects] = result
 
     def __str__(self):
         return self.name
 
-    # def __getitem__(self, objects):
-    #   if len(objects) != self.arity:
-    #     raise ValueError(f"Function {self.name} expects {self.arity} arguments, but {len(objects)} were provided.")
-    #   return self.mapping[objects]
+    def _key(self, objects) -> Tuple[Any, ...]:
+        objects = tuple(objects) if isinstance(objects, (list, tuple)) else (objects,)
+        if len(objects) != self.arity:
+            msg = f"Function {self.name} expects {self.arity} arguments, but {len(objects)} were provided."
+            raise ValueError(msg)
+        return objects
+
+    def __getitem__(self, objects):
+        objects = self._key(objects)
+        if objects in self.mapping:
+            return self.mapping[objects]
+        if self.compute is not None:
+            return self.compute(*objects)
+        msg = f"Function {self.name} is not defined for {objects}."
+        raise ValueError(msg)
+
+    def __setitem__(self, objects, result):
+        self.mapping[self._key(objects)] = result
+        self.version += 1
+
+    def __call__(self, objects):
+        return self[objects]
+
+    def extend(self, objects, result):
+        self[objects] = result
+        return self
 
-    # def __setitem__(self, objects, result):
-    #   if len(objects) != self.arity:
-    #     raise ValueError(f"Function {self.name} expects {self.arity} arguments, but {len(objects)} were provided.")
-    #   self.mapping[objects] = result
+    def bulk_extend(self, rows: Iterable[Sequence[Any]]):
+        """Add many (argument..., result) rows at once, without logging."""
+        for row in rows:
+            row = tuple(row)
+            self.mapping[self._key(row[:-1])] = row[-1]
+        self.version += 1
+        return self
 
-    # def __call__(self, objects):
-    #   return self.mapping[objects]
+    def represent_mapping(self):
+        entries = ", ".join(
+            f"({', '.join(map(str, objects))}) ↦ {result}" for objects, result in self.mapping.items()
+        )
+        if self.compute is not None:
+            entries = f"{entries}, ..." if entries else "..."
+        return "{" + entries + "}"
@@ -0,0 +1,55 @@
+from typing import Iterator, Tuple, Union
+
+
+class FunctionTerm:
+    """
+    A term built by applying a function symbol to other terms, e.g. f(g(x), c). The
+    arguments are either the names of constants and variables or nested function
+    terms.
+
+    Terms are immutable and hashed once on construction, so they can be used as keys
+    of the memo table that caches their values across quantifier iterations.
+    """
+
+    def __init__(self, name: str, args: Tuple[Union[str, "FunctionTerm"], ...]):
+        self.name = name
+        self.args = tuple(args)
+        self._hash = hash((self.name, self.args))
+        # The constants and variables the value of the term depends on
+        self.symbols: Tuple[str, ...] = tuple(
+            sorted(
+                {
+                    symbol
+                    for arg in self.args
+                    for symbol in (arg.symbols if isinstance(arg, FunctionTerm) else (str(arg),))
+                }
+            )
+        )
+        self.depth: int = 1 + max(
+            (arg.depth for arg in self.args if isinstance(arg, FunctionTerm)), default=0
+        )
+
+    def __str__(self):
+        return f"{self.name}({', '.join(str(arg) for arg in self.args)})"
+
+    def __repr__(self):
+        return str(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, FunctionTerm):
+            return False
+        return self._hash == other._hash and self.name == other.name and self.args == other.args
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # Unpickled through the constructor, since string hashes differ between processes
+        return FunctionTerm, (self.name, self.args)
+
+    def subterms(self) -> Iterator["FunctionTerm"]:
+        """This term and every function term nested in it."""
+        yield self
+        for arg in self.args:
+            if isinstance(arg, FunctionTerm):
+                yield from arg.subterms()
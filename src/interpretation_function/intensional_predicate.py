@@ -0,0 +1,50 @@
+from typing import Callable, List, Optional, Sequence
+
+from .nary_tuple import NaryTuple
+from interpretation_function.predicate import Predicate
+from modal_logic.interpretation import Interpretation
+
+
+class IntensionalPredicate(Predicate):
+    """
+    A predicate defined by a Python callable instead of a list of tuples, e.g.
+    Less(x, y) over the integers as lambda x, y: x < y. The extension is never
+    materialized.
+
+    A vectorized callable that takes a sequence of argument tuples and returns a
+    sequence of truth values can be given as well; the evaluator uses it to test whole
+    chunks of the domain at once. The cost hint is the relative cost of a single call,
+    which the evaluator uses to test cheaper subformulas first.
+    """
+
+    intensional = True
+
+    def __init__(
+        self,
+        name: str,
+        arity: int,
+        test: Callable[..., bool],
+        vectorized: Optional[Callable[[Sequence[tuple]], Sequence[bool]]] = None,
+        cost: float = 1.0,
+    ):
+        super().__init__(name, arity)
+        self.test = test
+        self.vectorized = vectorized
+        self.cost = cost
+
+    def __call__(self, objects: NaryTuple, interpretation: Interpretation):
+        resolved = objects.get_resolved_terms(interpretation)
+        return bool(self.test(*resolved))
+
+    def test_many(self, rows: Sequence[tuple]) -> List[bool]:
+        if self.vectorized is not None:
+            return [bool(result) for result in self.vectorized(rows)]
+        return [bool(self.test(*row)) for row in rows]
+
+    def extend(self, objects):
+        msg = f"Predicate {self.name} is defined by a callable and cannot be extended."
+        raise ValueError(msg)
+
+    def represent_extension(self):
+        variables = NaryTuple([None] * self.arity).represent_example_extension()
+        return f"{{{variables} | {self.name}{variables}}}"
@@ -2,6 +2,7 @@ from typing import TypeVar, Generic, Collection
 
 
 from interpretation_function.constant import Constant
+from interpretation_function.function_term import FunctionTerm
 from interpretation_function.variable import Variable
 
 T = TypeVar("T")
@@ -34,7 +35,7 @@ class NaryTuple(Generic[T]):
         """
         resolved = []
         for term in self.terms:
-            if isinstance(term, (Constant, Variable)):
+            if isinstance(term, (Constant, Variable, FunctionTerm)):
                 resolved.append(interpretation(term))
             else:
                 resolved.append(interpretation(Variable(term)))
@@ -52,7 +53,10 @@ class NaryTuple(Generic[T]):
     def __eq__(self, other: "NaryTuple"):
         if not isinstance(other, NaryTuple):
             raise TypeError(f"Expected Tuple but got {type(other)}")
-        return len(set(self.terms).difference(other.terms)) == 0
+        return self.terms == other.terms
+
+    def __hash__(self):
+        return hash(tuple(self.terms))
 
     def __str__(self):
         if len(self.terms) > 2:
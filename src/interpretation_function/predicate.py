@@ -1,6 +1,8 @@
 import itertools
+from typing import List, Optional, Sequence, Tuple
 
 from .nary_tuple import NaryTuple
+from modal_logic.domain import bitset
 from modal_logic.interpretation import Interpretation
 from interpretation_function.variable import Variable
 
@@ -12,17 +14,64 @@ config = Config()
 logger = Logger(__name__, config["log_level"])()
 
 
+class ExtensionList(list):
+    """
+    The list of tuples a predicate is true for. The indexes over it catch up with
+    appended entries; every other change, such as replacing, removing or reordering
+    entries, is counted in edits, after which they are rebuilt.
+    """
+
+    edits = 0
+
+
+def _counting_edits(method):
+    def edit(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.edits += 1
+        return result
+
+    edit.__name__ = method.__name__
+    return edit
+
+
+for _method in ("__setitem__", "__delitem__", "__imul__", "insert", "pop", "remove", "clear", "sort", "reverse"):
+    setattr(ExtensionList, _method, _counting_edits(getattr(list, _method)))
+
+
 class Predicate:
     """
     A predicate is a function that takes objects as arguments and returns a truth value. In FOL, predicates are used to describe properties or relationships between objects in the domain. Predicates can have multiple arguments, and the truth value of the predicate is determined by the objects assigned to these arguments in the interpretation.
 
     """
 
-    def __init__(self, name: str, arity: int):
+    # Whether the extension is defined by a callable rather than listed in true_for
+    intensional = False
+    # Relative cost of testing a single tuple, used to order subformulas
+    cost = 1.0
+
+    def __init__(self, name: str, arity: int, signature: Optional[Sequence[Optional[str]]] = None):
+        if signature is not None and len(signature) != arity:
+            msg = f"Signature {signature} of predicate {name} does not match its arity {arity}."
+            raise ValueError(msg)
         self.name = name
         self.arity = arity
+        # The sort of each argument position, None for positions that take any object
+        self.signature = tuple(signature) if signature is not None else (None,) * arity
+        self._replacements = 0
         self.true_for = []
         self.is_unary = arity == 1
+        self._init_indexes()
+
+    def _init_indexes(self):
+        """The state of the cached indexes, for subclasses that store their extension elsewhere as well."""
+        # Hashed index over true_for, caught up lazily on lookup
+        self._extension = set()
+        self._indexed = 0
+        self._indexed_version = None
+        self._id_extension = None
+        self._id_extension_key = None
+        self._id_bitset = 0
+        self._id_bitset_source = None
 
     def __str__(self):
         return self.name
@@ -32,7 +81,39 @@ class Predicate:
         logger.debug(
             f"Predicate Resolved terms to: {resolved} before checking if they exist in extension"
         )
-        return resolved in self.true_for
+        return tuple(resolved.terms) in self.extension
+
+    @property
+    def true_for(self) -> List[NaryTuple]:
+        return self._true_for
+
+    @true_for.setter
+    def true_for(self, true_for: List[NaryTuple]):
+        self._true_for = true_for if isinstance(true_for, ExtensionList) else ExtensionList(true_for)
+        self._replacements += 1
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """Changes whenever true_for is replaced or edited other than by appending to it."""
+        return self._replacements, self._true_for.edits
+
+    @property
+    def extension(self) -> set:
+        """
+        The extension as a set of tuples. true_for remains the source of truth, new
+        entries are indexed on the next lookup and the index is rebuilt if true_for
+        was replaced or edited.
+        """
+        if self._indexed_version != self.version:
+            self._extension = set()
+            self._indexed = 0
+            self._indexed_version = self.version
+        if self._indexed < len(self.true_for):
+            self._extension.update(
+                tuple(nary_tuple.terms) for nary_tuple in self.true_for[self._indexed :]
+            )
+            self._indexed = len(self.true_for)
+        return self._extension
 
     def extend(self, objects):
         if isinstance(objects, (list, tuple, set)):
@@ -45,6 +126,56 @@ class Predicate:
             )
         return self
 
+    def id_extension(self, domain) -> frozenset:
+        """
+        The extension encoded as tuples of the dense integer ids of an InternedDomain.
+        Tuples containing objects outside the domain are left out. The encoding is
+        cached until either the extension or the domain changes.
+        """
+        extension = self.extension
+        key = (id(domain), domain.version, self.version, len(extension))
+        if self._id_extension_key != key:
+            ids = domain.ids
+            self._id_extension = frozenset(
+                tuple(ids[obj] for obj in row)
+                for row in extension
+                if all(obj in ids for obj in row)
+            )
+            self._id_extension_key = key
+        return self._id_extension
+
+    def id_bitset(self, domain) -> int:
+        """
+        The extension of a unary predicate as a bitset over the ids of an
+        InternedDomain, so that counting objects is a popcount. Cached along with
+        id_extension.
+        """
+        extension = self.id_extension(domain)
+        if self._id_bitset_source is not extension:
+            self._id_bitset = bitset(row[0] for row in extension)
+            self._id_bitset_source = extension
+        return self._id_bitset
+
+    def bulk_extend(self, rows):
+        """
+        Add many tuples at once without logging, skipping tuples that are already in
+        the extension. Returns the number of tuples added.
+        """
+        extension = self.extension
+        added = 0
+        for row in rows:
+            row = tuple(row)
+            if len(row) != self.arity:
+                msg = f"Predicate {self.name} expects {self.arity} arguments, but {len(row)} were provided."
+                raise ValueError(msg)
+            if row in extension:
+                continue
+            extension.add(row)
+            self.true_for.append(NaryTuple(row))
+            added += 1
+        self._indexed = len(self.true_for)
+        return added
+
     def represent_extension(self):
         return "{" + ", ".join([f"{term}" for term in self.true_for]) + "}"
 
@@ -106,7 +237,9 @@ class Predicate:
     ):
         if any(term not in interpretation.names for term in input):
             # TODO: since the bindings are already broken by this point in the program, we cannot resolve variables so we have to just use the first n items in the domain
-            resolved_input_tuple = NaryTuple(list(interpretation.domain)[: len(input)])
+            resolved_input_tuple = NaryTuple(
+                list(itertools.islice(interpretation.domain, len(input)))
+            )
         else:
             resolved_input_tuple = input.get_resolved_terms(interpretation)
 
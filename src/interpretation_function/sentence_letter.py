@@ -18,6 +18,9 @@ class SentenceLetter:
         self.included_in_interpretations.append(interpretation)
         return self
 
+    def __hash__(self):
+        return hash(self.letter)
+
     def __eq__(self, other):
         for interpretation in self.included_in_interpretations:
             if other in interpretation.truth_values:
@@ -1,4 +1,4 @@
-from typing import TypeVar, Generic, Union, List, Collection, Any
+from typing import TypeVar, Generic, Union, List, Collection, Any, Dict, Iterable, Iterator, Optional
 
 from utils.config import Config
 from utils.log import Logger
@@ -13,8 +13,96 @@ logger = Logger(__name__, config["log_level"])()
 
 T = TypeVar("T")
 
+_REMOVED = object()
 
-class DomainOfDiscourse(Generic[T]):
+
+def bitset(ids: Iterable[int]) -> int:
+    """Encode a collection of object ids as an int with the bit of every id set."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    bits = bytearray((max(ids) >> 3) + 1)
+    for object_id in ids:
+        bits[object_id >> 3] |= 1 << (object_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+class InternedDomain(Generic[T]):
+    """
+    A set of domain objects in which every object is interned to a dense integer id.
+
+    Objects are iterated in the order they were added, so iteration is stable between
+    runs. The reverse table from ids to objects is a plain list indexed by id. Ids are
+    never reused: removing an object leaves a hole in the reverse table, which keeps
+    every other id (and anything encoded with it) valid.
+    """
+
+    def __init__(self, objects: Iterable[T] = ()):
+        self.ids: Dict[T, int] = {}
+        self.objects: List[Any] = []
+        # Incremented on every change so that id-encoded caches can be invalidated
+        self.version = 0
+        self.update(objects)
+
+    def intern(self, obj: T) -> int:
+        object_id = self.ids.get(obj)
+        if object_id is None:
+            object_id = len(self.objects)
+            self.ids[obj] = object_id
+            self.objects.append(obj)
+            self.version += 1
+        return object_id
+
+    def id_of(self, obj: T) -> Optional[int]:
+        return self.ids.get(obj)
+
+    def object(self, object_id: int) -> T:
+        obj = self.objects[object_id]
+        if obj is _REMOVED:
+            raise KeyError(f"Object with id {object_id} was removed from the domain.")
+        return obj
+
+    def first(self) -> T:
+        return next(iter(self.ids))
+
+    def add(self, obj: T):
+        self.intern(obj)
+
+    def update(self, objects: Iterable[T]):
+        for obj in objects:
+            self.intern(obj)
+
+    def discard(self, obj: T):
+        object_id = self.ids.pop(obj, None)
+        if object_id is not None:
+            self.objects[object_id] = _REMOVED
+            self.version += 1
+
+    def remove(self, obj: T):
+        if obj not in self.ids:
+            raise KeyError(obj)
+        self.discard(obj)
+
+    def bitset(self) -> int:
+        """The ids of the objects in the domain as a bitset, skipping removed ids."""
+        if len(self.ids) == len(self.objects):
+            return (1 << len(self.objects)) - 1
+        return bitset(self.ids.values())
+
+    def issubset(self, other: Iterable[T]) -> bool:
+        return all(obj in other for obj in self.ids)
+
+    def __contains__(self, item: T):
+        return item in self.ids
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class DomainOfDiscourse(InternedDomain[T]):
     """
     Represents the domain of discourse for an interpretation.
 
@@ -28,16 +116,28 @@ class DomainOfDiscourse(Generic[T]):
     def __init__(self, name: str = "D", model_name: str = "M"):
         logger.info(h(f"Creating Domain {im(name)}", 2))
         logger.info(df("domain", definition("domain")))
+        super().__init__()
         self.name = name
         self.model_name = model_name
-        self.domain = set()
+        self.sorts: Dict[str, InternedDomain[T]] = {}
+
+    @property
+    def domain(self) -> InternedDomain[T]:
+        return self
+
+    @domain.setter
+    def domain(self, objects: Iterable[T]):
+        self.ids = {}
+        self.objects = []
+        self.version += 1
+        self.update(objects)
 
     def __str__(self):
         return f"{self.name}"
 
     def __contains__(self, item: T):
         logger.info(h(f"Checking if {im(item)} is in Domain {im(self.name)}", 5))
-        result = item in self.domain
+        result = item in self.ids
 
         symbol = symb("is in") if result else symb("is not in")
         logger.info(
@@ -46,37 +146,58 @@ class DomainOfDiscourse(Generic[T]):
         return result
 
     def represent_domain(self):
-        return "{" + ", ".join(map(str, sorted(self.domain))) + "}"
+        return "{" + ", ".join(map(str, self)) + "}"
 
     def expand(self, obj: Union[T, List[T]]):
         logger.info(h(f"Expanding Domain {im(self.name)}", 3))
         logger.info(df("domain expansion", definition("domain expansion")))
 
         logger.info(h("Domain Before Expansion", 4))
-        logger.info(f"{im(self.name)} = {st(self.domain)}")
+        logger.info(f"{im(self.name)} = {st(list(self))}")
 
-        if isinstance(obj, Collection) and len(obj) > 0:
-            self.domain.update(obj)
+        if isinstance(obj, Collection) and not isinstance(obj, str) and len(obj) > 0:
+            self.update(obj)
         else:
-            self.domain.add(obj)
+            self.add(obj)
 
         logger.info(h("Domain After Expansion", 4))
-        logger.info(f"{im(self.name)}' = {st(self.domain)}")
+        logger.info(f"{im(self.name)}' = {st(list(self))}")
 
         return self
 
+    def bulk_expand(self, objects: Collection[T]):
+        """Add many objects at once without logging the domain before and after."""
+        self.update(objects)
+        return self
+
     def restrict(self, obj: Union[T, List[T]]):
-        if isinstance(obj, (list, tuple, set)):
-            self.domain.difference_update(obj)
-        else:
-            self.domain.remove(obj)
+        objects = obj if isinstance(obj, (list, tuple, set)) else [obj]
+        if not isinstance(obj, (list, tuple, set)) and obj not in self.ids:
+            raise KeyError(obj)
+        for item in objects:
+            self.discard(item)
+            for sort in self.sorts.values():
+                sort.discard(item)
+        return self
+
+    def add_sort(self, name: str, objects: Collection[T] = ()):
+        """
+        Declare a sort (e.g. Person) as a subset of the domain, adding its objects to
+        the domain. Typed quantifiers such as ∀x:Person only range over the sort.
+        """
+        if name not in self.sorts:
+            self.sorts[name] = InternedDomain()
+        self.sorts[name].update(objects)
+        self.update(objects)
         return self
 
-    def __iter__(self):
-        return iter(self.domain)
+    def sort(self, name: str) -> InternedDomain[T]:
+        if name not in self.sorts:
+            raise ValueError(f"Sort {name} is not declared in domain {self.name}.")
+        return self.sorts[name]
 
-    def __len__(self):
-        return len(self.domain)
+    def sorts_of(self, obj: T) -> List[str]:
+        return [name for name, sort in self.sorts.items() if obj in sort]
 
     def __eq__(self, other):
         if not isinstance(other, DomainOfDiscourse):
@@ -88,31 +209,118 @@ class DomainOfDiscourse(Generic[T]):
         logger.info(df("set equality", definition("set equality")))
 
         logger.info(h("Domain 1", 5))
-        logger.info(f"{im(self.name)} = {st(self.domain)}")
+        logger.info(f"{im(self.name)} = {st(list(self))}")
 
         logger.info(h("Domain 2", 5))
-        logger.info(f"{im(other.name)} = {st(other.domain)}")
+        logger.info(f"{im(other.name)} = {st(list(other))}")
 
         logger.info(h("Equality Check", 5))
 
         # Formal definition of set equality
-        result = self.domain.issubset(other.domain) and other.domain.issubset(
-            self.domain
-        )
+        result = self.issubset(other.ids) and other.issubset(self.ids)
 
         sem_entail = symb_sub("semantically entails", self.model_name)
         not_sem_entail = symb_sub("not semantically entails", self.model_name)
 
-        symbol = sem_entail if self.domain.issubset(other.domain) else not_sem_entail
-        logger.info(f"{symbol} {st(self.domain)} {symb('subset')} {st(other.domain)}")
+        symbol = sem_entail if self.issubset(other.ids) else not_sem_entail
+        logger.info(f"{symbol} {st(list(self))} {symb('subset')} {st(list(other))}")
 
-        symbol = sem_entail if other.domain.issubset(self.domain) else not_sem_entail
-        logger.info(f"{symbol} {st(other.domain)} {symb('subset')} {st(self.domain)}")
+        symbol = sem_entail if other.issubset(self.ids) else not_sem_entail
+        logger.info(f"{symbol} {st(list(other))} {symb('subset')} {st(list(self))}")
 
         symbol = sem_entail if result else not_sem_entail
-        logger.info(f"{symbol} {st(self.domain)} = {st(other.domain)}")
+        logger.info(f"{symbol} {st(list(self))} = {st(list(other))}")
 
         return result
 
     def __ne__(self, other):
         return not self.__eq__(other)
+
+
+class LazyDomain:
+    """
+    Base class for domains whose objects are produced on demand and never stored,
+    such as the integers 0..N. Quantifiers iterate them lazily like any other domain.
+    """
+
+    def __init__(self, name: str = "D", model_name: str = "M"):
+        self.name = name
+        self.model_name = model_name
+
+    def __str__(self):
+        return f"{self.name}"
+
+    def __bool__(self):
+        return True
+
+    def first(self):
+        return next(iter(self))
+
+    def represent_domain(self, max_objects: int = 5):
+        shown = []
+        for obj in self:
+            if len(shown) == max_objects:
+                shown.append("...")
+                break
+            shown.append(str(obj))
+        return "{" + ", ".join(shown) + "}"
+
+
+class RangeDomain(LazyDomain):
+    """
+    A domain of integers backed by a range. Membership, size and the id of an object
+    are computed arithmetically.
+    """
+
+    def __init__(self, start: int, stop: Optional[int] = None, step: int = 1, name: str = "D", model_name: str = "M"):
+        super().__init__(name, model_name)
+        self.range = range(start) if stop is None else range(start, stop, step)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.range)
+
+    def __len__(self):
+        return len(self.range)
+
+    def __contains__(self, item: Any):
+        return isinstance(item, int) and item in self.range
+
+    def id_of(self, obj: int) -> Optional[int]:
+        return self.range.index(obj) if obj in self else None
+
+    def object(self, object_id: int) -> int:
+        return self.range[object_id]
+
+
+class GeneratorDomain(LazyDomain):
+    """
+    A domain whose objects are produced by calling a factory that returns a fresh
+    iterable every time the domain is iterated. A membership test and the size can be
+    given up front; otherwise they are computed by iterating the domain.
+    """
+
+    def __init__(
+        self,
+        factory,
+        size: Optional[int] = None,
+        contains=None,
+        name: str = "D",
+        model_name: str = "M",
+    ):
+        super().__init__(name, model_name)
+        self.factory = factory
+        self.size = size
+        self.contains = contains
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.factory())
+
+    def __len__(self):
+        if self.size is None:
+            self.size = sum(1 for _ in self)
+        return self.size
+
+    def __contains__(self, item: Any):
+        if self.contains is not None:
+            return bool(self.contains(item))
+        return any(obj == item for obj in self)
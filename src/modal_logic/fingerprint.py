@@ -0,0 +1,285 @@
+import hashlib
+from collections import defaultdict
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from modal_logic.domain import LazyDomain
+from modal_logic.model import Model
+from modal_logic.union_find import UnionFind
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+# A symbol of the structure: its kind ("constant", "function", "predicate" or "sort") and name
+Symbol = Tuple[str, str]
+# Colours are dense ranks 0, 1, ... ordered by an isomorphism-invariant key
+Colours = List[int]
+
+
+class CanonicalForm:
+    """
+    The canonical form of a finite model: its objects numbered so that isomorphic
+    models, whatever their objects are called, get the same description, and a
+    fingerprint that hashes that description. Models with equal fingerprints are
+    isomorphic, up to hash collisions, so the fingerprint can key caches of
+    evaluation results and drop duplicate models.
+
+    The model is read as a set of rows over its objects: one per constant, tuple of a
+    predicate, entry of a function (its arguments followed by its result) and member
+    of a sort. Objects are then coloured by colour refinement: an object's new colour
+    is its colour together with the sorted colours of the rows it occurs in, at each
+    position, until the number of colours stops growing. Ties between objects that
+    are still left are broken by individualisation: one member of the first cell of
+    equal colours is given a colour of its own, the colours are refined again, and
+    this is repeated for every member of the cell, keeping the numbering with the
+    least description. The search is pruned by the automorphisms it discovers, and a
+    cell whose members can be swapped pairwise with its first member, such as objects
+    that occur in no row, is split in one step, since every order of it gives the
+    same description.
+
+    A round of refinement only recomputes the cells next to an object whose colour
+    changed in the previous round, so with rows of total length m the refinement
+    typically costs O(m log m) and models with few symmetries are canonised in
+    near-linear time. Highly regular models may need an exponential search in the
+    worst case. Predicates and functions defined by a callable are tabulated over the
+    whole domain first.
+    """
+
+    def __init__(self, model: Model):
+        interpretation = model.I
+        domain = interpretation.domain
+        if isinstance(domain, LazyDomain):
+            msg = f"Model {model.name} has a lazy domain, only finite models with stored objects have a canonical form."
+            raise ValueError(msg)
+        self.objects: List[Any] = list(domain)
+        self.ids: Dict[Any, int] = {obj: i for i, obj in enumerate(self.objects)}
+        self.letters = tuple(sorted(interpretation.truth_values.items()))
+        self.rows: Dict[Symbol, List[Tuple[int, ...]]] = self._rows(model)
+        self.rowsets = {symbol: set(rows) for symbol, rows in self.rows.items()}
+        # Object -> the (symbol, positions, row) of every row it occurs in
+        self.occurrences: List[List[Tuple[Symbol, Tuple[int, ...], Tuple[int, ...]]]] = [
+            [] for _ in self.objects
+        ]
+        for symbol, rows in self.rows.items():
+            for row in rows:
+                for obj in set(row):
+                    positions = tuple(i for i, other in enumerate(row) if other == obj)
+                    self.occurrences[obj].append((symbol, positions, row))
+        self.neighbours: List[set] = [
+            {other for _, _, row in occurrences for other in row} | {obj}
+            for obj, occurrences in enumerate(self.occurrences)
+        ]
+
+        self.nodes = 0
+        self.leaves = 0
+        self.automorphisms: List[List[int]] = []
+        self._best: Optional[tuple] = None
+        self._best_labels: Optional[Colours] = None
+        self._search()
+        # labels[i] is the canonical number of the i-th object
+        self.labels: Colours = self._best_labels
+        self.certificate: tuple = self._best
+        logger.debug(
+            f"Canonised {model.name} with {len(self.objects)} objects in {self.nodes} search nodes "
+            f"and {self.leaves} leaves, {len(self.automorphisms)} automorphisms found"
+        )
+
+    def _rows(self, model: Model) -> Dict[Symbol, List[Tuple[int, ...]]]:
+        interpretation = model.I
+        ids = self.ids
+        rows: Dict[Symbol, List[Tuple[int, ...]]] = defaultdict(list)
+        for name, obj in interpretation.names.items():
+            if obj in ids:
+                rows[("constant", name)].append((ids[obj],))
+        for name, predicate in interpretation.predicates.items():
+            if predicate.intensional:
+                cells = list(product(self.objects, repeat=predicate.arity))
+                extension = [cell for cell, value in zip(cells, predicate.test_many(cells)) if value]
+            else:
+                extension = predicate.extension
+            rows[("predicate", name)] = sorted(
+                {tuple(ids[obj] for obj in row) for row in extension if all(obj in ids for obj in row)}
+            )
+        for name, function in interpretation.functions.items():
+            if function.compute is not None:
+                mapping = {args: function[args] for args in product(self.objects, repeat=function.arity)}
+            else:
+                mapping = function.mapping
+            rows[("function", name)] = sorted(
+                tuple(ids[obj] for obj in args) + (ids[result],)
+                for args, result in mapping.items()
+                if result in ids and all(obj in ids for obj in args)
+            )
+        domain = interpretation.domain
+        for name in sorted(getattr(domain, "sorts", {})):
+            rows[("sort", name)] = sorted((ids[obj],) for obj in domain.sort(name) if obj in ids)
+        return dict(rows)
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(repr(self.certificate).encode()).hexdigest()
+
+    def canonical_objects(self) -> List[Any]:
+        """The objects of the model in canonical order."""
+        ordered = [None] * len(self.objects)
+        for i, label in enumerate(self.labels):
+            ordered[label] = self.objects[i]
+        return ordered
+
+    # Colour refinement
+
+    @staticmethod
+    def _rank(keys: Sequence[Any]) -> Colours:
+        ranks = {key: i for i, key in enumerate(sorted(set(keys)))}
+        return [ranks[key] for key in keys]
+
+    def _signature(self, obj: int, colours: Colours) -> tuple:
+        return tuple(
+            sorted(
+                (symbol, positions, tuple(colours[other] for other in row))
+                for symbol, positions, row in self.occurrences[obj]
+            )
+        )
+
+    def _refine(self, colours: Colours, changed: Optional[Iterable[int]] = None) -> Colours:
+        """
+        Refine colours until they are stable. Only cells with a neighbour of an object
+        whose colour changed can split, so only their signatures are recomputed.
+        """
+        n = len(colours)
+        changed = range(n) if changed is None else changed
+        while True:
+            affected = {colours[neighbour] for obj in changed for neighbour in self.neighbours[obj]}
+            cells: Dict[int, List[int]] = defaultdict(list)
+            for obj, colour in enumerate(colours):
+                if colour in affected:
+                    cells[colour].append(obj)
+            signatures: Dict[int, tuple] = {}
+            changed = []
+            for members in cells.values():
+                if len(members) < 2:
+                    continue
+                cell_signatures = [self._signature(obj, colours) for obj in members]
+                if any(signature != cell_signatures[0] for signature in cell_signatures[1:]):
+                    signatures.update(zip(members, cell_signatures))
+                    changed.extend(members)
+            if not changed:
+                return colours
+            colours = self._rank([(colour, signatures.get(obj, ())) for obj, colour in enumerate(colours)])
+
+    @staticmethod
+    def _individualise(colours: Colours, objects: Sequence[int]) -> Colours:
+        """The colours with the given objects, of one cell, split off in turn ahead of the rest of the cell."""
+        order = {obj: i for i, obj in enumerate(objects)}
+        return CanonicalForm._rank([(colour, order.get(obj, len(objects))) for obj, colour in enumerate(colours)])
+
+    # Search
+
+    def _swappable(self, a: int, b: int) -> bool:
+        """Whether exchanging a and b maps every row of the model onto a row."""
+        swap = {a: b, b: a}
+        for obj in (a, b):
+            for symbol, _, row in self.occurrences[obj]:
+                if tuple(swap.get(other, other) for other in row) not in self.rowsets[symbol]:
+                    return False
+        return True
+
+    def _certificate(self, labels: Colours) -> tuple:
+        return (
+            len(labels),
+            self.letters,
+            tuple(
+                (symbol, tuple(sorted(tuple(labels[obj] for obj in row) for row in rows)))
+                for symbol, rows in sorted(self.rows.items())
+            ),
+        )
+
+    def _leaf(self, labels: Colours):
+        self.leaves += 1
+        certificate = self._certificate(labels)
+        if self._best is None or certificate < self._best:
+            self._best, self._best_labels = certificate, labels
+        elif certificate == self._best:
+            # Both numberings give the same description, so they differ by an automorphism
+            by_label = [0] * len(labels)
+            for obj, label in enumerate(self._best_labels):
+                by_label[label] = obj
+            self.automorphisms.append([by_label[label] for label in labels])
+
+    def _orbit_representatives(self, members: List[int], path: List[int]) -> List[int]:
+        """One member of each orbit of members under the known automorphisms that fix path."""
+        orbits = UnionFind()
+        for automorphism in self.automorphisms:
+            if all(automorphism[obj] == obj for obj in path):
+                for obj in members:
+                    orbits.union(obj, automorphism[obj])
+        seen = set()
+        representatives = []
+        for obj in members:
+            root = orbits.find(obj)
+            if root not in seen:
+                seen.add(root)
+                representatives.append(obj)
+        return representatives
+
+    def _target(self, colours: Colours) -> Optional[List[int]]:
+        """The members of the first cell of more than one object, or None if every object has a colour of its own."""
+        cells: Dict[int, List[int]] = defaultdict(list)
+        for obj, colour in enumerate(colours):
+            cells[colour].append(obj)
+        return next((cells[colour] for colour in sorted(cells) if len(cells[colour]) > 1), None)
+
+    def _search(self):
+        if not self.objects:
+            self._best, self._best_labels = self._certificate([]), []
+            return
+        # Depth-first, with explicit frames of (colours, path, members, next index, explored members)
+        stack = [(self._refine([0] * len(self.objects)), [], None, 0, [])]
+        while stack:
+            colours, path, members, index, explored = stack.pop()
+            if members is None:
+                self.nodes += 1
+                members = self._target(colours)
+                if members is None:
+                    self._leaf(colours)
+                    continue
+                if all(self._swappable(members[0], obj) for obj in members[1:]):
+                    refined = self._refine(self._individualise(colours, members), members)
+                    stack.append((refined, path + members, None, 0, []))
+                    continue
+            # Members in the orbit of an explored member lead to the same descriptions
+            while index < len(members) and explored and members[index] not in self._orbit_representatives(
+                explored + [members[index]], path
+            ):
+                index += 1
+            if index == len(members):
+                continue
+            obj = members[index]
+            stack.append((colours, path, members, index + 1, explored + [obj]))
+            refined = self._refine(self._individualise(colours, [obj]), members)
+            stack.append((refined, path + [obj], None, 0, []))
+
+
+def canonical_form(model: Model) -> CanonicalForm:
+    return CanonicalForm(model)
+
+
+def fingerprint(model: Model) -> str:
+    """A hash of the model that is equal for isomorphic models."""
+    return CanonicalForm(model).fingerprint
+
+
+def deduplicate(models: Iterable[Model]) -> List[Model]:
+    """The models with all but the first of every isomorphism class dropped."""
+    seen = set()
+    unique = []
+    for model in models:
+        key = fingerprint(model)
+        if key not in seen:
+            seen.add(key)
+            unique.append(model)
+    return unique
@@ -0,0 +1,192 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from interpretation_function.predicate import Predicate
+from modal_logic.interpretation import Interpretation
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+Columns = Optional[Sequence[Union[str, int]]]
+
+
+class IngestStats:
+    """Row counts and throughput of a single ingestion run."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.rows = 0
+        self.added = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float("inf")
+
+    def __str__(self):
+        return (
+            f"{self.source}: {self.rows} rows ({self.added} new) in {self.batches} batches,"
+            f" {self.seconds:.2f}s, {self.rows_per_second:,.0f} rows/s"
+        )
+
+
+def read_rows(
+    path: Union[str, Path], columns: Columns = None, fmt: Optional[str] = None
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    Stream the rows of a CSV or JSONL file as tuples, one line at a time.
+
+    CSV files are expected to have a header row. JSONL lines can be objects, arrays
+    or scalars. columns selects and orders the fields of each row, by header/key name
+    or by position; by default every field is used in file order.
+    """
+    path = Path(path)
+    fmt = fmt or path.suffix.lstrip(".").lower()
+
+    if fmt == "csv":
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            positions = [
+                column if isinstance(column, int) else header.index(column)
+                for column in columns or range(len(header))
+            ]
+            for row in reader:
+                if row:
+                    yield tuple(row[i] for i in positions)
+
+    elif fmt in ("jsonl", "ndjson"):
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    keys = columns or list(record)
+                    yield tuple(record[key] for key in keys)
+                elif isinstance(record, list):
+                    positions = columns or range(len(record))
+                    yield tuple(record[i] for i in positions)
+                else:
+                    yield (record,)
+
+    else:
+        raise ValueError(f"Unsupported file format {fmt} for {path}, expected csv or jsonl.")
+
+
+def batched(rows: Iterable, batch_size: int) -> Iterator[List]:
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+class BulkLoader:
+    """
+    Streams domains and predicate extensions from CSV/JSONL files, one file per
+    relation, into an interpretation.
+
+    Rows are read and inserted in batches, so only one batch is held in memory at a
+    time. Objects are interned so that every occurrence of an object in the domain and
+    in the extensions shares one string. Unlike DomainOfDiscourse.expand and
+    Predicate.extend, nothing is logged per row; each load logs a single line with its
+    throughput.
+
+    If the interpretation is an SQLiteInterpretation, batches are written straight to
+    the database, which lets files larger than memory be loaded.
+    """
+
+    def __init__(
+        self,
+        interpretation: Interpretation,
+        batch_size: int = 10_000,
+        on_batch: Optional[Callable[[IngestStats], None]] = None,
+    ):
+        self.interpretation = interpretation
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.on_disk = hasattr(interpretation, "add_tuples")
+        self.interned = {}
+
+    def intern(self, obj: Any) -> Any:
+        if isinstance(obj, str):
+            obj = sys.intern(obj)
+        return self.interned.setdefault(obj, obj)
+
+    def add_objects(self, objects: List[Any]) -> int:
+        if self.on_disk:
+            before = self.interpretation.connection.total_changes
+            self.interpretation.add_objects(objects)
+            return self.interpretation.connection.total_changes - before
+
+        domain = self.interpretation.domain
+        before = len(domain)
+        objects = [self.intern(obj) for obj in objects]
+        if hasattr(domain, "bulk_expand"):
+            domain.bulk_expand(objects)
+        else:
+            domain.update(objects)
+        return len(domain) - before
+
+    def add_tuples(self, predicate_name: str, rows: List[Tuple[Any, ...]]) -> int:
+        if self.on_disk:
+            self.interpretation.declare_predicate(predicate_name, len(rows[0]))
+            self.add_objects([obj for row in rows for obj in row])
+            # Counting changes is cheaper than counting the rows of a large table
+            before = self.interpretation.connection.total_changes
+            self.interpretation.add_tuples(predicate_name, rows)
+            return self.interpretation.connection.total_changes - before
+
+        if predicate_name not in self.interpretation.predicates:
+            self.interpretation.add_predicate(Predicate(predicate_name, len(rows[0])))
+        rows = [tuple(self.intern(obj) for obj in row) for row in rows]
+        self.add_objects([obj for row in rows for obj in row])
+        return self.interpretation.predicates[predicate_name].bulk_extend(rows)
+
+    def _run(self, source: str, rows: Iterable, insert: Callable[[List], int]) -> IngestStats:
+        stats = IngestStats(source)
+        for batch in batched(rows, self.batch_size):
+            stats.added += insert(batch)
+            stats.rows += len(batch)
+            stats.batches += 1
+            stats.seconds = time.perf_counter() - stats.started
+            if self.on_batch:
+                self.on_batch(stats)
+        stats.seconds = time.perf_counter() - stats.started
+        logger.info(f"Ingested {stats}")
+        return stats
+
+    def load_domain(
+        self, path: Union[str, Path], column: Union[str, int] = 0, fmt: Optional[str] = None
+    ) -> IngestStats:
+        """Add one object per row of the file to the domain."""
+        rows = read_rows(path, [column], fmt)
+        return self._run(
+            str(path), rows, lambda batch: self.add_objects([row[0] for row in batch])
+        )
+
+    def load_relation(
+        self,
+        path: Union[str, Path],
+        predicate_name: str,
+        columns: Columns = None,
+        fmt: Optional[str] = None,
+    ) -> IngestStats:
+        """
+        Add every row of the file as a tuple to the extension of a predicate, creating
+        the predicate and adding the objects to the domain as needed.
+        """
+        rows = read_rows(path, columns, fmt)
+        return self._run(
+            str(path), rows, lambda batch: self.add_tuples(predicate_name, batch)
+        )
@@ -1,17 +1,25 @@
-from typing import Any, Union
+import hashlib
+from typing import Any, Optional, Union
 
 from interpretation_function.constant import Constant
+from interpretation_function.function_term import FunctionTerm
 from interpretation_function.variable import Variable
 from interpretation_function.sentence_letter import SentenceLetter
 
 from syntax.first_order_logic_syntax import PredicateExpr
 
+from modal_logic.domain import InternedDomain, LazyDomain
+from modal_logic.union_find import UnionFind
+
 from utils.config import Config
 from utils.log import Logger
 
 config = Config()
 logger = Logger(__name__, config["log_level"])()
 
+# Memoized term values kept before the memo table is cleared
+TERM_VALUES_LIMIT = 100_000
+
 
 class Interpretation:
     """
@@ -34,17 +42,32 @@ class Interpretation:
         self.name = name
         self.domain_name = domain_name
         self.model_name = model_name
-        self.domain = set()
+        self.domain = InternedDomain()
         self.truth_values = {}
         self.names = {}
         self.predicates = {}
+        self.functions = {}
+        # Constants declared to denote the same object, see alias
+        self.aliases = UnionFind()
+        # Memoized values of function terms, see evaluate_term
+        self.term_values = {}
+        self._term_values_key = ()
+        # Set while evaluating with modal_logic.symmetry.evaluate_with_symmetry
+        self.symmetry = None
+        # A semantics.evaluation_cache.EvaluationCache that evaluate consults, if any
+        self.result_cache = None
+        # The last content digest and the state of the symbols it was computed for
+        self._content_digest = (None, None)
 
     def __str__(self):
         output = [f"Interpretation {self.name}"]
 
         # Format Domain
-        domain_str = ", ".join(map(str, sorted(self.domain)))
-        output.append(f"\nDomain:\n  {{ {domain_str} }}")
+        if isinstance(self.domain, LazyDomain):
+            output.append(f"\nDomain:\n  {self.domain.represent_domain()}")
+        else:
+            domain_str = ", ".join(map(str, sorted(self.domain)))
+            output.append(f"\nDomain:\n  {{ {domain_str} }}")
 
         # Format Constant Mappings
         if self.names:
@@ -56,18 +79,22 @@ class Interpretation:
         if self.predicates:
             output.append("\nPredicates and Extensions:")
             for predicate_name, predicate in self.predicates.items():
-                if predicate.true_for:
+                if predicate.intensional or predicate.true_for:
                     extensions = predicate.represent_extension()
                 else:
                     extensions = "∅"  # Empty set if no true arguments
                 output.append(f"  {predicate_name} = {extensions}")
 
+        # Format Functions and Mappings
+        if self.functions:
+            output.append("\nFunctions and Mappings:")
+            for function_name, function in self.functions.items():
+                output.append(f"  {function_name} = {function.represent_mapping()}")
+
         # Format Sentence Letters and Truth Values
         if self.truth_values:
             output.append("\nSentence Letters Truth Values:")
-            for sentence_letter, truth_value in sorted(
-                self.truth_values.items(), key=lambda x: x[0].letter
-            ):
+            for sentence_letter, truth_value in sorted(self.truth_values.items()):
                 output.append(
                     f"  {sentence_letter}: {'True' if truth_value else 'False'}"
                 )
@@ -78,8 +105,9 @@ class Interpretation:
         self.domain = domain
         return self
 
-    def add_truth_value(self, sentence_letter: SentenceLetter, truth_value: bool):
-        self.truth_values[sentence_letter] = truth_value
+    def add_truth_value(self, sentence_letter: Union[SentenceLetter, str], truth_value: bool):
+        # Truth values are keyed by the letter so that formulas can look them up by name
+        self.truth_values[str(sentence_letter)] = truth_value
         return self
 
     def extend(self, constant: Union[Constant, Variable], obj: Any):
@@ -87,6 +115,32 @@ class Interpretation:
         self.names[constant.name] = obj
         return self
 
+    def alias(self, a: Constant, b: Constant):
+        """
+        Declare that two constants denote the same object (a = b). A constant without
+        an object of its own then denotes the object of any constant it is aliased
+        to, and identity atoms between aliased constants are decided by the
+        union-find structure without resolving either side.
+        """
+        objects = {
+            self.names[name]
+            for constant in (a, b)
+            for name in (self.aliases.members(constant.name) if constant.name in self.aliases else [constant.name])
+            if name in self.names
+        }
+        if len(objects) > 1:
+            msg = f"Cannot alias {a} and {b}, they already denote different objects {', '.join(map(str, objects))}."
+            raise ValueError(msg)
+        self.aliases.union(a.name, b.name)
+        return self
+
+    def aliased_object(self, name: str) -> Any:
+        """The object of the first constant in the alias class of name that has one."""
+        for member in self.aliases.members(name):
+            if member in self.names:
+                return self.names[member]
+        raise ValueError(f"No constant aliased to {name} denotes an object in interpretation {self.name}.")
+
     def restrict(self, constant: Union[Constant, Variable]):
         if constant.name not in self.names:
             if isinstance(constant, Variable):
@@ -112,10 +166,123 @@ class Interpretation:
         self.predicates[predicate.name] = predicate
         return self
 
+    def add_function(self, function):
+        self.functions[function.name] = function
+        return self
+
+    def evaluate_term(self, term: FunctionTerm):
+        """
+        The object a function term denotes under the current bindings.
+
+        Values are memoized by the term and the objects the constants and variables it
+        contains denote, through their aliases for constants without an object of
+        their own, so a subterm that does not mention the variable of an
+        enclosing quantifier is computed once for the whole loop rather than once per
+        object. The memo table is cleared when a function changes.
+        """
+        key = tuple((name, function.version) for name, function in self.functions.items())
+        if key != self._term_values_key or len(self.term_values) > TERM_VALUES_LIMIT:
+            self.term_values = {}
+            self._term_values_key = key
+        return self._evaluate_term(term)
+
+    def _evaluate_term(self, term: FunctionTerm):
+        key = (term, tuple(self._bound_object(symbol) for symbol in term.symbols))
+        if key in self.term_values:
+            return self.term_values[key]
+
+        if term.name not in self.functions:
+            raise ValueError(f"Function {term.name} in term {term} is not in interpretation {self.name}.")
+        args = tuple(
+            self._evaluate_term(arg) if isinstance(arg, FunctionTerm) else self(Variable(arg))
+            for arg in term.args
+        )
+        value = self.functions[term.name][args]
+        self.term_values[key] = value
+        return value
+
+    def _bound_object(self, symbol: str) -> Any:
+        if symbol in self.names:
+            return self.names[symbol]
+        if symbol in self.aliases:
+            for member in self.aliases.members(symbol):
+                if member in self.names:
+                    return self.names[member]
+        return None
+
+    def _content_state(self) -> Optional[tuple]:
+        """
+        A cheap key that changes whenever the content of the interpretation may have
+        changed, or None if the content cannot be hashed: the domain is not stored,
+        or a predicate or function is given by a callable. A predicate's version
+        changes when its true_for is replaced or edited, and its length when tuples
+        are appended.
+        """
+        domain = self.domain
+        if not isinstance(domain, InternedDomain):
+            return None
+        if any(predicate.intensional for predicate in self.predicates.values()):
+            return None
+        if any(getattr(function, "compute", None) is not None for function in self.functions.values()):
+            return None
+        return (
+            id(domain),
+            domain.version,
+            tuple((name, sort.version) for name, sort in getattr(domain, "sorts", {}).items()),
+            tuple(
+                (name, id(predicate), predicate.version, len(predicate.true_for))
+                for name, predicate in self.predicates.items()
+            ),
+            tuple((name, id(function), function.version) for name, function in self.functions.items()),
+            tuple(self.names.items()),
+            tuple(self.truth_values.items()),
+            tuple(self.aliases.parent.items()),
+        )
+
+    def content_digest(self) -> Optional[str]:
+        """
+        A SHA-256 hex digest of the domain, constants, sentence letters, predicate
+        extensions and function tables, equal for interpretations with the same
+        content, or None if the content cannot be hashed. It is recomputed only when a
+        symbol changed since the last call.
+        """
+        state = self._content_state()
+        if state is None:
+            return None
+        if self._content_digest[0] == state:
+            return self._content_digest[1]
+
+        digest = hashlib.sha256()
+
+        def update(*parts):
+            digest.update(repr(parts).encode())
+
+        domain = self.domain
+        update("domain", sorted(map(repr, domain)))
+        for name, sort in sorted(getattr(domain, "sorts", {}).items()):
+            update("sort", name, sorted(map(repr, sort)))
+        update("names", sorted((name, repr(obj)) for name, obj in self.names.items()))
+        update("aliases", sorted((name, min(self.aliases.sets[self.aliases.find(name)])) for name in self.aliases))
+        update("letters", sorted(self.truth_values.items()))
+        for name, predicate in sorted(self.predicates.items()):
+            update("predicate", name, predicate.arity, sorted(repr(tuple(row)) for row in predicate.extension))
+        for name, function in sorted(self.functions.items()):
+            update("function", name, function.arity, sorted(repr(item) for item in function.mapping.items()))
+
+        self._content_digest = (state, digest.hexdigest())
+        return self._content_digest[1]
+
+    def add_rules(self, rule_set):
+        """Add the predicates derived by a RuleSet to the interpretation."""
+        rule_set.attach(self)
+        return self
+
     # def get_domain_permutations(self, domain: List)
 
     def sentence_letter_truth_value(self, sentence_letter):
-        return self.truth_values[sentence_letter]
+        if str(sentence_letter) not in self.truth_values:
+            raise ValueError(f"Sentence letter {sentence_letter} has no truth value in interpretation {self.name}.")
+        return self.truth_values[str(sentence_letter)]
 
     def __call__(
         self,
@@ -123,6 +290,10 @@ class Interpretation:
     ):
         if isinstance(symbol, PredicateExpr):
             return self.predicates[symbol.name]
+        if isinstance(symbol, FunctionTerm):
+            return self.evaluate_term(symbol)
+        if str(symbol) not in self.names and str(symbol) in self.aliases:
+            return self.aliased_object(str(symbol))
         if isinstance(symbol, Constant) or str(symbol) in self.names:
             return self.names[str(symbol)]
         if isinstance(symbol, Variable):
@@ -0,0 +1,308 @@
+import copy
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from interpretation_function.constant import Constant
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import InternedDomain, bitset
+from modal_logic.interpretation import Interpretation
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import collect_free_terms, collect_predicate_names, iter_children
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    Expr,
+    IdentityExpr,
+    ImpliesExpr,
+    ModalExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+
+def members(worlds: int, n: int) -> List[int]:
+    """The ids in a bitset of n worlds, in increasing order."""
+    digits = format(worlds, f"0{n}b").encode()[::-1]
+    return [i for i, digit in enumerate(digits) if digit == 49]
+
+
+class KripkeModel:
+    """
+    A Kripke model: a set of worlds, an accessibility relation between them and, at
+    every world, an interpretation of the language. □φ is true at a world if φ is
+    true at every world accessible from it, and ◇φ if φ is true at some.
+
+    The interpretations of the worlds share structure. There is one base
+    interpretation, I, with the domain (the same at every world), the constants and
+    the functions, and the predicates that do not vary. A world only stores what it
+    changes: its own extensions of some predicates. Sentence letters are stored the
+    other way round, as the bitset of the worlds each one is true at, which is what
+    checking formulas needs. I can be passed to the Parser like the interpretation of
+    a Model.
+
+    Worlds are interned to dense ids in the order they are added. The relation is
+    kept as adjacency lists in both directions, so its size is linear in the number
+    of edges; adding an edge twice is harmless.
+    """
+
+    def __init__(self, name: str = "K", interpretation: Optional[Interpretation] = None):
+        self.name = name
+        self.worlds: InternedDomain = InternedDomain()
+        self.I = interpretation if interpretation is not None else Interpretation(model_name=name)
+        self.successors: List[List[int]] = []
+        self.predecessors: List[List[int]] = []
+        self.n_edges = 0
+        # Sentence letter -> the bitset of the worlds it is true at
+        self.valuation: Dict[str, int] = {}
+        # World id -> the predicates whose extension differs from the base interpretation
+        self.overrides: Dict[int, Dict[str, Predicate]] = {}
+
+    def __len__(self):
+        return len(self.worlds)
+
+    def __str__(self):
+        return f"Kripke model {self.name} with {len(self.worlds)} worlds and {self.n_edges} edges"
+
+    def world_id(self, world: Hashable) -> int:
+        world_id = self.worlds.id_of(world)
+        if world_id is None:
+            msg = f"World {world} is not in Kripke model {self.name}."
+            raise ValueError(msg)
+        return world_id
+
+    def add_world(self, world: Hashable) -> int:
+        world_id = self.worlds.intern(world)
+        while len(self.successors) <= world_id:
+            self.successors.append([])
+            self.predecessors.append([])
+        return world_id
+
+    def add_worlds(self, worlds: Iterable[Hashable]):
+        for world in worlds:
+            self.add_world(world)
+        return self
+
+    def add_edge(self, world: Hashable, accessible: Hashable):
+        """Make accessible accessible from world, adding both worlds if needed."""
+        source, target = self.add_world(world), self.add_world(accessible)
+        self.successors[source].append(target)
+        self.predecessors[target].append(source)
+        self.n_edges += 1
+        return self
+
+    def add_edges(self, edges: Iterable[Tuple[Hashable, Hashable]]):
+        for world, accessible in edges:
+            self.add_edge(world, accessible)
+        return self
+
+    def accessible(self, world: Hashable) -> List[Hashable]:
+        """The worlds accessible from world."""
+        return [self.worlds.object(target) for target in self.successors[self.world_id(world)]]
+
+    def set_true(self, letter: str, worlds: Iterable[Hashable]):
+        """Make a sentence letter true at the given worlds, in addition to those it is true at."""
+        self.valuation[letter] = self.valuation.get(letter, 0) | bitset(self.add_world(world) for world in worlds)
+        return self
+
+    def set_letter(self, world: Hashable, letter: str, value: bool):
+        bit = 1 << self.add_world(world)
+        worlds = self.valuation.get(letter, 0)
+        self.valuation[letter] = worlds | bit if value else worlds & ~bit
+        return self
+
+    def set_predicate(self, world: Hashable, predicate: Predicate):
+        """Give a predicate its own extension at a world, overriding the one of the base interpretation."""
+        self.overrides.setdefault(self.add_world(world), {})[predicate.name] = predicate
+        return self
+
+    def interpretation(self, world: Hashable) -> Interpretation:
+        """
+        The interpretation at a world: a shallow copy of the base interpretation that
+        shares its domain, constants and functions, with the predicates and sentence
+        letters of the world.
+        """
+        world_id = self.world_id(world)
+        interpretation = copy.copy(self.I)
+        interpretation.predicates = {**self.I.predicates, **self.overrides.get(world_id, {})}
+        interpretation._content_digest = (None, None)
+        interpretation.truth_values = dict(self.I.truth_values)
+        for letter, worlds in self.valuation.items():
+            interpretation.truth_values[letter] = bool(worlds >> world_id & 1)
+        return interpretation
+
+    def _with_predicates(self, predicates: Dict[str, Predicate]) -> Interpretation:
+        if not predicates:
+            return self.I
+        interpretation = copy.copy(self.I)
+        interpretation.predicates = {**self.I.predicates, **predicates}
+        interpretation._content_digest = (None, None)
+        return interpretation
+
+    # Checking formulas
+
+    def satisfaction_set(self, formula: Expr) -> int:
+        """The bitset of the worlds a formula is true at."""
+        return KripkeChecker(self).check(formula)
+
+    def satisfying_worlds(self, formula: Expr) -> List[Hashable]:
+        return [self.worlds.object(world_id) for world_id in members(self.satisfaction_set(formula), len(self))]
+
+    def holds(self, formula: Expr, world: Hashable) -> bool:
+        return bool(self.satisfaction_set(formula) >> self.world_id(world) & 1)
+
+    def valid(self, formula: Expr) -> bool:
+        """Whether a formula is true at every world."""
+        return self.satisfaction_set(formula) == (1 << len(self)) - 1
+
+
+class KripkeChecker:
+    """
+    Computes the satisfaction set of a formula, the bitset of the worlds it is true
+    at, bottom-up: the set of every subformula is computed once, for all worlds at
+    the same time, from the sets of its subformulas. Connectives are bitwise
+    operations, ◇φ is the set of predecessors of the worlds in the set of φ, found
+    through the reverse adjacency lists in time linear in the edges into that set,
+    and □φ is ¬◇¬φ.
+
+    A subformula without modal operators or sentence letters is evaluated with
+    evaluate, once in the base interpretation for all the worlds that do not
+    override any of its predicates and once per distinct combination of overrides,
+    rather than once per world. Quantifiers over subformulas with modal operators
+    range over the domain shared by all worlds: the set of ∀xφ is the intersection of
+    the sets of φ for every object bound to x, and the set of ∃xφ their union. Sets
+    are memoized per subformula and binding of its free variables.
+    """
+
+    def __init__(self, model: KripkeModel):
+        self.model = model
+        self.n = len(model)
+        self.all = (1 << self.n) - 1
+        self.memo: Dict[Tuple[int, tuple], int] = {}
+        self._free: Dict[int, Set[str]] = {}
+        self._local: Dict[int, bool] = {}
+
+    def check(self, formula: Expr) -> int:
+        satisfied = self.sat(formula, {})
+        logger.debug(
+            f"Checked {formula} in {self.model}: true at {satisfied.bit_count()} worlds, "
+            f"{len(self.memo)} satisfaction sets computed"
+        )
+        return satisfied
+
+    def _is_local(self, node: Expr) -> bool:
+        """Whether the subformula has no modal operators or sentence letters, so it only depends on predicates."""
+        local = self._local.get(id(node))
+        if local is None:
+            local = not isinstance(node, (ModalExpr, SentenceLetterExpr)) and all(
+                self._is_local(child) for child in iter_children(node)
+            )
+            self._local[id(node)] = local
+        return local
+
+    def sat(self, node: Expr, env: Dict[str, Any]) -> int:
+        free = self._free.get(id(node))
+        if free is None:
+            free = self._free[id(node)] = collect_free_terms(node)
+        key = (id(node), tuple((variable, env[variable]) for variable in sorted(free) if variable in env))
+        satisfied = self.memo.get(key)
+        if satisfied is None:
+            satisfied = self.memo[key] = self._sat(node, env)
+        return satisfied
+
+    def _sat(self, node: Expr, env: Dict[str, Any]) -> int:
+        if isinstance(node, SentenceLetterExpr):
+            if node.letter in self.model.valuation:
+                return self.model.valuation[node.letter]
+            return self.all if self.model.I.sentence_letter_truth_value(node.letter) else 0
+        if isinstance(node, NotExpr):
+            return self.all & ~self.sat(node.expr, env)
+        if isinstance(node, AndExpr):
+            satisfied = self.all
+            for operand in node.operands:
+                satisfied &= self.sat(operand, env)
+                if not satisfied:
+                    break
+            return satisfied
+        if isinstance(node, OrExpr):
+            satisfied = 0
+            for operand in node.operands:
+                satisfied |= self.sat(operand, env)
+                if satisfied == self.all:
+                    break
+            return satisfied
+        if isinstance(node, ImpliesExpr):
+            return (self.all & ~self.sat(node.left, env)) | self.sat(node.right, env)
+        if isinstance(node, ModalExpr):
+            if node.operator == "◇":
+                return self.preimage(self.sat(node.expr, env))
+            return self.all & ~self.preimage(self.all & ~self.sat(node.expr, env))
+        if isinstance(node, (PredicateExpr, IdentityExpr)) or self._is_local(node):
+            return self._sat_local(node, env)
+        if isinstance(node, QuantifierBlockExpr):
+            return self.sat(node.nested(), env)
+        if isinstance(node, QuantifierExpr):
+            domain = self.model.I.domain
+            objects = domain.sort(node.sort) if node.sort else domain
+            universal = node.quantifier == "∀"
+            satisfied = self.all if universal else 0
+            for obj in objects:
+                inner = self.sat(node.expr, {**env, node.variable: obj})
+                satisfied = satisfied & inner if universal else satisfied | inner
+                if satisfied == (0 if universal else self.all):
+                    break
+            return satisfied
+        if isinstance(node, CountingQuantifierExpr):
+            msg = f"Counting quantifiers over modal formulas such as {node} are not supported by the Kripke model checker."
+            raise ValueError(msg)
+        raise ValueError(f"Unknown node type: {type(node)}")
+
+    def preimage(self, satisfied: int) -> int:
+        """The worlds from which some world in satisfied is accessible."""
+        if not satisfied:
+            return 0
+        marks = bytearray(b"0" * self.n)
+        predecessors = self.model.predecessors
+        for target in members(satisfied, self.n):
+            for source in predecessors[target]:
+                marks[source] = 49
+        marks.reverse()
+        return int(marks, 2)
+
+    def _sat_local(self, node: Expr, env: Dict[str, Any]) -> int:
+        """The set of a subformula that only depends on the predicates of each world."""
+        base = self.model.I
+        names = collect_predicate_names(node)
+        groups: Dict[tuple, List[int]] = {}
+        for world_id, predicates in self.model.overrides.items():
+            if names & predicates.keys():
+                key = tuple(id(predicates.get(name)) for name in sorted(names))
+                groups.setdefault(key, []).append(world_id)
+
+        previous = {variable: base.names.get(variable) for variable in env}
+        for variable, obj in env.items():
+            base.extend(Constant(variable), obj)
+        try:
+            base_value = bool(evaluate(node, base))
+            satisfied = self.all if base_value else 0
+            for world_ids in groups.values():
+                predicates = self.model.overrides[world_ids[0]]
+                if bool(evaluate(node, self.model._with_predicates(predicates))) != base_value:
+                    mask = bitset(world_ids)
+                    satisfied = satisfied & ~mask if base_value else satisfied | mask
+        finally:
+            for variable, obj in previous.items():
+                if obj is None:
+                    base.remove_constant_object_mapping(Constant(variable))
+                else:
+                    base.extend(Constant(variable), obj)
+        return satisfied
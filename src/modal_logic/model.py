@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+from typing import Optional
 
 from modal_logic.domain import DomainOfDiscourse
 from modal_logic.interpretation import Interpretation
@@ -14,7 +15,7 @@ class Model:
 
     def with_interpretation_function(self, interpretation: Interpretation):
         self.I = interpretation
-        if self.D and not self.I.domain:
+        if self.D is not None and not self.I.domain:
             self.I.set_domain(self.D)
         self.I.model_name = self.name
         return self
@@ -45,12 +46,12 @@ class Model:
             pass
             # NOTE: most likely it is fine to leave the most recent binding of the variable so that other objects can query information about the satisfying bindings
 
-    def universal_instantiation(self, variable: Variable):
+    def universal_instantiation(self, variable: Variable, sort: Optional[str] = None):
         if len(self.D) == 0:
             msg = "Cannot instantiate a universally quantified variable with an empty domain."
             raise ValueError(msg)
 
-        for obj in self.D:
+        for obj in self.D.sort(sort) if sort else self.D:
             with self.bind_variable(variable, obj):
                 yield obj
 
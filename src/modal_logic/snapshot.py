@@ -0,0 +1,358 @@
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+
+from interpretation_function.constant import Constant
+from interpretation_function.nary_tuple import NaryTuple
+from interpretation_function.predicate import Predicate
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_utils import collect_predicate_names
+from syntax.first_order_logic_syntax import Expr
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+MAGIC = b"FOLM"
+VERSION = 1
+BYTE_ORDERS = {"little": 0, "big": 1}
+
+# magic, version, byte order, n_objects, object offsets position, object blob position,
+# n_constants, constants position, n_predicates, predicate directory position
+HEADER = struct.Struct("<4sHHQQQQQQQ")
+CONSTANT_ENTRY = struct.Struct("<HI")  # name length, object id
+PREDICATE_ENTRY = struct.Struct("<HIQQ")  # name length, arity, n_rows, rows position
+
+
+def _align(f, boundary=8):
+    padding = -f.tell() % boundary
+    f.write(b"\0" * padding)
+
+
+def write_snapshot(model: Model, path: Union[str, Path]):
+    """
+    Write a model to a binary snapshot file.
+
+    The file contains an interned domain table (object strings sorted by their UTF-8
+    encoding, so an object's id is its position in sorted order), the constants, and
+    for every predicate its extension as a sorted array of rows of 32-bit object ids.
+    Arrays are stored in native byte order, which is recorded in the header. Objects
+    are read back as strings, so models with objects of other types are rejected
+    rather than written as their str.
+    """
+    interpretation = model.I
+    objects = set()
+    for obj in interpretation.domain:
+        if not isinstance(obj, str):
+            msg = f"Object {obj!r} of model {model.name} is a {type(obj).__name__}, snapshots only store string objects."
+            raise ValueError(msg)
+        objects.add(obj)
+    objects = sorted(objects)
+    ids = {obj: i for i, obj in enumerate(objects)}
+
+    def object_id(obj):
+        if not isinstance(obj, str) or obj not in ids:
+            raise ValueError(f"Object {obj!r} of model {model.name} is not in its domain.")
+        return ids[obj]
+
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+
+        # Domain table: n + 1 offsets into a blob of encoded objects
+        encoded = [obj.encode("utf-8") for obj in objects]
+        offsets = array("Q", [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        _align(f)
+        object_offsets_pos = f.tell()
+        offsets.tofile(f)
+        object_blob_pos = f.tell()
+        for data in encoded:
+            f.write(data)
+
+        constants = {
+            name: obj for name, obj in interpretation.names.items() if isinstance(obj, str) and obj in ids
+        }
+        _align(f)
+        constants_pos = f.tell()
+        for name, obj in constants.items():
+            name_bytes = name.encode("utf-8")
+            f.write(CONSTANT_ENTRY.pack(len(name_bytes), object_id(obj)))
+            f.write(name_bytes)
+
+        rows_positions = {}
+        for name, predicate in interpretation.predicates.items():
+            rows = sorted(
+                {tuple(object_id(obj) for obj in t.terms) for t in predicate.true_for}
+            )
+            _align(f)
+            rows_positions[name] = (f.tell(), len(rows))
+            array("I", [i for row in rows for i in row]).tofile(f)
+
+        _align(f)
+        directory_pos = f.tell()
+        for name, predicate in interpretation.predicates.items():
+            name_bytes = name.encode("utf-8")
+            position, n_rows = rows_positions[name]
+            f.write(
+                PREDICATE_ENTRY.pack(len(name_bytes), predicate.arity, n_rows, position)
+            )
+            f.write(name_bytes)
+
+        f.seek(0)
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                BYTE_ORDERS[sys.byteorder],
+                len(objects),
+                object_offsets_pos,
+                object_blob_pos,
+                len(constants),
+                constants_pos,
+                len(interpretation.predicates),
+                directory_pos,
+            )
+        )
+    logger.debug(
+        f"Wrote snapshot of {model.name} with {len(objects)} objects and {len(interpretation.predicates)} predicates to {path}"
+    )
+
+
+class MappedDomain:
+    """
+    The domain of a snapshot. Objects are decoded from the memory-mapped domain table
+    on demand, and membership is a binary search over the sorted table, so nothing is
+    read up front.
+    """
+
+    def __init__(self, snapshot: "Snapshot", name: str = "D"):
+        self.snapshot = snapshot
+        self.name = name
+        self.model_name = None
+        self.offsets = snapshot.view(
+            snapshot.object_offsets_pos, snapshot.n_objects + 1, "Q"
+        )
+
+    def __str__(self):
+        return self.name
+
+    def object(self, object_id: int) -> str:
+        start = self.snapshot.object_blob_pos + self.offsets[object_id]
+        end = self.snapshot.object_blob_pos + self.offsets[object_id + 1]
+        return self.snapshot.mm[start:end].decode("utf-8")
+
+    def object_id(self, obj: Any) -> Optional[int]:
+        key = str(obj).encode("utf-8")
+        blob = self.snapshot.object_blob_pos
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            found = self.snapshot.mm[blob + self.offsets[mid] : blob + self.offsets[mid + 1]]
+            if found < key:
+                low = mid + 1
+            elif found > key:
+                high = mid
+            else:
+                return mid
+        return None
+
+    def __iter__(self) -> Iterator[str]:
+        for object_id in range(len(self)):
+            yield self.object(object_id)
+
+    def __len__(self):
+        return self.snapshot.n_objects
+
+    def __contains__(self, obj: Any):
+        return self.object_id(obj) is not None
+
+
+class MappedPredicate(Predicate):
+    """
+    A predicate whose extension is a sorted array of rows of object ids in a snapshot.
+    The array is only touched, and therefore only paged in by the operating system,
+    when the predicate is evaluated. Snapshots are read-only, so the version never
+    changes and the extension is decoded at most once.
+    """
+
+    # A snapshot is never edited
+    version = (0, 0)
+
+    def __init__(self, name: str, arity: int, n_rows: int, position: int, snapshot: "Snapshot"):
+        self.name = name
+        self.arity = arity
+        self.signature = (None,) * arity
+        self.is_unary = arity == 1
+        self.n_rows = n_rows
+        self.position = position
+        self.snapshot = snapshot
+        self._rows = None
+        self._init_indexes()
+
+    @property
+    def rows(self) -> memoryview:
+        if self._rows is None:
+            self._rows = self.snapshot.view(self.position, self.n_rows * self.arity, "I")
+        return self._rows
+
+    @property
+    def true_for(self) -> List[NaryTuple]:
+        domain = self.snapshot.domain
+        if not self.arity:
+            return [NaryTuple([])] * self.n_rows
+        return [
+            NaryTuple([domain.object(i) for i in self.row(r)])
+            for r in range(self.n_rows)
+        ]
+
+    @property
+    def extension(self) -> set:
+        if self._indexed_version is None:
+            self._extension = {tuple(nary_tuple.terms) for nary_tuple in self.true_for}
+            self._indexed_version = self.version
+        return self._extension
+
+    def row(self, r: int) -> List[int]:
+        return self.rows[r * self.arity : (r + 1) * self.arity].tolist()
+
+    def __len__(self):
+        return self.n_rows
+
+    def contains_ids(self, key: List[int]) -> bool:
+        low, high = 0, self.n_rows
+        while low < high:
+            mid = (low + high) // 2
+            row = self.row(mid)
+            if row < key:
+                low = mid + 1
+            elif row > key:
+                high = mid
+            else:
+                return True
+        return False
+
+    def __call__(self, objects: NaryTuple, interpretation: Interpretation):
+        if not self.arity:
+            return self.n_rows > 0
+        resolved = objects.get_resolved_terms(interpretation)
+        key = [self.snapshot.domain.object_id(obj) for obj in resolved]
+        if None in key:
+            return False
+        return self.contains_ids(key)
+
+    def extend(self, objects):
+        raise ValueError(f"Predicate {self.name} is read from a snapshot and is read-only.")
+
+
+class Snapshot:
+    """
+    A model snapshot opened with mmap. Opening only parses the header, the constants
+    and the predicate directory; the domain table and the extensions stay on disk
+    until a formula touches them.
+    """
+
+    def __init__(self, path: Union[str, Path], name: str = "M"):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            byte_order,
+            self.n_objects,
+            self.object_offsets_pos,
+            self.object_blob_pos,
+            n_constants,
+            constants_pos,
+            n_predicates,
+            directory_pos,
+        ) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} model snapshot.")
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError(f"{path} was written on a machine with a different byte order.")
+
+        self.domain = MappedDomain(self)
+
+        self.constants: Dict[str, int] = {}
+        position = constants_pos
+        for _ in range(n_constants):
+            name_length, object_id = CONSTANT_ENTRY.unpack_from(self.mm, position)
+            position += CONSTANT_ENTRY.size
+            constant = self.mm[position : position + name_length].decode("utf-8")
+            position += name_length
+            self.constants[constant] = object_id
+
+        self.predicates: Dict[str, MappedPredicate] = {}
+        position = directory_pos
+        for _ in range(n_predicates):
+            name_length, arity, n_rows, rows_pos = PREDICATE_ENTRY.unpack_from(
+                self.mm, position
+            )
+            position += PREDICATE_ENTRY.size
+            predicate_name = self.mm[position : position + name_length].decode("utf-8")
+            position += name_length
+            self.predicates[predicate_name] = MappedPredicate(
+                predicate_name, arity, n_rows, rows_pos, self
+            )
+
+        interpretation = Interpretation()
+        interpretation.domain = self.domain
+        interpretation.predicates = dict(self.predicates)
+        for constant, object_id in self.constants.items():
+            interpretation.extend(Constant(constant), self.domain.object(object_id))
+        self.model = Model(name).with_domain(self.domain).with_interpretation_function(
+            interpretation
+        )
+
+    def view(self, position: int, length: int, typecode: str) -> memoryview:
+        size = array(typecode).itemsize
+        return memoryview(self.mm)[position : position + length * size].cast(typecode)
+
+    def close(self):
+        # Views into the map have to be released before it can be closed
+        for predicate in self.predicates.values():
+            if predicate._rows is not None:
+                predicate._rows.release()
+                predicate._rows = None
+        self.domain.offsets.release()
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def referenced_predicates(self, ast: Expr) -> Set[str]:
+        return collect_predicate_names(ast)
+
+    def prefetch(self, ast: Expr):
+        """
+        Ask the operating system to page in the extensions of the predicates the
+        formula references, and only those.
+        """
+        if not hasattr(self.mm, "madvise"):
+            return
+        page = mmap.ALLOCATIONGRANULARITY
+        for name in self.referenced_predicates(ast) & self.predicates.keys():
+            predicate = self.predicates[name]
+            length = predicate.n_rows * predicate.arity * 4
+            if not length:
+                continue
+            start = predicate.position - predicate.position % page
+            self.mm.madvise(mmap.MADV_WILLNEED, start, predicate.position + length - start)
+
+
+def open_snapshot(path: Union[str, Path], name: str = "M") -> Model:
+    return Snapshot(path, name).model
@@ -0,0 +1,274 @@
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from interpretation_function.constant import Constant
+from interpretation_function.nary_tuple import NaryTuple
+from interpretation_function.predicate import Predicate
+from modal_logic.interpretation import Interpretation
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+PREDICATE_NAME_REGEX = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS domain (id INTEGER PRIMARY KEY, object TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS predicates (name TEXT PRIMARY KEY, arity INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS constants (name TEXT PRIMARY KEY, object_id INTEGER NOT NULL REFERENCES domain(id))",
+]
+
+
+def predicate_table(name: str) -> str:
+    if not PREDICATE_NAME_REGEX.match(name):
+        raise ValueError(f"Predicate name {name} cannot be used as a table name.")
+    return f'"pred_{name}"'
+
+
+def predicate_columns(arity: int) -> List[str]:
+    # Nullary predicates get a single dummy column holding 0 when the predicate is true
+    return [f"a{i}" for i in range(arity)] if arity else ["unit"]
+
+
+class SQLiteDomain:
+    """
+    The domain of an SQLiteInterpretation. Objects are stored in the domain table and
+    are only read from the database while iterating, so the domain never has to fit
+    in memory.
+    """
+
+    def __init__(self, interpretation: "SQLiteInterpretation"):
+        self.interpretation = interpretation
+
+    def __iter__(self) -> Iterator[str]:
+        cursor = self.interpretation.connection.execute(
+            "SELECT object FROM domain ORDER BY id"
+        )
+        for (obj,) in cursor:
+            yield obj
+
+    def __len__(self):
+        return self.interpretation.connection.execute(
+            "SELECT COUNT(*) FROM domain"
+        ).fetchone()[0]
+
+    def __contains__(self, obj: Any):
+        return self.interpretation.object_id(obj) is not None
+
+
+class SQLitePredicate(Predicate):
+    """
+    A predicate whose extension is stored in its own table of the database, with one
+    integer column per argument position referencing the domain table. Rows are not
+    read back in the order they were inserted, so every insert through add_tuples,
+    and every commit of another connection to the database, changes the version.
+    """
+
+    def __init__(self, name: str, arity: int, interpretation: "SQLiteInterpretation"):
+        self.name = name
+        self.arity = arity
+        self.signature = (None,) * arity
+        self.is_unary = arity == 1
+        self.interpretation = interpretation
+        self.table = predicate_table(name)
+        self.inserts = 0
+        self._init_indexes()
+
+    @property
+    def true_for(self) -> List[NaryTuple]:
+        columns = predicate_columns(self.arity)
+        joins = " ".join(
+            f"JOIN domain d{i} ON d{i}.id = p.{column}"
+            for i, column in enumerate(columns)
+            if self.arity
+        )
+        select = ", ".join(f"d{i}.object" for i in range(self.arity)) or "p.unit"
+        rows = self.interpretation.connection.execute(
+            f"SELECT {select} FROM {self.table} AS p {joins}"
+        )
+        return [NaryTuple(row if self.arity else []) for row in rows]
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        (data_version,) = self.interpretation.connection.execute("PRAGMA data_version").fetchone()
+        return data_version, self.inserts
+
+    @property
+    def extension(self) -> set:
+        if self._indexed_version != self.version:
+            self._extension = {tuple(nary_tuple.terms) for nary_tuple in self.true_for}
+            self._indexed_version = self.version
+        return self._extension
+
+    def __len__(self):
+        return self.interpretation.connection.execute(
+            f"SELECT COUNT(*) FROM {self.table}"
+        ).fetchone()[0]
+
+    def __call__(self, objects: NaryTuple, interpretation: Interpretation):
+        resolved = objects.get_resolved_terms(interpretation)
+        ids = [self.interpretation.object_id(obj) for obj in resolved]
+        if any(object_id is None for object_id in ids):
+            return False
+        if not self.arity:
+            ids = [0]
+        where = " AND ".join(f"{column} = ?" for column in predicate_columns(self.arity))
+        row = self.interpretation.connection.execute(
+            f"SELECT 1 FROM {self.table} WHERE {where} LIMIT 1", ids
+        ).fetchone()
+        return row is not None
+
+    def extend(self, objects):
+        if isinstance(objects, str):
+            objects = [objects]
+        if not isinstance(objects, (list, tuple, set)):
+            raise ValueError(
+                f"Predicate {self.name} expects a string or list of strings as arguments."
+            )
+        self.interpretation.add_tuples(self.name, [tuple(objects)])
+        return self
+
+
+class SQLiteInterpretation(Interpretation):
+    """
+    An interpretation whose domain, constants and predicate extensions are stored in a
+    local SQLite database file instead of Python sets, for models too large to keep in
+    memory.
+
+    Every predicate gets its own table with a composite primary key over all argument
+    positions plus an index on each remaining column, so lookups with any single
+    bound argument are indexed. Formulas can be evaluated with the regular evaluator,
+    which issues one query per atom, or compiled into a single SQL query with
+    syntax.ast_to_sql.evaluate_sql so that SQLite does the quantifier work.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ":memory:",
+        name: str = "I",
+        domain_name: str = "D",
+        model_name: str = "M",
+    ):
+        super().__init__(name, domain_name, model_name)
+        self.path = path
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+        self.domain = SQLiteDomain(self)
+        for predicate_name, arity in self.connection.execute(
+            "SELECT name, arity FROM predicates"
+        ):
+            self.predicates[predicate_name] = SQLitePredicate(predicate_name, arity, self)
+        for constant, obj in self.connection.execute(
+            "SELECT c.name, d.object FROM constants c JOIN domain d ON d.id = c.object_id"
+        ):
+            self.names[constant] = obj
+
+    def close(self):
+        self.connection.close()
+
+    def object_id(self, obj: Any) -> Optional[int]:
+        row = self.connection.execute(
+            "SELECT id FROM domain WHERE object = ?", (str(obj),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_domain(self, domain):
+        self.add_objects(domain)
+        return self
+
+    def add_objects(self, objects: Iterable[Any]):
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO domain (object) VALUES (?)",
+            ((str(obj),) for obj in objects),
+        )
+        self.connection.commit()
+        return self
+
+    def declare_predicate(self, name: str, arity: int) -> SQLitePredicate:
+        """Create the table and indexes for a predicate if they do not exist yet."""
+        if name in self.predicates:
+            if self.predicates[name].arity != arity:
+                msg = f"Predicate {name} already exists with arity {self.predicates[name].arity}."
+                raise ValueError(msg)
+            return self.predicates[name]
+
+        table = predicate_table(name)
+        columns = predicate_columns(arity)
+        column_defs = ", ".join(
+            f"{column} INTEGER NOT NULL REFERENCES domain(id)" if arity else f"{column} INTEGER NOT NULL"
+            for column in columns
+        )
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ({column_defs}, PRIMARY KEY ({', '.join(columns)})) WITHOUT ROWID"
+        )
+        # The primary key already indexes the first column
+        for column in columns[1:]:
+            self.connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "pred_{name}_{column}" ON {table} ({column})'
+            )
+        self.connection.execute(
+            "INSERT OR REPLACE INTO predicates (name, arity) VALUES (?, ?)", (name, arity)
+        )
+        self.connection.commit()
+
+        predicate = SQLitePredicate(name, arity, self)
+        self.predicates[name] = predicate
+        return predicate
+
+    def add_tuples(self, name: str, rows: Iterable[Sequence[Any]]):
+        """
+        Insert tuples of domain objects into the extension of a predicate. Objects that
+        are not in the domain yet are added to it.
+        """
+        predicate = self.predicates[name]
+        rows = [tuple(map(str, row)) for row in rows]
+        predicate.inserts += 1
+        if predicate.arity == 0:
+            if rows:
+                self.connection.execute(
+                    f"INSERT OR IGNORE INTO {predicate.table} (unit) VALUES (0)"
+                )
+                self.connection.commit()
+            return self
+
+        self.add_objects({obj for row in rows for obj in row})
+        columns = predicate_columns(predicate.arity)
+        lookups = ", ".join(
+            f"(SELECT id FROM domain WHERE object = ?)" for _ in columns
+        )
+        self.connection.executemany(
+            f"INSERT OR IGNORE INTO {predicate.table} ({', '.join(columns)}) VALUES ({lookups})",
+            rows,
+        )
+        self.connection.commit()
+        return self
+
+    def add_predicate(self, predicate: Predicate):
+        self.declare_predicate(predicate.name, predicate.arity)
+        if not isinstance(predicate, SQLitePredicate):
+            self.add_tuples(predicate.name, [tuple(t.terms) for t in predicate.true_for])
+        return self
+
+    def add_constant(self, constant: Constant, obj: Any):
+        """
+        Map a constant to an object and store the mapping in the database. Plain
+        extend() only binds in memory, which is what the evaluator relies on when it
+        temporarily binds quantified variables.
+        """
+        self.add_objects([obj])
+        self.connection.execute(
+            "INSERT OR REPLACE INTO constants (name, object_id) VALUES (?, ?)",
+            (constant.name, self.object_id(obj)),
+        )
+        self.connection.commit()
+        return self.extend(constant, obj)
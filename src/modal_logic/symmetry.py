@@ -0,0 +1,206 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from modal_logic.interpretation import Interpretation
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import collect_free_terms, collect_function_names, collect_predicate_names, iter_children
+from syntax.first_order_logic_syntax import CountingQuantifierExpr, Expr, QuantifierBlockExpr, QuantifierExpr
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+
+def collect_sorts(node: Expr) -> Set[str]:
+    sorts = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, (QuantifierExpr, CountingQuantifierExpr)) and current.sort is not None:
+            sorts.add(current.sort)
+        elif isinstance(current, QuantifierBlockExpr):
+            sorts.update(sort for sort in current.sorts if sort is not None)
+        stack.extend(iter_children(current))
+    return sorts
+
+
+class SymmetryPartition:
+    """
+    Partitions the domain into classes of objects that are indistinguishable under
+    the vocabulary of a formula: the predicates and sorts it mentions and the objects
+    its constants denote.
+
+    Objects start out coloured by the unary predicates and sorts they belong to, with
+    the denotations of constants kept apart. Optionally the colours are then refined
+    by the relations the objects take part in (colour refinement). Because colour
+    refinement can merge objects that are not actually interchangeable, every class
+    is verified: an object only stays in the class of its representative if swapping
+    the two maps every relation onto itself. The swaps within a class generate all of
+    its permutations, so any two members of a class can be exchanged without changing
+    the truth value of the formula.
+
+    A quantifier then only has to try one object per class, plus the members of the
+    class that are currently bound to other variables, since those are no longer
+    interchangeable with the rest.
+    """
+
+    def __init__(self, ast: Expr, interpretation: Interpretation, refine_relations: bool = True):
+        self.interpretation = interpretation
+        domain = list(interpretation.domain)
+        vocabulary = collect_predicate_names(ast)
+        predicates = [
+            interpretation.predicates[name]
+            for name in sorted(vocabulary)
+            if name in interpretation.predicates
+        ]
+        distinguished = {
+            interpretation.names[term]
+            for term in collect_free_terms(ast)
+            if term in interpretation.names
+        }
+
+        if any(p.intensional and p.arity > 1 for p in predicates) or collect_function_names(ast):
+            # Relations given by callables cannot be inspected, and swapping objects
+            # would have to preserve every function too, so nothing is merged
+            self.classes = [[obj] for obj in domain]
+            self.class_of = {obj: i for i, obj in enumerate(domain)}
+            return
+
+        unary = [p for p in predicates if p.arity == 1]
+        self.relations: Dict[str, Set[tuple]] = {
+            p.name: {tuple(t.terms) for t in p.true_for} for p in predicates if p.arity > 1
+        }
+        # Object -> the tuples of every relation it occurs in
+        self.occurrences: Dict[Any, List[Tuple[str, tuple]]] = defaultdict(list)
+        for name, rows in self.relations.items():
+            for row in rows:
+                for obj in set(row):
+                    self.occurrences[obj].append((name, row))
+
+        sorts = [
+            interpretation.domain.sort(sort) for sort in sorted(collect_sorts(ast))
+        ]
+        unary_extensions = [
+            (p, None if p.intensional else {t.terms[0] for t in p.true_for})
+            for p in unary
+        ]
+        colours = {}
+        for obj in domain:
+            colours[obj] = (
+                obj if obj in distinguished else None,
+                tuple(
+                    bool(p.test(obj)) if extension is None else obj in extension
+                    for p, extension in unary_extensions
+                ),
+                tuple(obj in sort for sort in sorts),
+            )
+        colours = self._relabel(colours)
+
+        if refine_relations:
+            colours = self._refine(colours)
+        elif self.occurrences:
+            # Without refinement, objects occurring in relations are kept apart
+            colours = {
+                obj: (colour, obj if obj in self.occurrences else None)
+                for obj, colour in colours.items()
+            }
+
+        candidates = defaultdict(list)
+        for obj in domain:
+            candidates[colours[obj]].append(obj)
+        self.classes: List[List[Any]] = []
+        for members in candidates.values():
+            self.classes.extend(self._verify(members))
+        self.class_of = {
+            obj: i for i, members in enumerate(self.classes) for obj in members
+        }
+        logger.debug(
+            f"Partitioned {len(domain)} objects into {len(self.classes)} symmetry classes"
+        )
+
+    @staticmethod
+    def _relabel(colours: Dict[Any, Any]) -> Dict[Any, int]:
+        labels = {}
+        return {
+            obj: labels.setdefault(colour, len(labels)) for obj, colour in colours.items()
+        }
+
+    def _refine(self, colours: Dict[Any, int]) -> Dict[Any, int]:
+        n_colours = len(set(colours.values()))
+        while True:
+            refined = {}
+            for obj, colour in colours.items():
+                signature = sorted(
+                    (name, tuple(i for i, o in enumerate(row) if o == obj), tuple(colours[o] for o in row))
+                    for name, row in self.occurrences.get(obj, ())
+                )
+                refined[obj] = (colour, tuple(signature))
+            refined = self._relabel(refined)
+            n_refined = len(set(refined.values()))
+            if n_refined == n_colours:
+                return refined
+            colours, n_colours = refined, n_refined
+
+    def _is_automorphism(self, a: Any, b: Any) -> bool:
+        """Whether swapping a and b maps every relation of the vocabulary onto itself."""
+        swap = {a: b, b: a}
+        for obj in (a, b):
+            for name, row in self.occurrences.get(obj, ()):
+                if tuple(swap.get(o, o) for o in row) not in self.relations[name]:
+                    return False
+        return True
+
+    def _verify(self, members: List[Any]) -> Iterator[List[Any]]:
+        while members:
+            representative, rest = members[0], members[1:]
+            accepted, rejected = [representative], []
+            for obj in rest:
+                if self._is_automorphism(representative, obj):
+                    accepted.append(obj)
+                else:
+                    rejected.append(obj)
+            yield accepted
+            members = rejected
+
+    def representatives(self, objects: Iterable[Any], bound: Set[Any]) -> Iterator[Any]:
+        """
+        The objects a quantifier over objects has to try: every bound object, and one
+        unbound object from each class.
+        """
+        if objects is self.interpretation.domain:
+            bound_by_class = defaultdict(list)
+            for obj in bound:
+                if obj in self.class_of:
+                    bound_by_class[self.class_of[obj]].append(obj)
+            for class_index, members in enumerate(self.classes):
+                yield from bound_by_class.get(class_index, ())
+                for obj in members:
+                    if obj not in bound:
+                        yield obj
+                        break
+            return
+
+        seen_classes = set()
+        for obj in objects:
+            if obj in bound:
+                yield obj
+                continue
+            class_index = self.class_of.get(obj)
+            if class_index is None:
+                yield obj
+            elif class_index not in seen_classes:
+                seen_classes.add(class_index)
+                yield obj
+
+
+def evaluate_with_symmetry(ast: Expr, interpretation: Interpretation, refine_relations: bool = True) -> bool:
+    """Evaluate a formula with quantifiers iterating once per symmetry class."""
+    previous = interpretation.symmetry
+    interpretation.symmetry = SymmetryPartition(ast, interpretation, refine_relations)
+    try:
+        return evaluate(ast, interpretation)
+    finally:
+        interpretation.symmetry = previous
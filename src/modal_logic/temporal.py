@@ -0,0 +1,275 @@
+from typing import Any, Dict, FrozenSet, Iterable, Tuple, Union
+
+from interpretation_function.constant import Constant
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import collect_free_terms, iter_children
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    Expr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    TemporalExpr,
+    UntilExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+SATISFIED, VIOLATED, PENDING = "satisfied", "violated", "pending"
+
+# What remains to be checked of a formula on the rest of a trace: True, False, an
+# obligation, or the conjunction ("and", residuals) or disjunction ("or", residuals)
+# of residuals. An obligation ("next", node, env, at_end) requires node to hold, with
+# the variables bound as in env, from the next model on; at_end is its value if the
+# trace ends before that model.
+Residual = Union[bool, Tuple]
+
+
+def conjoin(residuals: Iterable[Residual]) -> Residual:
+    operands = set()
+    for residual in residuals:
+        if residual is False:
+            return False
+        if residual is True:
+            continue
+        if residual[0] == "and":
+            operands.update(residual[1])
+        else:
+            operands.add(residual)
+    if not operands:
+        return True
+    return next(iter(operands)) if len(operands) == 1 else ("and", frozenset(operands))
+
+
+def disjoin(residuals: Iterable[Residual]) -> Residual:
+    operands = set()
+    for residual in residuals:
+        if residual is True:
+            return True
+        if residual is False:
+            continue
+        if residual[0] == "or":
+            operands.update(residual[1])
+        else:
+            operands.add(residual)
+    if not operands:
+        return False
+    return next(iter(operands)) if len(operands) == 1 else ("or", frozenset(operands))
+
+
+def residual_size(residual: Residual) -> int:
+    """The number of obligations in a residual."""
+    if isinstance(residual, bool):
+        return 0
+    if residual[0] == "next":
+        return 1
+    return sum(residual_size(operand) for operand in residual[1])
+
+
+class TemporalMonitor:
+    """
+    Checks a formula with temporal operators against a trace of models that arrives
+    one model at a time, such as snapshots of a running system, under the semantics
+    of finite traces: always φ is true if φ is true at every remaining model, until
+    the end of the trace, and next φ is false at the last model.
+
+    The monitor does not keep the trace. It keeps the residual of the formula: what
+    is left to check of it on the rest of the trace. Each model progresses the
+    residual. Subformulas without temporal operators are evaluated in the model with
+    evaluate. Temporal operators are unrolled by one step: always φ becomes φ now and
+    always φ from the next model on, eventually φ becomes φ now or eventually φ from
+    the next model on, and φ until ψ becomes ψ now, or φ now and φ until ψ from the
+    next model on. A quantifier over a temporal formula is expanded over the objects
+    of the current model. Each object it binds carries its obligations, e.g. an
+    outstanding eventually Response(x) for every x that made a request, into later
+    models.
+
+    Residuals are simplified and equal obligations merged. Their size is therefore
+    bounded by the formula and the objects with open obligations, not by the length
+    of the trace.
+
+    The verdict is SATISFIED or VIOLATED once the residual has become true or false,
+    whatever models follow. Otherwise it is PENDING, and final tells whether the
+    formula holds if the trace ends with the last model seen.
+    """
+
+    def __init__(self, formula: Expr):
+        self.formula = formula
+        self.residual: Residual = ("next", formula, (), False)
+        self.steps = 0
+        self._temporal: Dict[int, bool] = {}
+        self._free: Dict[int, FrozenSet[str]] = {}
+        # Negations of the nodes of obligations, built once so that equal obligations stay equal
+        self._negations: Dict[int, NotExpr] = {}
+
+    @property
+    def verdict(self) -> str:
+        if self.residual is True:
+            return SATISFIED
+        if self.residual is False:
+            return VIOLATED
+        return PENDING
+
+    def final(self) -> bool:
+        """Whether the formula holds on the trace if it ends with the last model seen."""
+        if self.steps == 0:
+            msg = "A temporal formula has no truth value on an empty trace."
+            raise ValueError(msg)
+        return self._at_end(self.residual)
+
+    def _at_end(self, residual: Residual) -> bool:
+        if isinstance(residual, bool):
+            return residual
+        if residual[0] == "next":
+            return residual[3]
+        if residual[0] == "and":
+            return all(self._at_end(operand) for operand in residual[1])
+        return any(self._at_end(operand) for operand in residual[1])
+
+    def step(self, model: Union[Model, Interpretation]) -> str:
+        """Progress the formula through the next model of the trace and return the verdict."""
+        interpretation = model.I if isinstance(model, Model) else model
+        self.steps += 1
+        if not isinstance(self.residual, bool):
+            memo: Dict[Tuple, Residual] = {}
+            self.residual = self._advance(self.residual, interpretation, memo)
+        logger.debug(
+            f"Progressed {self.formula} through model {self.steps}: {self.verdict}, "
+            f"{residual_size(self.residual)} obligations left"
+        )
+        return self.verdict
+
+    def run(self, trace: Iterable[Union[Model, Interpretation]]) -> str:
+        """Progress through every model of a trace, stopping early once the verdict is settled."""
+        for model in trace:
+            if self.step(model) != PENDING:
+                break
+        return self.verdict
+
+    @property
+    def size(self) -> int:
+        return residual_size(self.residual)
+
+    # Progression
+
+    def _advance(self, residual: Residual, interpretation: Interpretation, memo: Dict) -> Residual:
+        if isinstance(residual, bool):
+            return residual
+        if residual[0] == "next":
+            _, node, env, _ = residual
+            return self._progress(node, dict(env), interpretation, memo)
+        if residual[0] == "and":
+            return conjoin(self._advance(operand, interpretation, memo) for operand in residual[1])
+        return disjoin(self._advance(operand, interpretation, memo) for operand in residual[1])
+
+    def _is_temporal(self, node: Expr) -> bool:
+        temporal = self._temporal.get(id(node))
+        if temporal is None:
+            temporal = isinstance(node, (TemporalExpr, UntilExpr)) or any(
+                self._is_temporal(child) for child in iter_children(node)
+            )
+            self._temporal[id(node)] = temporal
+        return temporal
+
+    def _obligation(self, node: Expr, env: Dict[str, Any], at_end: bool) -> Residual:
+        free = self._free.get(id(node))
+        if free is None:
+            free = self._free[id(node)] = frozenset(collect_free_terms(node))
+        return ("next", node, tuple(sorted((variable, env[variable]) for variable in free if variable in env)), at_end)
+
+    def _negate(self, residual: Residual) -> Residual:
+        if isinstance(residual, bool):
+            return not residual
+        if residual[0] == "next":
+            _, node, env, at_end = residual
+            negation = self._negations.get(id(node))
+            if negation is None:
+                negation = self._negations[id(node)] = NotExpr(node)
+            return ("next", negation, env, not at_end)
+        if residual[0] == "and":
+            return disjoin(self._negate(operand) for operand in residual[1])
+        return conjoin(self._negate(operand) for operand in residual[1])
+
+    def _progress(self, node: Expr, env: Dict[str, Any], interpretation: Interpretation, memo: Dict) -> Residual:
+        """The residual of node, with the variables bound as in env, after the current model."""
+        key = (id(node), tuple((variable, env[variable]) for variable in sorted(env)))
+        residual = memo.get(key)
+        if residual is None:
+            residual = memo[key] = self._progress_node(node, env, interpretation, memo)
+        return residual
+
+    def _progress_node(self, node: Expr, env: Dict[str, Any], interpretation: Interpretation, memo: Dict) -> Residual:
+        if not self._is_temporal(node):
+            return self._evaluate(node, env, interpretation)
+        if isinstance(node, TemporalExpr):
+            if node.operator == "next":
+                return self._obligation(node.expr, env, False)
+            now = self._progress(node.expr, env, interpretation, memo)
+            if node.operator == "always":
+                return conjoin([now, self._obligation(node, env, True)])
+            return disjoin([now, self._obligation(node, env, False)])
+        if isinstance(node, UntilExpr):
+            later = conjoin([self._progress(node.left, env, interpretation, memo), self._obligation(node, env, False)])
+            return disjoin([self._progress(node.right, env, interpretation, memo), later])
+        if isinstance(node, NotExpr):
+            return self._negate(self._progress(node.expr, env, interpretation, memo))
+        if isinstance(node, AndExpr):
+            return conjoin(self._progress(operand, env, interpretation, memo) for operand in node.operands)
+        if isinstance(node, OrExpr):
+            return disjoin(self._progress(operand, env, interpretation, memo) for operand in node.operands)
+        if isinstance(node, ImpliesExpr):
+            return disjoin(
+                [
+                    self._negate(self._progress(node.left, env, interpretation, memo)),
+                    self._progress(node.right, env, interpretation, memo),
+                ]
+            )
+        if isinstance(node, QuantifierBlockExpr):
+            return self._progress(node.nested(), env, interpretation, memo)
+        if isinstance(node, QuantifierExpr):
+            objects = interpretation.domain.sort(node.sort) if node.sort else interpretation.domain
+            combine = conjoin if node.quantifier == "∀" else disjoin
+            return combine(
+                self._progress(node.expr, {**env, node.variable: obj}, interpretation, memo) for obj in list(objects)
+            )
+        if isinstance(node, CountingQuantifierExpr):
+            msg = f"Counting quantifiers over temporal formulas such as {node} cannot be monitored."
+            raise ValueError(msg)
+        raise ValueError(f"Unknown node type: {type(node)}")
+
+    @staticmethod
+    def _evaluate(node: Expr, env: Dict[str, Any], interpretation: Interpretation) -> bool:
+        previous = {variable: interpretation.names.get(variable) for variable in env}
+        for variable, obj in env.items():
+            interpretation.extend(Constant(variable), obj)
+        try:
+            return bool(evaluate(node, interpretation))
+        finally:
+            for variable, obj in previous.items():
+                if obj is None:
+                    interpretation.remove_constant_object_mapping(Constant(variable))
+                else:
+                    interpretation.extend(Constant(variable), obj)
+
+
+def monitor(formula: Expr, trace: Iterable[Union[Model, Interpretation]]) -> str:
+    """The verdict on a formula after the models of a trace."""
+    return TemporalMonitor(formula).run(trace)
+
+
+def holds_on_trace(formula: Expr, trace: Iterable[Union[Model, Interpretation]]) -> bool:
+    """Whether a formula holds on a finite trace of models."""
+    temporal_monitor = TemporalMonitor(formula)
+    for model in trace:
+        temporal_monitor.step(model)
+    return temporal_monitor.final()
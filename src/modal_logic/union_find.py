@@ -0,0 +1,68 @@
+from typing import Dict, Generic, Hashable, Iterator, List, TypeVar
+
+
+T = TypeVar("T", bound=Hashable)
+
+
+class UnionFind(Generic[T]):
+    """
+    Disjoint sets with path compression and union by rank, so that find, union and
+    connected take O(α(n)) amortized time. Elements are added on first use. The
+    members of every set are also listed at its root, the shorter list appended to
+    the longer on union, so members takes time linear in the size of the set.
+    """
+
+    def __init__(self):
+        self.parent: Dict[T, T] = {}
+        self.rank: Dict[T, int] = {}
+        # Root -> the members of its set
+        self.sets: Dict[T, List[T]] = {}
+
+    def __contains__(self, item: T):
+        return item in self.parent
+
+    def __len__(self):
+        return len(self.parent)
+
+    def add(self, item: T):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.rank[item] = 0
+            self.sets[item] = [item]
+
+    def find(self, item: T) -> T:
+        self.add(item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: T, b: T) -> T:
+        """Merge the sets of a and b and return the root of the merged set."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        if self.rank[root_a] == self.rank[root_b]:
+            self.rank[root_a] += 1
+        members, merged = self.sets[root_a], self.sets.pop(root_b)
+        if len(members) < len(merged):
+            members, merged = merged, members
+        members.extend(merged)
+        self.sets[root_a] = members
+        return root_a
+
+    def connected(self, a: T, b: T) -> bool:
+        if a not in self.parent or b not in self.parent:
+            return a == b
+        return self.find(a) == self.find(b)
+
+    def members(self, item: T) -> List[T]:
+        return list(self.sets[self.find(item)])
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.parent)
@@ -0,0 +1,345 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from interpretation_function.function_term import FunctionTerm
+from syntax.ast_utils import iter_children
+from syntax.first_order_logic_syntax import (
+    CountingQuantifierExpr,
+    Expr,
+    NotExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+)
+from syntax.normal_form import NormalForm, symbol_names
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+# A clause term is a variable (an int), a constant (a str), or a tuple of a function
+# symbol and its arguments. Variables never collide with the names of constants.
+Term = Union[int, str, tuple]
+# A literal is its sign, its predicate and the tuple of its arguments
+Literal = Tuple[bool, str, Tuple[Term, ...]]
+
+IDENTITY = "="
+
+
+# Terms
+
+
+def term_size(term: Term) -> int:
+    if isinstance(term, tuple):
+        return 1 + sum(term_size(arg) for arg in term[1:])
+    return 1
+
+
+def term_depth(term: Term) -> int:
+    if isinstance(term, tuple):
+        return 1 + max((term_depth(arg) for arg in term[1:]), default=0)
+    return 0
+
+
+def term_symbols(term: Term) -> Iterator[str]:
+    """The function symbols and constants of a term, with repetitions."""
+    if isinstance(term, tuple):
+        yield term[0]
+        for arg in term[1:]:
+            yield from term_symbols(arg)
+    elif not isinstance(term, int):
+        yield term
+
+
+def term_variables(term: Term) -> Iterator[int]:
+    if isinstance(term, tuple):
+        for arg in term[1:]:
+            yield from term_variables(arg)
+    elif isinstance(term, int):
+        yield term
+
+
+def term_str(term: Term) -> str:
+    if isinstance(term, tuple):
+        return f"{term[0]}({', '.join(term_str(arg) for arg in term[1:])})"
+    if isinstance(term, int):
+        return f"X{term}"
+    return term
+
+
+def rename(term: Term, mapping: Dict[int, int]) -> Term:
+    if isinstance(term, tuple):
+        return (term[0],) + tuple(rename(arg, mapping) for arg in term[1:])
+    if isinstance(term, int):
+        return mapping[term]
+    return term
+
+
+def apply(term: Term, substitution: Dict[int, Term]) -> Term:
+    """A term with the (triangular) substitution applied to it."""
+    while isinstance(term, int) and term in substitution:
+        term = substitution[term]
+    if isinstance(term, tuple):
+        return (term[0],) + tuple(apply(arg, substitution) for arg in term[1:])
+    return term
+
+
+def occurs(variable: int, term: Term, substitution: Dict[int, Term]) -> bool:
+    term = apply(term, substitution)
+    return variable in term_variables(term)
+
+
+def unify(left: Term, right: Term, substitution: Optional[Dict[int, Term]] = None) -> Optional[Dict[int, Term]]:
+    """A most general unifier extending substitution, or None if there is none."""
+    substitution = dict(substitution or {})
+    stack = [(left, right)]
+    while stack:
+        left, right = stack.pop()
+        while isinstance(left, int) and left in substitution:
+            left = substitution[left]
+        while isinstance(right, int) and right in substitution:
+            right = substitution[right]
+        if left == right:
+            continue
+        if isinstance(left, int):
+            if occurs(left, right, substitution):
+                return None
+            substitution[left] = right
+        elif isinstance(right, int):
+            if occurs(right, left, substitution):
+                return None
+            substitution[right] = left
+        elif isinstance(left, tuple) and isinstance(right, tuple) and left[0] == right[0] and len(left) == len(right):
+            stack.extend(zip(left[1:], right[1:]))
+        else:
+            return None
+    return substitution
+
+
+def match(pattern: Term, target: Term, substitution: Dict[int, Term]) -> Optional[Dict[int, Term]]:
+    """
+    A substitution extending substitution that maps pattern onto target, binding only
+    the variables of pattern; the variables of target are treated as constants.
+    """
+    substitution = dict(substitution)
+    stack = [(pattern, target)]
+    while stack:
+        pattern, target = stack.pop()
+        if isinstance(pattern, int):
+            bound = substitution.setdefault(pattern, target)
+            if bound != target:
+                return None
+        elif isinstance(pattern, tuple):
+            if not isinstance(target, tuple) or pattern[0] != target[0] or len(pattern) != len(target):
+                return None
+            stack.extend(zip(pattern[1:], target[1:]))
+        elif pattern != target:
+            return None
+    return substitution
+
+
+# Literals
+
+
+def literal_str(literal: Literal) -> str:
+    positive, predicate, args = literal
+    if predicate == IDENTITY:
+        return f"{term_str(args[0])} {'=' if positive else '≠'} {term_str(args[1])}"
+    atom = f"{predicate}({', '.join(term_str(arg) for arg in args)})" if args else predicate
+    return atom if positive else f"¬{atom}"
+
+
+def apply_literal(literal: Literal, substitution: Dict[int, Term]) -> Literal:
+    positive, predicate, args = literal
+    return positive, predicate, tuple(apply(arg, substitution) for arg in args)
+
+
+def literal_weight(literal: Literal) -> int:
+    return 1 + sum(term_size(arg) for arg in literal[2])
+
+
+class Clause:
+    """
+    A disjunction of literals whose variables are implicitly universally quantified.
+    Duplicate literals are removed and the variables renamed to 0, 1, ... in order of
+    first occurrence, so a clause never shares variables with the terms it was
+    built from. The clause records how it was derived, for proof reconstruction.
+    """
+
+    def __init__(self, literals: Iterable[Literal], rule: str = "input", parents: Tuple["Clause", ...] = ()):
+        mapping: Dict[int, int] = {}
+        normalised = []
+        for positive, predicate, args in dict.fromkeys(literals):
+            for arg in args:
+                for variable in term_variables(arg):
+                    mapping.setdefault(variable, len(mapping))
+            normalised.append((positive, predicate, tuple(rename(arg, mapping) for arg in args)))
+        self.literals: Tuple[Literal, ...] = tuple(dict.fromkeys(normalised))
+        self.n_vars = len(mapping)
+        self.rule = rule
+        self.parents = parents
+        self.weights = tuple(literal_weight(literal) for literal in self.literals)
+        self.weight = sum(self.weights)
+        # Assigned once the clause is kept by a prover
+        self.number: Optional[int] = None
+
+    def __len__(self):
+        return len(self.literals)
+
+    def __str__(self):
+        return " ∨ ".join(literal_str(literal) for literal in self.literals) or "⊥"
+
+    def __repr__(self):
+        return f"Clause({self})"
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.literals
+
+    def is_tautology(self) -> bool:
+        atoms = {(predicate, args) for positive, predicate, args in self.literals if positive}
+        return any(not positive and (predicate, args) in atoms for positive, predicate, args in self.literals)
+
+
+def subsumes(general: Clause, specific: Clause) -> bool:
+    """
+    Whether an instance of general is contained in specific, mapping distinct literals
+    of general to distinct literals of specific.
+    """
+    if len(general) > len(specific):
+        return False
+    # The literals of specific each literal of general matches on its own, fewest first
+    candidates = []
+    for (positive, predicate, args), weight in zip(general.literals, general.weights):
+        matches = []
+        for j, (other_positive, other_predicate, other_args) in enumerate(specific.literals):
+            # An instance of a literal is never lighter than the literal
+            if other_positive == positive and other_predicate == predicate and specific.weights[j] >= weight:
+                substitution = {}
+                for arg, other_arg in zip(args, other_args):
+                    substitution = match(arg, other_arg, substitution)
+                    if substitution is None:
+                        break
+                if substitution is not None:
+                    matches.append(j)
+        if not matches:
+            return False
+        candidates.append((args, matches))
+    candidates.sort(key=lambda candidate: len(candidate[1]))
+
+    def search(i: int, substitution: Dict[int, Term], used: frozenset) -> bool:
+        if i == len(candidates):
+            return True
+        args, matches = candidates[i]
+        for j in matches:
+            if j in used:
+                continue
+            extended = substitution
+            for arg, other_arg in zip(args, specific.literals[j][2]):
+                extended = match(arg, other_arg, extended)
+                if extended is None:
+                    break
+            if extended is not None and search(i + 1, extended, used | {j}):
+                return True
+        return False
+
+    return search(0, {}, frozenset())
+
+
+# Clausification
+
+
+def check_clausifiable(formula: Expr):
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CountingQuantifierExpr):
+            msg = f"Counting quantifiers such as {node} cannot be put in clause form."
+            raise ValueError(msg)
+        if isinstance(node, QuantifierExpr) and node.sort or isinstance(node, QuantifierBlockExpr) and any(node.sorts):
+            msg = f"Sorted quantifiers such as {node} cannot be put in clause form."
+            raise ValueError(msg)
+        stack.extend(iter_children(node))
+
+
+def literal_of(node: Expr, variables: Dict[str, int]) -> Literal:
+    """The clause literal of a literal of the AST, with the given names as variables."""
+
+    def convert(term) -> Term:
+        if isinstance(term, FunctionTerm):
+            return (term.name,) + tuple(convert(arg) for arg in term.args)
+        return variables.get(term, term)
+
+    positive = not isinstance(node, NotExpr)
+    atom = node if positive else node.expr
+    if isinstance(atom, PredicateExpr):
+        return positive, atom.name, tuple(convert(arg) for arg in atom.terms)
+    if isinstance(atom, SentenceLetterExpr):
+        return positive, atom.letter, ()
+    return positive != atom.negated, IDENTITY, (convert(atom.left), convert(atom.right))
+
+
+def clausify(formulas: Iterable[Expr]) -> List[Clause]:
+    """
+    The clauses of a set of formulas, which are satisfiable iff the formulas are,
+    through the definitional clause form of NormalForm.
+    """
+    formulas = list(formulas)
+    for formula in formulas:
+        check_clausifiable(formula)
+    normal_form = NormalForm(symbol_names(formulas))
+    clauses = []
+    for formula in formulas:
+        for literals in normal_form.clauses(formula):
+            variables = {name: i for i, name in enumerate(normal_form.variable_names)}
+            clauses.append(Clause(literal_of(literal, variables) for literal in literals))
+    return clauses
+
+
+def equality_axioms(clauses: Iterable[Clause]) -> List[Clause]:
+    """
+    Reflexivity, symmetry, transitivity and the substitution axioms for the function
+    symbols and predicates of clauses, which let resolution reason about =.
+    """
+    predicates: Dict[str, int] = {}
+    functions: Dict[str, int] = {}
+    for clause in clauses:
+        for _, predicate, args in clause.literals:
+            predicates.setdefault(predicate, len(args))
+            stack = list(args)
+            while stack:
+                term = stack.pop()
+                if isinstance(term, tuple):
+                    functions.setdefault(term[0], len(term) - 1)
+                    stack.extend(term[1:])
+    if IDENTITY not in predicates:
+        return []
+
+    axioms = [
+        Clause([(True, IDENTITY, (0, 0))], "reflexivity"),
+        Clause([(False, IDENTITY, (0, 1)), (True, IDENTITY, (1, 0))], "symmetry"),
+        Clause([(False, IDENTITY, (0, 1)), (False, IDENTITY, (1, 2)), (True, IDENTITY, (0, 2))], "transitivity"),
+    ]
+    for name, arity in sorted(functions.items()):
+        for position in range(arity):
+            left = tuple(range(arity))
+            right = left[:position] + (arity,) + left[position + 1:]
+            axioms.append(
+                Clause(
+                    [(False, IDENTITY, (position, arity)), (True, IDENTITY, ((name,) + left, (name,) + right))],
+                    "congruence",
+                )
+            )
+    for name, arity in sorted(predicates.items()):
+        if name == IDENTITY:
+            continue
+        for position in range(arity):
+            left = tuple(range(arity))
+            right = left[:position] + (arity,) + left[position + 1:]
+            axioms.append(
+                Clause([(False, IDENTITY, (position, arity)), (False, name, left), (True, name, right)], "congruence")
+            )
+    return axioms
@@ -0,0 +1,194 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from proof_theory.clause import Clause, Literal, Term, term_depth, term_symbols
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+# The token a discrimination tree stores for any variable
+VARIABLE = "*"
+
+
+class _TreeNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: Dict = {}
+        self.entries: List = []
+
+
+def _tokens(literal: Literal) -> Iterator:
+    """The literal flattened in preorder, with each symbol tagged by its arity."""
+    positive, predicate, args = literal
+    yield positive, predicate
+    stack = list(reversed(args))
+    while stack:
+        term = stack.pop()
+        if isinstance(term, tuple):
+            yield term[0], len(term) - 1
+            stack.extend(reversed(term[1:]))
+        elif isinstance(term, int):
+            yield VARIABLE
+        else:
+            yield term, 0
+
+
+class DiscriminationTree:
+    """
+    An index of literals by their preorder string of symbols, in which every variable
+    is the same token. Literals that share a prefix share a path, so retrieval walks
+    the tree once for all of them and skips every branch with a clashing symbol.
+
+    unifiable returns a superset of the entries whose literal unifies with the query
+    (the same variable may be matched against different terms); the caller confirms
+    each candidate with unify.
+    """
+
+    def __init__(self):
+        self.root = _TreeNode()
+        self.size = 0
+
+    def insert(self, literal: Literal, entry):
+        node = self.root
+        for token in _tokens(literal):
+            node = node.children.setdefault(token, _TreeNode())
+        node.entries.append(entry)
+        self.size += 1
+
+    def remove(self, literal: Literal, entry):
+        path = [self.root]
+        for token in _tokens(literal):
+            path.append(path[-1].children[token])
+        path[-1].entries.remove(entry)
+        self.size -= 1
+        tokens = list(_tokens(literal))
+        for depth in range(len(tokens), 0, -1):
+            node = path[depth]
+            if node.entries or node.children:
+                break
+            del path[depth - 1].children[tokens[depth - 1]]
+
+    def _skip(self, node: _TreeNode, n: int) -> Iterator[_TreeNode]:
+        """The nodes reached from node by skipping n complete terms."""
+        if n == 0:
+            yield node
+            return
+        for token, child in node.children.items():
+            yield from self._skip(child, n - 1 + (0 if token == VARIABLE else token[1]))
+
+    def _unifiable(self, node: _TreeNode, terms: Tuple[Term, ...]) -> Iterator:
+        if not terms:
+            yield from node.entries
+            return
+        term, rest = terms[0], terms[1:]
+        if isinstance(term, int):
+            for after in self._skip(node, 1):
+                yield from self._unifiable(after, rest)
+            return
+        child = node.children.get(VARIABLE)
+        if child is not None:
+            yield from self._unifiable(child, rest)
+        if isinstance(term, tuple):
+            child = node.children.get((term[0], len(term) - 1))
+            if child is not None:
+                yield from self._unifiable(child, term[1:] + rest)
+        else:
+            child = node.children.get((term, 0))
+            if child is not None:
+                yield from self._unifiable(child, rest)
+
+    def unifiable(self, literal: Literal) -> Iterator:
+        """The entries of the literals that may unify with literal, sign included."""
+        positive, predicate, args = literal
+        node = self.root.children.get((positive, predicate))
+        if node is not None:
+            yield from self._unifiable(node, args)
+
+
+class FeatureVectorIndex:
+    """
+    An index of clauses for subsumption by a vector of features that can only grow
+    from a clause to its instances and supersets: the number of literals of each
+    sign and predicate, the deepest term among them, and the occurrences of each
+    symbol. A clause can only subsume another if its vector is less than or equal
+    in every component, so the vectors are stored in a trie and a query only
+    descends into the components that pass the test.
+
+    The features are fixed when the index is built, from the predicates and symbols
+    of the clauses it will hold; symbols beyond max_symbols are not used.
+    """
+
+    def __init__(self, clauses: Iterable[Clause], max_symbols: int = 16):
+        predicates = set()
+        symbols: Dict[str, int] = {}
+        for clause in clauses:
+            for positive, predicate, args in clause.literals:
+                predicates.add((positive, predicate))
+                for arg in args:
+                    for symbol in term_symbols(arg):
+                        symbols[symbol] = symbols.get(symbol, 0) + 1
+        self.predicates = {key: i for i, key in enumerate(sorted(predicates))}
+        frequent = sorted(symbols, key=lambda symbol: (-symbols[symbol], symbol))[:max_symbols]
+        self.symbols = {symbol: i for i, symbol in enumerate(frequent)}
+        self.root: Dict = {}
+        self.size = 0
+
+    def features(self, clause: Clause) -> Tuple[int, ...]:
+        n = len(self.predicates)
+        vector = [0] * (2 * n + 1 + len(self.symbols))
+        unknown = 2 * n
+        for positive, predicate, args in clause.literals:
+            i = self.predicates.get((positive, predicate))
+            if i is None:
+                vector[unknown] += 1
+                continue
+            vector[i] += 1
+            vector[n + i] = max(vector[n + i], max((term_depth(arg) for arg in args), default=0))
+            for arg in args:
+                for symbol in term_symbols(arg):
+                    j = self.symbols.get(symbol)
+                    if j is not None:
+                        vector[2 * n + 1 + j] += 1
+        return tuple(vector)
+
+    def insert(self, clause: Clause):
+        node = self.root
+        for value in self.features(clause):
+            node = node.setdefault(value, {})
+        node.setdefault(None, []).append(clause)
+        self.size += 1
+
+    def remove(self, clause: Clause):
+        vector = self.features(clause)
+        path = [self.root]
+        for value in vector:
+            path.append(path[-1][value])
+        path[-1][None].remove(clause)
+        self.size -= 1
+        if not path[-1][None]:
+            del path[-1][None]
+        for depth in range(len(vector), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][vector[depth - 1]]
+
+    def _collect(self, node: Dict, vector: Tuple[int, ...], depth: int, smaller: bool) -> Iterator[Clause]:
+        if depth == len(vector):
+            yield from node.get(None, ())
+            return
+        bound = vector[depth]
+        for value, child in node.items():
+            if value <= bound if smaller else value >= bound:
+                yield from self._collect(child, vector, depth + 1, smaller)
+
+    def generalisations(self, clause: Clause) -> Iterator[Clause]:
+        """The stored clauses that may subsume clause."""
+        return self._collect(self.root, self.features(clause), 0, True)
+
+    def instances(self, clause: Clause) -> Iterator[Clause]:
+        """The stored clauses that clause may subsume."""
+        return self._collect(self.root, self.features(clause), 0, False)
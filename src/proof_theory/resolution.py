@@ -0,0 +1,356 @@
+import heapq
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from proof_theory.clause import (
+    Clause,
+    Literal,
+    apply_literal,
+    clausify,
+    equality_axioms,
+    literal_weight,
+    match,
+    rename,
+    subsumes,
+    unify,
+)
+from proof_theory.indexing import DiscriminationTree, FeatureVectorIndex
+from syntax.first_order_logic_syntax import Expr, NotExpr
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+PROVED, SATURATED, UNKNOWN = "proved", "saturated", "unknown"
+
+PHASES = ("clausification", "selection", "subsumption", "inference", "indexing")
+
+
+def eligible(clause: Clause) -> List[int]:
+    """
+    The literals of a clause that inferences may use: its heaviest negative literal if
+    it has one, otherwise all its literals.
+    """
+    negative = [i for i, literal in enumerate(clause.literals) if not literal[0]]
+    if negative:
+        return [max(negative, key=lambda i: literal_weight(clause.literals[i]))]
+    return list(range(len(clause.literals)))
+
+
+class ResolutionResult:
+    """
+    The outcome of a resolution refutation: PROVED if the empty clause was derived,
+    so the clauses are unsatisfiable, SATURATED if every inference was drawn without
+    deriving it, so they are satisfiable, and UNKNOWN if a limit was reached first.
+    The proof lists the clauses the empty clause was derived from, in order.
+    """
+
+    def __init__(self, status: str, proof: List[Clause], stats: Dict[str, int], times: Dict[str, float]):
+        self.status = status
+        self.proof = proof
+        self.stats = stats
+        self.times = times
+
+    @property
+    def proved(self) -> bool:
+        return self.status == PROVED
+
+    @property
+    def proof_length(self) -> int:
+        return len(self.proof)
+
+    def proof_text(self) -> str:
+        lines = []
+        for clause in self.proof:
+            parents = ", ".join(str(parent.number) for parent in clause.parents)
+            lines.append(f"{clause.number}. {clause}  ({clause.rule}{' ' + parents if parents else ''})")
+        return "\n".join(lines)
+
+    def __str__(self):
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.times.items())
+        return (
+            f"Resolution {self.status} with a proof of {self.proof_length} clauses after generating "
+            f"{self.stats['generated']} clauses ({phases})"
+        )
+
+
+class ResolutionProver:
+    """
+    A saturation prover for clauses by binary resolution and factoring, organised as
+    a given-clause loop. Clauses wait in a passive queue; the lightest one (or, every
+    age_ratio picks, the oldest) becomes the given clause, is made active, and every
+    inference between it and the active clauses is drawn. New clauses are dropped if
+    they are tautologies, variants of a kept clause or subsumed by an active clause,
+    and an active clause subsumed by the given clause is removed. A new clause also
+    loses every literal whose complement is an instance of an active unit clause.
+
+    Inferences are restricted by literal selection: a clause with negative literals
+    only resolves on its heaviest one, against a clause without negative literals, and
+    only clauses without negative literals are factored. This keeps the calculus
+    refutationally complete while cutting most of the resolvents.
+
+    The literals of the active clauses are kept in a discrimination tree, so the
+    resolution partners of a literal are retrieved without trying every clause, and
+    the active clauses themselves in a feature vector index that narrows down the
+    candidates for forward and backward subsumption. Clauses heavier than max_weight
+    are discarded, which may make the prover incomplete, so it then reports UNKNOWN
+    rather than SATURATED.
+    """
+
+    def __init__(
+        self,
+        clauses: Iterable[Clause],
+        max_clauses: int = 20_000,
+        max_weight: Optional[int] = None,
+        age_ratio: int = 5,
+        time_budget: Optional[float] = None,
+    ):
+        self.input = list(clauses)
+        self.max_clauses = max_clauses
+        self.max_weight = max_weight
+        self.age_ratio = age_ratio
+        self.time_budget = time_budget
+
+        self.by_weight: List = []
+        self.by_age: deque = deque()
+        self.active: set = set()
+        self.removed: set = set()
+        self.variants: set = set()
+        self.literals = DiscriminationTree()
+        self.units = DiscriminationTree()
+        self.features = FeatureVectorIndex(self.input)
+        self.n_clauses = 0
+        self.picks = 0
+        self.incomplete = False
+        self.empty: Optional[Clause] = None
+
+        self.stats = dict.fromkeys(
+            (
+                "given",
+                "generated",
+                "kept",
+                "tautologies",
+                "unit_deletions",
+                "forward_subsumed",
+                "backward_subsumed",
+                "discarded",
+            ),
+            0,
+        )
+        self.times = dict.fromkeys(PHASES, 0.0)
+
+    @contextmanager
+    def _phase(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[phase] += time.perf_counter() - start
+
+    def _forward_subsumed(self, clause: Clause) -> bool:
+        return any(subsumes(active, clause) for active in self.features.generalisations(clause))
+
+    def _keep(self, clause: Clause):
+        """Add a new clause to the passive queue unless it is redundant."""
+        self.stats["generated"] += 1
+        with self._phase("subsumption"):
+            clause = self._simplify(clause)
+        if clause.is_empty:
+            self._number(clause)
+            self.empty = clause
+            return
+        if clause.is_tautology():
+            self.stats["tautologies"] += 1
+            return
+        if self.max_weight is not None and clause.weight > self.max_weight:
+            self.stats["discarded"] += 1
+            self.incomplete = True
+            return
+        with self._phase("subsumption"):
+            if clause.literals in self.variants or self._forward_subsumed(clause):
+                self.stats["forward_subsumed"] += 1
+                return
+        self.variants.add(clause.literals)
+        self._number(clause)
+        self.stats["kept"] += 1
+        heapq.heappush(self.by_weight, (clause.weight, clause.number, clause))
+        self.by_age.append(clause)
+
+    def _simplify(self, clause: Clause) -> Clause:
+        """The clause without the literals whose complement is an instance of an active unit."""
+        kept = []
+        units = []
+        for positive, predicate, args in clause.literals:
+            for unit, _ in self.units.unifiable((not positive, predicate, args)):
+                substitution = {}
+                for arg, unit_arg in zip(args, unit.literals[0][2]):
+                    substitution = match(unit_arg, arg, substitution)
+                    if substitution is None:
+                        break
+                if substitution is not None:
+                    units.append(unit)
+                    break
+            else:
+                kept.append((positive, predicate, args))
+        if not units:
+            return clause
+        self.stats["unit_deletions"] += len(units)
+        return Clause(kept, f"{clause.rule} and unit deletion", clause.parents + tuple(units))
+
+    def _number(self, clause: Clause):
+        self.n_clauses += 1
+        clause.number = self.n_clauses
+
+    def _select(self) -> Optional[Clause]:
+        self.picks += 1
+        while self.by_weight or self.by_age:
+            if self.picks % self.age_ratio == 0 and self.by_age:
+                clause = self.by_age.popleft()
+            elif self.by_weight:
+                clause = heapq.heappop(self.by_weight)[2]
+            else:
+                clause = self.by_age.popleft()
+            if clause.number not in self.active and clause.number not in self.removed:
+                return clause
+        return None
+
+    def _activate(self, given: Clause):
+        with self._phase("subsumption"):
+            for active in list(self.features.instances(given)):
+                if subsumes(given, active):
+                    self._deactivate(active)
+                    self.stats["backward_subsumed"] += 1
+        with self._phase("indexing"):
+            self.active.add(given.number)
+            self.features.insert(given)
+            for i in eligible(given):
+                self.literals.insert(given.literals[i], (given, i))
+            if len(given) == 1:
+                self.units.insert(given.literals[0], (given, 0))
+
+    def _deactivate(self, clause: Clause):
+        with self._phase("indexing"):
+            self.active.discard(clause.number)
+            self.removed.add(clause.number)
+            self.features.remove(clause)
+            for i in eligible(clause):
+                self.literals.remove(clause.literals[i], (clause, i))
+            if len(clause) == 1:
+                self.units.remove(clause.literals[0], (clause, 0))
+
+    def _infer(self, given: Clause) -> List[Clause]:
+        """The factors of the given clause and its resolvents with the active clauses."""
+        inferred = []
+        literals = given.literals
+        selected = eligible(given)
+        factorable = len(selected) == len(literals)
+        for i, (positive, predicate, args) in enumerate(literals if factorable else ()):
+            for j in range(i + 1, len(literals)):
+                other_positive, other_predicate, other_args = literals[j]
+                if other_positive != positive or other_predicate != predicate:
+                    continue
+                substitution = {}
+                for arg, other_arg in zip(args, other_args):
+                    substitution = unify(arg, other_arg, substitution)
+                    if substitution is None:
+                        break
+                if substitution is not None:
+                    factor = [apply_literal(literal, substitution) for k, literal in enumerate(literals) if k != j]
+                    inferred.append(Clause(factor, "factor", (given,)))
+
+        # The given clause takes negative variables, apart from those of its partners
+        mapping = {variable: -variable - 1 for variable in range(given.n_vars)}
+        renamed: List[Literal] = [
+            (positive, predicate, tuple(rename(arg, mapping) for arg in args)) for positive, predicate, args in literals
+        ]
+        for i in selected:
+            positive, predicate, args = renamed[i]
+            for partner, k in list(self.literals.unifiable((not positive, predicate, args))):
+                _, _, partner_args = partner.literals[k]
+                substitution = {}
+                for arg, partner_arg in zip(args, partner_args):
+                    substitution = unify(arg, partner_arg, substitution)
+                    if substitution is None:
+                        break
+                if substitution is None:
+                    continue
+                resolvent = [apply_literal(literal, substitution) for m, literal in enumerate(renamed) if m != i]
+                resolvent += [apply_literal(literal, substitution) for m, literal in enumerate(partner.literals) if m != k]
+                inferred.append(Clause(resolvent, "resolution", (given, partner)))
+        return inferred
+
+    def _proof(self) -> List[Clause]:
+        proof = {}
+        stack = [self.empty]
+        while stack:
+            clause = stack.pop()
+            if clause.number not in proof:
+                proof[clause.number] = clause
+                stack.extend(clause.parents)
+        return [proof[number] for number in sorted(proof)]
+
+    def run(self) -> ResolutionResult:
+        deadline = None if self.time_budget is None else time.monotonic() + self.time_budget
+        for clause in self.input:
+            self._keep(clause)
+            if self.empty is not None:
+                break
+
+        status = UNKNOWN
+        while self.empty is None:
+            if self.n_clauses >= self.max_clauses or deadline is not None and time.monotonic() > deadline:
+                break
+            with self._phase("selection"):
+                given = self._select()
+            if given is None:
+                status = UNKNOWN if self.incomplete else SATURATED
+                break
+            with self._phase("subsumption"):
+                redundant = self._forward_subsumed(given)
+            if redundant:
+                self.stats["forward_subsumed"] += 1
+                self.removed.add(given.number)
+                continue
+            self.stats["given"] += 1
+            self._activate(given)
+            with self._phase("inference"):
+                inferred = self._infer(given)
+            for clause in inferred:
+                self._keep(clause)
+                if self.empty is not None:
+                    break
+
+        if self.empty is not None:
+            status = PROVED
+        proof = self._proof() if self.empty is not None else []
+        result = ResolutionResult(status, proof, dict(self.stats), dict(self.times))
+        logger.debug(str(result))
+        return result
+
+
+def refute(formulas: Iterable[Expr], equality: bool = True, **kwargs) -> ResolutionResult:
+    """
+    Resolution on the clause form of formulas: PROVED if they are unsatisfiable.
+    With equality, the axioms of = are added when the formulas use it.
+    """
+    start = time.perf_counter()
+    clauses = clausify(formulas)
+    if equality:
+        clauses += equality_axioms(clauses)
+    clausification = time.perf_counter() - start
+    result = ResolutionProver(clauses, **kwargs).run()
+    result.times["clausification"] += clausification
+    return result
+
+
+def prove(conclusion: Expr, premises: Iterable[Expr] = (), **kwargs) -> ResolutionResult:
+    """
+    Resolution on the premises and the negated conclusion: PROVED if the conclusion
+    follows from the premises (is valid, without premises) in every model.
+    """
+    return refute(list(premises) + [NotExpr(conclusion)], **kwargs)
@@ -0,0 +1,607 @@
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from interpretation_function.constant import Constant
+from interpretation_function.function import Function
+from interpretation_function.function_term import FunctionTerm
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import InternedDomain
+from modal_logic.interpretation import Interpretation
+from modal_logic.union_find import UnionFind
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import collect_free_terms, iter_children, structural_key, substitute
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    Expr,
+    IdentityExpr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+LITERAL, ALPHA, BETA, DELTA, GAMMA = "literal", "alpha", "beta", "delta", "gamma"
+
+CLOSED, OPEN, UNKNOWN = "closed", "open", "unknown"
+
+
+class TableauNode:
+    """
+    A formula on a tableau. A branch is the path from a leaf up to the root, so the
+    formulas above a split are shared by every branch below it rather than copied.
+    Nodes are numbered in the order they are added, and record the rule and the
+    number of the node they were derived from.
+    """
+
+    def __init__(self, formula: Expr, parent: Optional["TableauNode"], number: int, rule: str = "", source: Optional[int] = None):
+        self.formula = formula
+        self.parent = parent
+        self.number = number
+        self.rule = rule
+        self.source = source
+        self.children: List["TableauNode"] = []
+        # CLOSED, OPEN or UNKNOWN on leaves once their branch is finished
+        self.status: Optional[str] = None
+
+    def __str__(self):
+        justification = f"{self.rule} {self.source}" if self.source is not None else self.rule
+        return f"{self.number}. {self.formula}" + (f"  ({justification})" if justification else "")
+
+    def branch(self) -> List["TableauNode"]:
+        """The nodes from the root down to this one."""
+        nodes = []
+        node = self
+        while node is not None:
+            nodes.append(node)
+            node = node.parent
+        return nodes[::-1]
+
+
+class TableauResult:
+    """
+    The outcome of a tableau: CLOSED if every branch closed, OPEN if a branch yielded
+    a model of the formulas, which is checked with the evaluator before it is
+    returned, and UNKNOWN if a limit was reached first.
+    """
+
+    def __init__(self, status: str, root: Optional[TableauNode], model: Optional[Interpretation], n_nodes: int):
+        self.status = status
+        self.root = root
+        self.model = model
+        self.n_nodes = n_nodes
+
+    @property
+    def closed(self) -> bool:
+        return self.status == CLOSED
+
+    def __str__(self):
+        return f"Tableau {self.status} after {self.n_nodes} nodes"
+
+
+def rule_of(formula: Expr) -> Tuple[str, str, Any]:
+    """
+    The kind of rule that expands a formula, its name and what it yields: the
+    components for alpha and beta rules, (variable, body) for quantifier rules and
+    (atom, positive) for literals.
+    """
+    if isinstance(formula, (SentenceLetterExpr, PredicateExpr, IdentityExpr)):
+        return LITERAL, "", (formula, True)
+    if isinstance(formula, AndExpr):
+        return ALPHA, "∧", formula.operands
+    if isinstance(formula, OrExpr):
+        return BETA, "∨", formula.operands
+    if isinstance(formula, ImpliesExpr):
+        return BETA, "→", [NotExpr(formula.left), formula.right]
+    if isinstance(formula, QuantifierBlockExpr):
+        return rule_of(formula.nested())
+    if isinstance(formula, QuantifierExpr):
+        kind = GAMMA if formula.quantifier == "∀" else DELTA
+        return kind, formula.quantifier, (formula.variable, formula.expr)
+    if isinstance(formula, NotExpr):
+        inner = formula.expr
+        if isinstance(inner, (SentenceLetterExpr, PredicateExpr, IdentityExpr)):
+            return LITERAL, "", (inner, False)
+        if isinstance(inner, NotExpr):
+            return ALPHA, "¬¬", [inner.expr]
+        if isinstance(inner, AndExpr):
+            return BETA, "¬∧", [NotExpr(operand) for operand in inner.operands]
+        if isinstance(inner, OrExpr):
+            return ALPHA, "¬∨", [NotExpr(operand) for operand in inner.operands]
+        if isinstance(inner, ImpliesExpr):
+            return ALPHA, "¬→", [inner.left, NotExpr(inner.right)]
+        if isinstance(inner, QuantifierBlockExpr):
+            return rule_of(NotExpr(inner.nested()))
+        if isinstance(inner, QuantifierExpr):
+            kind = DELTA if inner.quantifier == "∀" else GAMMA
+            return kind, "¬" + inner.quantifier, (inner.variable, NotExpr(inner.expr))
+    msg = f"The tableau has no rule for {formula}."
+    raise ValueError(msg)
+
+
+def check_supported(formula: Expr):
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CountingQuantifierExpr):
+            msg = f"Counting quantifiers such as {node} are not supported by the tableau."
+            raise ValueError(msg)
+        if isinstance(node, QuantifierExpr) and node.sort or isinstance(node, QuantifierBlockExpr) and any(node.sorts):
+            msg = f"Sorted quantifiers such as {node} are not supported by the tableau."
+            raise ValueError(msg)
+        stack.extend(iter_children(node))
+
+
+def subterms(term) -> Iterable:
+    if isinstance(term, FunctionTerm):
+        for subterm in term.subterms():
+            yield subterm
+            yield from (arg for arg in subterm.args if not isinstance(arg, FunctionTerm))
+    else:
+        yield term
+
+
+def term_depth(term) -> int:
+    return term.depth if isinstance(term, FunctionTerm) else 0
+
+
+def replace_term(term, old, new):
+    if term == old:
+        return new
+    if isinstance(term, FunctionTerm):
+        args = tuple(replace_term(arg, old, new) for arg in term.args)
+        return term if args == term.args else FunctionTerm(term.name, args)
+    return term
+
+
+def replace_in_atom(atom: Expr, old, new) -> Expr:
+    if isinstance(atom, PredicateExpr):
+        return PredicateExpr(atom.name, [replace_term(term, old, new) for term in atom.terms])
+    if isinstance(atom, IdentityExpr):
+        return IdentityExpr(replace_term(atom.left, old, new), replace_term(atom.right, old, new), atom.negated)
+    return atom
+
+
+class Tableau:
+    """
+    A semantic tableau (a "first-order logic tree") for a set of formulas.
+
+    Branches are expanded depth-first. The literals of the current branch are kept
+    in two hashed sets, positive and negative, so each new literal closes the branch
+    or not in O(1). Backtracking out of a branch undoes the changes it made to those
+    sets through a trail, and the formulas still to be expanded are persistent linked
+    lists, so a split never copies the branch above it.
+
+    Non-branching rules are applied first, then ∃ (with a new name), then branching
+    rules, and ∀ last, instantiated with the ground terms on the branch. A formula
+    that is already on the branch is not added again, which stops the rules from
+    looping on the same instances. Each ∀ formula is instantiated with at most
+    max_instances terms, terms deeper than max_term_depth are not used, and the
+    whole tableau is bounded by max_nodes. Identity is handled by closing on t ≠ t
+    and by substituting the terms of every equation on the branch into its literals.
+
+    A branch that cannot be extended further is read as a model: its terms are the
+    objects, with equated terms merged, and its positive literals the extensions.
+    The model is evaluated against the formulas, and the branch counts as open only
+    if it satisfies them; otherwise, which can only happen once a limit cut the
+    branch short, the result is UNKNOWN.
+    """
+
+    def __init__(
+        self,
+        formulas: Iterable[Expr],
+        max_instances: int = 16,
+        max_term_depth: int = 2,
+        max_nodes: int = 10_000,
+        keep_tree: bool = False,
+    ):
+        self.formulas = list(formulas)
+        for formula in self.formulas:
+            check_supported(formula)
+        self.max_instances = max_instances
+        self.max_term_depth = max_term_depth
+        self.max_nodes = max_nodes
+        self.keep_tree = keep_tree
+
+        self.predicates: Dict[str, int] = {}
+        self.functions: Dict[str, int] = {}
+        self.letters = set()
+        self.constants = set()
+        self.has_identity = False
+        for formula in self.formulas:
+            self.constants |= collect_free_terms(formula)
+            stack = [formula]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, PredicateExpr):
+                    self.predicates[node.name] = len(node.terms)
+                    self._collect_functions(node.terms)
+                elif isinstance(node, SentenceLetterExpr):
+                    self.letters.add(node.letter)
+                elif isinstance(node, IdentityExpr):
+                    self.has_identity = True
+                    self._collect_functions([node.left, node.right])
+                stack.extend(iter_children(node))
+        self.fresh_names = (f"c{i}" for i in count(1) if f"c{i}" not in self.constants)
+
+        # State of the current branch, undone on backtracking through the trail
+        self.positive = set()
+        self.negative = set()
+        self.seen = set()
+        self.terms: List[Any] = []
+        self.term_set = set()
+        self.literals: List[Tuple[Expr, bool]] = []
+        self.equations: List[Tuple[Any, Any]] = []
+        self.trail: List[Tuple[Any, Any]] = []
+
+        self.root: Optional[TableauNode] = None
+        self.n_nodes = 0
+        self.model: Optional[Interpretation] = None
+
+    # Trail
+
+    def _add_to_set(self, container: set, item):
+        container.add(item)
+        self.trail.append((container, item))
+
+    def _append(self, container: list, item):
+        container.append(item)
+        self.trail.append((container, None))
+
+    def _undo(self, mark: int):
+        while len(self.trail) > mark:
+            container, item = self.trail.pop()
+            if isinstance(container, set):
+                container.discard(item)
+            else:
+                container.pop()
+
+    # Branch
+
+    def _add_term(self, term):
+        for subterm in subterms(term):
+            if subterm not in self.term_set and term_depth(subterm) <= self.max_term_depth:
+                self._add_to_set(self.term_set, subterm)
+                self._append(self.terms, subterm)
+
+    def _fresh_constant(self) -> str:
+        name = next(self.fresh_names)
+        self._add_term(name)
+        return name
+
+    def _add(self, formula: Expr, leaf: Optional[TableauNode], agenda: tuple, rule: str = "", source: Optional[int] = None):
+        """
+        Put a formula on the branch below leaf. Returns the new leaf, the new agenda
+        and whether the branch closed.
+        """
+        key = structural_key(formula)
+        if key in self.seen:
+            return leaf, agenda, False
+        self._add_to_set(self.seen, key)
+
+        self.n_nodes += 1
+        node = TableauNode(formula, leaf, self.n_nodes, rule, source)
+        if leaf is None:
+            self.root = node
+        elif self.keep_tree:
+            leaf.children.append(node)
+
+        kind, _, parts = rule_of(formula)
+        pending, deltas, betas, gammas = agenda
+        if kind == LITERAL:
+            atom, positive = parts
+            closed, derived = self._add_literal(atom, positive)
+            if closed:
+                node.status = CLOSED
+                return node, agenda, True
+            for literal in derived:
+                pending = ((literal, "=", node.number), pending)
+        elif kind == ALPHA:
+            for component in reversed(parts):
+                pending = ((component, rule_of(formula)[1], node.number), pending)
+        elif kind == BETA:
+            betas = (node, betas)
+        elif kind == DELTA:
+            deltas = (node, deltas)
+        else:
+            gammas = ((node, 0), gammas)
+        return node, (pending, deltas, betas, gammas), False
+
+    @staticmethod
+    def _literal_key(atom: Expr, positive: bool) -> Tuple[Optional[tuple], bool]:
+        """The key of a literal in the positive or negative set, None for t = t and t ≠ t."""
+        if isinstance(atom, IdentityExpr):
+            positive = positive != atom.negated
+            if atom.left == atom.right:
+                return None, positive
+            return ("=",) + tuple(sorted((atom.left, atom.right), key=str)), positive
+        if isinstance(atom, SentenceLetterExpr):
+            return (atom.letter,), positive
+        return (atom.name, tuple(atom.terms)), positive
+
+    def _closes(self, formula: Expr) -> bool:
+        """Whether a formula is a literal that contradicts the branch."""
+        kind, _, parts = rule_of(formula)
+        if kind != LITERAL:
+            return False
+        key, positive = self._literal_key(*parts)
+        if key is None:
+            return not positive
+        return key in (self.negative if positive else self.positive)
+
+    def _select_beta(self, betas):
+        """
+        The branching formula to expand next and the rest of the list. A formula with
+        a component already on the branch is dropped, since every branch below would
+        repeat the current one, and a formula whose components all but one close the
+        branch at once is preferred, since it does not really split.
+        """
+        skipped = []
+        chosen = None
+        rest = betas
+        while rest is not None:
+            node, rest = rest
+            components = rule_of(node.formula)[2]
+            if any(structural_key(component) in self.seen for component in components):
+                continue
+            if sum(not self._closes(component) for component in components) <= 1:
+                chosen = node
+                break
+            skipped.append(node)
+        if chosen is None:
+            if not skipped:
+                return None, None
+            chosen, skipped = skipped[0], skipped[1:]
+        for node in reversed(skipped):
+            rest = (node, rest)
+        return chosen, rest
+
+    def _add_literal(self, atom: Expr, positive: bool) -> Tuple[bool, List[Expr]]:
+        """Record a literal, returning whether it closes the branch and the literals it yields by identity."""
+        key, positive = self._literal_key(atom, positive)
+        if key is None:
+            return not positive, []
+        if key in (self.negative if positive else self.positive):
+            return True, []
+        self._add_to_set(self.positive if positive else self.negative, key)
+        for term in getattr(atom, "terms", ()):
+            self._add_term(term)
+        if not self.has_identity or isinstance(atom, SentenceLetterExpr):
+            return False, []
+        if isinstance(atom, IdentityExpr) and atom.negated:
+            # positive is now the polarity of the equation, so rewrite and store the equation itself
+            atom = IdentityExpr(atom.left, atom.right)
+
+        derived = []
+        equations = list(self.equations)
+        if isinstance(atom, IdentityExpr) and positive:
+            for literal, literal_positive in self.literals:
+                derived.extend(self._rewrite(literal, literal_positive, atom.left, atom.right))
+            self._append(self.equations, (atom.left, atom.right))
+        for left, right in equations:
+            derived.extend(self._rewrite(atom, positive, left, right))
+        self._append(self.literals, (atom, positive))
+        return False, derived
+
+    def _rewrite(self, atom: Expr, positive: bool, left, right) -> List[Expr]:
+        rewritten = []
+        for old, new in ((left, right), (right, left)):
+            literal = replace_in_atom(atom, old, new)
+            if literal is atom or structural_key(literal) == structural_key(atom):
+                continue
+            if max(map(term_depth, literal.terms), default=0) > self.max_term_depth:
+                continue
+            rewritten.append(literal if positive else NotExpr(literal))
+        return rewritten
+
+    # Expansion
+
+    def _expand(self, leaf: TableauNode, agenda: tuple) -> Optional[bool]:
+        """
+        Expand the branch ending at leaf. Returns True if every branch below it closed,
+        False if one yields a model and None if a limit was reached first.
+
+        The search is depth-first without recursion: the branching rules being
+        expanded on the current branch are kept on a stack, each with the leaf and
+        agenda it splits, its components still to try, the result of those already
+        tried and the trail mark to backtrack to, so deep tableaux do not exhaust the
+        Python stack.
+        """
+        splits = []
+        outcome = self._extend(leaf, agenda)
+        while True:
+            if isinstance(outcome, tuple):
+                leaf, agenda, rule, source, components = outcome
+                splits.append([leaf, agenda, rule, source, iter(components), True, len(self.trail)])
+            else:
+                if not splits:
+                    return outcome
+                split = splits[-1]
+                self._undo(split[6])
+                if outcome is False:
+                    return False
+                if outcome is None:
+                    split[5] = None
+
+            leaf, agenda, rule, source, components, result, _ = splits[-1]
+            component = next(components, None)
+            if component is None:
+                splits.pop()
+                outcome = result
+                continue
+            child, child_agenda, closed = self._add(component, leaf, agenda, rule, source)
+            # A component that is already on the branch is expanded from the same leaf
+            outcome = True if closed else self._extend(child, child_agenda)
+
+    def _extend(self, leaf: TableauNode, agenda: tuple):
+        """
+        Apply the rules on the branch ending at leaf until it closes (True), yields a
+        model (False) or reaches a limit (None), or until a branching rule is chosen,
+        which is returned as (leaf, agenda, rule, source, components) for _expand.
+        """
+        while True:
+            if self.n_nodes >= self.max_nodes:
+                leaf.status = UNKNOWN
+                return None
+            pending, deltas, betas, gammas = agenda
+
+            if pending is not None:
+                (formula, rule, source), pending = pending
+                leaf, agenda, closed = self._add(formula, leaf, (pending, deltas, betas, gammas), rule, source)
+                if closed:
+                    return True
+
+            elif deltas is not None:
+                node, deltas = deltas
+                _, rule, (variable, body) = rule_of(node.formula)
+                instance = substitute(body, variable, self._fresh_constant())
+                leaf, agenda, closed = self._add(instance, leaf, (pending, deltas, betas, gammas), rule, node.number)
+                if closed:
+                    return True
+
+            elif betas is not None:
+                node, betas = self._select_beta(betas)
+                if node is None:
+                    agenda = (pending, deltas, None, gammas)
+                    continue
+                _, rule, components = rule_of(node.formula)
+                return leaf, (pending, deltas, betas, gammas), rule, node.number, components
+
+            elif gammas is not None:
+                leaf, agenda, closed, progressed = self._instantiate(leaf, agenda)
+                if closed:
+                    return True
+                if not progressed:
+                    return self._open(leaf)
+
+            else:
+                return self._open(leaf)
+
+    def _instantiate(self, leaf: TableauNode, agenda: tuple):
+        """One round of ∀ instantiation with the terms the branch has gained since the last."""
+        pending, deltas, betas, gammas = agenda
+        if not self.terms:
+            self._fresh_constant()
+        entries = []
+        while gammas is not None:
+            entries.append(gammas[0])
+            gammas = gammas[1]
+
+        progressed = False
+        # ∀ formulas among the instances are collected here and go after the others
+        added = None
+        updated = []
+        for node, used in reversed(entries):
+            _, rule, (variable, body) = rule_of(node.formula)
+            stop = min(len(self.terms), self.max_instances)
+            for term in self.terms[used:stop]:
+                instance = substitute(body, variable, term)
+                leaf, (pending, deltas, betas, added), closed = self._add(instance, leaf, (pending, deltas, betas, added), rule, node.number)
+                if closed:
+                    return leaf, agenda, True, True
+            progressed = progressed or stop > used
+            updated.append((node, stop))
+
+        gammas = added
+        for entry in reversed(updated):
+            gammas = (entry, gammas)
+        return leaf, (pending, deltas, betas, gammas), False, progressed
+
+    def _collect_functions(self, terms):
+        for term in terms:
+            for subterm in subterms(term):
+                if isinstance(subterm, FunctionTerm):
+                    self.functions[subterm.name] = len(subterm.args)
+
+    def _open(self, leaf: TableauNode) -> Optional[bool]:
+        model = self.branch_model()
+        try:
+            satisfied = all(evaluate(formula, model) for formula in self.formulas)
+        except (ValueError, KeyError) as e:
+            logger.debug(f"The model of an open branch could not be evaluated: {e}")
+            satisfied = False
+        if satisfied:
+            leaf.status = OPEN
+            self.model = model
+            return False
+        leaf.status = UNKNOWN
+        return None
+
+    def branch_model(self) -> Interpretation:
+        """
+        The interpretation read off the current branch. Every function symbol of the
+        formulas is total: the values the branch does not fix, including those on
+        terms cut off by max_term_depth, are the first object of the domain.
+        """
+        classes = UnionFind()
+        for term in self.terms:
+            classes.add(term)
+        for key in self.positive:
+            if key[0] == "=":
+                classes.union(key[1], key[2])
+
+        model = Interpretation()
+        objects = {term: str(classes.find(term)) for term in classes}
+        model.set_domain(InternedDomain(objects.values()))
+        default = next(iter(objects.values()), None)
+        for name, arity in self.functions.items():
+            model.add_function(Function(name, arity, compute=lambda *args, default=default: default))
+        for term, obj in objects.items():
+            if isinstance(term, FunctionTerm):
+                if all(arg in objects for arg in term.args):
+                    model.functions[term.name][tuple(objects[arg] for arg in term.args)] = obj
+            else:
+                model.extend(Constant(term), obj)
+
+        for name, arity in self.predicates.items():
+            model.add_predicate(Predicate(name, arity))
+        for letter in self.letters:
+            model.add_truth_value(letter, (letter,) in self.positive)
+        for key in self.positive:
+            if key[0] in self.predicates and len(key) == 2:
+                name, terms = key
+                if all(term in objects for term in terms):
+                    model.predicates[name].extend(tuple(objects[term] for term in terms))
+        return model
+
+    def run(self) -> TableauResult:
+        agenda = (None, None, None, None)
+        leaf = None
+        for term in sorted(self.constants):
+            self._add_term(term)
+        for formula in self.formulas:
+            leaf, agenda, closed = self._add(formula, leaf, agenda)
+            if closed:
+                return TableauResult(CLOSED, self.root, None, self.n_nodes)
+
+        if leaf is None:
+            msg = "A tableau needs at least one formula."
+            raise ValueError(msg)
+        closed = self._expand(leaf, agenda)
+        status = CLOSED if closed else OPEN if closed is False else UNKNOWN
+        logger.debug(f"Tableau for {', '.join(map(str, self.formulas))} is {status} after {self.n_nodes} nodes")
+        return TableauResult(status, self.root, self.model, self.n_nodes)
+
+
+def satisfiable(formulas: Iterable[Expr], **kwargs) -> TableauResult:
+    """A tableau for formulas: OPEN, with a model, if they are satisfiable."""
+    return Tableau(formulas, **kwargs).run()
+
+
+def prove(conclusion: Expr, premises: Iterable[Expr] = (), **kwargs) -> TableauResult:
+    """
+    A tableau for the premises and the negated conclusion: CLOSED if the conclusion
+    follows from the premises (is valid, without premises), OPEN with a counter-model
+    if it does not.
+    """
+    return Tableau(list(premises) + [NotExpr(conclusion)], **kwargs).run()
@@ -0,0 +1,29 @@
+from graphviz import Digraph
+
+from proof_theory.tableau import CLOSED, OPEN, TableauNode
+
+
+LEAF_MARKS = {CLOSED: "×", OPEN: "○"}
+
+
+def visualize_tableau(root: TableauNode, graph=None):
+    """
+    Draw a tableau built with keep_tree=True as a tree of numbered formulas, with
+    closed branches ending in × and the open branch that gave the model in ○.
+    """
+    if graph is None:
+        graph = Digraph()
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        graph.node(str(id(node)), str(node), shape="plaintext")
+        if node.parent is not None:
+            graph.edge(str(id(node.parent)), str(id(node)), arrowhead="none")
+        if node.status is not None:
+            mark = f"{id(node)}-{node.status}"
+            graph.node(mark, LEAF_MARKS.get(node.status, "…"), shape="plaintext")
+            graph.edge(str(id(node)), mark, arrowhead="none")
+        stack.extend(reversed(node.children))
+
+    return graph
@@ -0,0 +1,406 @@
+import sys
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from syntax.ast_utils import iter_children
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    Expr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    SentenceLetterExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+FALSE = 0
+TRUE = 1
+
+# Level of the terminals, below every variable
+TERMINAL_LEVEL = sys.maxsize
+
+# Slots of the apply cache, a power of two
+CACHE_SIZE = 1 << 16
+
+CONNECTIVES = (NotExpr, AndExpr, OrExpr, ImpliesExpr)
+
+ORDERING_HEURISTICS = ("occurrence", "frequency", "alphabetical")
+
+
+def atom_name(node: Expr) -> str:
+    """The BDD variable of an atom of the propositional skeleton of a formula."""
+    if isinstance(node, SentenceLetterExpr):
+        return node.letter
+    if isinstance(node, PredicateExpr) and not node.terms:
+        return node.name
+    # Quantified subformulas, identities and atoms with terms are opaque
+    return str(node)
+
+
+def skeleton_atoms(ast: Expr) -> List[str]:
+    """The atoms of the propositional skeleton of a formula, each occurrence in order."""
+    atoms = []
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CONNECTIVES):
+            stack.extend(reversed(list(iter_children(node))))
+        else:
+            atoms.append(atom_name(node))
+    return atoms
+
+
+def variable_order(asts: Iterable[Expr], heuristic: str = "occurrence") -> List[str]:
+    """
+    A static variable order for the skeletons of some formulas. occurrence orders
+    atoms by their first occurrence from left to right, which keeps atoms that appear
+    in the same subformula close together; frequency puts the atoms that occur most
+    often first; alphabetical sorts them by name.
+    """
+    occurrences = [atom for ast in asts for atom in skeleton_atoms(ast)]
+    first = list(dict.fromkeys(occurrences))
+    if heuristic == "occurrence":
+        return first
+    if heuristic == "frequency":
+        counts = Counter(occurrences)
+        return sorted(first, key=lambda atom: -counts[atom])
+    if heuristic == "alphabetical":
+        return sorted(first)
+    msg = f"Unknown variable ordering heuristic {heuristic}, expected one of {', '.join(ORDERING_HEURISTICS)}."
+    raise ValueError(msg)
+
+
+class BDD:
+    """
+    A reduced ordered binary decision diagram manager for the propositional
+    skeletons of formulas.
+
+    Nodes are integers indexing three parallel lists holding their level, low child
+    and high child; 0 and 1 are the terminals. The unique table maps (level, low,
+    high) to the node, so every Boolean function has exactly one node once the order
+    is fixed: two formulas are equivalent iff their nodes are equal, and a formula is
+    a tautology iff its node is 1. Every connective is computed by if-then-else,
+    whose results are kept in a fixed-size cache where a new entry evicts the one in
+    its slot.
+
+    Node ids are only stable until the variables are reordered or garbage is
+    collected. Formulas added with add are kept as named roots, which are carried
+    over to the new node ids; with auto_reorder, sifting runs after add whenever the
+    node table has doubled since the last reordering.
+    """
+
+    def __init__(
+        self,
+        variables: Iterable[str] = (),
+        cache_size: int = CACHE_SIZE,
+        auto_reorder: bool = False,
+        max_growth: float = 1.2,
+    ):
+        if cache_size <= 0 or cache_size & (cache_size - 1):
+            msg = f"The apply cache size must be a power of two, got {cache_size}."
+            raise ValueError(msg)
+        self.cache_size = cache_size
+        self.auto_reorder = auto_reorder
+        self.max_growth = max_growth
+        self.order: List[str] = []
+        self.level: Dict[str, int] = {}
+        self.roots: Dict[Hashable, int] = {}
+        self._reset_tables()
+        self.reorder_at = 1024
+        for name in variables:
+            self.var(name)
+
+    def _reset_tables(self):
+        self._level: List[int] = [TERMINAL_LEVEL, TERMINAL_LEVEL]
+        self._low: List[int] = [FALSE, TRUE]
+        self._high: List[int] = [FALSE, TRUE]
+        self.unique: Dict[Tuple[int, int, int], int] = {}
+        self.cache: List[Optional[Tuple[int, int, int, int]]] = [None] * self.cache_size
+        self.cache_hits = self.cache_misses = self.cache_evictions = 0
+
+    def __len__(self):
+        return len(self._level)
+
+    # Construction
+
+    def var(self, name: str) -> int:
+        """The node of a variable, added below the existing ones if it is new."""
+        if name not in self.level:
+            self.level[name] = len(self.order)
+            self.order.append(name)
+        return self.make(self.level[name], FALSE, TRUE)
+
+    def make(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self._level)
+            self._level.append(level)
+            self._low.append(low)
+            self._high.append(high)
+            self.unique[key] = node
+        return node
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        """If f then g else h."""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+
+        slot = hash((f, g, h)) & (self.cache_size - 1)
+        entry = self.cache[slot]
+        if entry is not None and entry[0] == f and entry[1] == g and entry[2] == h:
+            self.cache_hits += 1
+            return entry[3]
+        self.cache_misses += 1
+
+        top = min(self._level[f], self._level[g], self._level[h])
+        f0, f1 = self._cofactors(f, top)
+        g0, g1 = self._cofactors(g, top)
+        h0, h1 = self._cofactors(h, top)
+        result = self.make(top, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+
+        if entry is not None:
+            self.cache_evictions += 1
+        self.cache[slot] = (f, g, h, result)
+        return result
+
+    def _cofactors(self, node: int, level: int) -> Tuple[int, int]:
+        if self._level[node] == level:
+            return self._low[node], self._high[node]
+        return node, node
+
+    def negate(self, u: int) -> int:
+        return self.ite(u, FALSE, TRUE)
+
+    def conjoin(self, u: int, v: int) -> int:
+        return self.ite(u, v, FALSE)
+
+    def disjoin(self, u: int, v: int) -> int:
+        return self.ite(u, TRUE, v)
+
+    def implies(self, u: int, v: int) -> int:
+        return self.ite(u, v, TRUE)
+
+    def iff(self, u: int, v: int) -> int:
+        return self.ite(u, v, self.negate(v))
+
+    def compile(self, ast: Expr) -> int:
+        """The node of the propositional skeleton of a formula."""
+        if isinstance(ast, NotExpr):
+            return self.negate(self.compile(ast.expr))
+        if isinstance(ast, AndExpr):
+            u = TRUE
+            for operand in ast.operands:
+                u = self.conjoin(u, self.compile(operand))
+                if u == FALSE:
+                    break
+            return u
+        if isinstance(ast, OrExpr):
+            u = FALSE
+            for operand in ast.operands:
+                u = self.disjoin(u, self.compile(operand))
+                if u == TRUE:
+                    break
+            return u
+        if isinstance(ast, ImpliesExpr):
+            return self.implies(self.compile(ast.left), self.compile(ast.right))
+        return self.var(atom_name(ast))
+
+    def add(self, ast: Expr, name: Optional[Hashable] = None) -> int:
+        """Compile a formula and keep it as a root under name, by default the formula itself."""
+        name = str(ast) if name is None else name
+        self.roots[name] = self.compile(ast)
+        if self.auto_reorder and len(self) > self.reorder_at:
+            self.sift()
+            self.reorder_at = 2 * len(self)
+        return self.roots[name]
+
+    @classmethod
+    def of(cls, asts: Iterable[Expr], heuristic: str = "occurrence", **kwargs) -> "BDD":
+        """A manager with the formulas added as roots, variables ordered by a heuristic."""
+        asts = list(asts)
+        bdd = cls(variable_order(asts, heuristic), **kwargs)
+        for ast in asts:
+            bdd.add(ast)
+        return bdd
+
+    # Queries
+
+    def equivalent(self, u: int, v: int) -> bool:
+        return u == v
+
+    def is_tautology(self, u: int) -> bool:
+        return u == TRUE
+
+    def is_contradiction(self, u: int) -> bool:
+        return u == FALSE
+
+    def count_models(self, u: int, n_variables: Optional[int] = None) -> int:
+        """
+        The number of assignments to the first n_variables variables (by default all of
+        them) that satisfy u, in time linear in the size of u. The variables of u must
+        be among them.
+        """
+        n = len(self.order) if n_variables is None else n_variables
+        counts = {FALSE: 0, TRUE: 1}
+
+        def level(node):
+            return n if node <= TRUE else self._level[node]
+
+        stack = [u]
+        while stack:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            low, high = self._low[node], self._high[node]
+            pending = [child for child in (low, high) if child not in counts]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            here = level(node)
+            counts[node] = (counts[low] << (level(low) - here - 1)) + (counts[high] << (level(high) - here - 1))
+        return counts[u] << level(u)
+
+    def satisfying_assignment(self, u: int) -> Optional[Dict[str, bool]]:
+        """An assignment to the variables on one path from u to 1, None if u is unsatisfiable."""
+        if u == FALSE:
+            return None
+        assignment = {}
+        while u > TRUE:
+            name = self.order[self._level[u]]
+            if self._high[u] != FALSE:
+                assignment[name], u = True, self._high[u]
+            else:
+                assignment[name], u = False, self._low[u]
+        return assignment
+
+    def support(self, u: int) -> List[str]:
+        return [self.order[level] for level in sorted({self._level[node] for node in self.nodes(u)})]
+
+    def nodes(self, u: int) -> List[int]:
+        """The internal nodes reachable from u."""
+        seen = set()
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node <= TRUE or node in seen:
+                continue
+            seen.add(node)
+            stack.extend((self._low[node], self._high[node]))
+        return list(seen)
+
+    def size(self, roots: Optional[Iterable[int]] = None) -> int:
+        """The number of internal nodes reachable from roots, by default the named roots."""
+        roots = self.roots.values() if roots is None else roots
+        return len({node for root in roots for node in self.nodes(root)})
+
+    def memory(self) -> Dict[str, int]:
+        """The size of the node table, unique table and apply cache, to size them."""
+        table_bytes = sum(sys.getsizeof(column) for column in (self._level, self._low, self._high))
+        unique_bytes = sys.getsizeof(self.unique) + sum(sys.getsizeof(key) for key in self.unique)
+        cache_entries = sum(entry is not None for entry in self.cache)
+        cache_bytes = sys.getsizeof(self.cache) + cache_entries * sys.getsizeof((0, 0, 0, 0))
+        return {
+            "variables": len(self.order),
+            "nodes": len(self),
+            "live_nodes": self.size(),
+            "node_table_bytes": table_bytes,
+            "unique_table_bytes": unique_bytes,
+            "cache_slots": self.cache_size,
+            "cache_entries": cache_entries,
+            "cache_bytes": cache_bytes,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_evictions": self.cache_evictions,
+            "total_bytes": table_bytes + unique_bytes + cache_bytes,
+        }
+
+    # Reordering
+
+    def reorder(self, order: List[str]):
+        """
+        Rebuild the named roots under a new variable order. Nodes not reachable from a
+        named root are dropped, so this also collects garbage.
+        """
+        if sorted(order) != sorted(self.order):
+            msg = "A variable order must be a permutation of the variables of the BDD."
+            raise ValueError(msg)
+        target = self._rebuilt(order)
+        if order != self.order:
+            # Building under a new order leaves intermediate nodes behind, which a
+            # second copy under the same order does not
+            target = target._rebuilt(order)
+        self.order, self.level = target.order, target.level
+        self._level, self._low, self._high = target._level, target._low, target._high
+        self.unique, self.cache = target.unique, target.cache
+        self.roots = target.roots
+        self.cache_hits = self.cache_misses = self.cache_evictions = 0
+        return self
+
+    def collect_garbage(self):
+        return self.reorder(list(self.order))
+
+    def _rebuilt(self, order: List[str]) -> "BDD":
+        target = BDD(order, self.cache_size)
+        mapping = {FALSE: FALSE, TRUE: TRUE}
+        for name, root in self.roots.items():
+            target.roots[name] = self._transfer(root, target, mapping)
+        return target
+
+    def _transfer(self, u: int, target: "BDD", mapping: Dict[int, int]) -> int:
+        if u not in mapping:
+            low = self._transfer(self._low[u], target, mapping)
+            high = self._transfer(self._high[u], target, mapping)
+            mapping[u] = target.ite(target.var(self.order[self._level[u]]), high, low)
+        return mapping[u]
+
+    def _size_under(self, order: List[str]) -> int:
+        target = BDD(order, self.cache_size)
+        mapping = {FALSE: FALSE, TRUE: TRUE}
+        roots = [self._transfer(root, target, mapping) for root in self.roots.values()]
+        return target.size(roots)
+
+    def sift(self):
+        """
+        Rudell's sifting over the named roots: each variable, the ones labelling the
+        most nodes first, is tried at every position with the others fixed and left
+        where the roots are smallest. A direction is abandoned once the size exceeds
+        max_growth times the best size so far. Each trial rebuilds the roots, so this
+        is meant for occasional use between operations.
+        """
+        order = list(self.order)
+        best = self.size()
+        initial = best
+        counts = Counter(self._level[node] for root in self.roots.values() for node in self.nodes(root))
+        for name in sorted(order, key=lambda name: -counts[self.level[name]]):
+            start = order.index(name)
+            rest = order[:start] + order[start + 1:]
+            best_position = start
+            for positions in (range(start - 1, -1, -1), range(start + 1, len(order))):
+                for position in positions:
+                    size = self._size_under(rest[:position] + [name] + rest[position:])
+                    if size < best:
+                        best, best_position = size, position
+                    elif size > self.max_growth * best:
+                        break
+            order = rest[:best_position] + [name] + rest[best_position:]
+        self.reorder(order)
+        logger.debug(f"Sifting reduced the BDD from {initial} to {best} nodes")
+        return self
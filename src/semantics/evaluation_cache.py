@@ -0,0 +1,277 @@
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_utils import formula_digest
+from syntax.first_order_logic_syntax import Expr
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS results (formula TEXT NOT NULL, model TEXT NOT NULL, value INTEGER NOT NULL, "
+    "used REAL NOT NULL, PRIMARY KEY (formula, model)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS results_used ON results (used)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+COUNTERS = ("memory_hits", "disk_hits", "misses", "writes", "evictions", "bypassed")
+
+
+class EvaluationCache:
+    """
+    A persistent cache of truth values, stored in an SQLite database file so that it
+    survives the process and is shared by every process that opens the same file.
+    A result is keyed by the formula digest of the formula, which ignores the names of
+    bound variables and the order of conjuncts and disjuncts, and the content digest
+    of the interpretation, so it is found again for an equal model built from scratch.
+
+    Once attached to an interpretation, evaluate consults the cache for every formula
+    it is asked for and stores the values it computes; subformulas are evaluated as
+    usual. Interpretations whose content cannot be hashed, because a predicate or
+    function is given by a callable or the domain is not stored, bypass the cache.
+
+    Recent results are also kept in memory. Writes are batched into transactions of
+    batch_size results. The database runs in WAL mode, so readers never block the
+    writer. Each process opens its own connection, including after a fork, and waits
+    up to timeout seconds for a lock. Once the number of results exceeds max_entries,
+    the least recently used are deleted until a tenth of the room is free again.
+
+    The hits, misses, writes and evictions are counted for this cache object and,
+    summed over every process, in the database itself; see stats.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_entries: int = 1_000_000,
+        memory_entries: int = 10_000,
+        batch_size: int = 1,
+        evict_every: int = 1000,
+        timeout: float = 30.0,
+    ):
+        if max_entries < 1:
+            msg = f"An evaluation cache must be able to hold at least one result, not {max_entries}."
+            raise ValueError(msg)
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.batch_size = batch_size
+        self.evict_every = evict_every
+        self.timeout = timeout
+        self.memory: OrderedDict = OrderedDict()
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self._unsaved: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        # Results to insert and hits whose time of use is to be updated, until the next flush
+        self._pending: List[Tuple[str, str, bool]] = []
+        self._touched: List[Tuple[str, str]] = []
+        self._since_eviction = 0
+        self._active = set()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_connection=None, _pid=None, memory=OrderedDict(), _pending=[], _touched=[], _active=set())
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            # A connection must not be shared with a forked child, which opens its own
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+            self._pid = os.getpid()
+        return self._connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self.connection
+        # Take the write lock up front, so that concurrent writers wait instead of deadlocking
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _count(self, counter: str, n: int = 1):
+        self.counters[counter] += n
+        self._unsaved[counter] += n
+
+    # Lookups
+
+    def get(self, formula: str, model: str) -> Optional[bool]:
+        """The cached value for a formula digest and a model digest, or None."""
+        key = (formula, model)
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+            self._count("memory_hits")
+            return value
+        row = self.connection.execute(
+            "SELECT value FROM results WHERE formula = ? AND model = ?", key
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        value = bool(row[0])
+        self._remember(key, value)
+        self._touched.append(key)
+        self._count("disk_hits")
+        if len(self._touched) >= self.batch_size:
+            self.flush()
+        return value
+
+    def put(self, formula: str, model: str, value: bool):
+        self._remember((formula, model), value)
+        self._pending.append((formula, model, value))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _remember(self, key: Tuple[str, str], value: bool):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def flush(self):
+        """Write the pending results, times of use and counters to the database."""
+        if not self._pending and not self._touched and not any(self._unsaved.values()):
+            return
+        now = time.time()
+        pending, touched = self._pending, self._touched
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO results (formula, model, value, used) VALUES (?, ?, ?, ?)",
+                [(formula, model, int(value), now) for formula, model, value in pending],
+            )
+            connection.executemany(
+                "UPDATE results SET used = ? WHERE formula = ? AND model = ?",
+                [(now, formula, model) for formula, model in touched],
+            )
+            self._unsaved["writes"] += len(pending)
+            connection.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                [(name, n) for name, n in self._unsaved.items() if n],
+            )
+        self.counters["writes"] += len(pending)
+        self._unsaved = dict.fromkeys(COUNTERS, 0)
+        self._pending, self._touched = [], []
+        self._since_eviction += len(pending)
+        if self._since_eviction >= self.evict_every:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete the least recently used results beyond max_entries, returning how many were deleted."""
+        self._since_eviction = 0
+        with self._transaction() as connection:
+            (entries,) = connection.execute("SELECT COUNT(*) FROM results").fetchone()
+            if entries <= self.max_entries:
+                return 0
+            # Make room for a tenth of the capacity, so that evictions are not run on every flush
+            keep = self.max_entries - self.max_entries // 10
+            (threshold,) = connection.execute(
+                "SELECT used FROM results ORDER BY used DESC LIMIT 1 OFFSET ?", (keep,)
+            ).fetchone()
+            deleted = connection.execute("DELETE FROM results WHERE used <= ?", (threshold,)).rowcount
+            connection.execute(
+                "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                (deleted,),
+            )
+        self.counters["evictions"] += deleted
+        logger.debug(f"Evicted {deleted} of {entries} cached results from {self.path}")
+        return deleted
+
+    # Evaluation
+
+    def attach(self, target: Union[Interpretation, Model]) -> Union[Interpretation, Model]:
+        """Make evaluate consult the cache for the interpretation (of the model)."""
+        interpretation = target.I if isinstance(target, Model) else target
+        interpretation.result_cache = self
+        return target
+
+    def evaluating(self, interpretation: Interpretation) -> bool:
+        """Whether a formula is being evaluated in the interpretation through the cache."""
+        return id(interpretation) in self._active
+
+    def evaluate(self, node: Expr, interpretation: Interpretation, evaluate: Callable) -> bool:
+        """The truth value of a formula in the interpretation, from the cache if it was computed before."""
+        model = interpretation.content_digest()
+        formula = formula_digest(node) if model is not None else None
+        if model is None:
+            self._count("bypassed")
+        else:
+            value = self.get(formula, model)
+            if value is not None:
+                return value
+
+        self._active.add(id(interpretation))
+        try:
+            value = bool(evaluate(node, interpretation))
+        finally:
+            self._active.discard(id(interpretation))
+        if model is not None:
+            self.put(formula, model, value)
+        return value
+
+    # Maintenance
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        The counters of this cache object, the same counters summed over every process
+        as total_<counter>, the number of stored results and the size of the file.
+        """
+        self.flush()
+        connection = self.connection
+        stats: Dict[str, Union[int, float]] = dict(self.counters)
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        stats["hit_rate"] = (lookups - self.counters["misses"]) / lookups if lookups else 0.0
+        totals = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+        for name in COUNTERS:
+            stats[f"total_{name}"] = totals.get(name, 0)
+        stats["entries"] = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        (page_count,) = connection.execute("PRAGMA page_count").fetchone()
+        (page_size,) = connection.execute("PRAGMA page_size").fetchone()
+        stats["size_bytes"] = page_count * page_size
+        return stats
+
+    def clear(self):
+        """Delete every stored result and reset the counters."""
+        self._pending, self._touched = [], []
+        self.memory.clear()
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM results")
+            connection.execute("DELETE FROM counters")
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._unsaved = dict.fromkeys(COUNTERS, 0)
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            self.flush()
+            self._connection.close()
+        self._connection = None
+        self._pid = None
@@ -0,0 +1,452 @@
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from modal_logic.fingerprint import fingerprint
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.grounding import UNKNOWN, CNFGrounding
+from semantics.model_finder import Signature, build_model
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import structural_key
+from syntax.first_order_logic_syntax import AndExpr, Expr, NotExpr, OrExpr, Parser
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+EQUIVALENT, NOT_EQUIVALENT, ERROR = "equivalent", "not equivalent", "error"
+
+# Submissions graded in the calling process rather than handed to workers
+PARALLEL_THRESHOLD = 64
+
+
+class ModelSpec:
+    """
+    A finite structure over the objects 0, ..., n - 1 in compact, picklable form: the
+    values of the constants and function cells and the true atoms, (letter,) for a
+    sentence letter and (predicate, args) for a predicate. It is built into a Model
+    only where it is evaluated.
+    """
+
+    __slots__ = ("n", "constants", "functions", "cells")
+
+    def __init__(self, n: int, constants: Dict[str, int], functions: Dict[tuple, int], cells: Iterable[tuple]):
+        self.n = n
+        self.constants = tuple(sorted(constants.items()))
+        self.functions = tuple(sorted(functions.items()))
+        self.cells = frozenset(cells)
+
+    @property
+    def key(self) -> tuple:
+        return self.n, self.constants, self.functions, tuple(sorted(self.cells, key=repr))
+
+    def flipped(self, cell: tuple) -> "ModelSpec":
+        """The same structure with the truth value of one atom changed."""
+        return ModelSpec(self.n, dict(self.constants), dict(self.functions), self.cells ^ {cell})
+
+    def build(self, signature: Signature, name: str = "M") -> Model:
+        """The Model of the spec; symbols of signature it does not mention denote the first object."""
+        constants = {constant: 0 for constant in signature.constants}
+        constants.update((constant, obj) for constant, obj in self.constants if constant in constants)
+        functions = {
+            (function, args): 0
+            for function, arity in signature.functions.items()
+            for args in product(range(self.n), repeat=arity)
+        }
+        functions.update((cell, obj) for cell, obj in self.functions if cell in functions)
+        cells = [
+            cell
+            for cell in self.cells
+            if (cell[0] in signature.letters if len(cell) == 1 else cell[0] in signature.predicates)
+        ]
+        return build_model(signature, self.n, constants, functions, cells, name)
+
+    def to_json(self) -> dict:
+        return {
+            "n": self.n,
+            "constants": dict(self.constants),
+            "functions": [[name, list(args), obj] for (name, args), obj in self.functions],
+            "cells": [[cell[0]] if len(cell) == 1 else [cell[0], list(cell[1])] for cell in self.cells],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ModelSpec":
+        functions = {(name, tuple(args)): obj for name, args, obj in data["functions"]}
+        cells = [(cell[0],) if len(cell) == 1 else (cell[0], tuple(cell[1])) for cell in data["cells"]]
+        return cls(data["n"], data["constants"], functions, cells)
+
+
+def atom_cells(signature: Signature, n: int) -> List[tuple]:
+    cells: List[tuple] = [(letter,) for letter in signature.letters]
+    for predicate, arity in sorted(signature.predicates.items()):
+        cells.extend((predicate, args) for args in product(range(n), repeat=arity))
+    return cells
+
+
+def function_cells(signature: Signature, n: int) -> List[tuple]:
+    return [
+        (function, args)
+        for function, arity in sorted(signature.functions.items())
+        for args in product(range(n), repeat=arity)
+    ]
+
+
+def counter_model_spec(
+    reference: Expr, submission: Expr, max_size: int, time_budget: Optional[float]
+) -> Optional[ModelSpec]:
+    """The smallest structure (within the budget) on which the two formulas differ."""
+    difference = OrExpr(AndExpr(reference, NotExpr(submission)), AndExpr(NotExpr(reference), submission))
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    for n in range(1, max_size + 1):
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            return None
+        grounding = CNFGrounding([difference], n)
+        if grounding.solve(remaining) is not None:
+            return ModelSpec(n, *grounding.assignment())
+        if grounding.status == UNKNOWN:
+            return None
+    return None
+
+
+class ModelSuite:
+    """
+    Small models that tell a reference formula apart from formulas that are not
+    equivalent to it, together with the truth value of the reference in each.
+
+    The suite is made of every structure over one, two, ... objects while there are
+    at most max_exhaustive of them, random structures of up to max_size objects with
+    sparse, even and dense extensions, and adversarial structures. Those are models
+    and counter-models of the reference of every size found through SAT, and
+    structures one atom away from another member on which the reference changes its
+    value, which catch submissions that get the role of a single atom wrong. Equal
+    structures are kept once and the smallest are tried first, so counter-models are
+    as small as possible. Of isomorphic structures only the first is kept.
+    """
+
+    def __init__(self, reference: Expr, specs: Iterable[ModelSpec] = ()):
+        self.reference = reference
+        self.signature = Signature([reference])
+        self.specs: List[ModelSpec] = []
+        self.values: List[bool] = []
+        self._keys = set()
+        self._fingerprints = set()
+        self.add(specs)
+
+    @property
+    def key(self) -> str:
+        return suite_key(self.reference)
+
+    @property
+    def digest(self) -> str:
+        """A hash of the reference and the structures of the suite, in order, which changes as the suite grows."""
+        content = (structural_key(self.reference), [spec.key for spec in self.specs])
+        return hashlib.sha256(repr(content).encode()).hexdigest()
+
+    def __len__(self):
+        return len(self.specs)
+
+    def add(self, specs: Iterable[ModelSpec]) -> int:
+        """Add the structures not yet in the suite, returning how many were new."""
+        added = 0
+        for spec in specs:
+            key = spec.key
+            if key in self._keys:
+                continue
+            self._keys.add(key)
+            model = spec.build(self.signature)
+            # Isomorphic structures give every formula over the signature the same value
+            canonical = fingerprint(model)
+            if canonical in self._fingerprints:
+                continue
+            self._fingerprints.add(canonical)
+            self.specs.append(spec)
+            self.values.append(evaluate(self.reference, model.I))
+            added += 1
+        return added
+
+    @classmethod
+    def generate(
+        cls,
+        reference: Expr,
+        max_size: int = 3,
+        max_exhaustive: int = 1024,
+        n_random: int = 100,
+        max_adversarial: int = 200,
+        seed: int = 0,
+    ) -> "ModelSuite":
+        suite = cls(reference)
+        rng = random.Random(seed)
+        signature = suite.signature
+
+        for n in range(1, max_size + 1):
+            cells = atom_cells(signature, n)
+            terms = [(constant,) for constant in signature.constants] + function_cells(signature, n)
+            if 2 ** len(cells) * n ** len(terms) > max_exhaustive:
+                break
+            for values in product(range(n), repeat=len(terms)):
+                constants = {term[0]: obj for term, obj in zip(terms, values) if len(term) == 1}
+                functions = {term: obj for term, obj in zip(terms, values) if len(term) == 2}
+                for bits in product((False, True), repeat=len(cells)):
+                    suite.add([ModelSpec(n, constants, functions, (cell for cell, bit in zip(cells, bits) if bit))])
+
+        for n in range(1, max_size + 1):
+            for formula in (reference, NotExpr(reference)):
+                grounding = CNFGrounding([formula], n)
+                if grounding.solve() is not None:
+                    suite.add([ModelSpec(n, *grounding.assignment())])
+
+        for i in range(n_random):
+            n = rng.randint(1, max_size)
+            density = (0.25, 0.5, 0.75)[i % 3]
+            constants = {constant: rng.randrange(n) for constant in signature.constants}
+            functions = {cell: rng.randrange(n) for cell in function_cells(signature, n)}
+            cells = [cell for cell in atom_cells(signature, n) if rng.random() < density]
+            suite.add([ModelSpec(n, constants, functions, cells)])
+
+        adversarial = 0
+        for spec, value in list(zip(suite.specs, suite.values)):
+            for cell in atom_cells(signature, spec.n):
+                if adversarial >= max_adversarial:
+                    break
+                flipped = spec.flipped(cell)
+                if evaluate(reference, flipped.build(signature).I) != value:
+                    adversarial += suite.add([flipped])
+
+        suite.specs, suite.values = map(list, zip(*sorted(zip(suite.specs, suite.values), key=lambda pair: pair[0].n)))
+        logger.debug(f"Generated a suite of {len(suite)} models for {reference}")
+        return suite
+
+    def to_json(self) -> dict:
+        return {"specs": [spec.to_json() for spec in self.specs]}
+
+
+def suite_key(reference: Expr) -> str:
+    return hashlib.sha256(repr(structural_key(reference)).encode()).hexdigest()
+
+
+class GradeResult:
+    """
+    The grade of one submission: EQUIVALENT if it agrees with the reference on every
+    model of the suite and no counter-model was found within the search bounds,
+    NOT_EQUIVALENT with a counter-model and the values of both formulas in it, or
+    ERROR if it could not be parsed or evaluated.
+    """
+
+    def __init__(
+        self,
+        submission: Union[str, Expr],
+        status: str,
+        formula: Optional[Expr] = None,
+        counter_model: Optional[Model] = None,
+        reference_value: Optional[bool] = None,
+        error: Optional[str] = None,
+    ):
+        self.submission = submission
+        self.status = status
+        self.formula = formula
+        self.counter_model = counter_model
+        self.reference_value = reference_value
+        self.error = error
+
+    @property
+    def equivalent(self) -> bool:
+        return self.status == EQUIVALENT
+
+    def __str__(self):
+        if self.status == NOT_EQUIVALENT:
+            n = len(self.counter_model.D)
+            return (
+                f"{self.formula}: {self.status}, the reference is {self.reference_value} but the submission "
+                f"{not self.reference_value} in a model of {n} object{'s' if n != 1 else ''}"
+            )
+        if self.status == ERROR:
+            return f"{self.submission}: {self.error}"
+        return f"{self.formula}: {self.status}"
+
+
+# Models built by each worker process, per suite digest, for the most recent suites
+_worker_models: Dict[str, List[Model]] = {}
+WORKER_SUITES = 8
+
+
+def _grade_chunk(
+    digest: str,
+    reference: Expr,
+    specs: Sequence[ModelSpec],
+    values: Sequence[bool],
+    chunk: Sequence[Tuple[int, Expr]],
+    search_size: int,
+    search_time: Optional[float],
+) -> List[Tuple[int, Optional[int], Optional[ModelSpec], Optional[str]]]:
+    """
+    For each submission in chunk: the first suite model on which it differs from the
+    reference, otherwise a counter-model found by search, or an error message.
+    """
+    signature = Signature([reference])
+    models = _worker_models.get(digest)
+    if models is None:
+        if len(_worker_models) >= WORKER_SUITES:
+            _worker_models.pop(next(iter(_worker_models)))
+        models = _worker_models[digest] = [spec.build(signature) for spec in specs]
+    graded = []
+    for index, formula in chunk:
+        try:
+            combined = Signature([reference, formula])
+            own_models = models
+            if (
+                combined.predicates != signature.predicates
+                or combined.functions != signature.functions
+                or combined.constants != signature.constants
+                or combined.letters != signature.letters
+            ):
+                own_models = [spec.build(combined) for spec in specs]
+            differing = next(
+                (i for i, model in enumerate(own_models) if evaluate(formula, model.I) != values[i]), None
+            )
+            found = None
+            if differing is None and search_size > 0:
+                found = counter_model_spec(reference, formula, search_size, search_time)
+            graded.append((index, differing, found, None))
+        except (ValueError, TypeError, KeyError) as error:
+            graded.append((index, None, None, f"{type(error).__name__}: {error}"))
+    return graded
+
+
+class Grader:
+    """
+    Grades submissions against reference formulas. Each reference gets a ModelSuite,
+    generated once and cached in memory and, with a cache_dir, on disk as JSON, so
+    regrading only evaluates. Counter-models found by search are added to the suite,
+    which makes it more discriminating with every submission graded.
+
+    Submissions are evaluated on the suite by a pool of worker processes, each of
+    which builds the models of a suite once per digest, so a suite that grew is
+    built again; the suite travels to the workers in its compact form. With few submissions, or workers=1, they are graded in process.
+    search_size and search_time bound the SAT search for a counter-model of the
+    submissions the suite does not separate from the reference.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 3,
+        n_random: int = 100,
+        seed: int = 0,
+        workers: Optional[int] = None,
+        search_size: int = 4,
+        search_time: Optional[float] = 1.0,
+        cache_dir: Optional[Union[str, Path]] = None,
+    ):
+        self.max_size = max_size
+        self.n_random = n_random
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.search_size = search_size
+        self.search_time = search_time
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.suites: Dict[str, ModelSuite] = {}
+        self._parser_model = Model("M").with_interpretation_function(Interpretation())
+
+    def parse(self, formula: Union[str, Expr]) -> Expr:
+        return Parser(formula, self._parser_model).parse() if isinstance(formula, str) else formula
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{key}-{self.max_size}-{self.n_random}-{self.seed}.json"
+
+    def suite(self, reference: Union[str, Expr]) -> ModelSuite:
+        """The suite of a reference formula, from the cache if it was generated before."""
+        reference = self.parse(reference)
+        key = suite_key(reference)
+        suite = self.suites.get(key)
+        if suite is not None:
+            return suite
+        path = self._cache_path(key)
+        if path is not None and path.exists():
+            with open(path, "r") as file:
+                specs = [ModelSpec.from_json(data) for data in json.load(file)["specs"]]
+            suite = ModelSuite(reference, specs)
+        else:
+            suite = ModelSuite.generate(reference, self.max_size, n_random=self.n_random, seed=self.seed)
+            self._save(suite)
+        self.suites[key] = suite
+        return suite
+
+    def _save(self, suite: ModelSuite):
+        path = self._cache_path(suite.key)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(suite.to_json(), file)
+
+    def grade(self, reference: Union[str, Expr], submissions: Iterable[Union[str, Expr]]) -> List[GradeResult]:
+        """The grade of every submission, in order."""
+        suite = self.suite(reference)
+        submissions = list(submissions)
+        results: List[Optional[GradeResult]] = [None] * len(submissions)
+        pending: List[Tuple[int, Expr]] = []
+        for index, submission in enumerate(submissions):
+            try:
+                pending.append((index, self.parse(submission)))
+            # The parser reports some malformed input only by failing on a missing token
+            except (ValueError, TypeError, AttributeError, IndexError) as error:
+                results[index] = GradeResult(submission, ERROR, error=f"{type(error).__name__}: {error}")
+
+        arguments = (suite.digest, suite.reference, suite.specs, suite.values)
+        search = (self.search_size, self.search_time)
+        if self.workers > 1 and len(pending) >= PARALLEL_THRESHOLD:
+            size = max(1, len(pending) // (4 * self.workers))
+            chunks = [pending[i : i + size] for i in range(0, len(pending), size)]
+            with ProcessPoolExecutor(self.workers) as pool:
+                futures = [pool.submit(_grade_chunk, *arguments, chunk, *search) for chunk in chunks]
+                graded = [item for future in futures for item in future.result()]
+        else:
+            graded = _grade_chunk(*arguments, pending, *search)
+
+        formulas = dict(pending)
+        found_specs = []
+        for index, differing, found, error in graded:
+            formula = formulas[index]
+            if error is not None:
+                results[index] = GradeResult(submissions[index], ERROR, formula, error=error)
+            elif differing is not None:
+                results[index] = self._counter_result(submissions[index], formula, suite.specs[differing], suite)
+            elif found is not None:
+                found_specs.append(found)
+                results[index] = self._counter_result(submissions[index], formula, found, suite)
+            else:
+                results[index] = GradeResult(submissions[index], EQUIVALENT, formula)
+
+        if found_specs:
+            # Only structures over the reference's own symbols can be reused for other submissions
+            own = [spec for spec in found_specs if all(self._in_signature(cell, suite.signature) for cell in spec.cells)]
+            if suite.add(own):
+                self._save(suite)
+        return results
+
+    @staticmethod
+    def _in_signature(cell: tuple, signature: Signature) -> bool:
+        return cell[0] in signature.letters if len(cell) == 1 else cell[0] in signature.predicates
+
+    @staticmethod
+    def _counter_result(submission, formula: Expr, spec: ModelSpec, suite: ModelSuite) -> GradeResult:
+        model = spec.build(Signature([suite.reference, formula]), "Counter-model")
+        reference_value = evaluate(suite.reference, model.I)
+        return GradeResult(submission, NOT_EQUIVALENT, formula, model, reference_value)
+
+
+def grade(reference: Union[str, Expr], submissions: Iterable[Union[str, Expr]], **kwargs) -> List[GradeResult]:
+    """Grade submissions against a reference formula with a new Grader."""
+    return Grader(**kwargs).grade(reference, submissions)
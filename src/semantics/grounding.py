@@ -0,0 +1,398 @@
+import time
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from interpretation_function.function_term import FunctionTerm
+from modal_logic.model import Model
+from semantics.model_finder import Signature, build_model
+from semantics.sat_solver import SATSolver
+from syntax.ast_utils import collect_free_terms
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    Expr,
+    IdentityExpr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+# A literal of the CNF, or a constant that was folded away
+Literal = Union[int, bool]
+
+# Polarities of a subformula: only ever true, only ever false, or both
+POSITIVE, NEGATIVE, BOTH = 1, -1, 0
+
+SAT, UNSAT, UNKNOWN = "sat", "unsat", "unknown"
+
+
+def negate(literal: Literal) -> Literal:
+    return not literal if isinstance(literal, bool) else -literal
+
+
+class CNFGrounding:
+    """
+    The formulas grounded over a domain of n objects as propositional clauses, solved
+    by the built-in SATSolver and decoded back into a Model.
+
+    Every ground atom is interned as one variable, and so is every pair of a constant
+    (or function cell) and the object it might denote, with exactly one such pair true.
+    Constants are also ordered by the least number heuristic: the first denotes the
+    first object and each further one at most one object past those already named.
+    Subformulas get Tseitin variables, shared between equal instances, and only the
+    implications their polarity needs. Instances whose value is already known are
+    folded away instead.
+
+    With lazy, the instances of top-level universal formulas are not generated up
+    front. Once the solver finds a model of the clauses so far, the instances it
+    violates are added and the solver runs again, until the model satisfies every
+    instance or the clauses become unsatisfiable.
+    """
+
+    def __init__(self, formulas: Iterable[Expr], n: int, lazy: bool = True, symmetry_breaking: bool = True):
+        self.formulas = list(formulas)
+        self.n = n
+        self.lazy = lazy
+        self.signature = Signature(self.formulas)
+        self.solver = SATSolver()
+        self.clauses: List[List[int]] = []
+        self.status: Optional[str] = None
+
+        self.atoms: Dict[tuple, int] = {}
+        self.constant_vars: Dict[Tuple[str, int], int] = {}
+        self.function_vars: Dict[Tuple[tuple, int], int] = {}
+        self._gates: Dict[Tuple[int, ...], int] = {}
+        self._directions: Dict[int, set] = {}
+        self._memo: Dict[tuple, Literal] = {}
+        self._free: Dict[int, Tuple[str, ...]] = {}
+        # Top-level ∀ formulas whose instances are added on demand, and the instances added
+        self.schemas: List[Tuple[Tuple[str, ...], Expr, Dict[str, int]]] = []
+        self._instantiated: set = set()
+
+        self._encode_terms(symmetry_breaking)
+        for formula in self.formulas:
+            self._assert(formula, {})
+
+    # Clauses and variables
+
+    def add_clause(self, clause: List[int]):
+        self.clauses.append(clause)
+        self.solver.add_clause(clause)
+
+    def new_var(self) -> int:
+        return self.solver.new_var()
+
+    def atom(self, cell: tuple) -> int:
+        variable = self.atoms.get(cell)
+        if variable is None:
+            variable = self.atoms[cell] = self.new_var()
+        return variable
+
+    def _exactly_one(self, variables: List[int]):
+        self.add_clause(list(variables))
+        for i, a in enumerate(variables):
+            for b in variables[i + 1:]:
+                self.add_clause([-a, -b])
+
+    def _encode_terms(self, symmetry_breaking: bool):
+        constants = self.signature.constants
+        for constant in constants:
+            variables = [self.new_var() for _ in range(self.n)]
+            for obj, variable in enumerate(variables):
+                self.constant_vars[(constant, obj)] = variable
+            self._exactly_one(variables)
+        if symmetry_breaking:
+            for i, constant in enumerate(constants):
+                for obj in range(1, self.n):
+                    # The i-th constant only names object obj if an earlier one names obj - 1
+                    earlier = [self.constant_vars[(other, obj - 1)] for other in constants[:i]]
+                    self.add_clause([-self.constant_vars[(constant, obj)]] + earlier)
+
+        for name, arity in self.signature.functions.items():
+            for args in product(range(self.n), repeat=arity):
+                variables = [self.new_var() for _ in range(self.n)]
+                for obj, variable in enumerate(variables):
+                    self.function_vars[((name, args), obj)] = variable
+                self._exactly_one(variables)
+
+    # Tseitin encoding
+
+    def conjoin(self, literals: Iterable[Literal], polarity: int) -> Literal:
+        """A literal equivalent to the conjunction of literals where polarity requires it."""
+        inputs = set()
+        for literal in literals:
+            if literal is False:
+                return False
+            if literal is not True:
+                if -literal in inputs:
+                    return False
+                inputs.add(literal)
+        if not inputs:
+            return True
+        if len(inputs) == 1:
+            return next(iter(inputs))
+        key = tuple(sorted(inputs))
+        gate = self._gates.get(key)
+        if gate is None:
+            gate = self._gates[key] = self.new_var()
+            self._directions[gate] = set()
+        directions = self._directions[gate]
+        if polarity != NEGATIVE and POSITIVE not in directions:
+            directions.add(POSITIVE)
+            for literal in key:
+                self.add_clause([-gate, literal])
+        if polarity != POSITIVE and NEGATIVE not in directions:
+            directions.add(NEGATIVE)
+            self.add_clause([gate] + [-literal for literal in key])
+        return gate
+
+    def disjoin(self, literals: Iterable[Literal], polarity: int) -> Literal:
+        return negate(self.conjoin((negate(literal) for literal in literals), -polarity))
+
+    def at_least(self, literals: List[Literal], k: int) -> Literal:
+        """A literal that is true iff at least k of literals are, by a sequential counter."""
+        if k <= 0:
+            return True
+        counts: List[Literal] = [True] + [False] * k
+        for literal in literals:
+            for j in range(k, 0, -1):
+                counts[j] = self.disjoin([counts[j], self.conjoin([counts[j - 1], literal], BOTH)], BOTH)
+        return counts[k]
+
+    def _free_variables(self, node: Expr) -> Tuple[str, ...]:
+        free = self._free.get(id(node))
+        if free is None:
+            free = self._free[id(node)] = tuple(sorted(collect_free_terms(node)))
+        return free
+
+    def encode(self, node: Expr, env: Dict[str, int], polarity: int = POSITIVE) -> Literal:
+        key = (id(node), polarity) + tuple(env.get(name) for name in self._free_variables(node))
+        literal = self._memo.get(key)
+        if literal is None:
+            literal = self._memo[key] = self._encode(node, env, polarity)
+        return literal
+
+    def _encode(self, node: Expr, env: Dict[str, int], polarity: int) -> Literal:
+        if isinstance(node, PredicateExpr):
+            return self._encode_atom(node, env, polarity)
+        if isinstance(node, SentenceLetterExpr):
+            return self.atom((node.letter,))
+        if isinstance(node, IdentityExpr):
+            equal = self.disjoin(
+                [
+                    self.conjoin([self.term_literal(node.left, env, obj), self.term_literal(node.right, env, obj)], BOTH)
+                    for obj in range(self.n)
+                ],
+                BOTH,
+            )
+            return negate(equal) if node.negated else equal
+        if isinstance(node, NotExpr):
+            return negate(self.encode(node.expr, env, -polarity))
+        if isinstance(node, AndExpr):
+            return self.conjoin([self.encode(operand, env, polarity) for operand in node.operands], polarity)
+        if isinstance(node, OrExpr):
+            return self.disjoin([self.encode(operand, env, polarity) for operand in node.operands], polarity)
+        if isinstance(node, ImpliesExpr):
+            return self.disjoin([negate(self.encode(node.left, env, -polarity)), self.encode(node.right, env, polarity)], polarity)
+        if isinstance(node, QuantifierBlockExpr):
+            return self.encode(node.nested(), env, polarity)
+        if isinstance(node, QuantifierExpr):
+            instances = [self.encode(node.expr, {**env, node.variable: obj}, polarity) for obj in range(self.n)]
+            if node.quantifier == "∀":
+                return self.conjoin(instances, polarity)
+            return self.disjoin(instances, polarity)
+        if isinstance(node, CountingQuantifierExpr):
+            instances = [self.encode(node.expr, {**env, node.variable: obj}, BOTH) for obj in range(self.n)]
+            low, high, negated = node.interval
+            literal = self.at_least(instances, low)
+            if high is not None:
+                literal = self.conjoin([literal, negate(self.at_least(instances, high + 1))], BOTH)
+            return negate(literal) if negated else literal
+        raise ValueError(f"Unknown node type: {type(node)}")
+
+    def resolve(self, term, env: Dict[str, int]) -> Optional[int]:
+        """The object a term denotes if it does not depend on the solver."""
+        if isinstance(term, FunctionTerm):
+            return 0 if self.n == 1 else None
+        if term in env:
+            return env[term]
+        return 0 if self.n == 1 else None
+
+    def term_literal(self, term, env: Dict[str, int], obj: int) -> Literal:
+        """A literal that is true iff term denotes obj."""
+        fixed = self.resolve(term, env)
+        if fixed is not None:
+            return fixed == obj
+        if not isinstance(term, FunctionTerm):
+            return self.constant_vars[(term, obj)]
+        key = (term, obj) + tuple(env.get(symbol) for symbol in term.symbols)
+        literal = self._memo.get(key)
+        if literal is None:
+            cases = []
+            for args in product(range(self.n), repeat=len(term.args)):
+                conditions = [self.term_literal(arg, env, value) for arg, value in zip(term.args, args)]
+                cases.append(self.conjoin(conditions + [self.function_vars[((term.name, args), obj)]], BOTH))
+            literal = self._memo[key] = self.disjoin(cases, BOTH)
+        return literal
+
+    def _encode_atom(self, node: PredicateExpr, env: Dict[str, int], polarity: int) -> Literal:
+        fixed = [self.resolve(term, env) for term in node.terms]
+        if all(obj is not None for obj in fixed):
+            return self.atom((node.name, tuple(fixed)))
+        open_positions = [i for i, obj in enumerate(fixed) if obj is None]
+        cases = []
+        for values in product(range(self.n), repeat=len(open_positions)):
+            args = list(fixed)
+            for position, value in zip(open_positions, values):
+                args[position] = value
+            conditions = [self.term_literal(node.terms[i], env, value) for i, value in zip(open_positions, values)]
+            cases.append(self.conjoin(conditions + [self.atom((node.name, tuple(args)))], polarity))
+        return self.disjoin(cases, polarity)
+
+    # Top level
+
+    def _assert(self, node: Expr, env: Dict[str, int]):
+        """Add clauses that make node true, splitting conjunctions and universal formulas."""
+        if isinstance(node, AndExpr):
+            for operand in node.operands:
+                self._assert(operand, env)
+            return
+        if isinstance(node, QuantifierBlockExpr) and node.quantifier == "∀":
+            node = node.nested()
+        if isinstance(node, QuantifierExpr) and node.quantifier == "∀":
+            variables = []
+            while isinstance(node, (QuantifierExpr, QuantifierBlockExpr)) and node.quantifier == "∀":
+                if isinstance(node, QuantifierBlockExpr):
+                    node = node.nested()
+                variables.append(node.variable)
+                node = node.expr
+            if self.lazy:
+                self.schemas.append((tuple(variables), node, env))
+            else:
+                for objects in product(range(self.n), repeat=len(variables)):
+                    self._assert(node, {**env, **dict(zip(variables, objects))})
+            return
+        literal = self.encode(node, env, POSITIVE)
+        if literal is False:
+            self.add_clause([])
+        elif literal is not True:
+            self.add_clause([literal])
+
+    def _refine(self) -> int:
+        """Add the instances of the lazy schemas that the current model violates."""
+        added = 0
+        values = self._decode_terms()
+        for index, (variables, body, env) in enumerate(list(self.schemas)):
+            for objects in product(range(self.n), repeat=len(variables)):
+                if (index, objects) in self._instantiated:
+                    continue
+                instance_env = {**env, **dict(zip(variables, objects))}
+                if not self.holds(body, instance_env, values):
+                    self._instantiated.add((index, objects))
+                    self._assert(body, instance_env)
+                    added += 1
+        return added
+
+    # Decoding
+
+    def _decode_terms(self):
+        constants = {constant: obj for (constant, obj), variable in self.constant_vars.items() if self.solver.value(variable)}
+        functions = {cell: obj for (cell, obj), variable in self.function_vars.items() if self.solver.value(variable)}
+        return constants, functions
+
+    def _term_value(self, term, env: Dict[str, int], values) -> int:
+        constants, functions = values
+        if isinstance(term, FunctionTerm):
+            return functions[(term.name, tuple(self._term_value(arg, env, values) for arg in term.args))]
+        if term in env:
+            return env[term]
+        return constants[term]
+
+    def _true(self, variable: Optional[int]) -> bool:
+        # Atoms interned after the last solve are false in its model
+        return variable is not None and variable < len(self.solver.model) and self.solver.value(variable)
+
+    def holds(self, node: Expr, env: Dict[str, int], values) -> bool:
+        """Whether a formula is true in the current model of the solver."""
+        if isinstance(node, PredicateExpr):
+            return self._true(self.atoms.get((node.name, tuple(self._term_value(term, env, values) for term in node.terms))))
+        if isinstance(node, SentenceLetterExpr):
+            return self._true(self.atoms.get((node.letter,)))
+        if isinstance(node, IdentityExpr):
+            return (self._term_value(node.left, env, values) == self._term_value(node.right, env, values)) != node.negated
+        if isinstance(node, NotExpr):
+            return not self.holds(node.expr, env, values)
+        if isinstance(node, AndExpr):
+            return all(self.holds(operand, env, values) for operand in node.operands)
+        if isinstance(node, OrExpr):
+            return any(self.holds(operand, env, values) for operand in node.operands)
+        if isinstance(node, ImpliesExpr):
+            return not self.holds(node.left, env, values) or self.holds(node.right, env, values)
+        if isinstance(node, QuantifierBlockExpr):
+            return self.holds(node.nested(), env, values)
+        instances = (self.holds(node.expr, {**env, node.variable: obj}, values) for obj in range(self.n))
+        if isinstance(node, QuantifierExpr):
+            return all(instances) if node.quantifier == "∀" else any(instances)
+        return node.satisfied_by(sum(instances))
+
+    def solve(self, time_budget: Optional[float] = None, name: str = "M") -> Optional[Model]:
+        """A model of the formulas with n objects, or None. status tells unsat from out of time."""
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        rounds = 0
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            result = self.solver.solve(time_budget=remaining)
+            rounds += 1
+            if result is None:
+                self.status = UNKNOWN
+                return None
+            if not result:
+                self.status = UNSAT
+                return None
+            if not self.lazy or not self._refine():
+                break
+        self.status = SAT
+        logger.debug(
+            f"Grounded to {self.solver.n_vars} variables and {len(self.clauses)} clauses, solved in {rounds} rounds"
+        )
+        return build_model(self.signature, self.n, *self.assignment(), name)
+
+    def assignment(self) -> Tuple[Dict[str, int], Dict[tuple, int], List[tuple]]:
+        """The values of the constants and function cells and the true atoms in the last model."""
+        constants, functions = self._decode_terms()
+        true_cells = [cell for cell, variable in self.atoms.items() if self._true(variable)]
+        return constants, functions, true_cells
+
+    def dimacs(self) -> str:
+        """The clauses generated so far in DIMACS CNF format."""
+        lines = [f"p cnf {self.solver.n_vars} {len(self.clauses)}"]
+        lines.extend(" ".join(map(str, clause + [0])) for clause in self.clauses)
+        return "\n".join(lines)
+
+
+def find_model_sat(
+    formulas: Iterable[Expr], max_size: int = 8, lazy: bool = True, time_budget: Optional[float] = None
+) -> Optional[Model]:
+    """The first model of the formulas over 1, 2, ..., max_size objects found through SAT."""
+    formulas = list(formulas)
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    for n in range(1, max_size + 1):
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            return None
+        grounding = CNFGrounding(formulas, n, lazy)
+        model = grounding.solve(remaining)
+        if model is not None or grounding.status == UNKNOWN:
+            return model
+    return None
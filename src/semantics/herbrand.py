@@ -0,0 +1,111 @@
+from itertools import chain, product
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from interpretation_function.function_term import FunctionTerm
+from syntax.ast_utils import collect_free_terms, iter_children
+from syntax.first_order_logic_syntax import Expr, IdentityExpr, PredicateExpr
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+GroundTerm = Union[str, FunctionTerm]
+
+# Constant added to signatures without one, since the Herbrand universe is never empty
+DEFAULT_CONSTANT = "a"
+
+
+def herbrand_signature(ast: Expr, bound: Iterable[str] = ()) -> Tuple[List[str], Dict[str, int]]:
+    """
+    The constants and function symbols (with their arities) of a formula. Every free
+    term that is not in bound is taken to be a constant.
+    """
+    constants = sorted(collect_free_terms(ast) - set(bound))
+    functions: Dict[str, int] = {}
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (PredicateExpr, IdentityExpr)):
+            for term in node.terms:
+                if isinstance(term, FunctionTerm):
+                    for subterm in term.subterms():
+                        if functions.setdefault(subterm.name, len(subterm.args)) != len(subterm.args):
+                            msg = f"Function {subterm.name} is used with {functions[subterm.name]} and {len(subterm.args)} arguments."
+                            raise ValueError(msg)
+        stack.extend(iter_children(node))
+    return constants, functions
+
+
+class HerbrandUniverse:
+    """
+    The ground terms that can be built from a set of constants and function symbols,
+    enumerated level by level: the constants, then the terms of depth 1, and so on.
+
+    A term of depth d has at least one argument of depth d - 1, so level d is built
+    by choosing the first argument position that takes a term of the previous level;
+    the positions before it take older terms and the ones after it any term. Every
+    term is generated exactly once, without a set of seen terms. Enumeration is lazy
+    and stops at max_depth or once max_terms terms have been produced.
+    """
+
+    def __init__(
+        self,
+        constants: Iterable[str],
+        functions: Dict[str, int],
+        max_depth: int = 3,
+        max_terms: Optional[int] = 10_000,
+    ):
+        self.constants = list(dict.fromkeys(constants)) or [DEFAULT_CONSTANT]
+        self.functions = {name: arity for name, arity in functions.items() if arity > 0}
+        self.max_depth = max_depth
+        self.max_terms = max_terms
+
+    @classmethod
+    def of(cls, ast: Expr, max_depth: int = 3, max_terms: Optional[int] = 10_000) -> "HerbrandUniverse":
+        """The Herbrand universe of the signature of a formula."""
+        constants, functions = herbrand_signature(ast)
+        return cls(constants, functions, max_depth, max_terms)
+
+    def levels(self) -> Iterator[List[GroundTerm]]:
+        """The terms of each depth in turn, each level as a list."""
+        produced = 0
+        older: List[GroundTerm] = []
+        newest: List[GroundTerm] = list(self.constants)
+        for depth in range(self.max_depth + 1):
+            if self.max_terms is not None and produced + len(newest) > self.max_terms:
+                newest = newest[: self.max_terms - produced]
+            produced += len(newest)
+            yield newest
+            if not newest or depth == self.max_depth:
+                return
+            if self.max_terms is not None and produced >= self.max_terms:
+                return
+
+            every = older + newest
+            level = []
+            budget = None if self.max_terms is None else self.max_terms - produced
+            for term in self._next_level(older, newest, every):
+                if budget is not None and len(level) >= budget:
+                    break
+                level.append(term)
+            older, newest = every, level
+
+    def _next_level(self, older: List[GroundTerm], newest: List[GroundTerm], every: List[GroundTerm]) -> Iterator[FunctionTerm]:
+        for name, arity in self.functions.items():
+            for first_new in range(arity):
+                pools = [older] * first_new + [newest] + [every] * (arity - first_new - 1)
+                for args in product(*pools):
+                    yield FunctionTerm(name, args)
+
+    def __iter__(self) -> Iterator[GroundTerm]:
+        return chain.from_iterable(self.levels())
+
+    def terms(self) -> List[GroundTerm]:
+        terms = list(self)
+        logger.debug(
+            f"Enumerated {len(terms)} ground terms up to depth {self.max_depth} from {len(self.constants)} constants and {len(self.functions)} functions"
+        )
+        return terms
@@ -0,0 +1,444 @@
+import time
+from itertools import product
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from interpretation_function.constant import Constant
+from interpretation_function.function import Function
+from interpretation_function.function_term import FunctionTerm
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_utils import collect_free_terms, iter_children
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    Expr,
+    IdentityExpr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+# Literals are 2 * gate + negated; gate 0 is the constant true
+TRUE, FALSE = 0, 1
+
+
+def object_name(obj: int) -> str:
+    """Objects are searched as 0, ..., n - 1 and named "1", ..., "n" in the models found."""
+    return str(obj + 1)
+
+
+class TimeBudgetExceeded(Exception):
+    pass
+
+
+class Signature:
+    """The predicates, functions, constants and sentence letters of a set of formulas."""
+
+    def __init__(self, formulas: Iterable[Expr]):
+        self.predicates: Dict[str, int] = {}
+        self.functions: Dict[str, int] = {}
+        self.constants: List[str] = []
+        self.letters: List[str] = []
+        constants = set()
+        for formula in formulas:
+            constants |= collect_free_terms(formula)
+            stack = [formula]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, (QuantifierExpr, CountingQuantifierExpr)) and node.sort or isinstance(node, QuantifierBlockExpr) and any(node.sorts):
+                    msg = f"Sorted quantifiers such as {node} are not supported by the model finder."
+                    raise ValueError(msg)
+                if isinstance(node, PredicateExpr):
+                    self._declare(self.predicates, node.name, len(node.terms), "Predicate")
+                elif isinstance(node, SentenceLetterExpr) and node.letter not in self.letters:
+                    self.letters.append(node.letter)
+                if isinstance(node, (PredicateExpr, IdentityExpr)):
+                    for term in node.terms:
+                        if isinstance(term, FunctionTerm):
+                            for subterm in term.subterms():
+                                self._declare(self.functions, subterm.name, len(subterm.args), "Function")
+                stack.extend(iter_children(node))
+        self.constants = sorted(constants)
+
+    @staticmethod
+    def _declare(symbols: Dict[str, int], name: str, arity: int, kind: str):
+        if symbols.setdefault(name, arity) != arity:
+            msg = f"{kind} {name} is used with {symbols[name]} and {arity} arguments."
+            raise ValueError(msg)
+
+
+class Grounding:
+    """
+    The formulas instantiated over a domain of n objects under fixed values of the
+    constants and functions, as a circuit of threshold gates. A gate is true iff at
+    least k of its input literals are true, which covers ∧ (k = all inputs), ∨ and ∃
+    (k = 1), ∀ (k = n) and counting quantifiers alike. Equal gates are shared, and
+    inputs that are constant are folded into k.
+
+    Values are propagated incrementally in both directions. Setting a literal updates
+    every gate reading it, and a gate that must be true or false forces its undecided
+    inputs once k leaves no other choice. Every change is recorded on a trail so that
+    a search can undo a decision and everything it implied.
+    """
+
+    def __init__(self, formulas: List[Expr], n: int, constants: Dict[str, int], functions: Dict[Tuple[str, Tuple[int, ...]], int]):
+        self.n = n
+        self.constants = constants
+        self.functions = functions
+        self.inputs: List[Tuple[int, ...]] = [()]
+        self.threshold: List[int] = [0]
+        self.readers: List[List[int]] = [[]]
+        self.cell: List[Optional[tuple]] = [None]
+        self.gates: Dict[tuple, int] = {}
+        self.cells: Dict[tuple, int] = {}
+        self._memo: Dict[tuple, int] = {}
+        self._free: Dict[int, Tuple[str, ...]] = {}
+        self.roots = [self.ground(formula, {}) for formula in formulas]
+
+        self.value: List[Optional[bool]] = [True] + [None] * (len(self.inputs) - 1)
+        self.trail: List[int] = []
+        self.queue: List[int] = []
+
+    # Construction
+
+    def _gate(self, literals: Iterable[int], k: int) -> int:
+        """The literal of a gate that is true iff at least k of literals are."""
+        inputs = []
+        for literal in literals:
+            if literal == TRUE:
+                k -= 1
+            elif literal != FALSE:
+                inputs.append(literal)
+        if k <= 0:
+            return TRUE
+        if k > len(inputs):
+            return FALSE
+        if len(inputs) == 1:
+            return inputs[0]
+        inputs = tuple(sorted(inputs))
+        key = (inputs, k)
+        gate = self.gates.get(key)
+        if gate is None:
+            gate = self._new(inputs, k, None)
+            self.gates[key] = gate
+            for literal in inputs:
+                self.readers[literal >> 1].append(gate)
+        return 2 * gate
+
+    def _new(self, inputs: Tuple[int, ...], k: int, cell: Optional[tuple]) -> int:
+        self.inputs.append(inputs)
+        self.threshold.append(k)
+        self.readers.append([])
+        self.cell.append(cell)
+        return len(self.inputs) - 1
+
+    def atom(self, cell: tuple) -> int:
+        gate = self.cells.get(cell)
+        if gate is None:
+            gate = self._new((), 0, cell)
+            self.cells[cell] = gate
+        return 2 * gate
+
+    def term_value(self, term, env: Dict[str, int]) -> int:
+        if isinstance(term, FunctionTerm):
+            args = tuple(self.term_value(arg, env) for arg in term.args)
+            return self.functions[(term.name, args)]
+        if term in env:
+            return env[term]
+        return self.constants[term]
+
+    def _free_variables(self, node: Expr) -> Tuple[str, ...]:
+        free = self._free.get(id(node))
+        if free is None:
+            free = tuple(sorted(collect_free_terms(node)))
+            self._free[id(node)] = free
+        return free
+
+    def ground(self, node: Expr, env: Dict[str, int]) -> int:
+        key = (id(node),) + tuple(env.get(name) for name in self._free_variables(node))
+        literal = self._memo.get(key)
+        if literal is None:
+            literal = self._ground(node, env)
+            self._memo[key] = literal
+        return literal
+
+    def _ground(self, node: Expr, env: Dict[str, int]) -> int:
+        if isinstance(node, PredicateExpr):
+            return self.atom((node.name, tuple(self.term_value(term, env) for term in node.terms)))
+        if isinstance(node, SentenceLetterExpr):
+            return self.atom((node.letter,))
+        if isinstance(node, IdentityExpr):
+            equal = self.term_value(node.left, env) == self.term_value(node.right, env)
+            return TRUE if equal != node.negated else FALSE
+        if isinstance(node, NotExpr):
+            return self.ground(node.expr, env) ^ 1
+        if isinstance(node, AndExpr):
+            return self._gate([self.ground(operand, env) for operand in node.operands], len(node.operands))
+        if isinstance(node, OrExpr):
+            return self._gate([self.ground(operand, env) for operand in node.operands], 1)
+        if isinstance(node, ImpliesExpr):
+            return self._gate([self.ground(node.left, env) ^ 1, self.ground(node.right, env)], 1)
+        if isinstance(node, QuantifierBlockExpr):
+            return self.ground(node.nested(), env)
+        if isinstance(node, (QuantifierExpr, CountingQuantifierExpr)):
+            instances = [self.ground(node.expr, {**env, node.variable: obj}) for obj in range(self.n)]
+            if isinstance(node, QuantifierExpr):
+                return self._gate(instances, self.n if node.quantifier == "∀" else 1)
+            low, high, negated = node.interval
+            literal = self._gate(instances, low)
+            if high is not None:
+                literal = self._gate([literal, self._gate(instances, high + 1) ^ 1], 2)
+            return literal ^ negated
+        raise ValueError(f"Unknown node type: {type(node)}")
+
+    # Propagation
+
+    def literal_value(self, literal: int) -> Optional[bool]:
+        value = self.value[literal >> 1]
+        return None if value is None else value != bool(literal & 1)
+
+    def assign(self, literal: int) -> bool:
+        """Make a literal true and propagate. Returns False on a conflict."""
+        if not self._set(literal):
+            return False
+        while self.queue:
+            gate = self.queue.pop()
+            if not self._check(gate):
+                self.queue.clear()
+                return False
+            for reader in self.readers[gate]:
+                if not self._check(reader):
+                    self.queue.clear()
+                    return False
+        return True
+
+    def _set(self, literal: int) -> bool:
+        gate, value = literal >> 1, not literal & 1
+        if self.value[gate] is not None:
+            return self.value[gate] == value
+        self.value[gate] = value
+        self.trail.append(gate)
+        self.queue.append(gate)
+        return True
+
+    def _check(self, gate: int) -> bool:
+        inputs = self.inputs[gate]
+        if not inputs:
+            return True
+        k = self.threshold[gate]
+        n_true = n_false = 0
+        for literal in inputs:
+            value = self.literal_value(literal)
+            if value is True:
+                n_true += 1
+            elif value is False:
+                n_false += 1
+        undecided = len(inputs) - n_true - n_false
+        if n_true >= k:
+            if not self._set(2 * gate):
+                return False
+        elif n_true + undecided < k:
+            if not self._set(2 * gate + 1):
+                return False
+
+        value = self.value[gate]
+        if value is True and n_true + undecided == k and undecided:
+            # Every undecided input is needed to reach k
+            return all(self._set(literal) for literal in inputs if self.literal_value(literal) is None)
+        if value is False and n_true == k - 1 and undecided:
+            # Any further true input would reach k
+            return all(self._set(literal ^ 1) for literal in inputs if self.literal_value(literal) is None)
+        return True
+
+    def undo(self, mark: int):
+        while len(self.trail) > mark:
+            self.value[self.trail.pop()] = None
+
+
+class ModelFinder:
+    """
+    Searches domains of 1, 2, ..., max_size objects for a model of a set of formulas,
+    in the style of MACE.
+
+    The values of constants and functions are enumerated first, with the least
+    number heuristic: objects not mentioned so far are interchangeable, so a new
+    value only ever goes to the lowest unmentioned object. For each of these the
+    formulas are grounded (see Grounding) and the predicate extensions and sentence
+    letters are searched depth-first, deciding one atom at a time and propagating
+    its consequences, so a partial model is abandoned as soon as it falsifies a
+    formula. Objects that no constant or function mentions remain interchangeable,
+    and among them only extensions in which their unary rows are in decreasing order
+    are explored.
+
+    The search stops once time_budget seconds have passed, if one is given.
+    """
+
+    def __init__(self, formulas: Iterable[Expr], max_size: int = 6, time_budget: Optional[float] = None):
+        self.formulas = list(formulas)
+        self.signature = Signature(self.formulas)
+        self.max_size = max_size
+        self.time_budget = time_budget
+        self.deadline: Optional[float] = None
+        self.timed_out = False
+        self.n_decisions = 0
+
+    def _check_time(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeBudgetExceeded
+
+    def find(self, name: str = "M") -> Optional[Model]:
+        """The first model found, in the smallest domain that has one, or None."""
+        self.deadline = None if self.time_budget is None else time.monotonic() + self.time_budget
+        self.timed_out = False
+        try:
+            for n in range(1, self.max_size + 1):
+                model = self.find_of_size(n, name)
+                if model is not None:
+                    return model
+        except TimeBudgetExceeded:
+            self.timed_out = True
+            logger.debug(f"Model search ran out of its {self.time_budget}s time budget")
+        return None
+
+    def find_of_size(self, n: int, name: str = "M") -> Optional[Model]:
+        for constants, functions, mentioned in self._term_structures(n):
+            grounding = Grounding(self.formulas, n, constants, functions)
+            if all(grounding.assign(root) for root in grounding.roots):
+                interchangeable = [] if self.signature.functions else list(range(mentioned, n))
+                if self._search(grounding, self._decision_order(grounding, n), 0, interchangeable):
+                    logger.debug(f"Found a model with {n} objects after {self.n_decisions} decisions")
+                    return self.to_model(grounding, name)
+        return None
+
+    def _term_structures(self, n: int) -> Iterator[Tuple[Dict[str, int], Dict[tuple, int], int]]:
+        """Values of the constants and then the function cells, by the least number heuristic."""
+        cells = [(name, args) for name, arity in self.signature.functions.items() for args in product(range(n), repeat=arity)]
+        names = self.signature.constants
+        constants: Dict[str, int] = {}
+        functions: Dict[tuple, int] = {}
+
+        def assign_constant(i: int, mentioned: int):
+            if i == len(names):
+                yield from assign_cell(0, mentioned)
+                return
+            for obj in range(min(mentioned + 1, n)):
+                constants[names[i]] = obj
+                yield from assign_constant(i + 1, max(mentioned, obj + 1))
+
+        def assign_cell(i: int, mentioned: int):
+            self._check_time()
+            if i == len(cells):
+                yield dict(constants), dict(functions), mentioned
+                return
+            name, args = cells[i]
+            mentioned = max([mentioned] + [arg + 1 for arg in args])
+            for obj in range(min(mentioned + 1, n)):
+                functions[cells[i]] = obj
+                yield from assign_cell(i + 1, max(mentioned, obj + 1))
+
+        yield from assign_constant(0, 0)
+
+    def _decision_order(self, grounding: Grounding, n: int) -> List[int]:
+        """Atoms ordered object by object, so that the unary rows of objects are filled in turn."""
+        def key(gate):
+            cell = grounding.cell[gate]
+            args = cell[1] if len(cell) == 2 else ()
+            return (max(args, default=-1), len(args), cell)
+        return sorted(grounding.cells.values(), key=key)
+
+    def _unary_rows_ordered(self, grounding: Grounding, interchangeable: List[int]) -> bool:
+        unary = sorted(name for name, arity in self.signature.predicates.items() if arity == 1)
+        for a, b in zip(interchangeable, interchangeable[1:]):
+            for name in unary:
+                gate_a = grounding.cells.get((name, (a,)))
+                gate_b = grounding.cells.get((name, (b,)))
+                value_a = grounding.value[gate_a] if gate_a is not None else False
+                value_b = grounding.value[gate_b] if gate_b is not None else False
+                if value_a is None or value_b is None:
+                    break
+                if value_a != value_b:
+                    if value_b and not value_a:
+                        return False
+                    break
+        return True
+
+    def _search(self, grounding: Grounding, order: List[int], i: int, interchangeable: List[int]) -> bool:
+        while i < len(order) and grounding.value[order[i]] is not None:
+            i += 1
+        if i == len(order):
+            return True
+        self._check_time()
+        gate = order[i]
+        for literal in (2 * gate, 2 * gate + 1):
+            self.n_decisions += 1
+            mark = len(grounding.trail)
+            if grounding.assign(literal) and self._unary_rows_ordered(grounding, interchangeable):
+                if self._search(grounding, order, i + 1, interchangeable):
+                    return True
+            grounding.undo(mark)
+        return False
+
+    def to_model(self, grounding: Grounding, name: str = "M") -> Model:
+        true_cells = [cell for cell, gate in grounding.cells.items() if grounding.value[gate]]
+        return build_model(self.signature, grounding.n, grounding.constants, grounding.functions, true_cells, name)
+
+
+def build_model(
+    signature: Signature,
+    n: int,
+    constants: Dict[str, int],
+    functions: Dict[Tuple[str, Tuple[int, ...]], int],
+    true_cells: Iterable[tuple],
+    name: str = "M",
+) -> Model:
+    """
+    A Model over the objects "1", ..., "n" from the values of the constants and
+    function cells and the atoms that are true: (letter,) for a sentence letter and
+    (predicate, args) for a predicate. Everything else is false.
+    """
+    interpretation = Interpretation()
+    for constant, obj in constants.items():
+        interpretation.extend(Constant(constant), object_name(obj))
+    for predicate, arity in signature.predicates.items():
+        interpretation.add_predicate(Predicate(predicate, arity))
+    for function, arity in signature.functions.items():
+        interpretation.add_function(Function(function, arity))
+    for (function, args), obj in functions.items():
+        interpretation.functions[function][tuple(map(object_name, args))] = object_name(obj)
+    for letter in signature.letters:
+        interpretation.add_truth_value(letter, False)
+
+    for cell in true_cells:
+        if len(cell) == 1:
+            interpretation.add_truth_value(cell[0], True)
+        else:
+            predicate, args = cell
+            interpretation.predicates[predicate].extend(tuple(map(object_name, args)))
+
+    domain = DomainOfDiscourse("D", name).bulk_expand([object_name(obj) for obj in range(n)])
+    return Model(name).with_domain(domain).with_interpretation_function(interpretation)
+
+
+def find_model(formulas: Iterable[Expr], max_size: int = 6, time_budget: Optional[float] = None) -> Optional[Model]:
+    """A model of the formulas with at most max_size objects, or None if there is none (within the budget)."""
+    return ModelFinder(formulas, max_size, time_budget).find()
+
+
+def find_counter_model(
+    premises: Iterable[Expr], conclusion: Expr, max_size: int = 6, time_budget: Optional[float] = None
+) -> Optional[Model]:
+    """A model of the premises in which the conclusion is false, showing that the argument is invalid."""
+    return ModelFinder(list(premises) + [NotExpr(conclusion)], max_size, time_budget).find()
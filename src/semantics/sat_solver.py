@@ -0,0 +1,321 @@
+import heapq
+import time
+from typing import Iterable, List, Optional
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+# Conflicts before the first restart, scaled by the Luby sequence
+RESTART_BASE = 100
+VAR_DECAY = 0.95
+# Learned clauses kept before the database is halved, grown on every reduction
+LEARNED_LIMIT = 2000
+
+
+def luby(i: int) -> int:
+    """The i-th element (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ..."""
+    k = 1
+    while True:
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        if 1 << (k - 1) <= i < (1 << k) - 1:
+            return luby(i - (1 << (k - 1)) + 1)
+        k += 1
+
+
+class SATSolver:
+    """
+    A conflict-driven clause learning SAT solver for clauses in DIMACS form, i.e.
+    lists of non-zero ints where -v is the negation of variable v.
+
+    Internally the literal of variable v is 2v, its negation 2v + 1. Every clause
+    watches its first two literals and is only visited when one of them becomes
+    false, so unit propagation does not touch satisfied or long-undecided clauses.
+    Conflicts are analysed to the first unique implication point and the learned
+    clause is minimised against the reasons of its literals. Decisions follow VSIDS
+    activities kept in a heap with lazy deletion, with saved phases; restarts follow
+    the Luby sequence, and the learned clauses with the highest LBD are deleted
+    periodically.
+
+    Clauses can be added between calls to solve, so that a caller can refine a
+    problem incrementally.
+    """
+
+    def __init__(self):
+        self.n_vars = 0
+        self.assigns: List[int] = [0]
+        self.level: List[int] = [0]
+        self.reason: List[Optional[int]] = [None]
+        self.activity: List[float] = [0.0]
+        self.phase: List[bool] = [False]
+        self.watches: List[List[int]] = [[], []]
+        self.clauses: List[Optional[List[int]]] = []
+        self.learned: List[int] = []
+        self.lbd: dict = {}
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []
+        self.head = 0
+        self.heap: List = []
+        self.var_inc = 1.0
+        self.ok = True
+        self.model: List[bool] = []
+        self.learned_limit = LEARNED_LIMIT
+
+        self.conflicts = self.decisions = self.propagations = self.restarts = 0
+
+    # Variables and clauses
+
+    def new_var(self) -> int:
+        self.n_vars += 1
+        self.assigns.append(0)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches.extend(([], []))
+        heapq.heappush(self.heap, (0.0, self.n_vars))
+        return self.n_vars
+
+    def _literal(self, dimacs: int) -> int:
+        variable = abs(dimacs)
+        while variable > self.n_vars:
+            self.new_var()
+        return 2 * variable + (dimacs < 0)
+
+    def _value(self, literal: int) -> int:
+        """1 if the literal is true, -1 if false, 0 if unassigned."""
+        value = self.assigns[literal >> 1]
+        return -value if literal & 1 else value
+
+    def add_clause(self, clause: Iterable[int]) -> bool:
+        """Add a clause, returning False once the clauses are known to be unsatisfiable."""
+        if not self.ok:
+            return False
+        self._backtrack(0)
+        literals = []
+        for literal in sorted(set(self._literal(dimacs) for dimacs in clause)):
+            if literal ^ 1 in literals or self._value(literal) == 1:
+                return True
+            if self._value(literal) == 0:
+                literals.append(literal)
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self._enqueue(literals[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._attach(literals)
+        return self.ok
+
+    def _attach(self, literals: List[int]) -> int:
+        index = len(self.clauses)
+        self.clauses.append(literals)
+        self.watches[literals[0] ^ 1].append(index)
+        self.watches[literals[1] ^ 1].append(index)
+        return index
+
+    # Propagation
+
+    def _enqueue(self, literal: int, reason: Optional[int]):
+        variable = literal >> 1
+        self.assigns[variable] = -1 if literal & 1 else 1
+        self.level[variable] = len(self.trail_lim)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def _propagate(self) -> Optional[int]:
+        """Unit propagation over the watch lists. Returns a conflicting clause, if any."""
+        while self.head < len(self.trail):
+            false_literal = self.trail[self.head] ^ 1
+            self.head += 1
+            self.propagations += 1
+            watching = self.watches[false_literal ^ 1]
+            kept = []
+            i = 0
+            while i < len(watching):
+                index = watching[i]
+                i += 1
+                clause = self.clauses[index]
+                if clause is None:
+                    continue
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self._value(clause[0]) == 1:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    if self._value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1] ^ 1].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self._value(clause[0]) == -1:
+                        kept.extend(watching[i:])
+                        self.watches[false_literal ^ 1] = kept
+                        return index
+                    self._enqueue(clause[0], index)
+            self.watches[false_literal ^ 1] = kept
+        return None
+
+    # Conflict analysis
+
+    def _bump(self, variable: int):
+        self.activity[variable] += self.var_inc
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, self.n_vars + 1) if not self.assigns[v]]
+            heapq.heapify(self.heap)
+        elif not self.assigns[variable]:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def _analyze(self, conflict: int):
+        """The learned clause (asserting literal first) and the level to backtrack to."""
+        seen = set()
+        learned = [None]
+        counter = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        current = len(self.trail_lim)
+        while True:
+            for other in clause:
+                if literal is not None and other == literal:
+                    continue
+                variable = other >> 1
+                if variable in seen or self.level[variable] == 0:
+                    continue
+                seen.add(variable)
+                self._bump(variable)
+                if self.level[variable] == current:
+                    counter += 1
+                else:
+                    learned.append(other)
+            while (self.trail[index] >> 1) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reason[literal >> 1]]
+        learned[0] = literal ^ 1
+
+        # Drop literals implied by the others through their reasons
+        kept = [learned[0]]
+        for other in learned[1:]:
+            reason = self.reason[other >> 1]
+            if reason is None or any(
+                (lit >> 1) not in seen and self.level[lit >> 1] > 0 for lit in self.clauses[reason] if lit != other ^ 1
+            ):
+                kept.append(other)
+        learned = kept
+
+        if len(learned) == 1:
+            return learned, 0
+        best = max(range(1, len(learned)), key=lambda i: self.level[learned[i] >> 1])
+        learned[1], learned[best] = learned[best], learned[1]
+        return learned, self.level[learned[1] >> 1]
+
+    def _backtrack(self, level: int):
+        if len(self.trail_lim) <= level:
+            return
+        for literal in self.trail[self.trail_lim[level]:]:
+            variable = literal >> 1
+            self.phase[variable] = not literal & 1
+            self.assigns[variable] = 0
+            self.reason[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.head = len(self.trail)
+
+    def _reduce(self):
+        """Delete the half of the learned clauses with the highest LBD, except reasons and binaries."""
+        locked = {self.reason[literal >> 1] for literal in self.trail}
+        candidates = [index for index in self.learned if len(self.clauses[index]) > 2 and index not in locked]
+        candidates.sort(key=lambda index: self.lbd[index], reverse=True)
+        removed = set(candidates[: len(candidates) // 2])
+        for index in removed:
+            self.clauses[index] = None
+            del self.lbd[index]
+        self.learned = [index for index in self.learned if index not in removed]
+        self.learned_limit = int(self.learned_limit * 1.1)
+
+    def _decide(self) -> Optional[int]:
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if not self.assigns[variable]:
+                return 2 * variable + (not self.phase[variable])
+        return None
+
+    # Solving
+
+    def solve(self, time_budget: Optional[float] = None, conflict_limit: Optional[int] = None) -> Optional[bool]:
+        """
+        True if the clauses are satisfiable, with the assignment in model, False if
+        not, and None if the time budget or conflict limit ran out first.
+        """
+        if not self.ok:
+            return False
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        start_conflicts = self.conflicts
+        restart_number = 1
+        until_restart = RESTART_BASE * luby(restart_number)
+        self._backtrack(0)
+        if self._propagate() is not None:
+            self.ok = False
+            return False
+
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                until_restart -= 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learned, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learned) == 1:
+                    self._enqueue(learned[0], None)
+                else:
+                    index = self._attach(learned)
+                    self.learned.append(index)
+                    self.lbd[index] = len({self.level[literal >> 1] for literal in learned})
+                    self._enqueue(learned[0], index)
+                self.var_inc /= VAR_DECAY
+                continue
+
+            if until_restart <= 0:
+                self.restarts += 1
+                restart_number += 1
+                until_restart = RESTART_BASE * luby(restart_number)
+                self._backtrack(0)
+                if deadline is not None and time.monotonic() > deadline:
+                    return None
+                if conflict_limit is not None and self.conflicts - start_conflicts >= conflict_limit:
+                    return None
+            if len(self.learned) > self.learned_limit:
+                self._reduce()
+
+            literal = self._decide()
+            if literal is None:
+                self.model = [False] + [self.assigns[v] == 1 for v in range(1, self.n_vars + 1)]
+                logger.debug(
+                    f"SAT after {self.decisions} decisions, {self.conflicts} conflicts and {self.restarts} restarts"
+                )
+                return True
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(literal, None)
+
+    def value(self, dimacs: int) -> bool:
+        """The value of a literal in the last model found."""
+        value = self.model[abs(dimacs)]
+        return value if dimacs > 0 else not value
@@ -0,0 +1,209 @@
+import csv
+import io
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from syntax.ast_utils import iter_children
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    Expr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    SentenceLetterExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+# Rows evaluated at once are 2 ** CHUNK_BITS, as the bits of one Python int
+CHUNK_BITS = 16
+
+TAUTOLOGY = "tautology"
+CONTRADICTION = "contradiction"
+CONTINGENT = "contingent"
+
+
+def collect_sentence_letters(ast: Expr) -> List[str]:
+    """The sentence letters of a formula in order of first occurrence."""
+    letters: Dict[str, None] = {}
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, SentenceLetterExpr):
+            letters.setdefault(node.letter)
+        elif isinstance(node, PredicateExpr) and not node.terms:
+            letters.setdefault(node.name)
+        elif not isinstance(node, (NotExpr, AndExpr, OrExpr, ImpliesExpr)):
+            msg = f"{node} is not in the propositional fragment, truth tables need sentence letters and connectives only."
+            raise ValueError(msg)
+        # Reversed so that the leftmost child is visited first
+        stack.extend(reversed(list(iter_children(node))))
+    return list(letters)
+
+
+def _repeat(pattern: int, width: int, total: int) -> int:
+    """Repeat a pattern of width bits until it fills total bits."""
+    while width < total:
+        pattern |= pattern << width
+        width *= 2
+    return pattern
+
+
+class TruthTable:
+    """
+    The truth table of a formula of the propositional fragment, evaluated
+    bit-parallel.
+
+    Rows are numbered like a printed truth table: in row r, the i-th of n sentence
+    letters is false iff bit n - 1 - i of r is set, so row 0 makes every letter true
+    and the first letter changes slowest. A block of 2 ** chunk_bits rows is a single
+    Python int with one bit per row. Each sentence letter is a fixed bit pattern in
+    every block (or a constant, for letters above the block size). The formula is
+    evaluated once per block with &, | and ~ on those ints, so a table with 2^n rows
+    takes 2^(n - chunk_bits) formula evaluations.
+    """
+
+    def __init__(self, ast: Expr, chunk_bits: int = CHUNK_BITS):
+        self.ast = ast
+        self.letters = collect_sentence_letters(ast)
+        self.n = len(self.letters)
+        self.chunk_bits = min(chunk_bits, self.n)
+        self.chunk_size = 1 << self.chunk_bits
+        self.full = (1 << self.chunk_size) - 1
+        self.n_chunks = 1 << (self.n - self.chunk_bits)
+        # Letters are false on the rows with their bit set within a block
+        self.false_patterns: Dict[int, int] = {
+            bit: _repeat(((1 << (1 << bit)) - 1) << (1 << bit), 2 << bit, self.chunk_size)
+            & self.full
+            for bit in range(self.chunk_bits)
+        }
+
+    @property
+    def n_rows(self) -> int:
+        return 1 << self.n
+
+    def letter_bits(self, letter_index: int, chunk: int) -> int:
+        bit = self.n - 1 - letter_index
+        if bit < self.chunk_bits:
+            return self.full & ~self.false_patterns[bit]
+        # Letters above the block size are constant across a block
+        row = chunk << self.chunk_bits
+        return 0 if (row >> bit) & 1 else self.full
+
+    def evaluate_chunk(self, chunk: int) -> int:
+        """The values of the formula on one block of rows, one bit per row."""
+        letters = {letter: self.letter_bits(i, chunk) for i, letter in enumerate(self.letters)}
+        return self._evaluate(self.ast, letters)
+
+    def _evaluate(self, node, letters: Dict[str, int]) -> int:
+        if isinstance(node, SentenceLetterExpr):
+            return letters[node.letter]
+        if isinstance(node, PredicateExpr):
+            return letters[node.name]
+        if isinstance(node, NotExpr):
+            return self.full & ~self._evaluate(node.expr, letters)
+        if isinstance(node, AndExpr):
+            bits = self.full
+            for operand in node.operands:
+                bits &= self._evaluate(operand, letters)
+                if not bits:
+                    break
+            return bits
+        if isinstance(node, OrExpr):
+            bits = 0
+            for operand in node.operands:
+                bits |= self._evaluate(operand, letters)
+                if bits == self.full:
+                    break
+            return bits
+        if isinstance(node, ImpliesExpr):
+            left = self._evaluate(node.left, letters)
+            return (self.full & ~left) | self._evaluate(node.right, letters)
+        msg = f"Unknown node type: {type(node)}"
+        raise ValueError(msg)
+
+    def chunks(self) -> Iterator[Tuple[int, int]]:
+        """(first row, bits) for every block of rows."""
+        for chunk in range(self.n_chunks):
+            yield chunk << self.chunk_bits, self.evaluate_chunk(chunk)
+
+    def count_true(self) -> int:
+        return sum(bits.bit_count() for _, bits in self.chunks())
+
+    def classify(self) -> str:
+        """Tautology, contradiction or contingent, stopping at the first block that decides it."""
+        seen_true = seen_false = False
+        for _, bits in self.chunks():
+            seen_true = seen_true or bits != 0
+            seen_false = seen_false or bits != self.full
+            if seen_true and seen_false:
+                return CONTINGENT
+        return TAUTOLOGY if seen_true else CONTRADICTION
+
+    def valuation(self, row: int) -> Dict[str, bool]:
+        return {
+            letter: not (row >> (self.n - 1 - i)) & 1 for i, letter in enumerate(self.letters)
+        }
+
+    def rows(self, only_true: bool = False) -> Iterator[Tuple[Dict[str, bool], bool]]:
+        """Every row as (valuation, value) in table order, optionally only the true rows."""
+        for first, bits in self.chunks():
+            if only_true:
+                while bits:
+                    low = bits & -bits
+                    yield self.valuation(first + low.bit_length() - 1), True
+                    bits ^= low
+            else:
+                for offset in range(self.chunk_size):
+                    yield self.valuation(first + offset), bool((bits >> offset) & 1)
+
+    def write_csv(self, destination: Union[str, Path, TextIO], only_true: bool = False):
+        """Write the table as CSV with T/F cells, to a path or an open text file."""
+        if isinstance(destination, (str, Path)):
+            with open(destination, "w", newline="") as f:
+                return self.write_csv(f, only_true)
+        writer = csv.writer(destination)
+        writer.writerow(self.letters + [str(self.ast)])
+        for valuation, value in self.rows(only_true):
+            writer.writerow([_cell(valuation[letter]) for letter in self.letters] + [_cell(value)])
+
+    def to_csv(self, only_true: bool = False) -> str:
+        output = io.StringIO()
+        self.write_csv(output, only_true)
+        return output.getvalue()
+
+    def to_markdown(self, max_rows: Optional[int] = 64, only_true: bool = False) -> str:
+        header = self.letters + [str(self.ast)]
+        lines = [
+            "| " + " | ".join(header) + " |",
+            "|" + "|".join(":-:" for _ in header) + "|",
+        ]
+        for i, (valuation, value) in enumerate(self.rows(only_true)):
+            if max_rows is not None and i >= max_rows:
+                lines.append("| " + " | ".join("..." for _ in header) + " |")
+                break
+            cells = [_cell(valuation[letter]) for letter in self.letters] + [_cell(value)]
+            lines.append("| " + " | ".join(cells) + " |")
+        return "\n".join(lines)
+
+    def summary(self) -> str:
+        true_rows = self.count_true()
+        return f"{self.ast} is {self.classify()}: true in {true_rows} of {self.n_rows} rows"
+
+
+def _cell(value: bool) -> str:
+    return "T" if value else "F"
+
+
+def truth_table(ast: Expr, chunk_bits: int = CHUNK_BITS) -> TruthTable:
+    table = TruthTable(ast, chunk_bits)
+    logger.debug(
+        f"Truth table of {ast}: {table.n} sentence letters, {table.n_rows} rows in {table.n_chunks} blocks"
+    )
+    return table
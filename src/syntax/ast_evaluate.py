@@ -1,9 +1,319 @@
-from syntax.first_order_logic_syntax import AndExpr, ImpliesExpr, NotExpr, OrExpr, PredicateExpr, QuantifierExpr
+from itertools import islice
+from typing import Optional
+
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    IdentityExpr,
+    ImpliesExpr,
+    ModalExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+    TemporalExpr,
+    UntilExpr,
+)
 from interpretation_function.constant import Constant
+from interpretation_function.function_term import FunctionTerm
+from interpretation_function.nary_tuple import NaryTuple
+from modal_logic.domain import GeneratorDomain, InternedDomain
 from modal_logic.interpretation import Interpretation
 
+# Number of objects handed to a vectorized predicate at once
+VECTOR_CHUNK_SIZE = 4096
+# Assumed size of generator domains that do not declare one, for cost estimates
+UNKNOWN_DOMAIN_SIZE = 1000
+
+_EXHAUSTED = object()
+
+
+def domain_size(domain) -> int:
+    if isinstance(domain, GeneratorDomain) and domain.size is None:
+        return UNKNOWN_DOMAIN_SIZE
+    return len(domain)
+
+
+def sort_domain(sort: Optional[str], interpretation: Interpretation):
+    """The objects a variable of the sort ranges over, the whole domain if untyped."""
+    if sort is not None:
+        return interpretation.domain.sort(sort)
+    return interpretation.domain
+
+
+def quantifier_domain(node, interpretation: Interpretation):
+    """The objects a quantifier ranges over: its sort if it is typed, else the domain."""
+    return sort_domain(node.sort, interpretation)
+
+
+def quantifier_objects(node: QuantifierExpr, interpretation: Interpretation):
+    return sort_objects(node.sort, interpretation)
+
+
+def sort_objects(sort: Optional[str], interpretation: Interpretation):
+    """
+    The objects a quantifier has to try. With a symmetry partition in place, that is
+    one object per class of indistinguishable objects plus the objects already bound.
+    """
+    objects = sort_domain(sort, interpretation)
+    if interpretation.symmetry is None:
+        return objects
+    return interpretation.symmetry.representatives(
+        objects, set(interpretation.names.values())
+    )
+
+
+def estimate_cost(node, interpretation: Interpretation) -> float:
+    """
+    Estimate the cost of evaluating a subformula from the cost hints of its
+    predicates and the size of the domain. The estimate is cached on the node.
+    """
+    cost = getattr(node, "cost_estimate", None)
+    if cost is not None:
+        return cost
+
+    if isinstance(node, PredicateExpr):
+        predicate = interpretation.predicates.get(node.name)
+        cost = predicate.cost if predicate is not None else 1.0
+    elif isinstance(node, NotExpr):
+        cost = estimate_cost(node.expr, interpretation)
+    elif isinstance(node, (AndExpr, OrExpr)):
+        cost = sum(estimate_cost(operand, interpretation) for operand in node.operands)
+    elif isinstance(node, ImpliesExpr):
+        cost = estimate_cost(node.left, interpretation) + estimate_cost(
+            node.right, interpretation
+        )
+    elif isinstance(node, (QuantifierExpr, CountingQuantifierExpr)):
+        cost = domain_size(quantifier_domain(node, interpretation)) * estimate_cost(
+            node.expr, interpretation
+        )
+    elif isinstance(node, QuantifierBlockExpr):
+        cost = estimate_cost(node.expr, interpretation)
+        for sort in node.sorts:
+            cost *= domain_size(sort_domain(sort, interpretation))
+    else:
+        cost = 1.0
+
+    node.cost_estimate = cost
+    return cost
+
+
+def evaluate_vectorized(node: QuantifierExpr, interpretation: Interpretation) -> Optional[bool]:
+    """
+    Evaluate ∀x P(...x...) and ∃x P(...x...), optionally with P negated, by handing
+    chunks of the domain to P's vectorized callable. Returns None if the quantifier
+    does not have that shape or P is not vectorized.
+    """
+    body, negated = node.expr, False
+    if isinstance(body, NotExpr):
+        body, negated = body.expr, True
+    if not isinstance(body, PredicateExpr):
+        return None
+    predicate = interpretation.predicates.get(body.name)
+    if getattr(predicate, "vectorized", None) is None:
+        return None
+
+    if any(isinstance(term, FunctionTerm) and node.variable in term.symbols for term in body.terms):
+        return None
+
+    # Terms other than the quantified variable are resolved once for every row
+    positions = [i for i, term in enumerate(body.terms) if str(term) == node.variable]
+    fixed = [
+        None if i in positions else NaryTuple([term]).get_resolved_terms(interpretation)[0]
+        for i, term in enumerate(body.terms)
+    ]
+    objects = iter(quantifier_domain(node, interpretation))
+    while chunk := list(islice(objects, VECTOR_CHUNK_SIZE)):
+        rows = []
+        for obj in chunk:
+            row = list(fixed)
+            for i in positions:
+                row[i] = obj
+            rows.append(tuple(row))
+        results = predicate.test_many(rows)
+        if node.quantifier == "∀" and any(result == negated for result in results):
+            return False
+        if node.quantifier == "∃" and any(result != negated for result in results):
+            return True
+    return node.quantifier == "∀"
+
+
+def unary_bitset(node, variable: str, domain: InternedDomain, interpretation: Interpretation) -> Optional[int]:
+    """
+    The bindings of variable that satisfy node as a bitset over the ids of the
+    domain, if node is a boolean combination of unary atoms on variable whose
+    extensions are listed. Returns None for any other formula.
+    """
+    if isinstance(node, PredicateExpr):
+        predicate = interpretation.predicates.get(node.name)
+        terms = [str(term) for term in node.terms]
+        if predicate is None or predicate.intensional or terms != [variable]:
+            return None
+        return predicate.id_bitset(domain)
+
+    elif isinstance(node, NotExpr):
+        inner = unary_bitset(node.expr, variable, domain, interpretation)
+        return None if inner is None else domain.bitset() & ~inner
+
+    elif isinstance(node, (AndExpr, OrExpr)):
+        combined = None
+        for operand in node.operands:
+            bits = unary_bitset(operand, variable, domain, interpretation)
+            if bits is None:
+                return None
+            if combined is None:
+                combined = bits
+            else:
+                combined = combined & bits if isinstance(node, AndExpr) else combined | bits
+        return combined
+
+    elif isinstance(node, ImpliesExpr):
+        left = unary_bitset(node.left, variable, domain, interpretation)
+        if left is None:
+            return None
+        right = unary_bitset(node.right, variable, domain, interpretation)
+        if right is None:
+            return None
+        return (domain.bitset() & ~left) | right
+
+    return None
+
+
+def evaluate_counting(node: CountingQuantifierExpr, interpretation: Interpretation) -> bool:
+    """
+    Count the objects that satisfy the body of a counting quantifier.
+
+    Bodies made of unary atoms on the variable are counted with a popcount of their
+    bitsets. Anything else is counted binding by binding, stopping as soon as the
+    objects left can no longer change the outcome. Symmetry classes are not used,
+    since every member of a class counts.
+    """
+    objects = quantifier_domain(node, interpretation)
+    if isinstance(objects, InternedDomain):
+        satisfying = unary_bitset(node.expr, node.variable, objects, interpretation)
+        if satisfying is not None:
+            return node.satisfied_by(satisfying.bit_count())
+
+    low, high, negated = node.interval
+    unknown_size = isinstance(objects, GeneratorDomain) and objects.size is None
+    remaining = None if unknown_size else len(objects)
+    count = 0
+    variable = Constant(node.variable)
+    for obj in objects:
+        interpretation.extend(variable, obj)
+        count += bool(evaluate(node.expr, interpretation))
+        interpretation.remove_constant_object_mapping(variable)
+        if remaining is not None:
+            remaining -= 1
+
+        if high is not None and count > high:
+            return negated
+        if count >= low and (high is None or (remaining is not None and count + remaining <= high)):
+            return not negated
+        if remaining is not None and count + remaining < low:
+            return negated
+    return node.satisfied_by(count)
+
+
+def evaluation_order(node, interpretation: Interpretation):
+    """The operands of an n-ary connective from cheapest to most expensive, cached on the node."""
+    order = getattr(node, "_evaluation_order", None)
+    if order is None:
+        order = sorted(node.operands, key=lambda n: estimate_cost(n, interpretation))
+        node._evaluation_order = order
+    return order
+
+
+def evaluate_block(node: QuantifierBlockExpr, interpretation: Interpretation) -> bool:
+    """
+    Evaluate a block of quantifiers by enumerating tuples of bindings with a stack of
+    iterators, one per variable, rather than one nested loop and call per variable.
+    Enumeration stops at the first counterexample of ∀ or witness of ∃.
+    """
+    deciding = node.quantifier == "∃"
+    variables = [Constant(variable) for variable in node.variables]
+    last = len(variables) - 1
+    iterators = [iter(sort_objects(node.sorts[0], interpretation))]
+    while iterators:
+        level = len(iterators) - 1
+        obj = next(iterators[level], _EXHAUSTED)
+        if obj is _EXHAUSTED:
+            iterators.pop()
+            if iterators:
+                interpretation.remove_constant_object_mapping(variables[level - 1])
+            continue
+
+        interpretation.extend(variables[level], obj)
+        if level < last:
+            # Objects of the next variable depend on the bindings so far under symmetry
+            iterators.append(iter(sort_objects(node.sorts[level + 1], interpretation)))
+            continue
+
+        value = bool(evaluate(node.expr, interpretation))
+        interpretation.remove_constant_object_mapping(variables[level])
+        if value == deciding:
+            for variable in variables[:level]:
+                interpretation.remove_constant_object_mapping(variable)
+            return deciding
+    return not deciding
+
+
+def evaluate_identity(node: IdentityExpr, interpretation: Interpretation) -> bool:
+    left, right = str(node.left), str(node.right)
+    aliases = interpretation.aliases
+    if left == right or (
+        left in aliases and right in aliases and aliases.connected(left, right)
+    ):
+        return not node.negated
+    resolved = node.terms.get_resolved_terms(interpretation)
+    return (resolved[0] == resolved[1]) != node.negated
+
+
+def _identity_with(node, variable: str, negated: bool):
+    """The term t of an atom variable = t (or ≠ with negated) where t does not mention the variable."""
+    if not isinstance(node, IdentityExpr) or node.negated != negated:
+        return None
+    for this, other in ((node.left, node.right), (node.right, node.left)):
+        symbols = other.symbols if isinstance(other, FunctionTerm) else (str(other),)
+        if str(this) == variable and variable not in symbols:
+            return other
+    return None
+
+
+def direct_binding(node: QuantifierExpr):
+    """
+    The term a quantifier can bind its variable to instead of scanning its domain,
+    for ∃x(x = t ∧ ...), ∀x(x = t → ...) and ∀x(x ≠ t ∨ ...). Only the object t
+    denotes can make the body differ from its trivial value, so the quantifier
+    reduces to evaluating the body once. Cached on the node.
+    """
+    if hasattr(node, "_direct_binding"):
+        return node._direct_binding
+
+    body, term = node.expr, None
+    if node.quantifier == "∃":
+        conjuncts = body.operands if isinstance(body, AndExpr) else [body]
+        term = next((t for t in (_identity_with(c, node.variable, False) for c in conjuncts) if t is not None), None)
+    elif isinstance(body, ImpliesExpr):
+        antecedent = body.left.operands if isinstance(body.left, AndExpr) else [body.left]
+        term = next((t for t in (_identity_with(c, node.variable, False) for c in antecedent) if t is not None), None)
+    elif isinstance(body, OrExpr):
+        term = next((t for t in (_identity_with(d, node.variable, True) for d in body.operands) if t is not None), None)
+    elif isinstance(body, IdentityExpr):
+        term = _identity_with(body, node.variable, True)
+
+    node._direct_binding = term
+    return term
+
 
 def evaluate(node, interpretation: Interpretation):
+    cache = interpretation.result_cache
+    if cache is not None and not cache.evaluating(interpretation):
+        # Only the outermost call consults the cache, subformulas are evaluated as usual
+        return cache.evaluate(node, interpretation, evaluate)
+
     if isinstance(node, PredicateExpr):
         # Base case: Evaluate the predicate with its terms
         predicate_obj = interpretation(node)
@@ -14,16 +324,12 @@ def evaluate(node, interpretation: Interpretation):
         return not evaluate(node.expr, interpretation)
 
     elif isinstance(node, AndExpr):
-        # Conjunction: both left and right must be true
-        return evaluate(node.left, interpretation) and evaluate(
-            node.right, interpretation
-        )
+        # Conjunction: every operand must be true, the cheapest are tested first
+        return all(evaluate(operand, interpretation) for operand in evaluation_order(node, interpretation))
 
     elif isinstance(node, OrExpr):
-        # Disjunction: either left or right (or both) must be true
-        return evaluate(node.left, interpretation) or evaluate(
-            node.right, interpretation
-        )
+        # Disjunction: at least one operand must be true
+        return any(evaluate(operand, interpretation) for operand in evaluation_order(node, interpretation))
 
     elif isinstance(node, ImpliesExpr):
         # Implication: equivalent to ¬left ∨ right
@@ -31,11 +337,38 @@ def evaluate(node, interpretation: Interpretation):
             node.right, interpretation
         )
 
+    elif isinstance(node, CountingQuantifierExpr):
+        return evaluate_counting(node, interpretation)
+
+    elif isinstance(node, QuantifierBlockExpr):
+        return evaluate_block(node, interpretation)
+
+    elif isinstance(node, IdentityExpr):
+        return evaluate_identity(node, interpretation)
+
+    elif isinstance(node, SentenceLetterExpr):
+        return interpretation.sentence_letter_truth_value(node.letter)
+
     elif isinstance(node, QuantifierExpr):
+        term = direct_binding(node)
+        if term is not None:
+            obj = NaryTuple([term]).get_resolved_terms(interpretation)[0]
+            if obj not in quantifier_domain(node, interpretation):
+                # No object of the domain satisfies the identity
+                return node.quantifier == "∀"
+            interpretation.extend(Constant(node.variable), obj)
+            result = evaluate(node.expr, interpretation)
+            interpretation.remove_constant_object_mapping(Constant(node.variable))
+            return result
+
+        vectorized = evaluate_vectorized(node, interpretation)
+        if vectorized is not None:
+            return vectorized
+
         # Quantifiers: Handle both ∀ and ∃ quantifiers
         if node.quantifier == "∀":
             # Universal quantification: check for all objects in the domain
-            for obj in interpretation.domain:
+            for obj in quantifier_objects(node, interpretation):
                 # Temporarily bind the variable to the object
                 interpretation.extend(Constant(node.variable), obj)
                 if not evaluate(node.expr, interpretation):
@@ -45,7 +378,7 @@ def evaluate(node, interpretation: Interpretation):
             return True  # all evaluations were True
         elif node.quantifier == "∃":
             # Existential quantification: check if any object in the domain satisfies
-            for obj in interpretation.domain:
+            for obj in quantifier_objects(node, interpretation):
                 interpretation.extend(Constant(node.variable), obj)
                 if evaluate(node.expr, interpretation):
                     # Remove the temporary binding
@@ -53,5 +386,11 @@ def evaluate(node, interpretation: Interpretation):
                     return True  # if any evaluation is True, ∃ succeeds
                 interpretation.remove_constant_object_mapping(Constant(node.variable))
             return False  # none satisfied the expression
+    elif isinstance(node, ModalExpr):
+        msg = f"Modal formulas such as {node} are true or false at the worlds of a modal_logic.kripke.KripkeModel, not in a single interpretation."
+        raise ValueError(msg)
+    elif isinstance(node, (TemporalExpr, UntilExpr)):
+        msg = f"Temporal formulas such as {node} are true or false of a trace of models, see modal_logic.temporal.TemporalMonitor."
+        raise ValueError(msg)
     else:
         raise ValueError(f"Unknown node type: {type(node)}")
@@ -0,0 +1,247 @@
+import math
+import random
+import time
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+)
+from syntax.ast_evaluate import direct_binding, evaluate, quantifier_domain
+from interpretation_function.constant import Constant
+from interpretation_function.nary_tuple import NaryTuple
+from modal_logic.interpretation import Interpretation
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+
+class QuantifierEstimate:
+    """
+    The fraction of sampled bindings of a quantified variable that satisfied the body
+    of the quantifier, with a Wilson score confidence interval.
+    """
+
+    def __init__(self, node: QuantifierExpr, confidence: float):
+        self.node = node
+        self.confidence = confidence
+        self.samples = 0
+        self.satisfying = 0
+        self.exhaustive = True
+
+    @property
+    def fraction(self) -> float:
+        return self.satisfying / self.samples if self.samples else 0.0
+
+    @property
+    def interval(self) -> Tuple[float, float]:
+        if not self.samples:
+            return (0.0, 1.0)
+        if self.exhaustive:
+            return (self.fraction, self.fraction)
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        n, p = self.samples, self.fraction
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return (max(0.0, center - margin), min(1.0, center + margin))
+
+    def __str__(self):
+        low, high = self.interval
+        return (
+            f"{self.node.quantifier}{self.node.variable}: {self.fraction:.3f} of {self.samples} bindings satisfy"
+            f" {self.node.expr} ({self.confidence:.0%} CI [{low:.3f}, {high:.3f}])"
+        )
+
+
+class ApproximateResult:
+    def __init__(self, value: bool, exact: bool, estimates: List[QuantifierEstimate], samples: int, seconds: float):
+        self.value = value
+        self.exact = exact
+        self.estimates = estimates
+        self.samples = samples
+        self.seconds = seconds
+
+    def __bool__(self):
+        return self.value
+
+    def __str__(self):
+        kind = "exact" if self.exact else "estimated"
+        lines = [f"{self.value} ({kind}, {self.samples} samples in {self.seconds:.2f}s)"]
+        lines.extend(f"  {estimate}" for estimate in self.estimates)
+        return "\n".join(lines)
+
+
+class ApproximateEvaluator:
+    """
+    Evaluates a formula by sampling bindings for quantified variables instead of
+    sweeping the domain.
+
+    A quantifier whose domain is no larger than samples_per_quantifier is swept
+    exhaustively. Otherwise bindings are drawn at random until the sample or time
+    budget runs out. Sampling stops as soon as a binding decides the quantifier for
+    certain: a counterexample for ∀ or a witness for ∃ whose own evaluation was
+    exact. Any answer that depends on an unfinished sample is reported as estimated.
+    """
+
+    def __init__(
+        self,
+        interpretation: Interpretation,
+        max_samples: int = 10_000,
+        samples_per_quantifier: int = 200,
+        time_budget: Optional[float] = None,
+        confidence: float = 0.95,
+        seed: Optional[int] = None,
+    ):
+        self.interpretation = interpretation
+        self.max_samples = max_samples
+        self.samples_per_quantifier = samples_per_quantifier
+        self.deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        self.confidence = confidence
+        self.random = random.Random(seed)
+        self.samples = 0
+        self.estimates: Dict[int, QuantifierEstimate] = {}
+        self.samplers: Dict[int, Callable[[], Any]] = {}
+
+    def exhausted(self) -> bool:
+        if self.samples >= self.max_samples:
+            return True
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def sampler(self, domain) -> Callable[[], Any]:
+        """A function drawing a uniformly random object from the domain."""
+        if id(domain) in self.samplers:
+            return self.samplers[id(domain)]
+
+        if hasattr(domain, "range"):
+            sample = lambda: self.random.choice(domain.range)
+        elif hasattr(domain, "ids") and hasattr(domain, "objects"):
+            # Interned domains have holes where objects were removed
+            def sample():
+                while True:
+                    obj = self.random.choice(domain.objects)
+                    if obj in domain.ids:
+                        return obj
+        elif hasattr(domain, "object") and hasattr(domain, "__len__"):
+            sample = lambda: domain.object(self.random.randrange(len(domain)))
+        else:
+            objects = list(domain)
+            sample = lambda: self.random.choice(objects)
+
+        self.samplers[id(domain)] = sample
+        return sample
+
+    def evaluate(self, node) -> Tuple[bool, bool]:
+        """Returns the value of the node and whether that value is exact."""
+        if isinstance(node, NotExpr):
+            value, exact = self.evaluate(node.expr)
+            return not value, exact
+
+        elif isinstance(node, (AndExpr, OrExpr, ImpliesExpr)):
+            # The value of an operand that decides the connective on its own
+            deciding = False if isinstance(node, AndExpr) else True
+            if isinstance(node, ImpliesExpr):
+                operands = [NotExpr(node.left), node.right]
+            else:
+                operands = node.operands
+            all_exact, decided = True, False
+            for operand in operands:
+                value, exact = self.evaluate(operand)
+                if value == deciding and exact:
+                    return deciding, True
+                decided = decided or value == deciding
+                all_exact = all_exact and exact
+            return deciding if decided else not deciding, all_exact
+
+        elif isinstance(node, QuantifierExpr):
+            return self.quantifier(node)
+
+        elif isinstance(node, QuantifierBlockExpr):
+            return self.quantifier(node.nested())
+
+        # Atoms and anything without quantifiers are evaluated exactly
+        return evaluate(node, self.interpretation), True
+
+    def quantifier(self, node: QuantifierExpr) -> Tuple[bool, bool]:
+        if id(node) not in self.estimates:
+            self.estimates[id(node)] = QuantifierEstimate(node, self.confidence)
+        estimate = self.estimates[id(node)]
+        domain = quantifier_domain(node, self.interpretation)
+        # A counterexample decides ∀, a witness decides ∃
+        deciding = node.quantifier == "∃"
+        variable = Constant(node.variable)
+
+        term = direct_binding(node)
+        if term is not None:
+            # Only the object the term denotes can decide the quantifier
+            obj = NaryTuple([term]).get_resolved_terms(self.interpretation)[0]
+            if obj not in domain:
+                return not deciding, True
+            bindings, exhaustive = iter([obj]), True
+        elif len(domain) <= self.samples_per_quantifier:
+            bindings, exhaustive = iter(domain), True
+        else:
+            sample = self.sampler(domain)
+            bindings = (sample() for _ in range(self.samples_per_quantifier))
+            exhaustive = False
+            estimate.exhaustive = False
+
+        all_exact, undecided = True, True
+        for obj in bindings:
+            if self.exhausted():
+                exhaustive = estimate.exhaustive = False
+                break
+            self.samples += 1
+            self.interpretation.extend(variable, obj)
+            value, exact = self.evaluate(node.expr)
+            self.interpretation.remove_constant_object_mapping(variable)
+
+            estimate.samples += 1
+            estimate.satisfying += value
+            if value == deciding and exact:
+                return deciding, True
+            if value == deciding:
+                undecided = False
+            all_exact = all_exact and exact
+
+        # An estimated counterexample (witness) still makes ∀ (∃) the likelier answer
+        if not undecided:
+            return deciding, False
+        return not deciding, exhaustive and all_exact
+
+
+def evaluate_approximate(
+    ast,
+    interpretation: Interpretation,
+    max_samples: int = 10_000,
+    samples_per_quantifier: int = 200,
+    time_budget: Optional[float] = None,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> ApproximateResult:
+    """
+    Evaluate a formula on a domain too large to sweep by sampling bindings, within a
+    total sample budget and an optional time budget in seconds.
+    """
+    started = time.perf_counter()
+    evaluator = ApproximateEvaluator(
+        interpretation, max_samples, samples_per_quantifier, time_budget, confidence, seed
+    )
+    value, exact = evaluator.evaluate(ast)
+    result = ApproximateResult(
+        value,
+        exact,
+        list(evaluator.estimates.values()),
+        evaluator.samples,
+        time.perf_counter() - started,
+    )
+    logger.debug(f"Approximate evaluation of {ast}: {result}")
+    return result
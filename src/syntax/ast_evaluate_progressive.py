@@ -4,16 +4,20 @@ from typing import Any, List, Union, Tuple
 
 from syntax.first_order_logic_syntax import (
     AndExpr,
+    CountingQuantifierExpr,
+    IdentityExpr,
     ImpliesExpr,
     NotExpr,
     OrExpr,
     PredicateExpr,
+    QuantifierBlockExpr,
     QuantifierExpr,
+    SentenceLetterExpr,
     Expr,
 )
 from syntax.ast_evaluate import evaluate
 from syntax.ast_visualize_progressive import create_graph_image
-from syntax.ast_utils import get_nodes_by_level
+from syntax.ast_utils import get_nodes_by_level, iter_children
 
 from interpretation_function.constant import Constant
 from interpretation_function.variable import Variable
@@ -62,6 +66,25 @@ def evaluate_level(
             captions.append(explanation)
             levels_with_full_explanations.add(cur_lvl)
 
+        elif isinstance(node, SentenceLetterExpr):
+            node.evaluated_value = evaluate(node, M.I)
+            explanation += (
+                f"Sentence letter {node} is assigned {node.evaluated_value} by {M.I.name}\n\n"
+            )
+            captions.append(explanation)
+
+        elif isinstance(node, IdentityExpr):
+            node.evaluated_value = evaluate(node, M.I)
+            left, right = node.terms.get_resolved_terms(M.I)
+            relation = "different objects" if node.negated else "the same object"
+            explanation += (
+                f"{node} is true in {M.name} under {M.I.name}"
+                + f" iff {node.left} and {node.right} denote {relation}\n\n"
+                + f"{M.I.name}({node.left}) = {left}, {M.I.name}({node.right}) = {right}\n\n"
+                + f"{node} ⟷ {node.evaluated_value}\n\n"
+            )
+            captions.append(explanation)
+
         elif isinstance(node, NotExpr):
             node.evaluated_value = not node.expr.evaluated_value
             explanation += (
@@ -72,26 +95,28 @@ def evaluate_level(
             captions.append(explanation)
 
         elif isinstance(node, AndExpr):
-            node.evaluated_value = (
-                node.left.evaluated_value and node.right.evaluated_value
+            node.evaluated_value = all(
+                operand.evaluated_value for operand in node.operands
             )
+            operands = ", ".join(str(operand) for operand in node.operands)
             explanation += (
-                f"{node.left} ∧ {node.right} is true in interpretation {M.name}"
-                + f" iff both {node.left} is true and {node.right} is true in"
+                f"{node} is true in interpretation {M.name}"
+                + f" iff every one of {operands} is true in"
                 + f" {M.name}\n\n"
-                + f" ({node.left} ∧ {node.right}) = {node.evaluated_value}\n\n"
+                + f" {node} = {node.evaluated_value}\n\n"
             )
             captions.append(explanation)
 
         elif isinstance(node, OrExpr):
-            node.evaluated_value = (
-                node.left.evaluated_value or node.right.evaluated_value
+            node.evaluated_value = any(
+                operand.evaluated_value for operand in node.operands
             )
+            operands = ", ".join(str(operand) for operand in node.operands)
             explanation += (
-                f"{node.left} ∨ {node.right} is true in interpretation {M.name}"
-                + f" iff either {node.left} is true or {node.right} is true in"
+                f"{node} is true in interpretation {M.name}"
+                + f" iff at least one of {operands} is true in"
                 + f" {M.name}\n\n"
-                + f" ({node.left} ∨ {node.right}) = {node.evaluated_value}\n\n"
+                + f" {node} = {node.evaluated_value}\n\n"
             )
             captions.append(explanation)
 
@@ -130,7 +155,7 @@ def evaluate_level(
             # Replace the quantifier node with True or False based on the domain and expression evaluation
             if node.quantifier == "∀":
                 evaluations: List[Tuple[bool, Any]] = []
-                for d_obj in M.universal_instantiation(Variable(node.variable)):
+                for d_obj in M.universal_instantiation(Variable(node.variable), node.sort):
                     res = evaluate(node.expr, M.I)
                     evaluations.append((res, d_obj))
                     logger.debug(f"{node.variable} = {d_obj} satisfies {node.expr}: {res}")
@@ -156,7 +181,7 @@ def evaluate_level(
 
             elif node.quantifier == "∃":
                 evaluations: List[Tuple[bool, Any]] = []
-                for d_obj in M.universal_instantiation(Variable(node.variable)):
+                for d_obj in M.universal_instantiation(Variable(node.variable), node.sort):
                     res = evaluate(node.expr, M.I)
                     evaluations.append((res, d_obj))
                     logger.debug(f"{node.variable} = {d_obj} satisfies {node.expr}: {res}")
@@ -176,6 +201,33 @@ def evaluate_level(
                 )
                 captions.append(explanation)
 
+        elif isinstance(node, QuantifierBlockExpr):
+            node.evaluated_value = evaluate(node, M.I)
+            variables = ", ".join(node.variables)
+            every = "every" if node.quantifier == "∀" else "at least one"
+            explanation += (
+                f"{node} is true in {M.name} under {M.I.name}"
+                + f" iff {every} assignment of objects in {M.I.name}'s domain"
+                + f" to ({variables}) satisfies {node.expr}\n\n"
+                + f"{node} ⟷ {node.evaluated_value}\n\n"
+            )
+            captions.append(explanation)
+
+        elif isinstance(node, CountingQuantifierExpr):
+            satisfying = []
+            for d_obj in M.universal_instantiation(Variable(node.variable), node.sort):
+                if evaluate(node.expr, M.I):
+                    satisfying.append(str(d_obj))
+            node.evaluated_value = node.satisfied_by(len(satisfying))
+            explanation += (
+                f"{node} is true in {M.name} under {M.I.name}"
+                + f" iff the number of objects in {M.I.name}'s domain that satisfy {node.expr}"
+                + f" is {node.comparison} {node.bound}\n\n"
+                + f"{len(satisfying)} objects satisfy {node.expr}: {{{', '.join(satisfying)}}}\n\n"
+                + f"{node} ⟷ {node.evaluated_value}\n\n"
+            )
+            captions.append(explanation)
+
     logger.info(replace_symbols("\n".join(captions)))
     return "".join([explanation_title] + captions)
 
@@ -192,10 +244,9 @@ def create_graph_image(node: Node, evaluated=True, graph=None):
     )
     graph.node(str(id(node)), label)
 
-    for child in getattr(node, "__dict__", {}).values():
-        if isinstance(child, Expr):
-            graph.edge(str(id(node)), str(id(child)))
-            create_graph_image(child, evaluated, graph)
+    for child in iter_children(node):
+        graph.edge(str(id(node)), str(id(child)))
+        create_graph_image(child, evaluated, graph)
 
     return graph
 
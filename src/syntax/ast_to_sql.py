@@ -0,0 +1,208 @@
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
+from interpretation_function.function_term import FunctionTerm
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    IdentityExpr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+)
+from modal_logic.sqlite_interpretation import SQLiteInterpretation, predicate_columns
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+Fragment = Tuple[str, List]
+
+SQL_COMPARISONS = {"≥": ">=", "≤": "<=", "=": "=", ">": ">", "<": "<", "≠": "<>"}
+
+
+class SQLCompiler:
+    """
+    Compiles a formula into a single SQL query over the tables of an
+    SQLiteInterpretation.
+
+    Atoms become EXISTS lookups on the predicate's table. A quantifier ∃x φ becomes
+    EXISTS over the domain table and ∀x φ becomes NOT EXISTS over the domain table
+    with φ negated. When the body of a quantifier is guarded by an atom on x (∃x(P(x)
+    ∧ ...) or ∀x(P(x) ∧ ... → ...)), the quantifier ranges over that predicate's table
+    instead, which turns the subquery into an indexed join.
+    """
+
+    def __init__(self, interpretation: SQLiteInterpretation):
+        self.interpretation = interpretation
+        self.aliases = count()
+
+    def compile(self, node) -> Fragment:
+        sql, params = self.condition(node, {})
+        return f"SELECT {sql}", params
+
+    def term(self, term, scope: Dict[str, str]) -> Fragment:
+        if isinstance(term, FunctionTerm):
+            raise ValueError(f"Function term {term} cannot be compiled to SQL.")
+        name = str(term)
+        if name in scope:
+            return scope[name], []
+        if name not in self.interpretation.names:
+            raise ValueError(f"Cannot compile free term {name} to SQL.")
+        return "?", [self.interpretation.object_id(self.interpretation.names[name])]
+
+    def condition(self, node, scope: Dict[str, str]) -> Fragment:
+        if isinstance(node, PredicateExpr):
+            return self.atom(node, scope)
+
+        elif isinstance(node, IdentityExpr):
+            left, left_params = self.term(node.left, scope)
+            right, right_params = self.term(node.right, scope)
+            operator = "<>" if node.negated else "="
+            return f"({left} {operator} {right})", left_params + right_params
+
+        elif isinstance(node, NotExpr):
+            sql, params = self.condition(node.expr, scope)
+            return f"NOT ({sql})", params
+
+        elif isinstance(node, (AndExpr, OrExpr)):
+            clauses, params = [], []
+            for operand in node.operands:
+                sql, operand_params = self.condition(operand, scope)
+                clauses.append(sql)
+                params.extend(operand_params)
+            operator = " AND " if isinstance(node, AndExpr) else " OR "
+            return f"({operator.join(clauses)})", params
+
+        elif isinstance(node, ImpliesExpr):
+            left, left_params = self.condition(node.left, scope)
+            right, right_params = self.condition(node.right, scope)
+            return f"(NOT ({left}) OR {right})", left_params + right_params
+
+        elif isinstance(node, QuantifierExpr):
+            return self.quantifier(node, scope)
+
+        elif isinstance(node, QuantifierBlockExpr):
+            return self.quantifier(node.nested(), scope)
+
+        elif isinstance(node, CountingQuantifierExpr):
+            return self.counting_quantifier(node, scope)
+
+        else:
+            raise ValueError(f"Unknown node type: {type(node)}")
+
+    def atom(self, node: PredicateExpr, scope: Dict[str, str]) -> Fragment:
+        predicate = self.interpretation(node)
+        if not node.terms:
+            return f"EXISTS (SELECT 1 FROM {predicate.table})", []
+
+        alias = f"p{next(self.aliases)}"
+        clauses, params = [], []
+        for column, term in zip(predicate_columns(predicate.arity), node.terms):
+            sql, term_params = self.term(term, scope)
+            clauses.append(f"{alias}.{column} = {sql}")
+            params.extend(term_params)
+        where = " AND ".join(clauses)
+        return f"EXISTS (SELECT 1 FROM {predicate.table} AS {alias} WHERE {where})", params
+
+    def quantifier(self, node: QuantifierExpr, scope: Dict[str, str]) -> Fragment:
+        if node.sort is not None:
+            raise ValueError(f"Typed quantifier {node.quantifier}{node.variable}:{node.sort} cannot be compiled to SQL.")
+        variable = node.variable
+        if node.quantifier == "∃":
+            conjuncts = flatten_conjunction(node.expr)
+            consequent = None
+        elif isinstance(node.expr, ImpliesExpr):
+            conjuncts = flatten_conjunction(node.expr.left)
+            consequent = node.expr.right
+        else:
+            conjuncts = []
+            consequent = node.expr
+
+        guard = find_guard(conjuncts, variable)
+        alias = f"q{next(self.aliases)}"
+        inner_scope = dict(scope)
+        clauses, params = [], []
+
+        if guard is None:
+            source = f"domain AS {alias}"
+            inner_scope[variable] = f"{alias}.id"
+            rest = conjuncts
+        else:
+            predicate = self.interpretation(guard)
+            source = f"{predicate.table} AS {alias}"
+            columns = predicate_columns(predicate.arity)
+            # The first occurrence of the variable in the guard provides its binding
+            inner_scope[variable] = next(
+                f"{alias}.{column}"
+                for column, term in zip(columns, guard.terms)
+                if str(term) == variable
+            )
+            for column, term in zip(columns, guard.terms):
+                sql, term_params = self.term(term, inner_scope)
+                if sql != f"{alias}.{column}":
+                    clauses.append(f"{alias}.{column} = {sql}")
+                    params.extend(term_params)
+            rest = [conjunct for conjunct in conjuncts if conjunct is not guard]
+
+        for conjunct in rest:
+            sql, conjunct_params = self.condition(conjunct, inner_scope)
+            clauses.append(sql)
+            params.extend(conjunct_params)
+
+        if node.quantifier == "∃":
+            where = " AND ".join(clauses) or "1"
+            return f"EXISTS (SELECT 1 FROM {source} WHERE {where})", params
+
+        # ∀x φ ⟷ ¬∃x ¬φ, with the guard and antecedent conjuncts kept positive
+        sql, consequent_params = self.condition(consequent, inner_scope)
+        clauses.append(f"NOT ({sql})")
+        params.extend(consequent_params)
+        where = " AND ".join(clauses)
+        return f"NOT EXISTS (SELECT 1 FROM {source} WHERE {where})", params
+
+    def counting_quantifier(self, node: CountingQuantifierExpr, scope: Dict[str, str]) -> Fragment:
+        if node.sort is not None:
+            raise ValueError(f"Typed counting quantifier {node} cannot be compiled to SQL.")
+        alias = f"q{next(self.aliases)}"
+        inner_scope = dict(scope)
+        inner_scope[node.variable] = f"{alias}.id"
+        sql, params = self.condition(node.expr, inner_scope)
+        # Counting up to bound + 1 rows is enough to decide any comparison with the bound
+        comparison = SQL_COMPARISONS[node.comparison]
+        return (
+            f"((SELECT COUNT(*) FROM (SELECT 1 FROM domain AS {alias} WHERE {sql} LIMIT ?)) {comparison} ?)",
+            params + [node.bound + 1, node.bound],
+        )
+
+
+def flatten_conjunction(node) -> List:
+    if isinstance(node, AndExpr):
+        return [conjunct for operand in node.operands for conjunct in flatten_conjunction(operand)]
+    return [node]
+
+
+def find_guard(conjuncts: List, variable: str) -> Optional[PredicateExpr]:
+    for conjunct in conjuncts:
+        if isinstance(conjunct, PredicateExpr) and any(
+            str(term) == variable for term in conjunct.terms
+        ):
+            return conjunct
+    return None
+
+
+def compile_to_sql(node, interpretation: SQLiteInterpretation) -> Fragment:
+    """Compile a formula into a single SELECT statement and its parameters."""
+    return SQLCompiler(interpretation).compile(node)
+
+
+def evaluate_sql(node, interpretation: SQLiteInterpretation) -> bool:
+    sql, params = compile_to_sql(node, interpretation)
+    logger.debug(f"Compiled {node} to SQL: {sql}")
+    return bool(interpretation.connection.execute(sql, params).fetchone()[0])
@@ -1,16 +1,26 @@
-from typing import Union
+import hashlib
+from typing import Dict, Union
+
+from interpretation_function.function_term import FunctionTerm
 
 from syntax.first_order_logic_syntax import (
     Expr,
     PredicateExpr,
+    IdentityExpr,
     QuantifierExpr,
+    QuantifierBlockExpr,
+    CountingQuantifierExpr,
     NotExpr,
     AndExpr,
     OrExpr,
     ImpliesExpr,
+    ModalExpr,
+    SentenceLetterExpr,
+    TemporalExpr,
+    UntilExpr,
 )
 
-Node = Union[PredicateExpr, QuantifierExpr, Expr, NotExpr, AndExpr, OrExpr, ImpliesExpr]
+Node = Union[PredicateExpr, IdentityExpr, QuantifierExpr, QuantifierBlockExpr, Expr, NotExpr, AndExpr, OrExpr, ImpliesExpr]
 
 
 def get_nodes_by_level(node: Node, nodes_by_level: dict = None, level=0):
@@ -21,8 +31,212 @@ def get_nodes_by_level(node: Node, nodes_by_level: dict = None, level=0):
     nodes_by_level[level].append(node)
 
     # Recursively collect nodes in child expressions
-    for child in getattr(node, "__dict__", {}).values():
-        if isinstance(child, Expr):
-            get_nodes_by_level(child, nodes_by_level, level + 1)
+    for child in iter_children(node):
+        get_nodes_by_level(child, nodes_by_level, level + 1)
 
     return nodes_by_level
+
+
+def iter_children(node: Node):
+    """The direct subformulas of a node, including the operands of n-ary connectives."""
+    for name, child in getattr(node, "__dict__", {}).items():
+        # Private attributes hold caches such as the nested form of a quantifier block
+        if name.startswith("_"):
+            continue
+        if isinstance(child, Expr):
+            yield child
+        elif isinstance(child, list):
+            yield from (operand for operand in child if isinstance(operand, Expr))
+
+
+def collect_predicate_names(node: Node) -> set:
+    names = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, PredicateExpr):
+            names.add(current.name)
+        stack.extend(iter_children(current))
+    return names
+
+
+def collect_function_names(node: Node) -> set:
+    names = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, (PredicateExpr, IdentityExpr)):
+            names.update(
+                subterm.name
+                for term in current.terms
+                if isinstance(term, FunctionTerm)
+                for subterm in term.subterms()
+            )
+        stack.extend(iter_children(current))
+    return names
+
+
+def collect_free_terms(node: Node, bound: frozenset = frozenset()) -> set:
+    """
+    The constants and variables in atoms that are not bound by an enclosing
+    quantifier, including those nested in function terms.
+    """
+    if isinstance(node, (PredicateExpr, IdentityExpr)):
+        symbols = set()
+        for term in node.terms:
+            symbols.update(term.symbols if isinstance(term, FunctionTerm) else (str(term),))
+        return symbols - bound
+    if isinstance(node, (QuantifierExpr, CountingQuantifierExpr)):
+        bound = bound | {node.variable}
+    elif isinstance(node, QuantifierBlockExpr):
+        bound = bound | set(node.variables)
+    terms = set()
+    for child in iter_children(node):
+        terms |= collect_free_terms(child, bound)
+    return terms
+
+
+def structural_key(node: Node) -> tuple:
+    """
+    A hashable key that is equal for syntactically identical formulas. Unlike str it
+    keeps every argument of a predicate, so it can be used to recognise formulas that
+    were built separately.
+    """
+    if isinstance(node, PredicateExpr):
+        return ("P", node.name, tuple(node.terms))
+    if isinstance(node, SentenceLetterExpr):
+        return ("L", node.letter)
+    if isinstance(node, IdentityExpr):
+        return ("=", node.left, node.right, node.negated)
+    if isinstance(node, NotExpr):
+        return ("¬", structural_key(node.expr))
+    if isinstance(node, (ModalExpr, TemporalExpr)):
+        return (node.operator, structural_key(node.expr))
+    if isinstance(node, UntilExpr):
+        return ("U", structural_key(node.left), structural_key(node.right))
+    if isinstance(node, (AndExpr, OrExpr)):
+        return (node.NAME,) + tuple(structural_key(operand) for operand in node.operands)
+    if isinstance(node, ImpliesExpr):
+        return ("→", structural_key(node.left), structural_key(node.right))
+    if isinstance(node, QuantifierExpr):
+        return (node.quantifier, node.variable, node.sort, structural_key(node.expr))
+    if isinstance(node, QuantifierBlockExpr):
+        return (node.quantifier, node.variables, node.sorts, structural_key(node.expr))
+    if isinstance(node, CountingQuantifierExpr):
+        return ("#", node.variable, node.sort, node.comparison, node.bound, structural_key(node.expr))
+    raise ValueError(f"Unknown node type: {type(node)}")
+
+
+def canonical_key(node: Node, bound: Dict[str, str] = None, depth: int = 0) -> tuple:
+    """
+    Like structural_key, but equal for formulas that only differ in the names of
+    their bound variables or in the order of the operands of ∧ and ∨. A bound
+    variable is replaced by the number of quantifiers above its binder, depth, so a
+    variable that shadows another gets a number of its own.
+    """
+    bound = bound or {}
+
+    def term_key(term):
+        if isinstance(term, FunctionTerm):
+            return (term.name,) + tuple(term_key(arg) for arg in term.args)
+        return bound.get(term, term)
+
+    def bind(variables) -> Dict[str, str]:
+        inner = dict(bound)
+        for i, variable in enumerate(variables):
+            inner[variable] = f"#{depth + i}"
+        return inner
+
+    if isinstance(node, PredicateExpr):
+        return ("P", node.name, tuple(term_key(term) for term in node.terms))
+    if isinstance(node, SentenceLetterExpr):
+        return ("L", node.letter)
+    if isinstance(node, IdentityExpr):
+        return ("=", term_key(node.left), term_key(node.right), node.negated)
+    if isinstance(node, NotExpr):
+        return ("¬", canonical_key(node.expr, bound, depth))
+    if isinstance(node, (ModalExpr, TemporalExpr)):
+        return (node.operator, canonical_key(node.expr, bound, depth))
+    if isinstance(node, UntilExpr):
+        return ("U", canonical_key(node.left, bound, depth), canonical_key(node.right, bound, depth))
+    if isinstance(node, (AndExpr, OrExpr)):
+        return (node.NAME,) + tuple(sorted((canonical_key(operand, bound, depth) for operand in node.operands), key=repr))
+    if isinstance(node, ImpliesExpr):
+        return ("→", canonical_key(node.left, bound, depth), canonical_key(node.right, bound, depth))
+    if isinstance(node, QuantifierExpr):
+        return (node.quantifier, node.sort, canonical_key(node.expr, bind([node.variable]), depth + 1))
+    if isinstance(node, QuantifierBlockExpr):
+        return (node.quantifier, node.sorts, canonical_key(node.expr, bind(node.variables), depth + len(node.variables)))
+    if isinstance(node, CountingQuantifierExpr):
+        return ("#", node.sort, node.comparison, node.bound, canonical_key(node.expr, bind([node.variable]), depth + 1))
+    raise ValueError(f"Unknown node type: {type(node)}")
+
+
+def formula_digest(node: Node) -> str:
+    """A SHA-256 hex digest of the canonical key of a formula, cached on the node."""
+    digest = getattr(node, "_digest", None)
+    if digest is None:
+        digest = hashlib.sha256(repr(canonical_key(node)).encode()).hexdigest()
+        node._digest = digest
+    return digest
+
+
+def substitute_term(term, variable: str, replacement):
+    """A term with every occurrence of variable replaced, including inside function terms."""
+    if isinstance(term, FunctionTerm):
+        if variable not in term.symbols:
+            return term
+        return FunctionTerm(term.name, tuple(substitute_term(arg, variable, replacement) for arg in term.args))
+    return replacement if term == variable else term
+
+
+def substitute(node: Node, variable: str, replacement) -> Node:
+    """
+    A formula with the free occurrences of variable replaced by a term. Subformulas
+    that do not change are shared with node rather than copied. The replacement is
+    not renamed apart, so it should not contain variables bound in node.
+    """
+    if isinstance(node, PredicateExpr):
+        terms = [substitute_term(term, variable, replacement) for term in node.terms]
+        if all(new is old for new, old in zip(terms, node.terms)):
+            return node
+        return PredicateExpr(node.name, terms)
+    if isinstance(node, IdentityExpr):
+        left = substitute_term(node.left, variable, replacement)
+        right = substitute_term(node.right, variable, replacement)
+        if left is node.left and right is node.right:
+            return node
+        return IdentityExpr(left, right, node.negated)
+    if isinstance(node, SentenceLetterExpr):
+        return node
+    if isinstance(node, NotExpr):
+        expr = substitute(node.expr, variable, replacement)
+        return node if expr is node.expr else NotExpr(expr)
+    if isinstance(node, (AndExpr, OrExpr)):
+        operands = [substitute(operand, variable, replacement) for operand in node.operands]
+        if all(new is old for new, old in zip(operands, node.operands)):
+            return node
+        return type(node)(*operands)
+    if isinstance(node, ImpliesExpr):
+        left = substitute(node.left, variable, replacement)
+        right = substitute(node.right, variable, replacement)
+        if left is node.left and right is node.right:
+            return node
+        return ImpliesExpr(left, right)
+    if isinstance(node, (QuantifierExpr, CountingQuantifierExpr)):
+        if node.variable == variable:
+            return node
+        expr = substitute(node.expr, variable, replacement)
+        if expr is node.expr:
+            return node
+        if isinstance(node, QuantifierExpr):
+            return QuantifierExpr(node.quantifier, node.variable, expr, node.sort)
+        return CountingQuantifierExpr(node.variable, expr, node.comparison, node.bound, node.sort)
+    if isinstance(node, QuantifierBlockExpr):
+        if variable in node.variables:
+            return node
+        expr = substitute(node.expr, variable, replacement)
+        if expr is node.expr:
+            return node
+        return QuantifierBlockExpr(node.quantifier, node.variables, expr, node.sorts)
+    raise ValueError(f"Unknown node type: {type(node)}")
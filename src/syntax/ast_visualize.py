@@ -1,6 +1,6 @@
 from graphviz import Digraph
 
-from syntax.first_order_logic_syntax import Expr
+from syntax.ast_utils import iter_children
 
 
 def visualize_ast(node, graph=None, parent=None):
@@ -16,8 +16,7 @@ def visualize_ast(node, graph=None, parent=None):
         graph.edge(str(id(parent)), str(id(node)))
 
     # Recursively add children nodes
-    for child in getattr(node, "__dict__", {}).values():
-        if isinstance(child, Expr):
-            visualize_ast(child, graph, node)
+    for child in iter_children(node):
+        visualize_ast(child, graph, node)
 
     return graph
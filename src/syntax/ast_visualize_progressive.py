@@ -14,7 +14,7 @@ from syntax.first_order_logic_syntax import (
 )
 from utils.image_creation import add_caption_below_image
 from utils.files import cleanup_temp_files
-from syntax.ast_utils import get_nodes_by_level
+from syntax.ast_utils import get_nodes_by_level, iter_children
 
 from utils.text_convert.to_latex import t, im, mm, st, symb, symb_sub, replace_symbols
 from utils.text_convert.to_markdown import df, h, pic
@@ -48,11 +48,10 @@ def create_graph_image(
     if parent:
         graph.edge(str(id(parent)), str(id(node)))
 
-    for child in getattr(node, "__dict__", {}).values():
-        if isinstance(child, Expr):
-            x = create_graph_image(child, level, current_level + 1, graph, node)
-            if x:
-                ret_node = x[1]
+    for child in iter_children(node):
+        x = create_graph_image(child, level, current_level + 1, graph, node)
+        if x:
+            ret_node = x[1]
 
     return graph, ret_node
 
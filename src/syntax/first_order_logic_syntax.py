@@ -1,9 +1,10 @@
 from interpretation_function.nary_tuple import NaryTuple
 
 from syntax.tokenizer import tokenize
+from interpretation_function.function_term import FunctionTerm
 from interpretation_function.variable import Variable
 
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Tuple
 
 from utils.config import Config
 from utils.log import Logger
@@ -20,14 +21,100 @@ class Expr:
 class QuantifierExpr(Expr):
     NAME = "Quantifier"
 
-    def __init__(self, quantifier, variable, expr):
+    def __init__(self, quantifier, variable, expr, sort: Optional[str] = None):
         self.quantifier = quantifier
         self.variable = variable
         self.expr = expr
+        self.sort = sort
         self.precedence = 4
 
     def __str__(self):
-        return f"{self.quantifier}{self.variable}({self.expr})"
+        sort = f":{self.sort}" if self.sort else ""
+        return f"{self.quantifier}{self.variable}{sort}({self.expr})"
+
+
+class QuantifierBlockExpr(Expr):
+    """
+    A block of quantifiers of the same kind over several variables, e.g. ∀x∀y∀z φ,
+    as a single node. The variables are bound left to right, each with its own sort.
+    """
+
+    NAME = "Quantifier block"
+
+    def __init__(self, quantifier, variables: Tuple[str, ...], expr, sorts: Optional[Tuple[Optional[str], ...]] = None):
+        if sorts is not None and len(sorts) != len(variables):
+            msg = f"Quantifier block over {len(variables)} variables was given {len(sorts)} sorts."
+            raise ValueError(msg)
+        self.quantifier = quantifier
+        self.variables = tuple(variables)
+        self.expr = expr
+        self.sorts = tuple(sorts) if sorts is not None else (None,) * len(self.variables)
+        self.precedence = 4
+        self._nested = None
+
+    def nested(self) -> QuantifierExpr:
+        """The equivalent chain of single-variable quantifiers, built once."""
+        if self._nested is None:
+            expr = self.expr
+            for variable, sort in reversed(list(zip(self.variables, self.sorts))):
+                expr = QuantifierExpr(self.quantifier, variable, expr, sort)
+            self._nested = expr
+        return self._nested
+
+    def __str__(self):
+        prefix = "".join(
+            f"{self.quantifier}{variable}" + (f":{sort}" if sort else "")
+            for variable, sort in zip(self.variables, self.sorts)
+        )
+        return f"{prefix}({self.expr})"
+
+
+class CountingQuantifierExpr(Expr):
+    """
+    A constraint on the number of objects that satisfy expr when bound to variable.
+    ∃≥k x φ, ∃≤k x φ and ∃=k x φ say that at least, at most or exactly k objects
+    satisfy φ; #x φ > k and the other comparisons constrain the count in the same way.
+    """
+
+    NAME = "Counting quantifier"
+    COMPARISONS = ("≥", "≤", "=", ">", "<", "≠")
+
+    def __init__(self, variable, expr, comparison: str, bound: int, sort: Optional[str] = None):
+        if comparison not in self.COMPARISONS:
+            msg = f"Unknown comparison {comparison} in counting quantifier, expected one of {', '.join(self.COMPARISONS)}."
+            raise ValueError(msg)
+        self.variable = variable
+        self.expr = expr
+        self.comparison = comparison
+        self.bound = bound
+        self.sort = sort
+        self.precedence = 4
+
+    @property
+    def interval(self) -> Tuple[int, Optional[int], bool]:
+        """
+        The counts that satisfy the constraint as an inclusive range (low, high), with
+        high None if unbounded, and whether the range is negated (for ≠).
+        """
+        k = self.bound
+        return {
+            "≥": (k, None, False),
+            ">": (k + 1, None, False),
+            "≤": (0, k, False),
+            "<": (0, k - 1, False),
+            "=": (k, k, False),
+            "≠": (k, k, True),
+        }[self.comparison]
+
+    def satisfied_by(self, count: int) -> bool:
+        low, high, negated = self.interval
+        return (low <= count and (high is None or count <= high)) != negated
+
+    def __str__(self):
+        sort = f":{self.sort}" if self.sort else ""
+        if self.comparison in ("≥", "≤", "="):
+            return f"∃{self.comparison}{self.bound}{self.variable}{sort}({self.expr})"
+        return f"#{self.variable}{sort}({self.expr}) {self.comparison} {self.bound}"
 
 
 class PredicateExpr(Expr):
@@ -43,6 +130,37 @@ class PredicateExpr(Expr):
         return f"{self.name}{self.terms}"
 
 
+class SentenceLetterExpr(Expr):
+    """A sentence letter such as P, an atom of the propositional fragment."""
+
+    NAME = "Sentence letter"
+
+    def __init__(self, letter: str):
+        self.letter = letter
+        self.precedence = 2
+        self.evaluated_value: Optional[bool] = None
+
+    def __str__(self):
+        return self.letter
+
+
+class IdentityExpr(Expr):
+    """An identity atom a = b, or a ≠ b if negated, between two terms."""
+
+    NAME = "="
+
+    def __init__(self, left, right, negated: bool = False):
+        self.left = left
+        self.right = right
+        self.negated = negated
+        self.terms = NaryTuple([left, right])
+        self.precedence = 2
+        self.evaluated_value: Optional[bool] = None
+
+    def __str__(self):
+        return f"{self.left} {'≠' if self.negated else '='} {self.right}"
+
+
 class NotExpr(Expr):
     NAME = "¬"
 
@@ -54,28 +172,102 @@ class NotExpr(Expr):
         return f"¬{self.expr}"
 
 
-class AndExpr(Expr):
-    NAME = "∧"
+class ModalExpr(Expr):
+    """
+    □φ (necessarily φ) or ◇φ (possibly φ), true at a world of a Kripke model if φ is
+    true at every, or some, world accessible from it.
+    """
+
+    NAME = "Modal"
+    OPERATORS = ("□", "◇")
+
+    def __init__(self, operator: str, expr):
+        if operator not in self.OPERATORS:
+            msg = f"Unknown modal operator {operator}, expected one of {', '.join(self.OPERATORS)}."
+            raise ValueError(msg)
+        self.operator = operator
+        self.expr = expr
+        self.precedence = 3
+
+    def __str__(self):
+        return f"{self.operator}{self.expr}"
+
+
+class TemporalExpr(Expr):
+    """
+    next φ, always φ or eventually φ over a finite trace of models: φ is true at the
+    next model, at every model from the current one on, or at some model from the
+    current one on.
+    """
+
+    NAME = "Temporal"
+    OPERATORS = ("next", "always", "eventually")
+
+    def __init__(self, operator: str, expr):
+        if operator not in self.OPERATORS:
+            msg = f"Unknown temporal operator {operator}, expected one of {', '.join(self.OPERATORS)}."
+            raise ValueError(msg)
+        self.operator = operator
+        self.expr = expr
+        self.precedence = 3
+
+    def __str__(self):
+        return f"{self.operator} {self.expr}"
+
+
+class UntilExpr(Expr):
+    """φ until ψ: ψ is true at some model from the current one on, and φ at every model before it."""
+
+    NAME = "until"
 
     def __init__(self, left, right):
         self.left = left
         self.right = right
+        self.precedence = 8
+
+    def __str__(self):
+        return f"({self.left} until {self.right})"
+
+
+def flatten_operands(cls, operands) -> List[Expr]:
+    """Splice the operands of nested nodes of the same connective into one list."""
+    flattened = []
+    for operand in operands:
+        if isinstance(operand, cls):
+            flattened.extend(operand.operands)
+        else:
+            flattened.append(operand)
+    return flattened
+
+
+class AndExpr(Expr):
+    """A conjunction of any number of operands, e.g. (P(x) ∧ Q(x) ∧ R(x, y))."""
+
+    NAME = "∧"
+
+    def __init__(self, *operands):
+        if len(operands) < 2:
+            raise ValueError(f"A conjunction needs at least 2 operands, got {len(operands)}.")
+        self.operands = flatten_operands(AndExpr, operands)
         self.precedence = 6
 
     def __str__(self):
-        return f"({self.left} ∧ {self.right})"
+        return "(" + " ∧ ".join(str(operand) for operand in self.operands) + ")"
 
 
 class OrExpr(Expr):
+    """A disjunction of any number of operands, e.g. (P(x) ∨ Q(x) ∨ R(x, y))."""
+
     NAME = "∨"
 
-    def __init__(self, left, right):
-        self.left = left
-        self.right = right
+    def __init__(self, *operands):
+        if len(operands) < 2:
+            raise ValueError(f"A disjunction needs at least 2 operands, got {len(operands)}.")
+        self.operands = flatten_operands(OrExpr, operands)
         self.precedence = 7
 
     def __str__(self):
-        return f"({self.left} ∨ {self.right})"
+        return "(" + " ∨ ".join(str(operand) for operand in self.operands) + ")"
 
 
 class ImpliesExpr(Expr):
@@ -95,10 +287,12 @@ class Parser:
         self.tokens = tokenize(formula)
         self.pos = 0
         self.interpretation = M.I
+        # Sorts of the typed variables in scope, used to catch sort errors while parsing
+        self.variable_sorts = {}
 
-    def peek(self):
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
+    def peek(self, offset: int = 0):
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset]
         return None
 
     def consume(self, token_type):
@@ -112,56 +306,125 @@ class Parser:
         return self.expr()
 
     def expr(self):
-        left = self.disjunct()
+        left = self.until()
         token = self.peek()
         if token and token.type == "IMPLIES":
             self.consume("IMPLIES")
-            right = self.disjunct()
+            right = self.until()
             return ImpliesExpr(left, right)
         return left
 
+    def until(self):
+        # until binds more loosely than ∨ and more tightly than →
+        left = self.disjunct()
+        if self.peek() and self.peek().type == "UNTIL":
+            self.consume("UNTIL")
+            return UntilExpr(left, self.disjunct())
+        return left
+
     def disjunct(self):
-        left = self.conjunct()
+        operands = [self.conjunct()]
         while self.peek() and self.peek().type == "OR":
             self.consume("OR")
-            right = self.conjunct()
-            left = OrExpr(left, right)
-        return left
+            operands.append(self.conjunct())
+        return OrExpr(*operands) if len(operands) > 1 else operands[0]
 
     def conjunct(self):
-        left = self.quantified()
+        operands = [self.quantified()]
         while self.peek() and self.peek().type == "AND":
             self.consume("AND")
-            right = self.quantified()
-            left = AndExpr(left, right)
-        return left
+            operands.append(self.quantified())
+        return AndExpr(*operands) if len(operands) > 1 else operands[0]
 
     def quantified(self):
         if self.peek() and self.peek().type == "QUANTIFIER":
+            # Consecutive quantifiers of the same kind over distinct variables form a block
             quantifier = self.consume("QUANTIFIER").value
-            variable = self.consume("VARIABLE").value
-            # If the quantifier is universal, bind all objects in the domain on the
-            # interpretation to the variable so that the evaluator can use it on the first iteration
-            if quantifier == "∀":
-                logger.debug(f"Binding {variable} to all objects in the domain.")
-                for obj in self.interpretation.domain:
-                    self.interpretation.extend(Variable(variable), obj)
-            if quantifier == "∃":
-                # Bind to a single object, and the rest will be iterated through in the evaluator
-                logger.debug(f"Binding {variable} to the first object in the domain.")
-                self.interpretation.extend(
-                    Variable(variable), list(self.interpretation.domain)[0]
-                )
-
+            variables, sorts = [], []
+            while True:
+                variable, sort = self.bound_variable(quantifier)
+                variables.append(variable)
+                sorts.append(sort)
+                token, following = self.peek(), self.peek(1)
+                if not (token and token.type == "QUANTIFIER" and token.value == quantifier):
+                    break
+                if not following or following.value in variables:
+                    break
+                self.consume("QUANTIFIER")
+
+            outer_sorts = [self.variable_sorts.get(variable) for variable in variables]
+            for variable, sort in zip(variables, sorts):
+                self.variable_sorts[variable] = sort
             expr = self.quantified()
-            return QuantifierExpr(quantifier, variable, expr)
+            for variable, outer_sort in reversed(list(zip(variables, outer_sorts))):
+                self.variable_sorts[variable] = outer_sort
+
+            if len(variables) == 1:
+                return QuantifierExpr(quantifier, variables[0], expr, sorts[0])
+            return QuantifierBlockExpr(quantifier, variables, expr, sorts)
+
+        elif self.peek() and self.peek().type == "COUNTING_QUANTIFIER":
+            # ∃≥3x φ
+            quantifier = self.consume("COUNTING_QUANTIFIER").value
+            comparison = quantifier.lstrip("∃").strip()[0]
+            bound = int(quantifier.lstrip("∃").strip()[1:])
+            variable, sort = self.bound_variable(quantifier)
+            expr = self.scope(variable, sort)
+            return CountingQuantifierExpr(variable, expr, comparison, bound, sort)
+
+        elif self.peek() and self.peek().type == "COUNT":
+            # #x φ > 3
+            quantifier = self.consume("COUNT").value
+            variable, sort = self.bound_variable(quantifier)
+            expr = self.scope(variable, sort)
+            token = self.peek()
+            if not token or token.type not in ("COMPARISON", "EQUAL", "NEQUAL"):
+                raise ValueError(f"Expected a comparison after #{variable}({expr}) but got {token}")
+            comparison = self.consume(token.type).value
+            bound = int(self.consume("NUMBER").value)
+            return CountingQuantifierExpr(variable, expr, comparison, bound, sort)
+
         return self.negation()
 
+    def bound_variable(self, quantifier: str) -> Tuple[str, Optional[str]]:
+        """Parse the variable of a quantifier and its optional sort annotation."""
+        variable = self.consume("VARIABLE").value
+        sort = None
+        if self.peek() and self.peek().type == "SORT":
+            sort = self.consume("SORT").value.lstrip(":").strip()
+            domain = self.interpretation.domain
+            if sort not in getattr(domain, "sorts", {}):
+                raise ValueError(f"Unknown sort {sort} in {quantifier}{variable}:{sort}")
+
+        # Bind the variable to a single object so that the evaluator can use it on
+        # the first iteration, the rest will be iterated through in the evaluator.
+        # Domains can be lazy, so they are never walked here.
+        objects = self.interpretation.domain.sort(sort) if sort else self.interpretation.domain
+        first = next(iter(objects), None)
+        if first is not None:
+            logger.debug(f"Binding {variable} to the first object in the domain.")
+            self.interpretation.extend(Variable(variable), first)
+        return variable, sort
+
+    def scope(self, variable: str, sort: Optional[str]):
+        outer_sort = self.variable_sorts.get(variable)
+        self.variable_sorts[variable] = sort
+        expr = self.quantified()
+        self.variable_sorts[variable] = outer_sort
+        return expr
+
     def negation(self):
         if self.peek() and self.peek().type == "NOT":
             self.consume("NOT")
             expr = self.negation()
             return NotExpr(expr)
+        elif self.peek() and self.peek().type == "MODAL":
+            # Modal operators bind as tightly as negation, but may be followed by a quantifier: □∀x(F(x))
+            operator = self.consume("MODAL").value
+            return ModalExpr(operator, self.quantified())
+        elif self.peek() and self.peek().type == "TEMPORAL":
+            operator = self.consume("TEMPORAL").value
+            return TemporalExpr(operator, self.quantified())
         elif self.peek() and self.peek().type == "LPAREN":
             # Parse a grouped expression in parentheses
             self.consume("LPAREN")
@@ -172,9 +435,14 @@ class Parser:
 
     def predicate(self):
         token = self.peek()
+        if token.type == "VARIABLE":
+            return self.identity()
         if token.type == "PREDICATE":
             name = self.consume("PREDICATE").value
             terms = []
+            if not (self.peek() and self.peek().type == "LPAREN") and name not in self.interpretation.predicates:
+                # A letter without arguments is a sentence letter unless a nullary predicate has its name
+                return SentenceLetterExpr(name)
             if self.peek() and self.peek().type == "LPAREN":
                 self.consume("LPAREN")
                 terms.append(self.term())
@@ -182,13 +450,67 @@ class Parser:
                     self.consume("COMMA")
                     terms.append(self.term())
                 self.consume("RPAREN")
+            self.check_sorts(name, terms)
             return PredicateExpr(name, terms)
         raise ValueError(f"Expected predicate but got {token}")
 
+    def identity(self) -> IdentityExpr:
+        left = self.term()
+        token = self.peek()
+        if not token or token.type not in ("EQUAL", "NEQUAL"):
+            raise ValueError(f"Expected = or ≠ after term {left} but got {token}")
+        self.consume(token.type)
+        right = self.term()
+        return IdentityExpr(left, right, negated=token.type == "NEQUAL")
+
+    def check_sorts(self, name: str, terms: List[Any]):
+        """
+        Check the arity of a predicate and that every typed variable and constant is
+        of the sort its argument position expects.
+        """
+        predicate = self.interpretation.predicates.get(name)
+        if predicate is None:
+            return
+        if len(terms) != predicate.arity:
+            msg = f"Predicate {name} expects {predicate.arity} arguments, but {len(terms)} were provided."
+            raise ValueError(msg)
+
+        domain = self.interpretation.domain
+        for position, (term, expected) in enumerate(zip(terms, predicate.signature)):
+            if expected is None:
+                continue
+            if self.variable_sorts.get(term):
+                if self.variable_sorts[term] != expected:
+                    msg = f"Sort error: argument {position + 1} of {name} is of sort {expected}, but {term} ranges over {self.variable_sorts[term]}."
+                    raise ValueError(msg)
+            elif term not in self.variable_sorts and term in self.interpretation.names:
+                obj = self.interpretation.names[term]
+                if expected in getattr(domain, "sorts", {}) and obj not in domain.sort(expected):
+                    msg = f"Sort error: argument {position + 1} of {name} is of sort {expected}, but {term} denotes {obj}."
+                    raise ValueError(msg)
+
     def term(self):
         token = self.peek()
         if token.type == "VARIABLE":
-            return self.consume("VARIABLE").value
+            name = self.consume("VARIABLE").value
+            if self.peek() and self.peek().type == "LPAREN":
+                return self.function_term(name)
+            return name
         elif token.type == "CONSTANT":
             return self.consume("CONSTANT").value
         raise ValueError(f"Unexpected term token: {token}")
+
+    def function_term(self, name: str) -> FunctionTerm:
+        # f(g(x), c): a function symbol is a lowercase letter directly applied to terms
+        self.consume("LPAREN")
+        args = [self.term()]
+        while self.peek() and self.peek().type == "COMMA":
+            self.consume("COMMA")
+            args.append(self.term())
+        self.consume("RPAREN")
+
+        function = self.interpretation.functions.get(name)
+        if function is not None and len(args) != function.arity:
+            msg = f"Function {name} expects {function.arity} arguments, but {len(args)} were provided."
+            raise ValueError(msg)
+        return FunctionTerm(name, tuple(args))
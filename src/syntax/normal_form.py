@@ -0,0 +1,376 @@
+from itertools import count
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from interpretation_function.function_term import FunctionTerm
+from syntax.ast_utils import collect_predicate_names, iter_children
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    CountingQuantifierExpr,
+    Expr,
+    IdentityExpr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+)
+
+from utils.config import Config
+from utils.log import Logger
+
+
+config = Config()
+logger = Logger(__name__, config["log_level"])()
+
+ATOMS = (PredicateExpr, SentenceLetterExpr, IdentityExpr)
+
+
+def is_literal(node: Expr) -> bool:
+    return isinstance(node, ATOMS) or isinstance(node, NotExpr) and isinstance(node.expr, ATOMS)
+
+
+def symbol_names(formulas: Iterable[Expr]) -> set:
+    """The predicates, letters, constants, variables and function symbols of formulas."""
+    names = set()
+    for formula in formulas:
+        names |= collect_predicate_names(formula)
+        stack = [formula]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, SentenceLetterExpr):
+                names.add(node.letter)
+            elif isinstance(node, (QuantifierExpr, CountingQuantifierExpr)):
+                names.add(node.variable)
+            elif isinstance(node, QuantifierBlockExpr):
+                names.update(node.variables)
+            elif isinstance(node, (PredicateExpr, IdentityExpr)):
+                for term in node.terms:
+                    if isinstance(term, FunctionTerm):
+                        names.update(subterm.name for subterm in term.subterms())
+                        names.update(term.symbols)
+                    else:
+                        names.add(str(term))
+            stack.extend(iter_children(node))
+    return names
+
+
+class NormalForm:
+    """
+    Negation normal form, Skolemization and definitional clause form, each in time
+    linear in the size of the formula.
+
+    Every subformula is interned: structurally equal subformulas are represented by
+    one canonical node, found through a table keyed by the node type, its own fields
+    and the identities of its (already interned) children, so building the key never
+    walks the subformula again. The results of every transformation are cached per
+    canonical node, so a subformula that occurs many times, within one formula or
+    across formulas given to the same instance, is rewritten once and the results
+    share structure.
+
+    Skolemization replaces each ∃x φ by φ with x replaced by a term over the free
+    variables of ∃x φ; equal ∃ subformulas get the same Skolem function. The ∀
+    variables are renamed after their quantifier depth, which keeps them apart from
+    every term substituted into their scope while letting equal subformulas at the
+    same depth share their rewriting.
+
+    Clause form follows Plaisted and Greenbaum: a disjunction is distributed over at
+    most one operand with several clauses, and every other such operand, and every
+    operand with a quantifier, is replaced by a new predicate over its free variables
+    that implies it. Since all formulas are in negation normal form, only that one
+    direction of the definition is needed.
+
+    The names of new Skolem functions, variables and predicates avoid reserved, which
+    should contain every symbol of the formulas.
+    """
+
+    def __init__(self, reserved: Iterable[str] = ()):
+        self.reserved = set(reserved)
+        self.skolem_names = (f"sk{i}" for i in count(1) if f"sk{i}" not in self.reserved)
+        self.definition_names = (f"D{i}" for i in count(1) if f"D{i}" not in self.reserved)
+        self.variable_names: List[str] = []
+        self._fresh_variables = (f"v{i}" for i in count() if f"v{i}" not in self.reserved)
+
+        self._table: Dict[tuple, Expr] = {}
+        self._canonical: Dict[int, Tuple[Expr, Expr]] = {}
+        self._free: Dict[int, FrozenSet[str]] = {}
+        self._bound_variables: Dict[int, FrozenSet[str]] = {}
+        self._nnf: Dict[Tuple[int, bool], Expr] = {}
+        self._skolemized: Dict[tuple, Expr] = {}
+        self._skolem_symbols: Dict[int, str] = {}
+        self._clauses: Dict[int, List[Tuple[Expr, ...]]] = {}
+        self._definitions: Dict[int, Expr] = {}
+        # Clauses defining new predicates, not yet returned by clauses
+        self._pending: List[Tuple[Expr, ...]] = []
+
+    # Interning
+
+    def _key(self, node: Expr) -> tuple:
+        if isinstance(node, PredicateExpr):
+            return ("P", node.name, tuple(node.terms))
+        if isinstance(node, SentenceLetterExpr):
+            return ("L", node.letter)
+        if isinstance(node, IdentityExpr):
+            return ("=", node.left, node.right, node.negated)
+        if isinstance(node, NotExpr):
+            return ("¬", id(node.expr))
+        if isinstance(node, (AndExpr, OrExpr)):
+            return (node.NAME,) + tuple(id(operand) for operand in node.operands)
+        if isinstance(node, ImpliesExpr):
+            return ("→", id(node.left), id(node.right))
+        if isinstance(node, QuantifierExpr):
+            return (node.quantifier, node.variable, node.sort, id(node.expr))
+        if isinstance(node, CountingQuantifierExpr):
+            return ("#", node.variable, node.sort, node.comparison, node.bound, id(node.expr))
+        msg = f"Unknown node type: {type(node)}"
+        raise ValueError(msg)
+
+    def _rebuild(self, node: Expr, children: List[Expr]) -> Expr:
+        if isinstance(node, NotExpr):
+            return NotExpr(children[0])
+        if isinstance(node, (AndExpr, OrExpr)):
+            return type(node)(*children)
+        if isinstance(node, ImpliesExpr):
+            return ImpliesExpr(*children)
+        if isinstance(node, QuantifierExpr):
+            return QuantifierExpr(node.quantifier, node.variable, children[0], node.sort)
+        return CountingQuantifierExpr(node.variable, children[0], node.comparison, node.bound, node.sort)
+
+    def _register(self, node: Expr) -> Expr:
+        """The canonical node for node, whose children must already be canonical."""
+        key = self._key(node)
+        canonical = self._table.get(key)
+        if canonical is None:
+            canonical = self._table[key] = node
+            # Canonical nodes are kept alive by the table, so their ids stay unique
+            self._canonical[id(node)] = (node, node)
+        return canonical
+
+    def intern(self, node: Expr) -> Expr:
+        """The canonical node structurally equal to node."""
+        known = self._canonical.get(id(node))
+        if known is not None and known[0] is node:
+            return known[1]
+        if isinstance(node, QuantifierBlockExpr):
+            canonical = self.intern(node.nested())
+        else:
+            children = list(iter_children(node))
+            canonical_children = [self.intern(child) for child in children]
+            if any(new is not old for new, old in zip(canonical_children, children)):
+                node_copy = self._rebuild(node, canonical_children)
+            else:
+                node_copy = node
+            canonical = self._register(node_copy)
+        self._canonical[id(node)] = (node, canonical)
+        return canonical
+
+    def free_variables(self, node: Expr) -> FrozenSet[str]:
+        """The free constants and variables of a canonical node."""
+        free = self._free.get(id(node))
+        if free is None:
+            if isinstance(node, (PredicateExpr, IdentityExpr)):
+                free = frozenset(
+                    symbol
+                    for term in node.terms
+                    for symbol in (term.symbols if isinstance(term, FunctionTerm) else (str(term),))
+                )
+            else:
+                free = frozenset().union(*(self.free_variables(child) for child in iter_children(node)))
+                if isinstance(node, (QuantifierExpr, CountingQuantifierExpr)):
+                    free = free - {node.variable}
+            self._free[id(node)] = free
+        return free
+
+    # Negation normal form
+
+    def nnf(self, node: Expr, positive: bool = True) -> Expr:
+        """
+        An equivalent formula (of the negation of node, if not positive) built from
+        literals with ∧, ∨ and quantifiers only.
+        """
+        node = self.intern(node)
+        key = (id(node), positive)
+        result = self._nnf.get(key)
+        if result is None:
+            result = self._nnf[key] = self._register_tree(self._to_nnf(node, positive))
+        return result
+
+    def _register_tree(self, node: Expr) -> Expr:
+        # Nodes built by the rewriting have canonical children, so interning is shallow
+        if isinstance(node, QuantifierBlockExpr):
+            return self.intern(node)
+        return self._register(node)
+
+    def _to_nnf(self, node: Expr, positive: bool) -> Expr:
+        if isinstance(node, IdentityExpr):
+            return node if positive else IdentityExpr(node.left, node.right, not node.negated)
+        if isinstance(node, ATOMS):
+            return node if positive else NotExpr(node)
+        if isinstance(node, NotExpr):
+            return self.nnf(node.expr, not positive)
+        if isinstance(node, (AndExpr, OrExpr)):
+            kind = type(node) if positive else OrExpr if isinstance(node, AndExpr) else AndExpr
+            return kind(*(self.nnf(operand, positive) for operand in node.operands))
+        if isinstance(node, ImpliesExpr):
+            if positive:
+                return OrExpr(self.nnf(node.left, False), self.nnf(node.right, True))
+            return AndExpr(self.nnf(node.left, True), self.nnf(node.right, False))
+        if isinstance(node, QuantifierExpr):
+            quantifier = node.quantifier if positive else "∃" if node.quantifier == "∀" else "∀"
+            return QuantifierExpr(quantifier, node.variable, self.nnf(node.expr, positive), node.sort)
+        if isinstance(node, CountingQuantifierExpr):
+            counting = self._register(
+                CountingQuantifierExpr(node.variable, self.nnf(node.expr), node.comparison, node.bound, node.sort)
+            )
+            return counting if positive else NotExpr(counting)
+        msg = f"Unknown node type: {type(node)}"
+        raise ValueError(msg)
+
+    # Skolemization
+
+    def _variable(self, depth: int) -> str:
+        while len(self.variable_names) <= depth:
+            self.variable_names.append(next(self._fresh_variables))
+        return self.variable_names[depth]
+
+    @staticmethod
+    def _term(term, env: Dict[str, object]):
+        if isinstance(term, FunctionTerm):
+            if not any(symbol in env for symbol in term.symbols):
+                return term
+            return FunctionTerm(term.name, tuple(NormalForm._term(arg, env) for arg in term.args))
+        return env.get(term, term)
+
+    def skolemize(self, node: Expr) -> Expr:
+        """An equisatisfiable formula without ∃, in negation normal form."""
+        return self._skolemize(self.nnf(node), {}, 0)
+
+    def _skolemize(self, node: Expr, env: Dict[str, object], depth: int) -> Expr:
+        free = sorted(self.free_variables(node))
+        key = (id(node), depth) + tuple(env.get(name) for name in free)
+        result = self._skolemized.get(key)
+        if result is not None:
+            return result
+
+        if isinstance(node, PredicateExpr):
+            terms = [self._term(term, env) for term in node.terms]
+            result = node if all(new is old for new, old in zip(terms, node.terms)) else PredicateExpr(node.name, terms)
+        elif isinstance(node, IdentityExpr):
+            left, right = self._term(node.left, env), self._term(node.right, env)
+            result = node if left is node.left and right is node.right else IdentityExpr(left, right, node.negated)
+        elif isinstance(node, SentenceLetterExpr):
+            result = node
+        elif isinstance(node, NotExpr):
+            atom = self._skolemize(node.expr, env, depth)
+            result = node if atom is node.expr else NotExpr(atom)
+        elif isinstance(node, (AndExpr, OrExpr)):
+            operands = [self._skolemize(operand, env, depth) for operand in node.operands]
+            if all(new is old for new, old in zip(operands, node.operands)):
+                result = node
+            else:
+                result = type(node)(*operands)
+        elif isinstance(node, QuantifierExpr) and node.quantifier == "∀":
+            variable = self._variable(depth)
+            body = self._skolemize(node.expr, {**env, node.variable: variable}, depth + 1)
+            result = QuantifierExpr("∀", variable, body, node.sort)
+        elif isinstance(node, QuantifierExpr):
+            symbol = self._skolem_symbols.get(id(node))
+            if symbol is None:
+                symbol = self._skolem_symbols[id(node)] = next(self.skolem_names)
+            args = tuple(env[name] for name in free if name in env)
+            witness = FunctionTerm(symbol, args) if args else symbol
+            result = self._skolemize(node.expr, {**env, node.variable: witness}, depth)
+        else:
+            msg = f"Counting quantifiers such as {node} cannot be Skolemized."
+            raise ValueError(msg)
+
+        result = self._register(result)
+        self._skolemized[key] = result
+        return result
+
+    # Definitional clause form
+
+    def _has_quantifier(self, node: Expr) -> bool:
+        return any(name in self.variable_names for name in self._bound(node))
+
+    def _bound(self, node: Expr) -> FrozenSet[str]:
+        bound = self._bound_variables.get(id(node))
+        if bound is None:
+            bound = frozenset().union(*(self._bound(child) for child in iter_children(node)))
+            if isinstance(node, QuantifierExpr):
+                bound = bound | {node.variable}
+            self._bound_variables[id(node)] = bound
+        return bound
+
+    def _define(self, node: Expr) -> Expr:
+        """A new atom that implies node, over the free variables of node."""
+        atom = self._definitions.get(id(node))
+        if atom is None:
+            variables = sorted(name for name in self.free_variables(node) if name in self.variable_names)
+            atom = self._definitions[id(node)] = self._register(PredicateExpr(next(self.definition_names), variables))
+            negated = self._register(NotExpr(atom))
+            self._pending.extend((negated,) + clause for clause in self._clauses_of(node))
+        return atom
+
+    def _clauses_of(self, node: Expr) -> List[Tuple[Expr, ...]]:
+        clauses = self._clauses.get(id(node))
+        if clauses is not None:
+            return clauses
+        if is_literal(node):
+            clauses = [(node,)]
+        elif isinstance(node, AndExpr):
+            clauses = [clause for operand in node.operands for clause in self._clauses_of(operand)]
+        elif isinstance(node, QuantifierExpr):
+            clauses = self._clauses_of(node.expr)
+        elif isinstance(node, OrExpr):
+            parts = []
+            for operand in node.operands:
+                if is_literal(operand):
+                    parts.append([(operand,)])
+                elif self._has_quantifier(operand):
+                    # Its variables must not meet those of the other operands in one clause
+                    parts.append([(self._define(operand),)])
+                else:
+                    parts.append(self._clauses_of(operand))
+            widest = max(range(len(parts)), key=lambda i: len(parts[i]))
+            prefix: Tuple[Expr, ...] = ()
+            for i, (operand, part) in enumerate(zip(node.operands, parts)):
+                if i == widest:
+                    continue
+                prefix += part[0] if len(part) == 1 else (self._define(operand),)
+            clauses = [prefix + clause for clause in parts[widest]]
+        else:
+            msg = f"{node} is not in Skolem normal form."
+            raise ValueError(msg)
+        self._clauses[id(node)] = clauses
+        return clauses
+
+    def clauses(self, node: Expr) -> List[Tuple[Expr, ...]]:
+        """
+        Clauses, as tuples of literals, that are satisfiable iff node is. The variables
+        of the clauses are the names in variable_names; every other term is a constant
+        or a Skolem term.
+        """
+        clauses = list(self._clauses_of(self.skolemize(node)))
+        clauses.extend(self._pending)
+        self._pending = []
+        return clauses
+
+
+def nnf(formula: Expr) -> Expr:
+    """The negation normal form of a formula."""
+    return NormalForm(symbol_names([formula])).nnf(formula)
+
+
+def skolemize(formula: Expr) -> Expr:
+    """The Skolem normal form of a formula, in negation normal form."""
+    return NormalForm(symbol_names([formula])).skolemize(formula)
+
+
+def definitional_cnf(formulas: Iterable[Expr]) -> Tuple[List[Tuple[Expr, ...]], List[str]]:
+    """The clauses of a set of formulas with definitions, and the names of their variables."""
+    formulas = list(formulas)
+    normal_form = NormalForm(symbol_names(formulas))
+    clauses = [clause for formula in formulas for clause in normal_form.clauses(formula)]
+    return clauses, normal_form.variable_names
@@ -5,7 +5,12 @@ import re
 Token = namedtuple("Token", ["type", "value"])
 
 TOKEN_REGEX = [
+    # Temporal operators, tried before single-letter variables
+    ("TEMPORAL", r"\b(next|always|eventually)\b"),
+    ("UNTIL", r"\buntil\b"),
+    ("COUNTING_QUANTIFIER", r"∃\s*[≥≤=]\s*\d+"),  # e.g. ∃≥3x, at least 3 objects
     ("QUANTIFIER", r"[∀∃]"),
+    ("SORT", r":\s*[A-Za-z_]\w*"),  # Sort annotation of a typed quantifier, e.g. ∀x:Person
     ("VARIABLE", r"[a-z]"),
     ("PREDICATE", r"[A-Z]"),
     ("LPAREN", r"\("),
@@ -14,8 +19,12 @@ TOKEN_REGEX = [
     ("OR", r"∨"),
     ("IMPLIES", r"→"),
     ("NOT", r"¬"),
+    ("MODAL", r"[□◇]"),  # Necessity and possibility
     ("EQUAL", r"="),
     ("NEQUAL", r"≠"),
+    ("COMPARISON", r"[<>≤≥]"),
+    ("COUNT", r"#"),  # Number of bindings of a variable, e.g. #x P(x) > 2
+    ("NUMBER", r"\d+"),
     ("COMMA", r","),
     ("WS", r"\s+"),  # Whitespace
     ("VARIABLE", r"\b[a-z]\b"),  # Single lowercase letter as a whole word
@@ -28,7 +37,13 @@ SYMBOL_REMAP = [
     (r"(\bimplies\b|=>|->|—>|→)", "→"),  # All implication symbols
     (r"(\band\b|&&|&)", "∧"),  # All AND symbols
     (r"(\bor\b|\|)", "∨"),  # All OR symbols
+    (r">=", "≥"),
+    (r"<=", "≤"),
+    (r"!=", "≠"),
     (r"(\bnot\b|!)", "¬"),  # All NOT symbols
+    (r"(\[\]|◻)", "□"),  # All necessity symbols
+    (r"(<>|◊|⋄)", "◇"),  # All possibility symbols
+    (r"(○|◯)", " next "),  # Temporal next
 ]
 
 SYMBOL_REMAP_REGEX = [
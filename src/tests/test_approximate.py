@@ -0,0 +1,71 @@
+import random
+
+from interpretation_function.constant import Constant
+from interpretation_function.intensional_predicate import IntensionalPredicate
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse, RangeDomain
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_evaluate import evaluate
+from syntax.ast_evaluate_approximate import evaluate_approximate
+from syntax.first_order_logic_syntax import Parser
+
+
+def random_formula(rng, depth, variables):
+    r = rng.random()
+    if depth == 0 or r < 0.3:
+        if rng.random() < 0.4:
+            return f"R({rng.choice(variables)}, {rng.choice(variables)})"
+        return f"{rng.choice('AB')}({rng.choice(variables)})"
+    if r < 0.45:
+        return f"¬({random_formula(rng, depth - 1, variables)})"
+    if r < 0.7:
+        variable = "xyz"[min(len(variables) - 1, 2)]
+        return f"{rng.choice('∀∃')}{variable}({random_formula(rng, depth - 1, variables + [variable])})"
+    operator = rng.choice(["∧", "∨", "→"])
+    return f"({random_formula(rng, depth - 1, variables)} {operator} {random_formula(rng, depth - 1, variables)})"
+
+
+def test_small_domains_are_swept_exactly():
+    rng = random.Random(0)
+    for _ in range(50):
+        objects = [f"o{i}" for i in range(rng.randint(1, 6))]
+        A, B, R = Predicate("A", 1), Predicate("B", 1), Predicate("R", 2)
+        for obj in objects:
+            if rng.random() < 0.5:
+                A.extend(obj)
+            if rng.random() < 0.5:
+                B.extend(obj)
+            for other in objects:
+                if rng.random() < 0.3:
+                    R.extend([obj, other])
+        interpretation = Interpretation().add_predicate(A).add_predicate(B).add_predicate(R)
+        interpretation.extend(Constant("c"), objects[0])
+        model = Model("M").with_domain(DomainOfDiscourse("D").expand(objects)).with_interpretation_function(interpretation)
+        formula = Parser(f"{rng.choice('∀∃')}x({random_formula(rng, 3, ['x', 'c'])})", model).parse()
+        result = evaluate_approximate(formula, model.I)
+        assert result.exact and result.value == evaluate(formula, model.I)
+
+
+def test_sampling_a_large_domain():
+    interpretation = (
+        Interpretation()
+        .add_predicate(IntensionalPredicate("L", 2, lambda x, y: x < y))
+        .add_predicate(IntensionalPredicate("E", 1, lambda x: x % 10 != 7))
+    )
+    model = Model("M").with_domain(RangeDomain(10**9)).with_interpretation_function(interpretation)
+
+    def approximate(formula):
+        return evaluate_approximate(Parser(formula, model).parse(), model.I, seed=1)
+
+    # A counterexample or a witness decides the quantifier for certain
+    counterexample = approximate("∀x(E(x))")
+    assert counterexample.value is False and counterexample.exact
+    witness = approximate("∃x(¬E(x))")
+    assert witness.value is True and witness.exact
+
+    estimated = approximate("∀x(E(x) ∨ ∃y(L(y, x)))")
+    assert estimated.value is True and not estimated.exact
+    low, high = estimated.estimates[0].interval
+    assert low < 1.0 == high
+    assert estimated.samples <= 10_000
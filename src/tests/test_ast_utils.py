@@ -0,0 +1,47 @@
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.evaluation_cache import EvaluationCache
+from semantics.model_finder import Signature, build_model
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import canonical_key, formula_digest
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+SHADOWED = "∀x∀y(P(x) → ∀x(∀y(R(x, y))))"
+RENAMED = "∀x∀y(P(x) → ∀x(∀z(R(x, x))))"
+
+
+def parse(formula: str):
+    return Parser(formula, M).parse()
+
+
+def test_canonical_key_ignores_bound_variable_names():
+    assert canonical_key(parse("∀x∃y(R(x, y))")) == canonical_key(parse("∀u∃v(R(u, v))"))
+    assert canonical_key(parse("∀x(P(x) ∧ Q(x))")) == canonical_key(parse("∀y(Q(y) ∧ P(y))"))
+
+
+def test_canonical_key_distinguishes_variables_by_binder():
+    assert canonical_key(parse("∀x∀y(R(x, y))")) != canonical_key(parse("∀x∀y(R(y, x))"))
+    assert canonical_key(parse("∀x∀y(R(x, y))")) != canonical_key(parse("∀x∀y(R(x, x))"))
+
+
+def test_shadowed_quantifiers_get_their_own_numbers():
+    assert formula_digest(parse(SHADOWED)) != formula_digest(parse(RENAMED))
+    assert formula_digest(parse("∀x(P(x) → ∀x(Q(x)))")) == formula_digest(parse("∀y(P(y) → ∀z(Q(z)))"))
+    assert formula_digest(parse("∀x(P(x) → ∀x(Q(x)))")) != formula_digest(parse("∀x(P(x) → ∀y(Q(x)))"))
+
+
+def test_cache_does_not_confuse_shadowed_quantifiers(tmp_path):
+    shadowed, renamed = parse(SHADOWED), parse(RENAMED)
+    signature = Signature([shadowed, renamed])
+    true_cells = [("P", (0,)), ("R", (0, 0)), ("R", (1, 1))]
+    model = build_model(signature, 2, {}, {}, true_cells)
+    assert evaluate(renamed, model.I) is True
+    assert evaluate(shadowed, model.I) is False
+
+    with EvaluationCache(tmp_path / "results.sqlite") as cache:
+        cache.attach(model)
+        assert evaluate(parse(RENAMED), model.I) is True
+        assert evaluate(parse(SHADOWED), model.I) is False
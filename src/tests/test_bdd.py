@@ -0,0 +1,68 @@
+import itertools
+import random
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.bdd import BDD
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+
+def random_formula(rng, depth, letters):
+    """A formula as a string and as a function of a valuation."""
+    if depth == 0 or rng.random() < 0.2:
+        letter = rng.choice(letters)
+        return letter, lambda valuation: valuation[letter]
+    if rng.random() < 0.2:
+        text, value = random_formula(rng, depth - 1, letters)
+        return f"¬{text}", lambda valuation: not value(valuation)
+    (left, left_value), (right, right_value) = (random_formula(rng, depth - 1, letters) for _ in range(2))
+    operator = rng.choice(["∧", "∨", "→"])
+    combine = {
+        "∧": lambda a, b: a and b,
+        "∨": lambda a, b: a or b,
+        "→": lambda a, b: not a or b,
+    }[operator]
+    return f"({left} {operator} {right})", lambda valuation: combine(left_value(valuation), right_value(valuation))
+
+
+def test_bdds_agree_with_truth_tables():
+    rng = random.Random(0)
+    for _ in range(60):
+        letters = list("PQRSTU")[: rng.randint(1, 6)]
+        formulas = [random_formula(rng, 5, letters) for _ in range(3)]
+        asts = [Parser(text, M).parse() for text, _ in formulas]
+        bdd = BDD.of(asts, rng.choice(["occurrence", "frequency", "alphabetical"]), cache_size=rng.choice([1, 4, 1024]))
+        for step in ("built", "sifted", "collected"):
+            if step == "sifted":
+                bdd.sift()
+            elif step == "collected":
+                bdd.collect_garbage()
+            valuations = [dict(zip(bdd.order, values)) for values in itertools.product([False, True], repeat=len(bdd.order))]
+            tables = [[value(valuation) for valuation in valuations] for _, value in formulas]
+            for ast, (_, value), table in zip(asts, formulas, tables):
+                root = bdd.roots[str(ast)]
+                assert bdd.count_models(root) == sum(table)
+                assert bdd.is_tautology(root) == all(table)
+                assignment = bdd.satisfying_assignment(root)
+                if assignment is None:
+                    assert not any(table)
+                else:
+                    # Letters off the path are free, so any completion satisfies the formula
+                    assert value({**dict.fromkeys(bdd.order, False), **assignment})
+            for (i, first), (j, second) in itertools.product(enumerate(asts), repeat=2):
+                assert (bdd.roots[str(first)] == bdd.roots[str(second)]) == (tables[i] == tables[j])
+
+
+def test_sifting_repairs_a_bad_variable_order():
+    formula = "(" + " ∨ ".join(f"({a} ∧ {b})" for a, b in zip("ABCDEF", "GHIJKL")) + ")"
+    ast = Parser(formula, M).parse()
+    bdd = BDD(list("ABCDEFGHIJKL"))
+    bdd.add(ast)
+    before = bdd.size()
+    bdd.sift()
+    assert bdd.size() < before
+    # Six independent pairs: 2^12 assignments minus the 3^6 that satisfy no pair
+    assert bdd.count_models(bdd.roots[str(ast)]) == 2**12 - 3**6
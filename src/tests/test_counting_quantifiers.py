@@ -0,0 +1,60 @@
+import random
+
+from interpretation_function.constant import Constant
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from modal_logic.sqlite_interpretation import SQLiteInterpretation
+from syntax.ast_evaluate import evaluate
+from syntax.ast_to_sql import evaluate_sql
+from syntax.first_order_logic_syntax import Parser
+
+
+COMPARISONS = {
+    "≥": lambda count, bound: count >= bound,
+    "≤": lambda count, bound: count <= bound,
+    "=": lambda count, bound: count == bound,
+    ">": lambda count, bound: count > bound,
+    "<": lambda count, bound: count < bound,
+    "≠": lambda count, bound: count != bound,
+}
+
+
+def test_counting_quantifiers_agree_with_counting_by_hand():
+    rng = random.Random(0)
+    for _ in range(40):
+        objects = [f"o{i}" for i in range(rng.randint(1, 6))]
+        A, R = Predicate("A", 1), Predicate("R", 2)
+        a = {obj for obj in objects if rng.random() < 0.5}
+        r = {(x, y) for x in objects for y in objects if rng.random() < 0.3}
+        for obj in a:
+            A.extend(obj)
+        for row in r:
+            R.extend(list(row))
+        interpretation = Interpretation().add_predicate(A).add_predicate(R).extend(Constant("c"), objects[0])
+        model = Model("M").with_domain(DomainOfDiscourse("D").expand(objects)).with_interpretation_function(interpretation)
+        stored = SQLiteInterpretation()
+        stored.add_objects(objects)
+        stored.add_predicate(A)
+        stored.add_predicate(R)
+        stored.add_constant(Constant("c"), objects[0])
+        stored_model = Model("S").with_interpretation_function(stored)
+
+        k, j = rng.randint(0, 4), rng.randint(0, 3)
+        comparison = rng.choice(["≥", "≤", "="])
+        inner = rng.choice(list(COMPARISONS))
+        cases = {
+            f"∃{comparison}{k}x(A(x) ∧ R(c, x))": COMPARISONS[comparison](
+                sum(x in a and (objects[0], x) in r for x in objects), k
+            ),
+            f"#x(R(x, x) ∨ ¬A(x)) {inner} {k}": COMPARISONS[inner](
+                sum((x, x) in r or x not in a for x in objects), k
+            ),
+            f"∀x(#y(R(x, y)) {inner} {j})": all(
+                COMPARISONS[inner](sum((x, y) in r for y in objects), j) for x in objects
+            ),
+        }
+        for formula, expected in cases.items():
+            assert evaluate(Parser(formula, model).parse(), model.I) == expected, formula
+            assert evaluate_sql(Parser(formula, stored_model).parse(), stored) == expected, formula
@@ -0,0 +1,53 @@
+import random
+
+from interpretation_function.derived_predicate import RuleSet
+from interpretation_function.nary_tuple import NaryTuple
+from interpretation_function.predicate import Predicate
+from modal_logic.interpretation import Interpretation
+
+
+CLOSURE = ["T(x, y) :- R(x, y)", "T(x, y) :- R(x, z), T(z, y)"]
+
+
+def transitive_closure(edges):
+    closure = set(edges)
+    while True:
+        new = {(a, d) for a, b in closure for c, d in closure if b == c} - closure
+        if not new:
+            return closure
+        closure |= new
+
+
+def closure_of(edges):
+    R = Predicate("R", 2)
+    for edge in edges:
+        R.extend(list(edge))
+    rule_set = RuleSet(CLOSURE)
+    Interpretation().add_predicate(R).add_rules(rule_set)
+    return R, rule_set.derived["T"]
+
+
+def test_transitive_closure_is_maintained_incrementally():
+    rng = random.Random(0)
+    for _ in range(50):
+        edges = [(f"o{rng.randrange(5)}", f"o{rng.randrange(5)}") for _ in range(8)]
+        R, T = closure_of(edges[:4])
+        assert T.extension == transitive_closure(edges[:4])
+        for edge in edges[4:]:
+            R.extend(list(edge))
+        assert T.extension == transitive_closure(edges)
+
+
+def test_derived_extension_after_replacing_a_base_tuple_in_place():
+    R, T = closure_of([("a", "b"), ("b", "c")])
+    assert T.extension == {("a", "b"), ("a", "c"), ("b", "c")}
+    R.true_for[1] = NaryTuple(["c", "a"])
+    assert T.extension == {("a", "b"), ("c", "a"), ("c", "b")}
+
+
+def test_derived_extension_after_remove_and_append():
+    R, T = closure_of([("a", "b"), ("b", "c")])
+    assert T.extension == {("a", "b"), ("a", "c"), ("b", "c")}
+    R.true_for.remove(R.true_for[1])
+    R.true_for.append(NaryTuple(["c", "a"]))
+    assert T.extension == {("a", "b"), ("c", "a"), ("c", "b")}
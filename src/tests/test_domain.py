@@ -0,0 +1,35 @@
+import random
+
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse, InternedDomain
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+def test_ids_are_dense_stable_and_never_reused():
+    domain = InternedDomain(["a", "b", "c"])
+    assert [domain.id_of(obj) for obj in "abc"] == [0, 1, 2]
+    assert domain.intern("b") == 1
+    domain.discard("b")
+    assert list(domain) == ["a", "c"] and "b" not in domain
+    assert domain.intern("d") == 3 and domain.object(3) == "d"
+    assert domain.bitset() == 0b1101
+
+
+def test_quantifiers_range_over_the_objects_left_after_a_restriction():
+    rng = random.Random(0)
+    for _ in range(30):
+        objects = [f"o{i}" for i in range(rng.randint(2, 6))]
+        edges = {(a, b) for a in objects for b in objects if rng.random() < 0.4}
+        R = Predicate("R", 2)
+        for edge in edges:
+            R.extend(list(edge))
+        domain = DomainOfDiscourse("D").expand(objects)
+        model = Model("M").with_domain(domain).with_interpretation_function(Interpretation().add_predicate(R))
+        formula = Parser("∀x(∃y(R(x, y)))", model).parse()
+        removed = rng.choice(objects)
+        domain.restrict(removed)
+        left = [obj for obj in objects if obj != removed]
+        assert evaluate(formula, model.I) == all(any((a, b) in edges for b in left) for a in left)
@@ -0,0 +1,49 @@
+from interpretation_function.nary_tuple import NaryTuple
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.evaluation_cache import EvaluationCache
+from semantics.model_finder import Signature, build_model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+
+def parse(formula: str):
+    return Parser(formula, M).parse()
+
+
+def model_of(formula, true_cells, n=2):
+    return build_model(Signature([formula]), n, {}, {}, true_cells)
+
+
+def test_results_persist_across_cache_objects(tmp_path):
+    formula = parse("∃x(P(x))")
+    with EvaluationCache(tmp_path / "results.sqlite") as cache:
+        assert evaluate(formula, cache.attach(model_of(formula, [("P", (1,))])).I) is True
+    with EvaluationCache(tmp_path / "results.sqlite") as cache:
+        assert evaluate(formula, cache.attach(model_of(formula, [("P", (1,))])).I) is True
+        assert cache.stats()["disk_hits"] == 1
+
+
+def test_content_digest_changes_with_in_place_edits():
+    model = model_of(parse("∀x(P(x))"), [("P", (0,))])
+    digest = model.I.content_digest()
+    P = model.I.predicates["P"]
+    P.true_for[0] = NaryTuple(["2"])
+    assert model.I.content_digest() != digest
+    P.true_for = [NaryTuple(["1"])]
+    assert model.I.content_digest() == digest
+
+
+def test_cache_sees_in_place_edits(tmp_path):
+    formula = parse("∀x(P(x))")
+    model = model_of(formula, [("P", (0,)), ("P", (1,))])
+    with EvaluationCache(tmp_path / "results.sqlite") as cache:
+        cache.attach(model)
+        assert evaluate(formula, model.I) is True
+        model.I.predicates["P"].true_for[1] = NaryTuple(["1"])
+        assert evaluate(formula, model.I) is False
+        model.I.predicates["P"].true_for.pop()
+        assert evaluate(formula, model.I) is False
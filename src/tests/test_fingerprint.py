@@ -0,0 +1,69 @@
+import itertools
+import random
+
+from modal_logic.fingerprint import fingerprint
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.model_finder import Signature, build_model
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+SIGNATURE = Signature([Parser("(F(a) ∧ R(a, f(a)) ∧ P)", M).parse()])
+
+
+def random_structure(rng, n, density):
+    constants = {"a": rng.randrange(n)}
+    functions = {("f", (i,)): rng.randrange(n) for i in range(n)}
+    cells = [("F", (i,)) for i in range(n) if rng.random() < density]
+    cells += [("R", (i, j)) for i in range(n) for j in range(n) if rng.random() < density]
+    if rng.random() < 0.5:
+        cells.append(("P",))
+    return n, constants, functions, cells
+
+
+def permuted(structure, permutation):
+    n, constants, functions, cells = structure
+    return (
+        n,
+        {name: permutation[obj] for name, obj in constants.items()},
+        {(name, tuple(permutation[arg] for arg in args)): permutation[obj] for (name, args), obj in functions.items()},
+        [cell if len(cell) == 1 else (cell[0], tuple(permutation[arg] for arg in cell[1])) for cell in cells],
+    )
+
+
+def key(structure):
+    n, constants, functions, cells = structure
+    return n, sorted(constants.items()), sorted(functions.items()), set(cells)
+
+
+def isomorphic(first, second):
+    return first[0] == second[0] and any(
+        key(permuted(first, permutation)) == key(second) for permutation in itertools.permutations(range(first[0]))
+    )
+
+
+def test_fingerprints_are_equal_exactly_for_isomorphic_models():
+    rng = random.Random(0)
+    for _ in range(100):
+        n = rng.randint(1, 4)
+        structure = random_structure(rng, n, rng.choice([0, 0.2, 0.5]))
+        permutation = list(range(n))
+        rng.shuffle(permutation)
+        expected = fingerprint(build_model(SIGNATURE, *structure))
+        assert fingerprint(build_model(SIGNATURE, *permuted(structure, permutation))) == expected
+        other = random_structure(rng, n, 0.3)
+        assert (fingerprint(build_model(SIGNATURE, *other)) == expected) == isomorphic(structure, other)
+
+
+def test_simple_graphs_on_four_vertices():
+    signature = Signature([Parser("∀x(∀y(R(x, y)))", M).parse()])
+    pairs = list(itertools.combinations(range(4), 2))
+    fingerprints = set()
+    for edges in itertools.product([False, True], repeat=len(pairs)):
+        cells = [("R", pair) for pair, edge in zip(pairs, edges) if edge]
+        cells += [("R", (j, i)) for _, (i, j) in cells]
+        fingerprints.add(fingerprint(build_model(signature, 4, {}, {}, cells)))
+    # There are 11 simple graphs on four vertices up to isomorphism
+    assert len(fingerprints) == 11
@@ -0,0 +1,70 @@
+import random
+
+from interpretation_function.constant import Constant
+from interpretation_function.function import Function
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.herbrand import HerbrandUniverse, herbrand_signature
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+def test_function_terms_agree_with_their_tables():
+    rng = random.Random(0)
+    for _ in range(20):
+        objects = list(range(rng.randint(1, 6)))
+        g = {(obj,): rng.choice(objects) for obj in objects}
+        p = {obj for obj in objects if rng.random() < 0.5}
+        P = Predicate("P", 1)
+        for obj in p:
+            P.extend([obj])
+        interpretation = Interpretation().add_predicate(P).add_function(Function("g", 1, dict(g)))
+        interpretation.extend(Constant("c"), objects[-1])
+        model = Model("M").with_domain(DomainOfDiscourse("D").expand(objects)).with_interpretation_function(interpretation)
+        formula = Parser("∃x(P(g(g(x))) ∧ ¬P(g(c)))", model).parse()
+
+        def expected():
+            return any(g[(g[(x,)],)] in p for x in objects) and g[(objects[-1],)] not in p
+
+        assert evaluate(formula, model.I) == expected()
+        changed = rng.choice(objects)
+        g[(changed,)] = interpretation.functions["g"][(changed,)] = rng.choice(objects)
+        assert evaluate(formula, model.I) == expected()
+
+
+def test_terms_without_the_quantified_variable_are_computed_once():
+    calls = []
+
+    def add(a, b):
+        calls.append((a, b))
+        return (a + b) % 7
+
+    E = Predicate("E", 2)
+    for obj in range(7):
+        E.extend([obj, obj])
+    interpretation = Interpretation().add_predicate(E).add_function(Function("f", 2, compute=add))
+    interpretation.add_function(Function("g", 1, {(obj,): obj * 3 % 7 for obj in range(7)}))
+    interpretation.extend(Constant("c"), 2)
+    model = Model("M").with_domain(DomainOfDiscourse("D").expand(list(range(7)))).with_interpretation_function(interpretation)
+    assert evaluate(Parser("∀x∀y(E(f(g(c), x), f(x, g(c))))", model).parse(), model.I) is True
+    # Once per object for each of the two terms, not once per pair of objects
+    assert len(calls) == 2 * 7
+
+
+def test_herbrand_universe_by_depth():
+    universe = HerbrandUniverse(["c", "d"], {"f": 2, "g": 1}, max_depth=2)
+    levels = [len(level) for level in universe.levels()]
+    # Depth 1: g over 2 constants and f over 2 × 2; depth 2: g over the 6 new terms
+    # and f over the 8 terms up to depth 1 minus the 4 pairs of constants
+    assert levels == [2, 2 + 4, 6 + 8 * 8 - 4]
+    terms = universe.terms()
+    assert len(terms) == len(set(terms)) == sum(levels)
+    assert len(HerbrandUniverse(["c"], {"f": 2}, max_depth=10, max_terms=1000).terms()) == 1000
+
+
+def test_herbrand_signature_of_a_formula():
+    model = Model("M").with_interpretation_function(Interpretation())
+    formula = Parser("∀x(P(f(x, g(c))) ∨ E(x, d))", model).parse()
+    assert herbrand_signature(formula, bound=["x"]) == (["c", "d"], {"f": 2, "g": 1})
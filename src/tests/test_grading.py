@@ -0,0 +1,28 @@
+from semantics.grading import EQUIVALENT, NOT_EQUIVALENT, Grader, ModelSpec
+
+
+REFERENCE = "∀x(P(x) → Q(x))"
+SUBMISSIONS = ["∀y(¬P(y) ∨ Q(y))", "∀x(Q(x) → P(x))", "∃x(P(x))"]
+
+
+def test_grades_submissions():
+    results = Grader(workers=1).grade(REFERENCE, SUBMISSIONS)
+    assert [result.status for result in results] == [EQUIVALENT, NOT_EQUIVALENT, NOT_EQUIVALENT]
+
+
+def test_graders_with_different_suites_in_one_process():
+    first = Grader(max_size=3, workers=1).grade(REFERENCE, SUBMISSIONS)
+    second = Grader(max_size=2, n_random=7, seed=5, workers=1).grade(REFERENCE, SUBMISSIONS)
+    assert [result.status for result in first] == [result.status for result in second]
+
+
+def test_suite_digest_changes_as_the_suite_grows():
+    grader = Grader(max_size=1, n_random=0, workers=1, search_size=0)
+    suite = grader.suite(REFERENCE)
+    digest = suite.digest
+    assert grader.grade(REFERENCE, ["∃x(P(x) → Q(x))"])[0].status == EQUIVALENT
+
+    # A structure of two objects in which the reference is false separates the submission
+    assert suite.add([ModelSpec(2, {}, {}, [("P", (1,))])]) == 1
+    assert suite.digest != digest
+    assert grader.grade(REFERENCE, ["∃x(P(x) → Q(x))"])[0].status == NOT_EQUIVALENT
@@ -0,0 +1,52 @@
+import itertools
+import random
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.grounding import find_model_sat
+from semantics.model_finder import Signature, build_model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+
+def random_formula(rng, depth, variables):
+    r = rng.random()
+    if depth == 0 or r < 0.3:
+        if rng.random() < 0.5:
+            return f"R({rng.choice(variables)}, {rng.choice(variables)})"
+        return f"F({rng.choice(variables)})"
+    if r < 0.45:
+        return f"¬({random_formula(rng, depth - 1, variables)})"
+    if r < 0.7:
+        variable = "xyz"[min(len(variables) - 1, 2)]
+        return f"{rng.choice('∀∃')}{variable}({random_formula(rng, depth - 1, variables + [variable])})"
+    if r < 0.8:
+        return f"(∃≥2x(F(x)) ∨ {random_formula(rng, depth - 1, variables)})"
+    operator = rng.choice(["∧", "∨", "→"])
+    return f"({random_formula(rng, depth - 1, variables)} {operator} {random_formula(rng, depth - 1, variables)})"
+
+
+def models_up_to_two_objects():
+    signature = Signature([Parser("F(a) ∧ R(a, a)", M).parse()])
+    for n in (1, 2):
+        cells = [("F", (i,)) for i in range(n)] + [("R", args) for args in itertools.product(range(n), repeat=2)]
+        for values in itertools.product([False, True], repeat=len(cells)):
+            true_cells = [cell for cell, value in zip(cells, values) if value]
+            for a in range(n):
+                yield build_model(signature, n, {"a": a}, {}, true_cells)
+
+
+def test_models_through_sat_agree_with_enumeration():
+    rng = random.Random(0)
+    models = list(models_up_to_two_objects())
+    for _ in range(20):
+        formulas = [Parser(random_formula(rng, 3, ["a"]), M).parse() for _ in range(rng.randint(1, 3))]
+        expected = any(all(evaluate(formula, model.I) for formula in formulas) for model in models)
+        for lazy in (True, False):
+            model = find_model_sat(formulas, 2, lazy=lazy)
+            assert (model is not None) == expected
+            if model is not None:
+                assert all(evaluate(formula, model.I) for formula in formulas)
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.kripke import KripkeModel
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    ImpliesExpr,
+    ModalExpr,
+    NotExpr,
+    OrExpr,
+    Parser,
+    SentenceLetterExpr,
+)
+
+
+def random_formula(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return SentenceLetterExpr(rng.choice("PQ"))
+    kind = rng.randrange(5)
+    if kind == 0:
+        return NotExpr(random_formula(rng, depth - 1))
+    if kind == 1:
+        return AndExpr(random_formula(rng, depth - 1), random_formula(rng, depth - 1))
+    if kind == 2:
+        return OrExpr(random_formula(rng, depth - 1), random_formula(rng, depth - 1))
+    if kind == 3:
+        return ImpliesExpr(random_formula(rng, depth - 1), random_formula(rng, depth - 1))
+    return ModalExpr(rng.choice("□◇"), random_formula(rng, depth - 1))
+
+
+def holds_at(node, world, edges, true):
+    """The truth value of a propositional modal formula at one world, by the definitions."""
+    if isinstance(node, SentenceLetterExpr):
+        return world in true[node.letter]
+    if isinstance(node, NotExpr):
+        return not holds_at(node.expr, world, edges, true)
+    if isinstance(node, AndExpr):
+        return all(holds_at(operand, world, edges, true) for operand in node.operands)
+    if isinstance(node, OrExpr):
+        return any(holds_at(operand, world, edges, true) for operand in node.operands)
+    if isinstance(node, ImpliesExpr):
+        return not holds_at(node.left, world, edges, true) or holds_at(node.right, world, edges, true)
+    values = [holds_at(node.expr, v, edges, true) for u, v in edges if u == world]
+    return all(values) if node.operator == "□" else any(values)
+
+
+def test_satisfaction_sets_agree_with_a_check_at_each_world():
+    rng = random.Random(0)
+    for _ in range(200):
+        n = rng.randint(1, 8)
+        edges = {(rng.randrange(n), rng.randrange(n)) for _ in range(rng.randint(0, 2 * n))}
+        true = {letter: {w for w in range(n) if rng.random() < 0.5} for letter in "PQ"}
+        model = KripkeModel()
+        model.add_worlds(range(n))
+        model.add_edges(edges)
+        for letter, worlds in true.items():
+            model.set_true(letter, worlds)
+        formula = random_formula(rng, 5)
+        assert model.satisfying_worlds(formula) == [w for w in range(n) if holds_at(formula, w, edges, true)]
+
+
+@pytest.mark.parametrize(
+    "formula, worlds",
+    [
+        ("([]P -> <>P) ∧ ◇□P", ["u", "v", "w"]),
+        ("∀x(F(x))", ["w"]),
+        ("◇∀x(F(x))", ["v", "w"]),
+        ("∃x(□F(x))", ["u", "v", "w"]),
+        ("∀x(◇F(x))", ["v", "w"]),
+        ("□(∀x(F(x)))", ["v", "w"]),
+    ],
+)
+def test_predicates_that_differ_between_worlds(formula, worlds):
+    model = KripkeModel()
+    model.add_edges([("u", "v"), ("v", "w"), ("w", "w")])
+    model.set_true("P", ["v", "w"])
+    model.I.set_domain(DomainOfDiscourse().bulk_expand(["1", "2"]))
+    model.I.add_predicate(Predicate("F", 1).extend("1"))
+    model.set_predicate("w", Predicate("F", 1).extend("1").extend("2"))
+    assert model.satisfying_worlds(Parser(formula, model).parse()) == worlds
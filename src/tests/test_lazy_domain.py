@@ -0,0 +1,51 @@
+import random
+
+from interpretation_function.constant import Constant
+from interpretation_function.intensional_predicate import IntensionalPredicate
+from modal_logic.domain import GeneratorDomain, RangeDomain
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+FORMULAS = {
+    "∃x(L(c, x) ∧ D(c, x))": lambda n, c: any(c < x and c != 0 and x % c == 0 for x in range(n)),
+    "∀x(E(x) ∨ L(x, c))": lambda n, c: all(x % 2 == 0 or x < c for x in range(n)),
+    "∃x(L(x, c) ∧ ∀y(L(y, x) → E(y)))": lambda n, c: any(
+        x < c and all(y % 2 == 0 for y in range(n) if y < x) for x in range(n)
+    ),
+    "∀x(∃y(L(x, y)))": lambda n, c: n == 0,
+}
+
+
+def range_model(n, c):
+    interpretation = (
+        Interpretation()
+        .add_predicate(IntensionalPredicate("L", 2, lambda x, y: x < y))
+        .add_predicate(IntensionalPredicate("D", 2, lambda x, y: x != 0 and y % x == 0, cost=3))
+        .add_predicate(
+            IntensionalPredicate("E", 1, lambda x: x % 2 == 0, vectorized=lambda rows: [row[0] % 2 == 0 for row in rows])
+        )
+        .extend(Constant("c"), c)
+    )
+    return Model("M").with_domain(RangeDomain(n)).with_interpretation_function(interpretation)
+
+
+def test_callable_predicates_over_a_range_agree_with_python():
+    rng = random.Random(0)
+    for _ in range(10):
+        n = rng.randint(1, 16)
+        c = rng.randrange(n)
+        model = range_model(n, c)
+        for formula, expected in FORMULAS.items():
+            assert evaluate(Parser(formula, model).parse(), model.I) == expected(n, c), formula
+
+
+def test_generator_domain_is_iterated_afresh_for_every_quantifier():
+    domain = GeneratorDomain(lambda: (i * i for i in range(10)), contains=lambda obj: int(obj**0.5) ** 2 == obj)
+    assert len(domain) == 10 and 81 in domain and 80 not in domain
+    interpretation = Interpretation().add_predicate(IntensionalPredicate("L", 2, lambda x, y: x < y))
+    model = Model("M").with_domain(domain).with_interpretation_function(interpretation)
+    assert evaluate(Parser("∀x(∃y(L(x, y) ∨ ∀z(¬L(x, z))))", model).parse(), model.I) is True
+    assert evaluate(Parser("∀x(∃y(L(x, y)))", model).parse(), model.I) is False
@@ -0,0 +1,77 @@
+import itertools
+
+import pytest
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.model_finder import Signature, build_model, find_counter_model, find_model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+
+def parse(formula: str):
+    return Parser(formula, M).parse()
+
+
+def models_of_size(signature, n):
+    """Every interpretation of the predicates of the signature over n objects."""
+    cells = [
+        (name, args)
+        for name, arity in sorted(signature.predicates.items())
+        for args in itertools.product(range(n), repeat=arity)
+    ]
+    for values in itertools.product([False, True], repeat=len(cells)):
+        yield build_model(signature, n, {}, {}, [cell for cell, value in zip(cells, values) if value])
+
+
+@pytest.mark.parametrize(
+    "formulas",
+    [
+        ["∃x(P(x))", "∃x(¬P(x))"],
+        ["∀x(∃y(R(x, y)))", "∀x(¬R(x, x))"],
+        ["∀x(∃y(R(x, y) ∧ ¬P(y)))", "∃x(P(x))", "∀x(R(x, x) → P(x))"],
+        ["∀x(∀y(R(x, y) → R(y, x)))", "∃x(∃y(R(x, y) ∧ ¬R(x, x)))"],
+        ["∀x(P(x) ∧ ¬P(x))"],
+    ],
+)
+def test_models_found_are_the_smallest(formulas):
+    asts = [parse(formula) for formula in formulas]
+    signature = Signature(asts)
+    smallest = next(
+        (
+            n
+            for n in (1, 2)
+            if any(all(evaluate(ast, model.I) for ast in asts) for model in models_of_size(signature, n))
+        ),
+        None,
+    )
+    model = find_model(asts, max_size=2)
+    if smallest is None:
+        assert model is None
+    else:
+        assert len(model.I.domain) == smallest
+        assert all(evaluate(ast, model.I) for ast in asts)
+
+
+@pytest.mark.parametrize(
+    "premises, conclusion",
+    [
+        (["∀y(∃x(R(x, y)))"], "∃x(∀y(R(x, y)))"),
+        (["∃x(F(x))"], "∀x(F(x))"),
+        (["∀x(f(f(x)) = x)"], "∀x(f(x) = x)"),
+        (["∃≥3x(F(x))"], "∃≥4x(F(x))"),
+        (["A(c)", "B(c)"], "∀x(A(x) → B(x))"),
+    ],
+)
+def test_counter_models_of_invalid_arguments(premises, conclusion):
+    model = find_counter_model([parse(premise) for premise in premises], parse(conclusion))
+    assert model is not None
+    assert all(evaluate(parse(premise), model.I) for premise in premises)
+    assert not evaluate(parse(conclusion), model.I)
+
+
+def test_no_counter_model_of_a_valid_formula():
+    assert find_model([parse("¬(∀x(F(x) → G(x)) → (∀x(F(x)) → ∀x(G(x))))")], max_size=4) is None
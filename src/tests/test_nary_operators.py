@@ -0,0 +1,56 @@
+import random
+
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import get_nodes_by_level
+from syntax.first_order_logic_syntax import AndExpr, OrExpr, Parser, QuantifierBlockExpr, QuantifierExpr
+
+
+def random_model(rng, n):
+    objects = [f"o{i}" for i in range(n)]
+    P, R = Predicate("P", 1), Predicate("R", 2)
+    p = {obj for obj in objects if rng.random() < 0.6}
+    r = {(x, y) for x in objects for y in objects if rng.random() < 0.4}
+    for obj in p:
+        P.extend(obj)
+    for row in r:
+        R.extend(list(row))
+    interpretation = Interpretation().add_predicate(P).add_predicate(R)
+    model = Model("M").with_domain(DomainOfDiscourse("D").expand(objects)).with_interpretation_function(interpretation)
+    return model, objects, p, r
+
+
+def test_chains_of_and_and_or_parse_into_one_node():
+    model, *_ = random_model(random.Random(0), 2)
+    conjunction = Parser("∀x(" + " ∧ ".join(["P(x)"] * 500) + ")", model).parse()
+    assert isinstance(conjunction.expr, AndExpr) and len(conjunction.expr.operands) == 500
+    assert len(get_nodes_by_level(conjunction)) == 3
+    disjunction = Parser("(P(a) ∨ P(b) ∨ (P(c) ∨ P(d)))", model).parse()
+    assert isinstance(disjunction, OrExpr) and len(disjunction.operands) == 4
+
+
+def test_quantifier_blocks_agree_with_nested_quantifiers():
+    rng = random.Random(1)
+    for _ in range(15):
+        model, objects, p, r = random_model(rng, rng.randint(1, 4))
+        cases = {
+            "∀x∀y∀z(R(x, y) ∧ R(y, z) → R(x, z))": all(
+                (x, z) in r for x in objects for y in objects for z in objects if (x, y) in r and (y, z) in r
+            ),
+            "∃x∃y(R(x, y) ∧ R(y, x) ∧ P(x) ∧ ¬P(y))": any(
+                (x, y) in r and (y, x) in r and x in p and y not in p for x in objects for y in objects
+            ),
+            "∀x∃y∃z(R(x, y) ∨ R(z, x) ∨ P(z))": all(
+                any((x, y) in r or (z, x) in r or z in p for y in objects for z in objects) for x in objects
+            ),
+        }
+        for formula, expected in cases.items():
+            ast = Parser(formula, model).parse()
+            assert evaluate(ast, model.I) == expected, formula
+            if isinstance(ast, QuantifierBlockExpr):
+                assert isinstance(ast.nested(), QuantifierExpr)
+                assert evaluate(ast.nested(), model.I) == expected
+                assert str(Parser(str(ast), model).parse()) == str(ast)
@@ -0,0 +1,133 @@
+import itertools
+import random
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.grounding import find_model_sat
+from semantics.model_finder import Signature, build_model
+from syntax.ast_evaluate import evaluate
+from syntax.ast_utils import iter_children
+from syntax.first_order_logic_syntax import (
+    IdentityExpr,
+    ImpliesExpr,
+    NotExpr,
+    Parser,
+    PredicateExpr,
+    QuantifierBlockExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+)
+from syntax.normal_form import definitional_cnf, nnf, skolemize
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+ATOMS = (SentenceLetterExpr, PredicateExpr, IdentityExpr)
+
+
+def parse(formula: str):
+    return Parser(formula, M).parse()
+
+
+def random_formula(rng, depth, variables):
+    r = rng.random()
+    if depth == 0 or r < 0.3:
+        if rng.random() < 0.5:
+            return f"R({rng.choice(variables)}, {rng.choice(variables)})"
+        return f"F({rng.choice(variables)})"
+    if r < 0.45:
+        return f"¬({random_formula(rng, depth - 1, variables)})"
+    if r < 0.7:
+        variable = "xyz"[min(len(variables) - 1, 2)]
+        return f"{rng.choice('∀∃')}{variable}({random_formula(rng, depth - 1, variables + [variable])})"
+    operator = rng.choice(["∧", "∨", "→"])
+    return f"({random_formula(rng, depth - 1, variables)} {operator} {random_formula(rng, depth - 1, variables)})"
+
+
+def random_letters_formula(rng, depth, letters):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(letters)
+    if rng.random() < 0.2:
+        return f"¬{random_letters_formula(rng, depth - 1, letters)}"
+    operator = rng.choice(["∧", "∨", "→"])
+    return f"({random_letters_formula(rng, depth - 1, letters)} {operator} {random_letters_formula(rng, depth - 1, letters)})"
+
+
+def models_up_to_two_objects():
+    signature = Signature([parse("F(a) ∧ R(a, a)")])
+    for n in (1, 2):
+        cells = [("F", (i,)) for i in range(n)] + [("R", args) for args in itertools.product(range(n), repeat=2)]
+        for values in itertools.product([False, True], repeat=len(cells)):
+            true_cells = [cell for cell, value in zip(cells, values) if value]
+            for a in range(n):
+                yield build_model(signature, n, {"a": a}, {}, true_cells)
+
+
+def nodes(formula):
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(iter_children(node))
+
+
+def test_nnf_is_equivalent_and_negates_only_atoms():
+    rng = random.Random(0)
+    models = list(models_up_to_two_objects())
+    for _ in range(15):
+        formula = parse(random_formula(rng, 4, ["a"]))
+        normal = nnf(formula)
+        for node in nodes(normal):
+            assert not isinstance(node, ImpliesExpr)
+            assert not isinstance(node, NotExpr) or isinstance(node.expr, ATOMS)
+        for model in rng.sample(models, 20):
+            assert evaluate(normal, model.I) == evaluate(formula, model.I)
+
+
+def test_skolemization_preserves_the_sizes_of_models():
+    rng = random.Random(1)
+    models = list(models_up_to_two_objects())
+    for _ in range(15):
+        formula = parse(random_formula(rng, 3, ["a"]))
+        skolem = skolemize(formula)
+        for node in nodes(skolem):
+            if isinstance(node, (QuantifierExpr, QuantifierBlockExpr)):
+                assert node.quantifier == "∀"
+        # Over n objects the Skolem functions exist iff the witnesses do
+        model = find_model_sat([skolem], 2)
+        assert (model is not None) == any(evaluate(formula, candidate.I) for candidate in models)
+        if model is not None:
+            assert evaluate(formula, model.I)
+
+
+def test_definitional_cnf_is_equisatisfiable_on_the_original_letters():
+    rng = random.Random(2)
+    for _ in range(40):
+        letters = list("PQRS")[: rng.randint(1, 4)]
+        formula = parse(random_letters_formula(rng, 4, letters))
+        clauses, _ = definitional_cnf([formula])
+        # Definitions are nullary atoms D1(), D2(), ... next to the sentence letters
+        variables = sorted(
+            {str(literal.expr if isinstance(literal, NotExpr) else literal) for clause in clauses for literal in clause}
+            | set(letters)
+        )
+
+        def holds(literal, valuation):
+            if isinstance(literal, NotExpr):
+                return not valuation[str(literal.expr)]
+            return valuation[str(literal)]
+
+        projections = set()
+        for values in itertools.product([False, True], repeat=len(variables)):
+            valuation = dict(zip(variables, values))
+            if all(any(holds(literal, valuation) for literal in clause) for clause in clauses):
+                projections.add(tuple(valuation[letter] for letter in letters))
+
+        interpretation = Interpretation()
+        models = set()
+        for values in itertools.product([False, True], repeat=len(letters)):
+            for letter, value in zip(letters, values):
+                interpretation.add_truth_value(letter, value)
+            if evaluate(formula, interpretation):
+                models.add(values)
+        assert projections == models
@@ -0,0 +1,56 @@
+from interpretation_function.nary_tuple import NaryTuple
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import InternedDomain
+
+
+def test_extension_catches_up_with_appends():
+    P = Predicate("P", 1).extend("o0")
+    assert P.extension == {("o0",)}
+    P.extend("o1")
+    P.true_for.append(NaryTuple(["o2"]))
+    assert P.extension == {("o0",), ("o1",), ("o2",)}
+
+
+def test_extension_after_replacing_true_for():
+    P = Predicate("P", 1).extend("o0")
+    assert ("o0",) in P.extension
+    P.true_for = [NaryTuple(["o1"])]
+    assert P.extension == {("o1",)}
+    P.true_for = [NaryTuple(["o2"]), NaryTuple(["o3"])]
+    assert P.extension == {("o2",), ("o3",)}
+
+
+def test_extension_after_editing_true_for_in_place():
+    P = Predicate("P", 1).extend("o0").extend("o1")
+    assert P.extension == {("o0",), ("o1",)}
+    P.true_for[0] = NaryTuple(["o2"])
+    assert P.extension == {("o2",), ("o1",)}
+    P.true_for.pop()
+    assert P.extension == {("o2",)}
+    P.true_for.clear()
+    assert P.extension == set()
+
+
+def test_id_extension_after_replacing_true_for():
+    domain = InternedDomain()
+    for obj in ("o0", "o1"):
+        domain.intern(obj)
+    P = Predicate("P", 1).extend("o0")
+    assert P.id_extension(domain) == {(0,)}
+    P.true_for = [NaryTuple(["o1"])]
+    assert P.id_extension(domain) == {(1,)}
+    assert P.id_bitset(domain) == 0b10
+
+
+def test_id_extension_after_an_edit_that_keeps_the_length():
+    domain = InternedDomain()
+    for obj in ("o0", "o1", "o2"):
+        domain.intern(obj)
+    P = Predicate("P", 1).extend("o0").extend("o1")
+    assert P.id_extension(domain) == {(0,), (1,)}
+    P.true_for.remove(P.true_for[0])
+    P.extend("o2")
+    assert P.id_extension(domain) == {(1,), (2,)}
+    P.true_for.sort(key=lambda nary_tuple: nary_tuple.terms, reverse=True)
+    assert [tuple(nary_tuple.terms) for nary_tuple in P.true_for] == [("o2",), ("o1",)]
+    assert P.id_bitset(domain) == 0b110
@@ -0,0 +1,79 @@
+import itertools
+import random
+
+import pytest
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from proof_theory.resolution import SATURATED, prove, refute
+from proof_theory.tableau import satisfiable
+from semantics.model_finder import Signature, build_model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+
+def parse(formula: str):
+    return Parser(formula, M).parse()
+
+
+def random_formula(rng, depth, variables):
+    r = rng.random()
+    if depth == 0 or r < 0.3:
+        if rng.random() < 0.5:
+            return f"R({rng.choice(variables)}, {rng.choice(variables)})"
+        return f"F({rng.choice(variables)})"
+    if r < 0.45:
+        return f"¬({random_formula(rng, depth - 1, variables)})"
+    if r < 0.7:
+        variable = "xyz"[min(len(variables) - 1, 2)]
+        return f"{rng.choice('∀∃')}{variable}({random_formula(rng, depth - 1, variables + [variable])})"
+    operator = rng.choice(["∧", "∨", "→"])
+    return f"({random_formula(rng, depth - 1, variables)} {operator} {random_formula(rng, depth - 1, variables)})"
+
+
+def models_up_to_two_objects():
+    signature = Signature([parse("F(a) ∧ R(a, a)")])
+    for n in (1, 2):
+        cells = [("F", (i,)) for i in range(n)] + [("R", args) for args in itertools.product(range(n), repeat=2)]
+        for values in itertools.product([False, True], repeat=len(cells)):
+            true_cells = [cell for cell, value in zip(cells, values) if value]
+            for a in range(n):
+                yield build_model(signature, n, {"a": a}, {}, true_cells)
+
+
+def test_refutations_agree_with_models_and_tableaux():
+    rng = random.Random(0)
+    models = list(models_up_to_two_objects())
+    for _ in range(25):
+        formulas = [parse(random_formula(rng, 3, ["a"])) for _ in range(rng.randint(1, 3))]
+        result = refute(formulas, max_clauses=5000, time_budget=2)
+        if any(all(evaluate(formula, model.I) for formula in formulas) for model in models):
+            assert not result.proved
+        if satisfiable(formulas, max_nodes=3000).closed:
+            assert result.proved
+
+
+@pytest.mark.parametrize(
+    "premises, conclusion",
+    [
+        (["∀x(F(x) → R(x, x))", "F(a)"], "∃y(R(y, y))"),
+        ([], "∃x(F(x) → ∀y(F(y)))"),
+        (
+            ["∀x(∀y(R(x, y) → R(y, x)))", "∀x(∀y(∀z((R(x, y) ∧ R(y, z)) → R(x, z))))", "∀x(∃y(R(x, y)))"],
+            "∀x(R(x, x))",
+        ),
+        (["a = b", "F(a)"], "F(b)"),
+        (["∀x(f(x) = x)"], "F(f(f(a))) ∨ ¬F(a)"),
+    ],
+)
+def test_proves_valid_arguments(premises, conclusion):
+    result = prove(parse(conclusion), [parse(premise) for premise in premises])
+    assert result.proved
+    assert result.proof[-1].literals == ()
+
+
+def test_saturates_on_satisfiable_clauses():
+    assert refute([parse("F(a)"), parse("∀x(F(x) → R(x, a))")]).status == SATURATED
@@ -0,0 +1,51 @@
+import itertools
+import random
+
+from semantics.sat_solver import SATSolver, luby
+
+
+def satisfiable_by_brute_force(n, clauses):
+    return any(
+        all(any(values[abs(literal) - 1] == (literal > 0) for literal in clause) for clause in clauses)
+        for values in itertools.product([False, True], repeat=n)
+    )
+
+
+def random_clauses(rng, n, m, width=3):
+    return [[rng.choice([-1, 1]) * rng.randint(1, n) for _ in range(rng.randint(1, width))] for _ in range(m)]
+
+
+def test_luby_sequence():
+    assert [luby(i) for i in range(1, 16)] == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+
+
+def test_solver_agrees_with_brute_force_including_incremental_clauses():
+    rng = random.Random(0)
+    for _ in range(300):
+        n = rng.randint(1, 10)
+        clauses = random_clauses(rng, n, rng.randint(1, 5 * n))
+        solver = SATSolver()
+        for clause in clauses:
+            solver.add_clause(clause)
+        while solver.n_vars < n:
+            solver.new_var()
+        satisfiable = solver.solve()
+        assert satisfiable == satisfiable_by_brute_force(n, clauses)
+        if satisfiable:
+            assert all(any(solver.value(literal) for literal in clause) for clause in clauses)
+            more = random_clauses(rng, n, 5)
+            for clause in more:
+                solver.add_clause(clause)
+            assert solver.solve() == satisfiable_by_brute_force(n, clauses + more)
+
+
+def test_pigeonhole_is_unsatisfiable():
+    pigeons, holes = 6, 5
+    solver = SATSolver()
+    variable = lambda pigeon, hole: pigeon * holes + hole + 1
+    for pigeon in range(pigeons):
+        solver.add_clause([variable(pigeon, hole) for hole in range(holes)])
+    for hole in range(holes):
+        for a, b in itertools.combinations(range(pigeons), 2):
+            solver.add_clause([-variable(a, hole), -variable(b, hole)])
+    assert solver.solve() is False
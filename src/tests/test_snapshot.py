@@ -0,0 +1,46 @@
+import pytest
+
+from interpretation_function.constant import Constant
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.fingerprint import fingerprint
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from modal_logic.snapshot import Snapshot, write_snapshot
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+def model_over(objects, rows):
+    interpretation = Interpretation().extend(Constant("a"), objects[0])
+    interpretation.add_predicate(Predicate("R", 2).extend(list(rows[0])))
+    for row in rows[1:]:
+        interpretation.predicates["R"].extend(list(row))
+    domain = DomainOfDiscourse("D", "M").bulk_expand(objects)
+    return Model("M").with_domain(domain).with_interpretation_function(interpretation)
+
+
+def test_snapshot_round_trip(tmp_path):
+    model = model_over(["o1", "o2", "o3"], [("o1", "o2"), ("o2", "o3")])
+    write_snapshot(model, tmp_path / "model.snapshot")
+    with Snapshot(tmp_path / "model.snapshot") as snapshot:
+        assert list(snapshot.domain) == ["o1", "o2", "o3"]
+        for formula in ("∃x(R(a, x))", "∀x(R(x, a))", "∃x∃y(R(x, y) ∧ R(y, x))", "∃x∃y(R(a, x) ∧ R(x, y))"):
+            assert evaluate(Parser(formula, snapshot.model).parse(), snapshot.model.I) == evaluate(
+                Parser(formula, model).parse(), model.I
+            )
+
+
+@pytest.mark.parametrize("objects", [[1, 2], [(0, 1), (1, 0)]])
+def test_snapshot_rejects_objects_that_are_not_strings(tmp_path, objects):
+    model = model_over(objects, [(objects[0], objects[1])])
+    with pytest.raises(ValueError):
+        write_snapshot(model, tmp_path / "model.snapshot")
+
+
+def test_fingerprint_of_a_snapshot(tmp_path):
+    model = model_over(["o1", "o2", "o3"], [("o1", "o2"), ("o2", "o3"), ("o3", "o3")])
+    write_snapshot(model, tmp_path / "model.snapshot")
+    with Snapshot(tmp_path / "model.snapshot") as snapshot:
+        assert fingerprint(snapshot.model) == fingerprint(model)
+        assert snapshot.model.I.predicates["R"].extension == {("o1", "o2"), ("o2", "o3"), ("o3", "o3")}
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from interpretation_function.constant import Constant
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+def sorted_model(people, documents, wrote):
+    domain = DomainOfDiscourse("D").add_sort("Person", people).add_sort("Doc", documents)
+    W = Predicate("W", 2, ["Person", "Doc"])
+    for row in wrote:
+        W.extend(list(row))
+    interpretation = Interpretation().add_predicate(W).extend(Constant("c"), documents[0])
+    return Model("M").with_domain(domain).with_interpretation_function(interpretation)
+
+
+def test_typed_quantifiers_range_over_their_sort():
+    rng = random.Random(0)
+    for _ in range(30):
+        people = [f"p{i}" for i in range(rng.randint(1, 3))]
+        documents = [f"d{i}" for i in range(rng.randint(1, 3))]
+        wrote = {(p, d) for p in people for d in documents if rng.random() < 0.5}
+        model = sorted_model(people, documents, wrote)
+        cases = {
+            "∀x:Person(∃y:Doc(W(x, y)))": all(any((p, d) in wrote for d in documents) for p in people),
+            "∀y:Doc(∃x:Person(W(x, y)))": all(any((p, d) in wrote for p in people) for d in documents),
+            "∃x:Person(W(x, c))": any((p, documents[0]) in wrote for p in people),
+        }
+        for formula, expected in cases.items():
+            assert evaluate(Parser(formula, model).parse(), model.I) == expected, formula
+
+
+@pytest.mark.parametrize("formula", ["∀x:Doc(W(x, c))", "∀x:Person(W(c, x))", "∀x:Robot(W(x, c))"])
+def test_sort_errors_are_reported_by_the_parser(formula):
+    model = sorted_model(["p0"], ["d0"], [("p0", "d0")])
+    with pytest.raises(ValueError):
+        Parser(formula, model).parse()
@@ -0,0 +1,76 @@
+import random
+
+from interpretation_function.constant import Constant
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.fingerprint import fingerprint
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from modal_logic.sqlite_interpretation import SQLiteInterpretation
+from syntax.ast_evaluate import evaluate
+from syntax.ast_to_sql import evaluate_sql
+from syntax.first_order_logic_syntax import Parser
+
+
+def random_formula(rng, depth, variables):
+    r = rng.random()
+    if depth == 0 or r < 0.3:
+        if rng.random() < 0.4:
+            return f"R({rng.choice(variables)}, {rng.choice(variables)})"
+        return f"{rng.choice('AB')}({rng.choice(variables)})"
+    if r < 0.45:
+        return f"¬({random_formula(rng, depth - 1, variables)})"
+    if r < 0.7:
+        variable = "xyz"[min(len(variables) - 1, 2)]
+        return f"{rng.choice('∀∃')}{variable}({random_formula(rng, depth - 1, variables + [variable])})"
+    operator = rng.choice(["∧", "∨", "→"])
+    return f"({random_formula(rng, depth - 1, variables)} {operator} {random_formula(rng, depth - 1, variables)})"
+
+
+def random_models(rng):
+    objects = [f"o{i}" for i in range(rng.randint(1, 4))]
+    A, B, R = Predicate("A", 1), Predicate("B", 1), Predicate("R", 2)
+    for obj in objects:
+        if rng.random() < 0.5:
+            A.extend(obj)
+        if rng.random() < 0.5:
+            B.extend(obj)
+        for other in objects:
+            if rng.random() < 0.3:
+                R.extend([obj, other])
+    interpretation = Interpretation().add_predicate(A).add_predicate(B).add_predicate(R)
+    interpretation.extend(Constant("c"), objects[0])
+    model = Model("M").with_domain(DomainOfDiscourse("D").expand(objects)).with_interpretation_function(interpretation)
+
+    stored = SQLiteInterpretation()
+    stored.add_objects(objects)
+    for predicate in (A, B, R):
+        stored.add_predicate(predicate)
+    stored.add_constant(Constant("c"), objects[0])
+    return model, Model("S").with_interpretation_function(stored)
+
+
+def test_sql_evaluation_agrees_with_the_evaluator():
+    rng = random.Random(1)
+    for _ in range(100):
+        model, stored = random_models(rng)
+        formula = f"{rng.choice('∀∃')}x({random_formula(rng, 3, ['x', 'c'])})"
+        expected = evaluate(Parser(formula, model).parse(), model.I)
+        assert evaluate(Parser(formula, stored).parse(), stored.I) == expected
+        assert evaluate_sql(Parser(formula, stored).parse(), stored.I) == expected
+
+
+def test_fingerprint_of_a_stored_model():
+    rng = random.Random(2)
+    for _ in range(20):
+        model, stored = random_models(rng)
+        assert fingerprint(stored) == fingerprint(model)
+
+
+def test_extension_follows_inserts():
+    stored = SQLiteInterpretation()
+    P = stored.declare_predicate("P", 1)
+    stored.add_tuples("P", [("o1",)])
+    assert P.extension == {("o1",)}
+    stored.add_tuples("P", [("o0",)])
+    assert P.extension == {("o0",), ("o1",)}
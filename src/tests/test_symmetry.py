@@ -0,0 +1,62 @@
+import random
+
+from interpretation_function.constant import Constant
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from modal_logic.symmetry import SymmetryPartition, evaluate_with_symmetry
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+def random_formula(rng, depth, variables):
+    r = rng.random()
+    if depth == 0 or r < 0.3:
+        if rng.random() < 0.4:
+            return f"R({rng.choice(variables)}, {rng.choice(variables)})"
+        return f"{rng.choice('AB')}({rng.choice(variables)})"
+    if r < 0.45:
+        return f"¬({random_formula(rng, depth - 1, variables)})"
+    if r < 0.7:
+        variable = "xyz"[min(len(variables) - 1, 2)]
+        return f"{rng.choice('∀∃')}{variable}({random_formula(rng, depth - 1, variables + [variable])})"
+    operator = rng.choice(["∧", "∨", "→"])
+    return f"({random_formula(rng, depth - 1, variables)} {operator} {random_formula(rng, depth - 1, variables)})"
+
+
+def random_model(rng):
+    objects = [f"o{i}" for i in range(rng.randint(1, 7))]
+    A, B, R = Predicate("A", 1), Predicate("B", 1), Predicate("R", 2)
+    for obj in objects:
+        if rng.random() < 0.5:
+            A.extend(obj)
+        if rng.random() < 0.5:
+            B.extend(obj)
+        for other in objects:
+            if rng.random() < 0.15:
+                R.extend([obj, other])
+    interpretation = Interpretation().add_predicate(A).add_predicate(B).add_predicate(R)
+    interpretation.extend(Constant("c"), objects[0])
+    return Model("M").with_domain(DomainOfDiscourse("D").expand(objects)).with_interpretation_function(interpretation)
+
+
+def test_evaluation_by_class_agrees_with_the_evaluator():
+    rng = random.Random(0)
+    for _ in range(50):
+        model = random_model(rng)
+        formula = Parser(f"{rng.choice('∀∃')}x({random_formula(rng, 4, ['x', 'c'])})", model).parse()
+        expected = evaluate(formula, model.I)
+        for refine_relations in (True, False):
+            assert evaluate_with_symmetry(formula, model.I, refine_relations) == expected
+
+
+def test_objects_outside_every_relation_form_one_class():
+    objects = [f"u{i}" for i in range(20)] + ["a", "b"]
+    A = Predicate("A", 1).extend("a")
+    R = Predicate("R", 2).extend(["a", "b"]).extend(["b", "a"])
+    interpretation = Interpretation().add_predicate(A).add_predicate(R)
+    model = Model("M").with_domain(DomainOfDiscourse("D").bulk_expand(objects)).with_interpretation_function(interpretation)
+    formula = Parser("∀x(∀y(R(x, y) → R(y, x)) ∧ ∃y(¬A(y)))", model).parse()
+    assert len(SymmetryPartition(formula, interpretation).classes) == 3
+    assert evaluate_with_symmetry(formula, interpretation) is evaluate(formula, interpretation) is True
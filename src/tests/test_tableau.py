@@ -0,0 +1,79 @@
+import pytest
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from proof_theory.tableau import CLOSED, OPEN, UNKNOWN, prove, satisfiable
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+
+def parse(formula: str):
+    return Parser(formula, M).parse()
+
+
+@pytest.mark.parametrize(
+    "formula",
+    [
+        "(a = b) → ¬(b ≠ a)",
+        "((a = b) ∧ ¬(c ≠ b)) → (a = c)",
+        "(¬(a ≠ b) ∧ P(a)) → P(b)",
+        "((a = b) ∧ P(a)) → P(b)",
+        "∀x(x = x)",
+    ],
+)
+def test_proves_valid_formulas(formula):
+    assert prove(parse(formula)).status == CLOSED
+
+
+@pytest.mark.parametrize(
+    "formula",
+    [
+        "(a = b) → (b ≠ a)",
+        "(a = b) → (a = c)",
+        "(¬(a ≠ b) ∧ P(a)) → ¬P(b)",
+    ],
+)
+def test_does_not_prove_invalid_formulas(formula):
+    assert prove(parse(formula)).status == OPEN
+
+
+@pytest.mark.parametrize(
+    "formulas",
+    [
+        ["(a = b) ∧ ¬(b ≠ a)"],
+        ["(a = b)", "¬(b ≠ a)", "P(a)"],
+        ["¬(a ≠ b)", "¬(c ≠ b)", "P(a) ∨ P(c)"],
+    ],
+)
+def test_negated_inequations_under_equations_are_satisfiable(formulas):
+    result = satisfiable([parse(formula) for formula in formulas])
+    assert result.status == OPEN
+    assert result.model is not None
+
+
+def test_unsatisfiable_with_negated_inequation():
+    assert satisfiable([parse("¬(a ≠ b)"), parse("P(a)"), parse("¬P(b)")]).status == CLOSED
+
+
+def test_deep_tableau_does_not_exhaust_the_stack():
+    formulas = ["∀y∃z(Q(y))", "a = a", "∀x∀y∀z((R(x, y) ∧ R(y, z)) → R(x, z))"]
+    result = satisfiable([parse(formula) for formula in formulas], max_nodes=3000)
+    assert result.status in (OPEN, UNKNOWN)
+
+
+@pytest.mark.parametrize(
+    "formulas, kwargs",
+    [
+        (["∀x(P(f(x)) → ¬P(x))"], {"max_term_depth": 0}),
+        (["∀x(f(f(x)) = x)"], {}),
+        (["∀x(f(f(x)) = x)", "P(a)"], {"max_term_depth": 1}),
+    ],
+)
+def test_branch_models_with_functions_cut_off_by_the_term_depth(formulas, kwargs):
+    result = satisfiable([parse(formula) for formula in formulas], **kwargs)
+    assert result.status in (OPEN, UNKNOWN)
+    if result.status == OPEN:
+        assert all(evaluate(parse(formula), result.model) for formula in formulas)
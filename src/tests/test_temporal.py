@@ -0,0 +1,109 @@
+import random
+
+from interpretation_function.constant import Constant
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from modal_logic.temporal import SATISFIED, VIOLATED, TemporalMonitor
+from semantics.model_finder import Signature, build_model
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import (
+    AndExpr,
+    ImpliesExpr,
+    NotExpr,
+    OrExpr,
+    Parser,
+    PredicateExpr,
+    QuantifierExpr,
+    SentenceLetterExpr,
+    TemporalExpr,
+    UntilExpr,
+)
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+SIGNATURE = Signature([Parser("(P ∧ Q ∧ ∀x(R(x) ∧ T(x)))", M).parse()])
+
+
+def holds_at(node, trace, i, bindings):
+    """The truth value of a formula at position i of a finite trace, by the definitions."""
+    if isinstance(node, TemporalExpr):
+        if node.operator == "next":
+            return i + 1 < len(trace) and holds_at(node.expr, trace, i + 1, bindings)
+        values = (holds_at(node.expr, trace, j, bindings) for j in range(i, len(trace)))
+        return all(values) if node.operator == "always" else any(values)
+    if isinstance(node, UntilExpr):
+        return any(
+            holds_at(node.right, trace, j, bindings) and all(holds_at(node.left, trace, k, bindings) for k in range(i, j))
+            for j in range(i, len(trace))
+        )
+    if isinstance(node, NotExpr):
+        return not holds_at(node.expr, trace, i, bindings)
+    if isinstance(node, AndExpr):
+        return all(holds_at(operand, trace, i, bindings) for operand in node.operands)
+    if isinstance(node, OrExpr):
+        return any(holds_at(operand, trace, i, bindings) for operand in node.operands)
+    if isinstance(node, ImpliesExpr):
+        return not holds_at(node.left, trace, i, bindings) or holds_at(node.right, trace, i, bindings)
+    if isinstance(node, QuantifierExpr):
+        values = [holds_at(node.expr, trace, i, {**bindings, node.variable: obj}) for obj in list(trace[i].I.domain)]
+        return all(values) if node.quantifier == "∀" else any(values)
+    interpretation = trace[i].I
+    for variable, obj in bindings.items():
+        interpretation.extend(Constant(variable), obj)
+    value = evaluate(node, interpretation)
+    for variable in bindings:
+        interpretation.remove_constant_object_mapping(Constant(variable))
+    return value
+
+
+def random_formula(rng, depth, first_order, variable=None):
+    if depth == 0 or rng.random() < 0.2:
+        if first_order and variable:
+            return PredicateExpr(rng.choice("RT"), [variable])
+        return SentenceLetterExpr(rng.choice("PQ"))
+    kind = rng.randrange(9)
+    if kind == 0:
+        return NotExpr(random_formula(rng, depth - 1, first_order, variable))
+    if kind in (1, 2, 3, 4):
+        expr = {1: AndExpr, 2: OrExpr, 3: ImpliesExpr, 4: UntilExpr}[kind]
+        return expr(random_formula(rng, depth - 1, first_order, variable), random_formula(rng, depth - 1, first_order, variable))
+    if kind == 5 and first_order and variable is None:
+        return QuantifierExpr(rng.choice("∀∃"), "x", random_formula(rng, depth - 1, first_order, "x"))
+    return TemporalExpr(rng.choice(TemporalExpr.OPERATORS), random_formula(rng, depth - 1, first_order, variable))
+
+
+def random_model(rng, n):
+    cells = [(letter,) for letter in "PQ" if rng.random() < 0.5]
+    cells += [(predicate, (i,)) for predicate in "RT" for i in range(n) if rng.random() < 0.5]
+    return build_model(SIGNATURE, n, {}, {}, cells)
+
+
+def test_monitor_agrees_with_finite_trace_semantics():
+    rng = random.Random(0)
+    for trial in range(100):
+        formula = random_formula(rng, 4, first_order=trial % 2 == 1)
+        trace = [random_model(rng, rng.randint(1, 3)) for _ in range(rng.randint(1, 6))]
+        monitor = TemporalMonitor(formula)
+        whole = holds_at(formula, trace, 0, {})
+        for k, model in enumerate(trace):
+            verdict = monitor.step(model)
+            assert monitor.final() == holds_at(formula, trace[: k + 1], 0, {})
+            # A settled verdict holds whatever models follow
+            if verdict == SATISFIED:
+                assert whole
+            elif verdict == VIOLATED:
+                assert not whole
+
+
+def test_obligations_stay_bounded_on_a_long_trace():
+    rng = random.Random(1)
+    monitor = TemporalMonitor(Parser("always ∀x((R(x) → eventually T(x)))", M).parse())
+    sizes = []
+    for _ in range(100):
+        cells = [("R", (i,)) for i in range(5) if rng.random() < 0.2]
+        cells += [("T", (i,)) for i in range(5) if rng.random() < 0.2]
+        monitor.step(build_model(SIGNATURE, 5, {}, {}, cells))
+        sizes.append(monitor.size)
+    # The always obligation and at most one outstanding eventually T(x) per object
+    assert max(sizes) <= 1 + 5
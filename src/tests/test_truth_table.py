@@ -0,0 +1,54 @@
+import itertools
+import random
+
+import pytest
+
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from semantics.truth_table import truth_table
+from syntax.first_order_logic_syntax import Parser
+
+
+M = Model("M").with_interpretation_function(Interpretation())
+
+
+def random_formula(rng, depth, letters):
+    """A formula as a string and as a function of a valuation."""
+    if depth == 0 or rng.random() < 0.2:
+        letter = rng.choice(letters)
+        return letter, lambda valuation: valuation[letter]
+    if rng.random() < 0.2:
+        text, value = random_formula(rng, depth - 1, letters)
+        return f"¬{text}", lambda valuation: not value(valuation)
+    (left, left_value), (right, right_value) = (random_formula(rng, depth - 1, letters) for _ in range(2))
+    operator = rng.choice(["∧", "∨", "→"])
+    combine = {
+        "∧": lambda a, b: a and b,
+        "∨": lambda a, b: a or b,
+        "→": lambda a, b: not a or b,
+    }[operator]
+    return f"({left} {operator} {right})", lambda valuation: combine(left_value(valuation), right_value(valuation))
+
+
+@pytest.mark.parametrize("chunk_bits", [0, 2, 16])
+def test_rows_agree_with_evaluating_each_valuation(chunk_bits):
+    rng = random.Random(chunk_bits)
+    for _ in range(60):
+        text, value = random_formula(rng, 4, list("PQRSTUVW")[: rng.randint(1, 8)])
+        table = truth_table(Parser(text, M).parse(), chunk_bits)
+        # Row 0 makes every letter true and the first letter changes slowest
+        valuations = [
+            dict(zip(table.letters, values)) for values in itertools.product([True, False], repeat=table.n)
+        ]
+        assert [row for row, _ in table.rows()] == valuations
+        expected = [value(valuation) for valuation in valuations]
+        assert [truth for _, truth in table.rows()] == expected
+        assert [row for row, _ in table.rows(only_true=True)] == [v for v, e in zip(valuations, expected) if e]
+        assert table.count_true() == sum(expected)
+        classification = "tautology" if all(expected) else "contradiction" if not any(expected) else "contingent"
+        assert table.classify() == classification
+
+
+def test_quantified_formulas_have_no_truth_table():
+    with pytest.raises(ValueError):
+        truth_table(Parser("∀x(P(x))", M).parse())
@@ -0,0 +1,50 @@
+import pytest
+
+from interpretation_function.constant import Constant
+from interpretation_function.function import Function
+from interpretation_function.predicate import Predicate
+from modal_logic.domain import DomainOfDiscourse
+from modal_logic.interpretation import Interpretation
+from modal_logic.model import Model
+from modal_logic.union_find import UnionFind
+from syntax.ast_evaluate import evaluate
+from syntax.first_order_logic_syntax import Parser
+
+
+def test_members_follow_unions():
+    sets = UnionFind()
+    for a, b in [(1, 2), (3, 4), (2, 4), (5, 6)]:
+        sets.union(a, b)
+    assert sorted(sets.members(1)) == [1, 2, 3, 4]
+    assert sorted(sets.members(6)) == [5, 6]
+    assert sets.members(7) == [7]
+    assert sets.connected(1, 3) and not sets.connected(1, 5)
+    assert sum(len(members) for members in sets.sets.values()) == len(sets)
+
+
+def test_aliased_constants_denote_the_object_of_their_class():
+    interpretation = Interpretation()
+    for i in range(1000):
+        interpretation.alias(Constant(f"c{i}"), Constant(f"c{i + 1}"))
+    interpretation.extend(Constant("c1000"), "o")
+    assert interpretation(Constant("c0")) == "o"
+    assert interpretation(Constant("c500")) == "o"
+
+
+def test_alias_rejects_constants_with_different_objects():
+    interpretation = Interpretation().extend(Constant("a"), "o1").extend(Constant("b"), "o2")
+    interpretation.alias(Constant("a"), Constant("c"))
+    with pytest.raises(ValueError):
+        interpretation.alias(Constant("c"), Constant("b"))
+
+
+def test_function_terms_follow_the_object_of_an_aliased_constant():
+    interpretation = Interpretation().extend(Constant("a"), "o1")
+    interpretation.set_domain(DomainOfDiscourse("D").expand(["o1", "o2"]))
+    interpretation.add_function(Function("f", 1, compute=lambda obj: obj))
+    interpretation.add_predicate(Predicate("P", 1).extend("o1"))
+    interpretation.alias(Constant("b"), Constant("a"))
+    formula = Parser("P(f(b))", Model("M").with_interpretation_function(interpretation)).parse()
+    assert evaluate(formula, interpretation) is True
+    interpretation.extend(Constant("a"), "o2")
+    assert evaluate(formula, interpretation) is False